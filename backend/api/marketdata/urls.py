@@ -1,3 +1,6 @@
 from django.urls import path
+from .views import MarketDataLatestView
+
 urlpatterns = [
+    path("", MarketDataLatestView.as_view(), name="marketdata-latest"),
 ]
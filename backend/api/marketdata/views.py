@@ -18,8 +18,9 @@ def _to_dt(v):
 
 class MarketDataLatestView(APIView):
     """
-    GET /api/marketdata?pair=EURUSD&tf=15m
+    GET /api/marketdata?pair=EURUSD&tf=15m[&provisional=1]
     Returns the latest ingestion slice for (pair, tf) with ETag/Last-Modified.
+    provisional=1 adds the still-forming bar (not persisted yet) under "forming".
     """
     def get(self, request):
         pair = request.query_params.get("pair") or request.query_params.get("symbol")
@@ -57,7 +58,18 @@ class MarketDataLatestView(APIView):
             "provider": provider,
         }
 
-        token = f"{sym}|{tf}|{payload['last_ingest_ts'] or ''}".encode("utf-8")
+        token = f"{sym}|{tf}|{payload['last_ingest_ts'] or ''}"
+        if request.query_params.get("provisional") in ("1", "true", "True"):
+            from backend.ingestion.forming import get_forming_bars
+            bar = get_forming_bars().get(sym, tf)
+            if bar:
+                ts = _to_dt(bar["timestamp"])
+                bar = dict(bar, timestamp=ts.isoformat().replace("+00:00", "Z"))
+                token += f"|{bar['timestamp']}|{bar['close']}|{bar.get('volume')}"
+            payload["forming"] = bar
+            # The forming bar changes between ingests; skip the time-based 304 below
+            last_ing = None
+        token = token.encode("utf-8")
         etag = md5(token).hexdigest()
         inm = request.headers.get("If-None-Match")
         if inm and inm.strip('"') == etag:
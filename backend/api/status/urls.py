@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import IngestionStatusView
+from .views import IngestionStatusView, QuotaBudgetView
 
 urlpatterns = [
     path("status", IngestionStatusView.as_view(), name="ingestion-status"),
     path("status/", IngestionStatusView.as_view()),
+    path("quota", QuotaBudgetView.as_view(), name="ingestion-quota"),
 ]
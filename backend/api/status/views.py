@@ -45,3 +45,14 @@ class IngestionStatusView(APIView):
     """Compatibility wrapper for tests that call the CBV."""
     def get(self, request, *args, **kwargs):
         return ingestion_status(request)
+
+
+class QuotaBudgetView(APIView):
+    """
+    GET /api/ingestion/quota[?provider=AllTick]
+    Today's request budget per provider and (symbol, timeframe): projected vs actual burn.
+    """
+    def get(self, request, *args, **kwargs):
+        from backend.ingestion.quota_budget import budget_report
+        provider = request.query_params.get("provider")
+        return Response({"providers": budget_report([provider] if provider else None)})
@@ -0,0 +1,201 @@
+# backend/ingestion/aggregator.py
+"""
+Tick → bar aggregator with incremental multi-timeframe rollup.
+
+- add_tick() builds base (1m) bars from trades/quotes; a base bar closes when the first
+  tick of a later minute arrives (or on flush_ticks() for quiet markets).
+- add_bar() takes closed base bars (from ticks or straight from a provider; timestamps are
+  floored to the base step) and rolls them up into every target timeframe (default
+  5m/15m/1h/4h, buckets aligned to UTC epoch).
+  A rollup bar is emitted exactly once: when the base bar that ends its bucket arrives, or,
+  if that base bar is missing, when the first base bar of a later bucket arrives.
+- Re-delivered or late base bars (at/before the last one seen for the symbol) are ignored,
+  so polling "latest bar" repeatedly is safe.
+- Open buckets live in memory; warm_start() rebuilds them from MarketData base bars so a
+  restart does not emit half-filled bars.
+- roll_up() is what ingestion uses: a fresh aggregator per cycle, warm-started from the
+  stored (closed) base bars, so every Celery worker derives the same rollups from the
+  database instead of from whatever part of the feed its own process happened to see.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.tasks.utils import timeframe_seconds
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TIMEFRAMES = tuple(
+    t.strip() for t in os.getenv("ROLLUP_TIMEFRAMES", "5m,15m,1h,4h").split(",") if t.strip()
+)
+
+
+def _epoch(ts: datetime) -> int:
+    return int(ts.timestamp())
+
+
+def _utc(epoch_s: int) -> datetime:
+    return datetime.fromtimestamp(epoch_s, dt_timezone.utc)
+
+
+class _Bucket:
+    __slots__ = ("start", "open", "high", "low", "close", "volume", "count", "provider")
+
+    def __init__(self, start: int, bar: dict):
+        self.start = start
+        self.open, self.high, self.low, self.close = bar["open"], bar["high"], bar["low"], bar["close"]
+        self.volume = bar.get("volume") or 0.0
+        self.count = 1
+        self.provider = bar.get("provider")
+
+    def merge(self, bar: dict) -> None:
+        self.high = max(self.high, bar["high"])
+        self.low = min(self.low, bar["low"])
+        self.close = bar["close"]
+        self.volume += bar.get("volume") or 0.0
+        self.count += 1
+
+    def to_bar(self, symbol: str, timeframe: str) -> dict:
+        return {
+            "symbol": symbol, "timeframe": timeframe, "timestamp": _utc(self.start),
+            "open": self.open, "high": self.high, "low": self.low, "close": self.close,
+            "volume": self.volume, "provider": self.provider, "source_bars": self.count,
+        }
+
+
+class BarAggregator:
+    def __init__(self, base: str = "1m", targets: Iterable[str] = ROLLUP_TIMEFRAMES):
+        self.base = base
+        self.base_step = timeframe_seconds(base)
+        self.targets = [tf for tf in targets if tf != base]
+        self._steps = {tf: timeframe_seconds(tf) for tf in self.targets}
+        for tf, step in self._steps.items():
+            if step % self.base_step:
+                raise ValueError(f"{tf} is not a whole multiple of base timeframe {base}")
+        self._ticks: Dict[str, _Bucket] = {}                    # forming base bar per symbol
+        self._open: Dict[Tuple[str, str], _Bucket] = {}         # open rollup bucket per (symbol, tf)
+        self._emitted: Dict[Tuple[str, str], int] = {}          # last emitted bucket start
+        self._last_base: Dict[str, int] = {}                    # last base bar accepted per symbol
+        self._warmed: set = set()
+        self._lock = threading.Lock()
+
+    # ---- ticks → base bars ----
+    def add_tick(self, symbol: str, ts: datetime, price: float, volume: float = 0.0,
+                 provider: Optional[str] = None) -> List[dict]:
+        """Feed one trade/quote; returns closed bars (base first, then any rollups it completed)."""
+        t = _epoch(ts)
+        start = t - t % self.base_step
+        with self._lock:
+            cur = self._ticks.get(symbol)
+            if cur is not None and start < cur.start:
+                return []  # late tick for a bar that already closed
+            if cur is not None and start == cur.start:
+                cur.merge({"high": price, "low": price, "close": price, "volume": volume})
+                return []
+            self._ticks[symbol] = _Bucket(start, {"open": price, "high": price, "low": price, "close": price,
+                                                  "volume": volume, "provider": provider})
+        return self._close_base(symbol, cur) if cur is not None else []
+
+    def flush_ticks(self, symbol: str, now: datetime) -> List[dict]:
+        """Close the forming base bar if its interval has ended (no tick arrived after it)."""
+        with self._lock:
+            cur = self._ticks.get(symbol)
+            if cur is None or _epoch(now) < cur.start + self.base_step:
+                return []
+            del self._ticks[symbol]
+        return self._close_base(symbol, cur)
+
+    def _close_base(self, symbol: str, bucket: _Bucket) -> List[dict]:
+        bar = bucket.to_bar(symbol, self.base)
+        bar.pop("source_bars")
+        return [bar] + self.add_bar(bar)
+
+    # ---- base bars → rollups ----
+    def add_bar(self, bar: dict) -> List[dict]:
+        """Feed one closed base bar; returns rollup bars that closed because of it."""
+        symbol = bar["symbol"]
+        t = _epoch(bar["timestamp"])
+        t -= t % self.base_step
+        if t != _epoch(bar["timestamp"]):
+            bar = dict(bar, timestamp=_utc(t))
+        out = []
+        with self._lock:
+            if t <= self._last_base.get(symbol, -1):
+                return []
+            self._last_base[symbol] = t
+            for tf, step in self._steps.items():
+                key = (symbol, tf)
+                start = t - t % step
+                cur = self._open.get(key)
+                if cur is not None and cur.start != start:
+                    # Bucket's last base bar never came; the next bucket closes it
+                    out.append(self._emit(key, cur))
+                    cur = None
+                if cur is None:
+                    if start <= self._emitted.get(key, -1):
+                        continue
+                    cur = self._open[key] = _Bucket(start, bar)
+                else:
+                    cur.merge(bar)
+                if t + self.base_step >= start + step:
+                    out.append(self._emit(key, cur))
+        return out
+
+    def _emit(self, key: Tuple[str, str], bucket: _Bucket) -> dict:
+        self._open.pop(key, None)
+        self._emitted[key] = bucket.start
+        return bucket.to_bar(*key)
+
+    def open_bar(self, symbol: str, timeframe: str) -> Optional[dict]:
+        """Forming (not yet emitted) bar for (symbol, timeframe), if any."""
+        with self._lock:
+            cur = self._ticks.get(symbol) if timeframe == self.base else self._open.get((symbol, timeframe))
+            return cur.to_bar(symbol, timeframe) if cur is not None else None
+
+    # ---- restart safety ----
+    def seed(self, bars: Iterable[dict]) -> None:
+        """Replay already-stored base bars (oldest → newest) to rebuild open buckets silently."""
+        for bar in bars:
+            self.add_bar(bar)
+
+    def warm_start(self, symbols: Iterable[str], now: Optional[datetime] = None) -> None:
+        """
+        Seed open buckets for `symbols` from MarketData base bars since the start of the
+        widest bucket holding `now` (default: the current time).
+        """
+        from django.utils import timezone
+        from backend.models import MarketData
+
+        symbols = [s for s in symbols if s not in self._warmed]
+        self._warmed.update(symbols)
+        if not symbols or not self._steps:
+            return
+        n = _epoch(now or timezone.now())
+        widest = max(self._steps.values())
+        since = _utc(n - n % widest)
+        rows = (
+            MarketData.objects.filter(symbol__in=symbols, timeframe=self.base, timestamp__gte=since)
+            .order_by("symbol", "timestamp")
+            .values("symbol", "timestamp", "open", "high", "low", "close", "volume", "provider")
+        )
+        self.seed(rows)
+
+
+def roll_up(bars: Iterable[dict], base: str = "1m", targets: Iterable[str] = ROLLUP_TIMEFRAMES) -> List[dict]:
+    """
+    Rollup bars completed by freshly fetched closed base `bars`. Bucket state is rebuilt from
+    MarketData on every call (from one widest bucket before the oldest new bar, so a bucket whose
+    last base bar never came is still closed by the next one), so the result does not depend on
+    which worker ran earlier cycles; bars already stored are skipped.
+    """
+    bars = sorted(bars, key=lambda b: b["timestamp"])
+    if not bars:
+        return []
+    agg = BarAggregator(base, targets)
+    widest = max(agg._steps.values(), default=0)
+    agg.warm_start({b["symbol"] for b in bars}, now=_utc(_epoch(bars[0]["timestamp"]) - widest))
+    return [rolled for bar in bars for rolled in agg.add_bar(bar)]
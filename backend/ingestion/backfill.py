@@ -0,0 +1,154 @@
+# backend/ingestion/backfill.py
+"""
+Resumable historical backfill engine (used by `manage.py backfill_marketdata`).
+
+- One fetch thread per symbol (bounded pool) pages through provider history via
+  BaseProvider.fetch_history(); a shared token bucket keeps the provider under its rate limit.
+- Pages stream through a bounded queue to a single writer (the calling thread), which
+  bulk-upserts each page and advances the BackfillCheckpoint cursor in the same transaction.
+  Whatever the cursor says is written is written; a crash resumes from the cursor.
+- Fetch threads never touch the DB (SQLite has one writer anyway).
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from django.db import transaction
+from django.db.models import F
+
+from backend.models import BackfillCheckpoint
+from backend.net.ratelimit import RateLimiter
+from backend.tasks.utils import timeframe_seconds, upsert_market_bars
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 5000
+_PUT_POLL_SEC = 0.5
+
+
+def _prepare_checkpoint(symbol: str, timeframe: str, provider_name: str,
+                        start: datetime, end: datetime, restart: bool) -> BackfillCheckpoint:
+    """Create or resume the checkpoint row; returns it with cursor_ts set to the next bar to fetch."""
+    ckpt = BackfillCheckpoint.objects.filter(symbol=symbol, timeframe=timeframe).first()
+    if ckpt is None:
+        return BackfillCheckpoint.objects.create(
+            symbol=symbol, timeframe=timeframe, provider=provider_name,
+            range_start=start, range_end=end, cursor_ts=start,
+        )
+    if restart or start < ckpt.range_start:
+        # Requested history earlier than what we covered (or forced): start over
+        ckpt.range_start = start
+        ckpt.cursor_ts = start
+        ckpt.bars_written = 0
+    else:
+        ckpt.cursor_ts = max(ckpt.cursor_ts, start)
+    ckpt.range_end = end
+    ckpt.provider = provider_name
+    ckpt.status = "RUNNING"
+    ckpt.error_message = None
+    ckpt.save()
+    return ckpt
+
+
+def _page_producer(provider, symbol: str, timeframe: str, cursor: datetime, end: datetime,
+                   page_size: int, limiter: RateLimiter, out: queue.Queue, stop: threading.Event) -> None:
+    step = timedelta(seconds=timeframe_seconds(timeframe))
+
+    def _put(item) -> bool:
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=_PUT_POLL_SEC)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        while cursor < end and not stop.is_set():
+            window_end = min(end, cursor + step * page_size)
+            limiter.acquire()
+            bars = provider.fetch_history(symbol, timeframe, cursor, window_end, limit=page_size)
+            if len(bars) >= page_size and bars[-1]["timestamp"] >= cursor:
+                # Page truncated by the provider limit: continue right after the last bar
+                nxt = min(window_end, bars[-1]["timestamp"] + step)
+            else:
+                # Window exhausted (gaps such as weekends simply yield short pages)
+                nxt = window_end
+            if not _put(("page", symbol, bars, nxt)):
+                return
+            cursor = nxt
+        _put(("done", symbol, None, cursor))
+    except Exception as exc:
+        _put(("error", symbol, exc, cursor))
+
+
+def run_backfill(
+    provider,
+    symbols: Iterable[str],
+    timeframe: str,
+    start: datetime,
+    end: datetime,
+    *,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    workers: int = 4,
+    rate_per_sec: float = 5.0,
+    restart: bool = False,
+) -> Dict[str, object]:
+    """
+    Backfill [start, end) for every symbol from `provider`.
+    Returns {"symbols": {sym: {"status", "bars", "cursor"}}, "bars": total, "bars_per_sec": float}.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    timeframe_seconds(timeframe)  # validate early
+    checkpoints = {
+        sym: _prepare_checkpoint(sym, timeframe, provider.name, start, end, restart) for sym in symbols
+    }
+
+    limiter = RateLimiter(rate_per_sec)
+    pages: queue.Queue = queue.Queue(maxsize=max(2, workers * 2))  # backpressure on fetchers
+    stop = threading.Event()
+    summary = {sym: {"status": "RUNNING", "bars": 0, "cursor": ck.cursor_ts} for sym, ck in checkpoints.items()}
+    t0 = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(symbols) or 1))) as pool:
+        for sym, ck in checkpoints.items():
+            pool.submit(_page_producer, provider, sym, timeframe, ck.cursor_ts, end,
+                        page_size, limiter, pages, stop)
+        active = len(symbols)
+        try:
+            while active:
+                kind, sym, payload, cursor = pages.get()
+                ck = checkpoints[sym]
+                if kind == "page":
+                    with transaction.atomic():
+                        counts = upsert_market_bars(payload)
+                        n = counts["inserted"] + counts["updated"]
+                        BackfillCheckpoint.objects.filter(pk=ck.pk).update(
+                            cursor_ts=cursor, bars_written=F("bars_written") + n,
+                        )
+                    summary[sym]["bars"] += n
+                    summary[sym]["cursor"] = cursor
+                    continue
+
+                active -= 1
+                if kind == "done":
+                    BackfillCheckpoint.objects.filter(pk=ck.pk).update(status="DONE")
+                    summary[sym]["status"] = "DONE"
+                else:
+                    logger.error("backfill: %s %s failed at %s: %s", sym, timeframe, cursor, payload)
+                    BackfillCheckpoint.objects.filter(pk=ck.pk).update(
+                        status="FAILED", error_message=str(payload)[:2000],
+                    )
+                    summary[sym]["status"] = "FAILED"
+        finally:
+            stop.set()
+
+    total = sum(s["bars"] for s in summary.values())
+    elapsed = max(1e-9, time.monotonic() - t0)
+    return {"symbols": summary, "bars": total, "bars_per_sec": round(total / elapsed, 1)}
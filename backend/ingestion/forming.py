@@ -0,0 +1,133 @@
+# backend/ingestion/forming.py
+"""
+Forming-bar vs closed-bar handling for polled "latest bar" providers.
+
+Polling latest returns the bar that is still forming. Upserting it on every poll rewrites
+the same MarketData row each cycle and re-runs freshness/KPI/analysis work for a bar
+whose values will still change. FormingBars.split() separates one poll result into:
+- closed bars (open time + timeframe <= now): returned for persistence, and
+- the forming bar: kept in the Django cache per (symbol, timeframe) with its running
+  high/low/close/volume, so the API can still show it as a provisional bar.
+When the provider moves on to the next interval, the last snapshot of the previous forming
+bar is released as closed, unless the provider returned that closed bar itself. The last
+snapshot may miss ticks after the final poll; the gap scanner/backfill path can refresh it.
+
+The cache must be shared by every worker (Redis, see backend/net/shared_cache.py), and each
+read-merge-write runs under a per-series lock, so two workers polling the same series
+cannot drop each other's high/low or release the same closed bar twice.
+"""
+from __future__ import annotations
+
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from django.utils import timezone
+
+from backend.net import shared_cache
+from backend.tasks.utils import timeframe_seconds
+
+logger = logging.getLogger(__name__)
+
+FORMING_KEY_PREFIX = "forming_bar"
+# Per-series lock: held for one cache read-merge-write, so seconds are plenty
+_LOCK_TIMEOUT_SEC = 5.0
+_LOCK_WAIT_SEC = 2.0
+
+
+def _start(ts: datetime, step: int) -> int:
+    t = int(ts.timestamp())
+    return t - t % step
+
+
+class FormingBars:
+    """Still-open bars in the Django cache (shared by every worker, like the rate limiters)."""
+
+    def __init__(self, cache=None, prefix: str = FORMING_KEY_PREFIX):
+        if cache is None:
+            cache = shared_cache.cache
+        self.cache = cache
+        self.prefix = prefix
+        shared_cache.warn_if_local(cache, "forming bars")
+
+    def _key(self, symbol: str, timeframe: str) -> str:
+        return f"{self.prefix}:{symbol}:{timeframe}"
+
+    @contextmanager
+    def _locked(self, symbol: str, timeframe: str):
+        with shared_cache.lock(self.cache, self._key(symbol, timeframe),
+                               timeout=_LOCK_TIMEOUT_SEC, blocking_timeout=_LOCK_WAIT_SEC) as held:
+            if not held:
+                logger.warning("forming bars: lock for %s %s not acquired; updating unlocked", symbol, timeframe)
+            yield
+
+    def get(self, symbol: str, timeframe: str) -> Optional[dict]:
+        """Latest snapshot of the forming bar (marked provisional), or None."""
+        bar = self.cache.get(self._key(symbol, timeframe))
+        return dict(bar, provisional=True) if bar else None
+
+    def remember(self, bar: dict) -> dict:
+        """Merge a forming-bar snapshot into the cached one for the same interval."""
+        with self._locked(bar["symbol"], bar["timeframe"]):
+            return self._remember(bar)
+
+    def _remember(self, bar: dict) -> dict:
+        step = timeframe_seconds(bar["timeframe"])
+        key = self._key(bar["symbol"], bar["timeframe"])
+        cur = self.cache.get(key)
+        snap = {k: v for k, v in bar.items() if k != "provisional"}
+        if cur and _start(cur["timestamp"], step) == _start(bar["timestamp"], step):
+            snap["timestamp"] = cur["timestamp"]
+            snap["open"] = cur["open"]
+            snap["high"] = max(cur["high"], bar["high"])
+            snap["low"] = min(cur["low"], bar["low"])
+        # Outlive the interval by one bar so a late poll can still release it as closed
+        self.cache.set(key, snap, timeout=2 * step + 60)
+        return snap
+
+    def discard(self, symbol: str, timeframe: str) -> None:
+        self.cache.delete(self._key(symbol, timeframe))
+
+    def split(self, symbol: str, timeframe: str, bars: Iterable[dict],
+              now: Optional[datetime] = None) -> List[dict]:
+        """
+        Return the closed bars of one poll result (oldest → newest) and cache the forming one.
+        A previously cached bar whose interval has ended is included as closed.
+        """
+        with self._locked(symbol, timeframe):
+            return self._split(symbol, timeframe, bars, now)
+
+    def _split(self, symbol: str, timeframe: str, bars: Iterable[dict], now: Optional[datetime]) -> List[dict]:
+        step = timeframe_seconds(timeframe)
+        n = int((now or timezone.now()).timestamp())
+        cached = self.cache.get(self._key(symbol, timeframe))
+
+        closed, forming = [], None
+        for bar in sorted(bars, key=lambda b: b["timestamp"]):
+            if _start(bar["timestamp"], step) + step <= n:
+                closed.append(bar)
+            else:
+                forming = bar
+
+        if forming is not None:
+            snap = self._remember(forming)
+            if cached and _start(cached["timestamp"], step) == _start(snap["timestamp"], step):
+                cached = None  # same interval, merged above
+        if cached and _start(cached["timestamp"], step) + step <= n:
+            starts = {_start(b["timestamp"], step) for b in closed}
+            if _start(cached["timestamp"], step) not in starts:
+                closed.insert(0, cached)
+            if forming is None:
+                self.discard(symbol, timeframe)
+        return sorted(closed, key=lambda b: b["timestamp"])
+
+
+_FORMING: Optional[FormingBars] = None
+
+
+def get_forming_bars() -> FormingBars:
+    global _FORMING
+    if _FORMING is None:
+        _FORMING = FormingBars()
+    return _FORMING
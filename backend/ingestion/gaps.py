@@ -0,0 +1,251 @@
+# backend/ingestion/gaps.py
+"""
+Gap scanner and targeted repair for MarketData (driven by backend.tasks.gap_tasks).
+
+scan_gaps():
+- One ordered, index-backed pass over (symbol, timeframe, timestamp) for every watchlist
+  series inside a lookback window; consecutive bars further apart than the timeframe step
+  (watchlist cadence) leave missing timestamps, and so do bars missing between the start
+  of the window and the first stored one and closed bars missing after the last stored
+  one up to now. A series with no bars in the window is missing throughout. Expected closures (FX weekend, 17:00 New York time Friday →
+  Sunday, DST-aware) are not gaps.
+- Each missing run becomes a GapRepair ledger row (QUEUED). Runs already QUEUED or given up
+  on (UNFILLABLE) are left alone, so the scan stays cheap enough for every few minutes
+  (concurrent scans inserting the same run keep one row);
+  a QUEUED row whose repair task never reported back (lost message, dead worker) is
+  dispatched again once it is older than GAP_REQUEUE_AFTER_MIN.
+
+repair_gap():
+- Fetches exactly the missing range from the provider history endpoint, bulk-upserts it and
+  records the outcome (REPAIRED / PARTIAL / UNFILLABLE / FAILED) on the ledger row.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from backend.models import GapRepair, MarketData
+from backend.tasks.utils import parse_watchlist, timeframe_seconds, upsert_market_bars
+
+logger = logging.getLogger(__name__)
+
+# Defaults; the watchlist may override them under `gap_scan:`.
+GAP_LOOKBACK_HOURS = float(os.getenv("GAP_LOOKBACK_HOURS", "48"))
+GAP_SKIP_WEEKENDS = os.getenv("GAP_SKIP_WEEKENDS", "1") in ("1", "true", "True")
+GAP_MAX_REPAIR_ATTEMPTS = int(os.getenv("GAP_MAX_REPAIR_ATTEMPTS", "3"))
+GAP_REPAIR_PAGE_SIZE = int(os.getenv("GAP_REPAIR_PAGE_SIZE", "5000"))
+# A QUEUED ledger row untouched for this long is dispatched again
+GAP_REQUEUE_AFTER_MIN = float(os.getenv("GAP_REQUEUE_AFTER_MIN", "30"))
+# Bars closed less than this long ago are not yet missing (ingestion is still due to write them)
+GAP_TRAILING_GRACE_SEC = int(os.getenv("GAP_TRAILING_GRACE_SEC", "120"))
+
+# FX weekend in New York time: Friday 17:00 → Sunday 17:00 (21:00/22:00 UTC with DST);
+# bar open times inside are not expected
+_WEEKEND_TZ = "America/New_York"
+_WEEKEND_CLOSE_HOUR = 17
+
+_ACTIVE = ("QUEUED", "UNFILLABLE")
+
+
+def _cfg() -> dict:
+    wl = parse_watchlist()
+    gs = wl.get("gap_scan") or {}
+    return {
+        "pairs": wl["pairs"],
+        "timeframes": wl["timeframes"],
+        "lookback_hours": float(gs.get("lookback_hours", GAP_LOOKBACK_HOURS)),
+        "skip_weekends": bool(gs.get("skip_weekends", GAP_SKIP_WEEKENDS)),
+        "requeue_after_min": float(gs.get("requeue_after_min", GAP_REQUEUE_AFTER_MIN)),
+        "trailing_grace_sec": int(gs.get("trailing_grace_sec", GAP_TRAILING_GRACE_SEC)),
+    }
+
+
+def _closed(epoch_s: np.ndarray) -> np.ndarray:
+    """Mask of bar open times that fall inside the FX weekend closure."""
+    local = pd.to_datetime(np.asarray(epoch_s, dtype=np.int64), unit="s", utc=True).tz_convert(_WEEKEND_TZ)
+    weekday, hour = np.asarray(local.weekday), np.asarray(local.hour)  # Monday = 0
+    return ((weekday == 4) & (hour >= _WEEKEND_CLOSE_HOUR)) | (weekday == 5) | (
+        (weekday == 6) & (hour < _WEEKEND_CLOSE_HOUR)
+    )
+
+
+def expected_bars(start_s: int, end_s: int, step: int, skip_weekends: bool = True) -> np.ndarray:
+    """Bar open times in [start_s, end_s] (epoch seconds) that should exist."""
+    stamps = np.arange(start_s, end_s + 1, step, dtype=np.int64)
+    return stamps[~_closed(stamps)] if skip_weekends else stamps
+
+
+def find_gaps(stamps: np.ndarray, step: int, skip_weekends: bool = True,
+              end: Optional[int] = None, start: Optional[int] = None) -> List[Tuple[int, int, int]]:
+    """
+    Missing runs between consecutive bars of one series.
+    stamps: sorted epoch seconds. end: epoch seconds of the first bar not yet expected
+    (the series end); bars missing between the last stamp and it count too. start: the
+    first bar expected (the scan's left edge); bars missing before the first stamp count
+    too, and a series without stamps is missing from start to end.
+    Returns [(first_missing, last_missing, n_missing)].
+    """
+    if start is not None and (not stamps.size or start < stamps[0]):
+        stamps = np.insert(stamps, 0, np.int64(start - step))
+    if end is not None and stamps.size and end > stamps[-1]:
+        stamps = np.append(stamps, np.int64(end))
+    if stamps.size < 2:
+        return []
+    out = []
+    for i in np.nonzero(np.diff(stamps) > step)[0]:
+        missing = expected_bars(int(stamps[i]) + step, int(stamps[i + 1]) - 1, step, skip_weekends)
+        if missing.size == 0:
+            continue
+        runs = np.split(missing, np.nonzero(np.diff(missing) > step)[0] + 1)
+        out.extend((int(r[0]), int(r[-1]), int(r.size)) for r in runs)
+    return out
+
+
+def _series_stamps(pairs: List[str], timeframes: List[str], since: datetime) -> Dict[Tuple[str, str], np.ndarray]:
+    """
+    Single ordered query over the (symbol, timeframe, timestamp) index for the whole universe.
+    Every (pair, timeframe) is present, with no stamps when it has no bars since `since`.
+    """
+    rows = (
+        MarketData.objects.filter(symbol__in=pairs, timeframe__in=timeframes, timestamp__gte=since)
+        .order_by("symbol", "timeframe", "timestamp")
+        .values_list("symbol", "timeframe", "timestamp")
+    )
+    buckets: Dict[Tuple[str, str], list] = {(sym, tf): [] for sym in pairs for tf in timeframes}
+    for sym, tf, ts in rows.iterator(chunk_size=5000):
+        buckets[(sym, tf)].append(int(ts.timestamp()))
+    return {k: np.asarray(v, dtype=np.int64) for k, v in buckets.items()}
+
+
+def _utc(epoch_s: int) -> datetime:
+    return datetime.fromtimestamp(epoch_s, dt_timezone.utc)
+
+
+def scan_gaps(pairs: Optional[List[str]] = None, timeframes: Optional[List[str]] = None,
+              now: Optional[datetime] = None, since: Optional[datetime] = None) -> dict:
+    """
+    Find missing bars for every (pair, timeframe) between `since` (default: the lookback
+    before now) and now, and queue ledger rows for new runs. A series with no bars in that
+    window (an outage longer than it, a newly added pair) is missing from `since` on.
+    Returns {"series", "gaps", "missing_bars", "queued": [GapRepair ids]}.
+    """
+    cfg = _cfg()
+    pairs = pairs or cfg["pairs"]
+    timeframes = timeframes or cfg["timeframes"]
+    now = now or timezone.now()
+    since = since or now - timedelta(hours=cfg["lookback_hours"])
+    stale_before = timezone.now() - timedelta(minutes=cfg["requeue_after_min"])
+    closed_by = int(now.timestamp()) - cfg["trailing_grace_sec"]
+
+    series = _series_stamps(pairs, timeframes, since)
+    known: Dict[Tuple[str, str], List[GapRepair]] = {}
+    for g in GapRepair.objects.filter(symbol__in=pairs, timeframe__in=timeframes, gap_end__gte=since):
+        known.setdefault((g.symbol, g.timeframe), []).append(g)
+
+    new_rows, requeue = [], []
+    n_gaps = n_missing = 0
+    for (sym, tf), stamps in series.items():
+        step = timeframe_seconds(tf)
+        # first bar whose interval has not closed (with grace) by now: the series end
+        series_end = closed_by - closed_by % step
+        # first bar open time inside the window: the series start
+        series_start = -(-int(since.timestamp()) // step) * step
+        for first, last, n in find_gaps(stamps, step, cfg["skip_weekends"], end=series_end, start=series_start):
+            n_gaps += 1
+            n_missing += n
+            start, end = _utc(first), _utc(last)
+            # A partly repaired run shrinks, so match ledger rows by overlap rather than start
+            row = next((g for g in known.get((sym, tf), ()) if g.gap_start <= end and g.gap_end >= start), None)
+            if row is None:
+                new_rows.append(GapRepair(symbol=sym, timeframe=tf, gap_start=start, gap_end=end, missing_bars=n))
+            elif row.status not in _ACTIVE or (row.status == "QUEUED" and row.updated_at < stale_before):
+                # Repaired/partial/failed before but still (partly) missing, or queued long
+                # ago and never picked up: try again
+                row.status = "QUEUED"
+                row.gap_start, row.gap_end, row.missing_bars = start, end, n
+                row.updated_at = timezone.now()  # bulk_update skips auto_now
+                requeue.append(row)
+
+    queued = []
+    if new_rows:
+        # A concurrent scan may insert the same run first: keep its row (and dispatch it again;
+        # repair upserts, so a duplicate repair only costs a fetch)
+        GapRepair.objects.bulk_create(new_rows, ignore_conflicts=True)
+        keys = {(g.symbol, g.timeframe, g.gap_start) for g in new_rows}
+        queued = [
+            pk for pk, sym, tf, start in GapRepair.objects.filter(
+                symbol__in={k[0] for k in keys}, timeframe__in={k[1] for k in keys},
+                gap_start__in={k[2] for k in keys}, status="QUEUED",
+            ).values_list("pk", "symbol", "timeframe", "gap_start")
+            if (sym, tf, start) in keys
+        ]
+    if requeue:
+        GapRepair.objects.bulk_update(requeue, ["status", "gap_start", "gap_end", "missing_bars", "updated_at"])
+
+    queued += [g.pk for g in requeue]
+    return {"series": len(series), "gaps": n_gaps, "missing_bars": n_missing, "queued": queued}
+
+
+def _fetch_range(provider, symbol: str, timeframe: str, start: datetime, end_excl: datetime) -> List[dict]:
+    step = timedelta(seconds=timeframe_seconds(timeframe))
+    bars, cursor = [], start
+    while cursor < end_excl:
+        page = provider.fetch_history(symbol, timeframe, cursor, end_excl, limit=GAP_REPAIR_PAGE_SIZE)
+        page = [b for b in page if start <= b["timestamp"] < end_excl]
+        if not page:
+            break
+        bars.extend(page)
+        if len(page) < GAP_REPAIR_PAGE_SIZE:
+            break
+        cursor = page[-1]["timestamp"] + step
+    return bars
+
+
+def repair_gap(gap_id: int, provider=None) -> dict:
+    """Fetch and write one ledger range; returns {"status", "bars_written", "missing"}."""
+    from providers.manager import ProviderManager
+
+    gap = GapRepair.objects.get(pk=gap_id)
+    step = timeframe_seconds(gap.timeframe)
+    if provider is None:
+        manager = ProviderManager()
+        provider = manager.get_provider(gap.provider) if gap.provider else manager.choose(gap.symbol, gap.timeframe)
+
+    gap.attempts += 1
+    gap.provider = provider.name
+    try:
+        bars = _fetch_range(provider, gap.symbol, gap.timeframe, gap.gap_start,
+                            gap.gap_end + timedelta(seconds=step))
+        for bar in bars:
+            bar["provider"] = provider.name
+        with transaction.atomic():
+            upsert_market_bars(bars)
+            present = MarketData.objects.filter(
+                symbol=gap.symbol, timeframe=gap.timeframe,
+                timestamp__gte=gap.gap_start, timestamp__lte=gap.gap_end,
+            ).count()
+            expected = expected_bars(int(gap.gap_start.timestamp()), int(gap.gap_end.timestamp()), step,
+                                     _cfg()["skip_weekends"]).size
+            gap.bars_written += len(bars)
+            gap.error_message = None
+            if present >= expected:
+                gap.status = "REPAIRED"
+                gap.repaired_at = timezone.now()
+            else:
+                gap.status = "UNFILLABLE" if gap.attempts >= GAP_MAX_REPAIR_ATTEMPTS else "PARTIAL"
+            gap.save()
+        missing = max(0, expected - present)
+    except Exception as exc:
+        logger.warning("gap repair %s failed: %s", gap, exc)
+        gap.status = "UNFILLABLE" if gap.attempts >= GAP_MAX_REPAIR_ATTEMPTS else "FAILED"
+        gap.error_message = str(exc)[:2000]
+        gap.save()
+        missing = gap.missing_bars
+    return {"status": gap.status, "bars_written": gap.bars_written, "missing": missing}
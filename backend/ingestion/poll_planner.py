@@ -0,0 +1,203 @@
+# backend/ingestion/poll_planner.py
+"""
+Adaptive poll planner: per-(pair, timeframe) poll intervals kept in a priority heap.
+
+Used by scheduler.tick and the poll_due_series beat task when autoslowdown is on
+(settings.AUTOSLOWDOWN and UserPreference.autoslowdown_enabled); otherwise every tick
+polls every pair as before.
+
+interval = base(timeframe) / activity × quota_factor, clamped to [POLL_MIN_SEC, POLL_MAX_SEC]
+- base: POLL_PER_BAR polls per bar (15m → 60s, 1h → 240s); never slower than one bar
+  unless quota pressure says so.
+- activity: recent ATR and volume against their own lookback average (from MarketData,
+  one query per timeframe), clamped to [POLL_ACTIVITY_MIN, POLL_ACTIVITY_MAX]. Quiet pairs
+  back off, busy pairs poll faster.
+- quota_factor: 1 while the primary provider's ProviderTelemetry.quota_usage_pct is under
+  POLL_QUOTA_SOFT_PCT, then grows as the remaining quota shrinks; a series spending ahead
+  of its daily budget (backend.ingestion.quota_budget) is stretched by its pace factor.
+The heap lives in the Django cache (Redis, shared by every worker, like the rate limiters)
+and is planned under a cross-process lock, so two workers never plan the same due series
+twice. With a per-process cache (LocMem outside eager mode) every worker would keep its own
+heap and dispatch the same polls again, so plan_due() falls back to the legacy cadence.
+Due entries are dispatched busiest first; with POLL_MAX_SERIES_PER_TICK set, the rest stay
+due for the next tick.
+"""
+from __future__ import annotations
+
+import heapq
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from backend.models import MarketData, ProviderTelemetry
+from backend.net import shared_cache
+from backend.tasks.utils import parse_watchlist, timeframe_seconds
+
+logger = logging.getLogger(__name__)
+
+POLL_MIN_SEC = float(os.getenv("POLL_MIN_SEC", "15"))
+POLL_MAX_SEC = float(os.getenv("POLL_MAX_SEC", "900"))
+POLL_PER_BAR = float(os.getenv("POLL_PER_BAR", "15"))
+POLL_ACTIVITY_MIN = float(os.getenv("POLL_ACTIVITY_MIN", "0.25"))
+POLL_ACTIVITY_MAX = float(os.getenv("POLL_ACTIVITY_MAX", "4"))
+POLL_ACTIVITY_LOOKBACK_BARS = int(os.getenv("POLL_ACTIVITY_LOOKBACK_BARS", "100"))
+POLL_ACTIVITY_RECENT_BARS = int(os.getenv("POLL_ACTIVITY_RECENT_BARS", "14"))
+POLL_QUOTA_SOFT_PCT = float(os.getenv("POLL_QUOTA_SOFT_PCT", "60"))
+POLL_MAX_SERIES_PER_TICK = int(os.getenv("POLL_MAX_SERIES_PER_TICK", "0"))  # 0 = no cap
+
+HEAP_KEY = "poll_planner:heap"
+LOCK_NAME = "poll_planner"
+LOCK_TTL_SEC = 30
+
+Series = Tuple[str, str]
+
+
+def autoslowdown_enabled() -> bool:
+    if not getattr(settings, "AUTOSLOWDOWN", True):
+        return False
+    try:
+        from backend.preferences.models import UserPreference
+        pref = UserPreference.objects.filter(pk=1).values_list("autoslowdown_enabled", flat=True).first()
+    except Exception:
+        pref = None
+    return True if pref is None else bool(pref)
+
+
+def watch_series() -> List[Series]:
+    """(pair, timeframe) pairs that ingest_once actually fetches (rollup base only, if set)."""
+    cfg = parse_watchlist()
+    tfs = [cfg["rollup_from"]] if cfg.get("rollup_from") else list(cfg["timeframes"])
+    return [(sym, tf) for tf in tfs for sym in cfg["pairs"]]
+
+
+def _ratio(values: np.ndarray, recent: int) -> Optional[float]:
+    base = float(np.mean(values))
+    if values.size <= recent or base <= 0:
+        return None
+    return float(np.mean(values[-recent:])) / base
+
+
+def activity(series: List[Series], now: Optional[datetime] = None) -> Dict[Series, float]:
+    """Recent ATR/volume relative to their lookback average per series (1.0 = typical)."""
+    now = now or timezone.now()
+    out: Dict[Series, float] = {s: 1.0 for s in series}
+    by_tf: Dict[str, List[str]] = {}
+    for sym, tf in series:
+        by_tf.setdefault(tf, []).append(sym)
+
+    for tf, syms in by_tf.items():
+        since = now - timedelta(seconds=timeframe_seconds(tf) * POLL_ACTIVITY_LOOKBACK_BARS)
+        rows = (
+            MarketData.objects.filter(symbol__in=syms, timeframe=tf, timestamp__gte=since)
+            .order_by("symbol", "timestamp")
+            .values_list("symbol", "high", "low", "close", "volume")
+        )
+        cols: Dict[str, list] = {}
+        for sym, *vals in rows:
+            cols.setdefault(sym, []).append(vals)
+        for sym, vals in cols.items():
+            a = np.asarray(vals, dtype=float)
+            if len(a) < 2:
+                continue
+            high, low, close, volume = a[1:, 0], a[1:, 1], a[1:, 2], a[1:, 3]
+            prev = a[:-1, 2]
+            tr = np.maximum(high - low, np.maximum(np.abs(high - prev), np.abs(low - prev)))
+            ratios = [r for r in (_ratio(tr, POLL_ACTIVITY_RECENT_BARS),
+                                  _ratio(volume, POLL_ACTIVITY_RECENT_BARS)) if r is not None]
+            if ratios:
+                out[(sym, tf)] = float(np.clip(np.mean(ratios), POLL_ACTIVITY_MIN, POLL_ACTIVITY_MAX))
+    return out
+
+
+def quota_factor(provider: str) -> float:
+    pct = (ProviderTelemetry.objects.filter(provider=provider)
+           .values_list("quota_usage_pct", flat=True).first())
+    if pct is None or pct <= POLL_QUOTA_SOFT_PCT:
+        return 1.0
+    left = max(100.0 - pct, 1.0)
+    return (100.0 - POLL_QUOTA_SOFT_PCT) / left
+
+
+def interval_sec(timeframe: str, act: float = 1.0, quota: float = 1.0) -> float:
+    step = timeframe_seconds(timeframe)
+    base = step / POLL_PER_BAR
+    ceiling = POLL_MAX_SEC if quota > 1.0 else min(POLL_MAX_SEC, step)
+    return float(min(ceiling, max(POLL_MIN_SEC, base / act * quota)))
+
+
+class PollPlanner:
+    def __init__(self, cache=None):
+        if cache is None:
+            cache = shared_cache.cache
+        self.cache = cache
+
+    def heap(self) -> List[list]:
+        """Current plan: [due_epoch, -activity, symbol, timeframe] entries (heap order)."""
+        return list(self.cache.get(HEAP_KEY) or [])
+
+    def reset(self) -> None:
+        self.cache.delete(HEAP_KEY)
+
+    def due(self, now: Optional[datetime] = None, provider: Optional[str] = None) -> Optional[List[Series]]:
+        """
+        Pop every due series, reschedule it with a fresh interval and return it (busiest first).
+        Returns None when another worker is planning right now.
+        """
+        now = now or timezone.now()
+        with shared_cache.lock(self.cache, LOCK_NAME, timeout=LOCK_TTL_SEC, blocking_timeout=0) as held:
+            return self._due(now, provider) if held else None
+
+    def _due(self, now: datetime, provider: Optional[str]) -> List[Series]:
+        t = now.timestamp()
+        wanted = set(watch_series())
+        heap = [e for e in self.heap() if (e[2], e[3]) in wanted]
+        known = {(e[2], e[3]) for e in heap}
+        heap += [[t, -1.0, sym, tf] for sym, tf in sorted(wanted - known)]  # new series: due now
+        heapq.heapify(heap)
+
+        popped = []
+        while heap and heap[0][0] <= t:
+            popped.append(heapq.heappop(heap))
+        if not popped:
+            self.cache.set(HEAP_KEY, heap, timeout=None)
+            return []
+
+        act = activity([(e[2], e[3]) for e in popped], now)
+        popped.sort(key=lambda e: -act[(e[2], e[3])])  # busiest first
+        if POLL_MAX_SERIES_PER_TICK > 0:
+            for e in popped[POLL_MAX_SERIES_PER_TICK:]:
+                heapq.heappush(heap, [e[0], -act[(e[2], e[3])], e[2], e[3]])  # still due: first next tick
+            popped = popped[:POLL_MAX_SERIES_PER_TICK]
+
+        if provider is None:
+            from providers.manager import ProviderManager
+            provider = ProviderManager().primary()
+        from backend.ingestion.quota_budget import get_quota_budget  # imports this module
+        budget = get_quota_budget()
+        q = quota_factor(provider)
+        due = [(e[2], e[3]) for e in popped]
+        for sym, tf in due:
+            slow = max(q, budget.pace_factor(provider, sym, tf, now))
+            heapq.heappush(heap, [t + interval_sec(tf, act[(sym, tf)], slow), -act[(sym, tf)], sym, tf])
+        logger.debug("poll planner: %d due, quota factor %.2f", len(due), q)
+        self.cache.set(HEAP_KEY, heap, timeout=None)
+        return due
+
+
+def plan_due(now: Optional[datetime] = None) -> Optional[List[Series]]:
+    """
+    Series to poll now, or None when autoslowdown is off or the cache is not shared by the
+    workers (poll everything, legacy cadence).
+    """
+    if not autoslowdown_enabled():
+        return None
+    planner = PollPlanner()
+    if not shared_cache.warn_if_local(planner.cache, "poll planner"):
+        return None
+    due = planner.due(now)
+    return due if due is not None else []
@@ -0,0 +1,217 @@
+# backend/ingestion/quota_budget.py
+"""
+Daily request budget per (provider, symbol, timeframe), re-planned as usage comes in.
+
+- Capacity: the tightest of the provider's daily / minute×1440 / second×86400 limits
+  (providers.yaml `rate_limit:` + PROVIDER_RATE_LIMITS overrides, the same quota the
+  DistributedRateLimiter enforces), minus QUOTA_RESERVE_PCT kept back for retries,
+  backfill and gap repair.
+- Demand: what the poll planner's base cadence would spend per series per day. A batched
+  provider serves every pair of a timeframe with one request, so each pair costs 1/n.
+- Actual: every ingest request is attributed to its series (record_usage(), counters in
+  the shared Redis cache, incremented atomically by every worker); the provider total is the larger of that and the limiter's
+  daily window (which also sees retries, hedges and backfill).
+- Re-plan: the capacity still left today is spread over the remaining demand; a series'
+  budget is what it used plus its share of the rest. Under quota pressure (the rest does
+  not fit, or the day's burn projects past usable) pace_factor() > 1 means a series is
+  spending faster than planned and the poll planner stretches its interval by that much;
+  with capacity to spare it stays 1. ProviderManager demotes a provider whose usable
+  budget is gone.
+Days are UTC, matching the limiter's daily window.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, List, Optional, Tuple
+
+from django.utils import timezone
+
+from backend.ingestion.poll_planner import interval_sec, watch_series
+from backend.net import shared_cache
+from backend.net.ratelimit import WINDOWS, get_provider_limiter, provider_rate_limits
+
+logger = logging.getLogger(__name__)
+
+QUOTA_RESERVE_PCT = float(os.getenv("QUOTA_RESERVE_PCT", "10"))
+QUOTA_REPLAN_SEC = float(os.getenv("QUOTA_REPLAN_SEC", "60"))
+QUOTA_MAX_PACE_FACTOR = float(os.getenv("QUOTA_MAX_PACE_FACTOR", "8"))
+
+_KEY_PREFIX = "quota_budget"
+_MILLI = 1000  # usage counters are integer milli-requests (a batch request splits across pairs)
+
+Series = Tuple[str, str]
+
+
+def _day(now: datetime) -> str:
+    return now.astimezone(dt_timezone.utc).date().isoformat()
+
+
+def _elapsed(now: datetime) -> float:
+    t = now.timestamp()
+    return (t % 86400) / 86400.0
+
+
+def daily_capacity(limits: Dict[str, int]) -> Optional[int]:
+    """Requests per UTC day the tightest configured window allows (None when unlimited)."""
+    caps = [int(n) * (86400 // WINDOWS[w]) for w, n in limits.items() if n]
+    return min(caps) if caps else None
+
+
+def _supports_batch(provider: str) -> bool:
+    from providers.manager import _PROVIDER_REGISTRY
+    cls = _PROVIDER_REGISTRY.get(provider)
+    return bool(cls and cls.supports_batch)
+
+
+def series_demand(provider: str, series: List[Series]) -> Dict[Series, float]:
+    """Requests/day each series would use at the planner's base cadence."""
+    per_tf: Dict[str, int] = {}
+    for _, tf in series:
+        per_tf[tf] = per_tf.get(tf, 0) + 1
+    batch = _supports_batch(provider)
+    return {(sym, tf): 86400.0 / interval_sec(tf) / (per_tf[tf] if batch else 1) for sym, tf in series}
+
+
+class QuotaBudget:
+    def __init__(self, cache=None):
+        if cache is None:
+            cache = shared_cache.cache
+        self.cache = cache
+        shared_cache.warn_if_local(cache, "quota budget")
+
+    def _used_key(self, provider: str, day: str, symbol: str, timeframe: str) -> str:
+        return f"{_KEY_PREFIX}:used:{provider}:{day}:{symbol}:{timeframe}"
+
+    def _plan_key(self, provider: str) -> str:
+        return f"{_KEY_PREFIX}:plan:{provider}"
+
+    # ---- actual usage ----
+    def record_usage(self, provider: str, symbols: List[str], timeframe: str,
+                     requests: float = 1.0, now: Optional[datetime] = None) -> None:
+        """Attribute `requests` made for `symbols` (split evenly) to their series."""
+        if not symbols:
+            return
+        day = _day(now or timezone.now())
+        share = max(1, int(round(requests * _MILLI / len(symbols))))
+        for sym in symbols:
+            key = self._used_key(provider, day, sym, timeframe)
+            self.cache.add(key, 0, timeout=2 * 86400)
+            try:
+                self.cache.incr(key, share)
+            except ValueError:  # evicted between add and incr
+                self.cache.add(key, share, timeout=2 * 86400)
+
+    def used(self, provider: str, series: List[Series], now: Optional[datetime] = None) -> Dict[Series, float]:
+        day = _day(now or timezone.now())
+        keys = {self._used_key(provider, day, sym, tf): (sym, tf) for sym, tf in series}
+        got = self.cache.get_many(list(keys))
+        return {s: got.get(k, 0) / _MILLI for k, s in keys.items()}
+
+    # ---- planning ----
+    def plan(self, provider: str, now: Optional[datetime] = None, force: bool = False,
+             limits: Optional[Dict[str, int]] = None) -> Optional[dict]:
+        """
+        Budget for `provider` today (None when it has no configured limits). Cached for
+        QUOTA_REPLAN_SEC unless `force`.
+        """
+        now = now or timezone.now()
+        if not force:
+            cached = self.cache.get(self._plan_key(provider))
+            if cached and cached["day"] == _day(now) and now.timestamp() - cached["at"] < QUOTA_REPLAN_SEC:
+                return cached
+
+        limits = limits if limits is not None else provider_rate_limits().get(provider)
+        capacity = daily_capacity(limits or {})
+        if capacity is None:
+            return None
+        usable = capacity * (1.0 - QUOTA_RESERVE_PCT / 100.0)
+        series = watch_series()
+        demand = series_demand(provider, series)
+        used = self.used(provider, series, now)
+        f = _elapsed(now)
+
+        limiter = get_provider_limiter(provider, limits)
+        window = (limiter.usage().get("daily") or {}).get("used", 0) if limiter is not None else 0
+        used_total = max(float(window), sum(used.values()))
+        left = max(0.0, usable - used_total)
+        rest = {s: d * (1.0 - f) for s, d in demand.items()}
+        scale = min(1.0, left / sum(rest.values())) if sum(rest.values()) > 0 else 0.0
+
+        rows = {}
+        for s in series:
+            budget = used[s] + rest[s] * scale
+            planned_by_now = budget * f
+            rows[s] = {
+                "budget": round(budget, 2),
+                "used": round(used[s], 3),
+                "demand": round(demand[s], 2),
+                "pace_factor": round(used[s] / planned_by_now, 3) if planned_by_now > 0 else 1.0,
+            }
+        plan = {
+            "provider": provider,
+            "day": _day(now),
+            "at": now.timestamp(),
+            "elapsed": round(f, 4),
+            "limits": dict(limits),
+            "capacity": capacity,
+            "usable": round(usable, 1),
+            "demand": round(sum(demand.values()), 1),
+            "budget": round(sum(r["budget"] for r in rows.values()), 1),
+            "actual": round(used_total, 1),
+            "planned_by_now": round(min(usable, sum(demand.values())) * f, 1),
+            "projected_eod": round(used_total / f, 1) if f > 0 else 0.0,
+            "scale": round(scale, 4),
+            "series": rows,
+        }
+        plan["over_budget"] = plan["projected_eod"] > usable
+        # Pacing only matters when the day's demand does not fit what is left
+        plan["pressure"] = scale < 1.0 or plan["over_budget"]
+        self.cache.set(self._plan_key(provider), plan, timeout=86400)
+        return plan
+
+    def pace_factor(self, provider: str, symbol: str, timeframe: str, now: Optional[datetime] = None) -> float:
+        """
+        >1 when the series spends faster than its budget under quota pressure (the rest of
+        today's demand does not fit what is left, or the burn projects past usable); the poll
+        interval stretches by it. With ample capacity busy series keep their faster cadence.
+        """
+        plan = self.plan(provider, now)
+        if plan is None or not plan.get("pressure"):
+            return 1.0
+        row = plan["series"].get((symbol, timeframe))
+        if row is None:
+            return 1.0
+        if row["budget"] - row["used"] < 1.0 and plan["elapsed"] < 1.0:
+            return QUOTA_MAX_PACE_FACTOR  # nothing left for this series today
+        return min(QUOTA_MAX_PACE_FACTOR, max(1.0, row["pace_factor"]))
+
+    def exhausted(self, provider: str, now: Optional[datetime] = None) -> bool:
+        """True once the provider's usable daily budget is spent (ProviderManager demotes it)."""
+        plan = self.plan(provider, now)
+        return bool(plan) and plan["actual"] >= plan["usable"]
+
+
+_BUDGET: Optional[QuotaBudget] = None
+
+
+def get_quota_budget() -> QuotaBudget:
+    global _BUDGET
+    if _BUDGET is None:
+        _BUDGET = QuotaBudget()
+    return _BUDGET
+
+
+def budget_report(providers: Optional[List[str]] = None, now: Optional[datetime] = None) -> List[dict]:
+    """Projected vs actual burn for every provider with configured limits (API payload)."""
+    names = providers if providers is not None else sorted(provider_rate_limits())
+    out = []
+    for name in names:
+        plan = get_quota_budget().plan(name, now, force=True)
+        if plan is None:
+            continue
+        plan = dict(plan)
+        plan["series"] = [dict(row, symbol=s[0], timeframe=s[1]) for s, row in sorted(plan["series"].items())]
+        out.append(plan)
+    return out
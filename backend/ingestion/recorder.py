@@ -0,0 +1,225 @@
+# backend/ingestion/recorder.py
+"""
+Raw provider response recorder (opt-in via PROVIDER_RECORD_DIR) and its reader.
+
+Layout under PROVIDER_RECORD_DIR:
+    <provider>/<YYYY-MM-DD>/seg-<pid>-<n>.jsonl.gz   compressed response records
+    <provider>/<YYYY-MM-DD>/index-<pid>.jsonl        one line per record (plain text)
+    <provider>/<YYYY-MM-DD>/until-<pid>              latest t1 among that index's records
+- Partitioned by the UTC date of the data (request window start), so replaying a range
+  never opens the days after it; the until-<pid> markers let it skip the days before it
+  whose records all end before the range starts, without parsing their indexes.
+- Records are buffered and written as one gzip member per flush; the index stores each
+  member's byte offset/length plus (symbol, timeframe, t0, t1), so a reader seeks straight
+  to the members it needs instead of decompressing whole segments.
+- File names carry the pid, so several workers can record into the same tree.
+- Each record keeps the provider's raw rows untouched; parsing happens on replay, so a
+  translator fix can be re-run over the same bytes.
+"""
+from __future__ import annotations
+
+import atexit
+import glob
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_RECORD_DIR = os.getenv("PROVIDER_RECORD_DIR", "")             # empty = recorder off
+RECORD_FLUSH_RECORDS = int(os.getenv("PROVIDER_RECORD_FLUSH_RECORDS", "50"))
+RECORD_FLUSH_SEC = float(os.getenv("PROVIDER_RECORD_FLUSH_SEC", "30"))
+RECORD_SEGMENT_MAX_BYTES = int(os.getenv("PROVIDER_RECORD_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+READER_MEMBER_CACHE = int(os.getenv("PROVIDER_RECORD_READER_CACHE", "64"))   # decompressed members kept
+
+
+def _iso(ts: datetime) -> str:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=dt_timezone.utc)
+    return ts.astimezone(dt_timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class ResponseRecorder:
+    """Append-only writer; record() is cheap (buffer append), I/O happens on flush()."""
+
+    def __init__(self, root: str, flush_records: int = RECORD_FLUSH_RECORDS,
+                 flush_sec: float = RECORD_FLUSH_SEC, segment_max_bytes: int = RECORD_SEGMENT_MAX_BYTES):
+        self.root = root
+        self.flush_records = max(1, flush_records)
+        self.flush_sec = flush_sec
+        self.segment_max_bytes = segment_max_bytes
+        self._pending: Dict[Tuple[str, str], List[dict]] = {}   # (provider, day) → records
+        self._count = 0
+        self._last_flush = time.monotonic()
+        self._segments: Dict[Tuple[str, str], str] = {}         # (provider, day) → current segment path
+        self._until: Dict[Tuple[str, str], str] = {}            # (provider, day) → latest t1 indexed
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, kind: str, symbol: str, timeframe: str,
+               start: datetime, end: datetime, raw) -> None:
+        """Buffer one raw response for (symbol, timeframe) covering [start, end]."""
+        rec = {"provider": provider, "kind": kind, "symbol": symbol, "timeframe": timeframe,
+               "t0": _iso(start), "t1": _iso(end), "at": _iso(datetime.now(dt_timezone.utc)), "raw": raw}
+        day = rec["t0"][:10]
+        with self._lock:
+            self._pending.setdefault((provider, day), []).append(rec)
+            self._count += 1
+            due = self._count >= self.flush_records or time.monotonic() - self._last_flush >= self.flush_sec
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered records; returns how many were written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._count = 0
+            self._last_flush = time.monotonic()
+            written = 0
+            for (provider, day), recs in pending.items():
+                try:
+                    self._write_member(provider, day, recs)
+                    written += len(recs)
+                except OSError:
+                    logger.exception("recorder: could not write %d %s record(s) for %s", len(recs), provider, day)
+            return written
+
+    def _segment(self, provider: str, day: str) -> str:
+        path = self._segments.get((provider, day))
+        if path is None or (os.path.exists(path) and os.path.getsize(path) >= self.segment_max_bytes):
+            folder = os.path.join(self.root, provider, day)
+            os.makedirs(folder, exist_ok=True)
+            n = len(glob.glob(os.path.join(folder, f"seg-{os.getpid()}-*.jsonl.gz")))
+            path = self._segments[(provider, day)] = os.path.join(folder, f"seg-{os.getpid()}-{n}.jsonl.gz")
+        return path
+
+    def _write_member(self, provider: str, day: str, recs: List[dict]) -> None:
+        path = self._segment(provider, day)
+        lines = "".join(json.dumps(r, separators=(",", ":"), default=str) + "\n" for r in recs)
+        member = gzip.compress(lines.encode("utf-8"))
+        with open(path, "ab") as f:
+            offset = f.tell()
+            f.write(member)
+        seg = os.path.basename(path)
+        index = "".join(
+            json.dumps({"seg": seg, "offset": offset, "length": len(member), "row": i,
+                        "symbol": r["symbol"], "timeframe": r["timeframe"], "kind": r["kind"],
+                        "t0": r["t0"], "t1": r["t1"], "at": r["at"]}, separators=(",", ":")) + "\n"
+            for i, r in enumerate(recs)
+        )
+        folder = os.path.dirname(path)
+        with open(os.path.join(folder, f"index-{os.getpid()}.jsonl"), "a", encoding="utf-8") as f:
+            f.write(index)
+        last = max(r["t1"] for r in recs)
+        if last > self._until.get((provider, day), ""):
+            marker = os.path.join(folder, f"until-{os.getpid()}")
+            with open(marker + ".tmp", "w", encoding="utf-8") as f:
+                f.write(last)
+            os.replace(marker + ".tmp", marker)
+            self._until[(provider, day)] = last
+
+
+class RecordingReader:
+    """Index-driven reader over a recorder tree (used by providers.replay and benchmarks)."""
+
+    def __init__(self, root: str, provider: str):
+        self.root = root
+        self.provider = provider
+        self._members: "OrderedDict[Tuple[str, int], List[dict]]" = OrderedDict()  # small LRU
+        self._lock = threading.Lock()
+
+    def days(self) -> List[str]:
+        return sorted(os.path.basename(p) for p in glob.glob(os.path.join(self.root, self.provider, "*"))
+                      if os.path.isdir(p))
+
+    def _ends_before(self, day: str, lo: str) -> bool:
+        """True when every record filed under `day` ends before `lo` (per the until-<pid> markers)."""
+        folder = os.path.join(self.root, self.provider, day)
+        for path in glob.glob(os.path.join(folder, "index-*.jsonl")):
+            pid = os.path.basename(path)[len("index-"):-len(".jsonl")]
+            try:
+                with open(os.path.join(folder, f"until-{pid}"), encoding="utf-8") as f:
+                    if f.read().strip() >= lo:
+                        return False
+            except OSError:
+                return False  # no marker (older recording): read the index
+        return True
+
+    def index(self, symbol: Optional[str] = None, timeframe: Optional[str] = None,
+              start: Optional[datetime] = None, end: Optional[datetime] = None,
+              kind: Optional[str] = None) -> List[dict]:
+        """Index entries overlapping [start, end], ordered by (t0, recorded at)."""
+        lo = _iso(start) if start else None
+        hi = _iso(end) if end else None
+        out = []
+        for day in self.days():
+            if hi and day > hi[:10]:
+                continue  # filed under its t0 day, so nothing here starts before `end`
+            if lo and day < lo[:10] and self._ends_before(day, lo):
+                continue
+            for path in sorted(glob.glob(os.path.join(self.root, self.provider, day, "index-*.jsonl"))):
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        e = json.loads(line)
+                        if (symbol and e["symbol"] != symbol) or (timeframe and e["timeframe"] != timeframe):
+                            continue
+                        if (kind and e["kind"] != kind) or (lo and e["t1"] < lo) or (hi and e["t0"] > hi):
+                            continue
+                        e["day"] = day
+                        out.append(e)
+        out.sort(key=lambda e: (e["t0"], e["at"]))
+        return out
+
+    def _member(self, day: str, seg: str, offset: int, length: int) -> List[dict]:
+        key = (os.path.join(day, seg), offset)
+        with self._lock:
+            recs = self._members.get(key)
+            if recs is not None:
+                self._members.move_to_end(key)
+        if recs is None:
+            with open(os.path.join(self.root, self.provider, day, seg), "rb") as f:
+                f.seek(offset)
+                data = gzip.decompress(f.read(length))
+            recs = [json.loads(line) for line in data.decode("utf-8").splitlines()]
+            with self._lock:
+                self._members[key] = recs
+                while len(self._members) > READER_MEMBER_CACHE:
+                    self._members.popitem(last=False)
+        return recs
+
+    def records(self, entries: List[dict]) -> Iterator[dict]:
+        for e in entries:
+            yield self._member(e["day"], e["seg"], e["offset"], e["length"])[e["row"]]
+
+
+_RECORDER: Optional[ResponseRecorder] = None
+_RECORDER_LOCK = threading.Lock()
+
+
+def get_recorder() -> Optional[ResponseRecorder]:
+    """Process recorder when PROVIDER_RECORD_DIR is set, else None (recording off)."""
+    global _RECORDER
+    if not PROVIDER_RECORD_DIR:
+        return None
+    with _RECORDER_LOCK:
+        if _RECORDER is None or _RECORDER.root != PROVIDER_RECORD_DIR:
+            _RECORDER = ResponseRecorder(PROVIDER_RECORD_DIR)
+            atexit.register(_RECORDER.flush)
+        return _RECORDER
+
+
+def record_response(provider: str, kind: str, symbol: str, timeframe: str,
+                    start: datetime, end: datetime, raw) -> None:
+    """Fetch-path hook: no-op unless recording is on; never raises into the caller."""
+    rec = get_recorder()
+    if rec is None:
+        return
+    try:
+        rec.record(provider, kind, symbol, timeframe, start, end, raw)
+    except Exception:
+        logger.exception("recorder: dropping %s %s %s response", provider, symbol, timeframe)
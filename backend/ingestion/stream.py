@@ -0,0 +1,229 @@
+# backend/ingestion/stream.py
+"""
+Streaming ingestion (used by `manage.py stream_ingest`).
+
+- One long-lived WebSocket per provider, subscribed to every watchlist pair/timeframe.
+- Wire format (JSON text frames; the stand-in server in stream_standin.py speaks it):
+    client → {"type": "subscribe", "symbols": [...], "timeframes": [...]}
+    server → {"type": "bar", "symbol", "tf", "ts", "o", "h", "l", "c", "v", "closed": bool}
+    server → {"type": "ping"}            (app-level heartbeat; WS ping frames count too)
+- Closed bars are coalesced for at most STREAM_FLUSH_MS and written through
+  upsert_market_bars(); forming bars (closed=false) are not persisted, only kept in the
+  forming-bar cache (backend.ingestion.forming) for provisional reads.
+- Every ping/pong refreshes IngestionStatus.last_seen_at for the subscribed pairs.
+- A reader thread only parses frames; all DB writes happen on the thread calling run().
+  Dropped connections reconnect with the shared backoff curve.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from backend.models import IngestionStatus
+from backend.net import websocket as ws
+from backend.net.backoff_state import next_delay_seconds
+from backend.ingestion.forming import get_forming_bars
+from backend.tasks.freshness import update_ingestion_status
+from backend.tasks.utils import upsert_market_bars
+
+logger = logging.getLogger(__name__)
+
+STREAM_FLUSH_MS = int(os.getenv("STREAM_FLUSH_MS", "50"))        # max wait to coalesce closed bars
+STREAM_PING_SEC = float(os.getenv("STREAM_PING_SEC", "10"))      # client keepalive ping interval
+STREAM_CONNECT_TIMEOUT = float(os.getenv("STREAM_CONNECT_TIMEOUT", "10"))
+
+
+def stream_url(provider: str) -> Optional[str]:
+    """Configured socket URL for a provider, e.g. ALLTICK_WS_URL."""
+    return os.getenv(f"{provider.upper()}_WS_URL")
+
+
+def _parse_bar(msg: dict, provider: str) -> dict:
+    ts = datetime.fromisoformat(str(msg["ts"]).replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=dt_timezone.utc)
+    return {
+        "symbol": msg["symbol"], "timeframe": msg["tf"], "timestamp": ts,
+        "open": msg["o"], "high": msg["h"], "low": msg["l"], "close": msg["c"],
+        "volume": msg.get("v") or 0.0, "provider": provider,
+    }
+
+
+class StreamIngestor:
+    def __init__(self, provider: str, url: str, pairs: List[str], timeframes: List[str], *,
+                 headers: Optional[Dict[str, str]] = None, flush_ms: int = STREAM_FLUSH_MS,
+                 ping_sec: float = STREAM_PING_SEC):
+        self.provider = provider
+        self.url = url
+        self.pairs = list(pairs)
+        self.timeframes = list(timeframes)
+        self.headers = headers or {}
+        self.flush_sec = max(0, flush_ms) / 1000.0
+        self.ping_sec = ping_sec
+        self._stop = threading.Event()
+        self._events: "queue.Queue[Tuple[str, object]]" = queue.Queue()
+        self._sock: Optional[ws.WebSocket] = None
+        self.stats = {"bars": 0, "forming": 0, "pings": 0, "batches": 0, "reconnects": 0, "errors": 0}
+
+    def stop(self) -> None:
+        self._stop.set()
+        sock = self._sock
+        if sock is not None:
+            sock.close()
+
+    # ---- reader thread: socket → events queue (no DB) ----
+    def _reader(self, sock: ws.WebSocket) -> None:
+        last_ping = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                if self.ping_sec and time.monotonic() - last_ping >= self.ping_sec:
+                    sock.ping()
+                    last_ping = time.monotonic()
+                got = sock.recv(timeout=0.25)
+                if got is None:
+                    continue
+                op, payload = got
+                if op in (ws.OP_PING, ws.OP_PONG):
+                    self._events.put(("ping", None))
+                    continue
+                if op != ws.OP_TEXT:
+                    continue
+                try:
+                    msg = json.loads(payload)
+                except ValueError:
+                    logger.warning("stream[%s]: dropping non-JSON frame", self.provider)
+                    continue
+                kind = msg.get("type")
+                if kind == "ping":
+                    sock.send_text(json.dumps({"type": "pong"}))
+                    self._events.put(("ping", None))
+                elif kind == "bar":
+                    event = "bar" if msg.get("closed", True) else "forming"
+                    try:
+                        self._events.put((event, _parse_bar(msg, self.provider)))
+                    except (KeyError, TypeError, ValueError):
+                        logger.warning("stream[%s]: malformed bar %r", self.provider, msg)
+        except (ws.ConnectionClosed, OSError) as exc:
+            if not self._stop.is_set():
+                self._events.put(("disconnected", exc))
+            return
+        self._events.put(("disconnected", None))
+
+    def _connect(self) -> ws.WebSocket:
+        sock = ws.connect(self.url, headers=self.headers, timeout=STREAM_CONNECT_TIMEOUT)
+        sock.send_text(json.dumps({"type": "subscribe", "symbols": self.pairs, "timeframes": self.timeframes}))
+        return sock
+
+    # ---- writer side (calling thread) ----
+    def _ensure_status_rows(self) -> None:
+        have = set(
+            IngestionStatus.objects.filter(symbol__in=self.pairs, timeframe__in=self.timeframes)
+            .values_list("symbol", "timeframe")
+        )
+        for sym in self.pairs:
+            for tf in self.timeframes:
+                if (sym, tf) not in have:
+                    IngestionStatus.objects.get_or_create(symbol=sym, timeframe=tf)
+
+    def _heartbeat(self) -> None:
+        self.stats["pings"] += 1
+        IngestionStatus.objects.filter(symbol__in=self.pairs, timeframe__in=self.timeframes).update(
+            last_seen_at=timezone.now()
+        )
+
+    def _write(self, bars: List[dict]) -> None:
+        touched: Set[Tuple[str, str]] = {(b["symbol"], b["timeframe"]) for b in bars}
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                upsert_market_bars(bars)
+                for sym, tf in touched:
+                    update_ingestion_status(sym, tf, provider=self.provider, last_ingest_ts=now)
+        except Exception:
+            self.stats["errors"] += 1
+            logger.exception("stream[%s]: write of %d bar(s) failed", self.provider, len(bars))
+            return
+        self.stats["bars"] += len(bars)
+        self.stats["batches"] += 1
+
+    def _drain(self, first: Tuple[str, object]) -> Tuple[List[dict], Optional[Tuple[str, object]]]:
+        """Collect bars arriving within flush_sec of the first; returns (bars, deferred non-bar event)."""
+        bars = []
+        event: Optional[Tuple[str, object]] = first
+        deadline = time.monotonic() + self.flush_sec
+        while event is not None:
+            kind, data = event
+            if kind == "bar":
+                bars.append(data)
+            elif kind == "ping":
+                self._heartbeat()
+            elif kind == "forming":
+                self.stats["forming"] += 1
+                get_forming_bars().remember(data)
+            else:
+                return bars, event
+            try:
+                remaining = deadline - time.monotonic()
+                event = self._events.get(timeout=remaining) if remaining > 0 else self._events.get_nowait()
+            except queue.Empty:
+                event = None
+        return bars, None
+
+    def run(self, *, max_bars: Optional[int] = None, duration: Optional[float] = None) -> dict:
+        """Stream until stop(), `duration` seconds, or `max_bars` closed bars written."""
+        self._ensure_status_rows()
+        ends_at = time.monotonic() + duration if duration else None
+        attempts = 0
+        reader: Optional[threading.Thread] = None
+
+        while not self._stop.is_set():
+            if ends_at and time.monotonic() >= ends_at:
+                break
+            if self._sock is None:
+                try:
+                    self._sock = self._connect()
+                    attempts = 0
+                    reader = threading.Thread(target=self._reader, args=(self._sock,), daemon=True,
+                                              name=f"stream-{self.provider}")
+                    reader.start()
+                    logger.info("stream[%s]: subscribed %d pair(s) × %s", self.provider, len(self.pairs),
+                                ",".join(self.timeframes))
+                except (OSError, ws.ConnectionClosed) as exc:
+                    delay = next_delay_seconds(attempts)
+                    attempts += 1
+                    self.stats["reconnects"] += 1
+                    logger.warning("stream[%s]: connect failed (%s); retrying in %.1fs", self.provider, exc, delay)
+                    self._stop.wait(delay)
+                    continue
+
+            try:
+                event = self._events.get(timeout=0.25)
+            except queue.Empty:
+                continue
+            bars, deferred = self._drain(event)
+            if bars:
+                self._write(bars)
+            if deferred is not None and deferred[0] == "disconnected":
+                logger.warning("stream[%s]: connection lost (%s); reconnecting", self.provider, deferred[1])
+                self._sock.close()
+                self._sock = None
+                self.stats["reconnects"] += 1
+            if max_bars is not None and self.stats["bars"] >= max_bars:
+                break
+
+        if self._sock is not None:
+            self._stop.set()
+            self._sock.close()
+            self._sock = None
+        if reader is not None:
+            reader.join(timeout=1.0)
+        return dict(self.stats)
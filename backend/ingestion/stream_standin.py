@@ -0,0 +1,154 @@
+# backend/ingestion/stream_standin.py
+"""
+Local stand-in for a provider quote stream, so streaming ingestion runs offline (dev/tests).
+
+Speaks the wire format documented in backend/ingestion/stream.py. After a client subscribes
+it receives a ping every `ping_interval` seconds and, when `bar_interval` is set, one closed
+dev-fake bar per pair/timeframe every `bar_interval` seconds. The synthetic clock advances one
+timeframe step per emission (accelerated replay) starting from the current aligned bar.
+Tests can push exact bars with publish().
+"""
+from __future__ import annotations
+
+import json
+import logging
+import random
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, Optional, Tuple
+
+from backend.net import websocket as ws
+from backend.tasks.utils import timeframe_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class _Client:
+    def __init__(self, sock: ws.WebSocket):
+        self.sock = sock
+        self.symbols: List[str] = []
+        self.timeframes: List[str] = []
+        self.subscribed = threading.Event()
+
+
+class StandInStreamServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, *,
+                 bar_interval: Optional[float] = 1.0, ping_interval: float = 5.0):
+        self.bar_interval = bar_interval
+        self.ping_interval = ping_interval
+        self._clients: List[_Client] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._clock: Dict[Tuple[str, str], Tuple[datetime, float]] = {}
+        server = self
+
+        class _Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                server._serve_client(self.request)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._tcp = socketserver.ThreadingTCPServer((host, port), _Handler)
+        self._tcp.daemon_threads = True
+        self.host, self.port = self._tcp.server_address[:2]
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/stream"
+
+    def start(self) -> "StandInStreamServer":
+        threading.Thread(target=self._tcp.serve_forever, daemon=True, name="stream-standin").start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._lock:
+            clients = list(self._clients)
+        for c in clients:
+            c.sock.close()
+        self._tcp.shutdown()
+        self._tcp.server_close()
+
+    def wait_for_subscriber(self, timeout: float = 5.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if any(c.subscribed.is_set() for c in self._clients):
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def publish(self, bar: dict) -> None:
+        """Send one bar message (wire format) to every subscriber of its symbol/tf."""
+        text = json.dumps({"type": "bar", "closed": True, **bar}, default=str)
+        with self._lock:
+            clients = list(self._clients)
+        for c in clients:
+            if bar.get("symbol") in c.symbols and bar.get("tf") in c.timeframes:
+                try:
+                    c.sock.send_text(text)
+                except OSError:
+                    pass
+
+    def drop_clients(self) -> None:
+        """Close every client socket (simulates a provider-side disconnect)."""
+        with self._lock:
+            clients, self._clients = list(self._clients), []
+        for c in clients:
+            c.sock.close()
+
+    # ---- per-connection loop ----
+    def _next_fake_bar(self, symbol: str, tf: str) -> dict:
+        step = timeframe_seconds(tf)
+        with self._lock:
+            ts, close = self._clock.get((symbol, tf)) or (
+                datetime.fromtimestamp(int(time.time()) // step * step, tz=dt_timezone.utc),
+                1.0 + (random.random() - 0.5) * 0.1,
+            )
+            new_close = round(close + (random.random() - 0.5) * 0.001, 6)
+            self._clock[(symbol, tf)] = (ts + timedelta(seconds=step), new_close)
+        return {
+            "symbol": symbol, "tf": tf, "ts": ts.isoformat(),
+            "o": close, "h": round(max(close, new_close) + 0.0003, 6),
+            "l": round(min(close, new_close) - 0.0003, 6), "c": new_close, "v": 0.0,
+        }
+
+    def _serve_client(self, raw_sock) -> None:
+        try:
+            sock, _path = ws.server_handshake(raw_sock)
+        except (ConnectionError, ws.ConnectionClosed, OSError):
+            return
+        client = _Client(sock)
+        with self._lock:
+            self._clients.append(client)
+
+        next_ping = time.monotonic() + self.ping_interval
+        next_bar = time.monotonic() + (self.bar_interval or 0)
+        try:
+            while not self._stop.is_set() and not sock.closed:
+                got = sock.recv(timeout=0.02)
+                if got is not None and got[0] == ws.OP_TEXT:
+                    msg = json.loads(got[1])
+                    if msg.get("type") == "subscribe":
+                        client.symbols = list(msg.get("symbols") or [])
+                        client.timeframes = list(msg.get("timeframes") or [])
+                        client.subscribed.set()
+                if not client.subscribed.is_set():
+                    continue
+                now = time.monotonic()
+                if self.ping_interval and now >= next_ping:
+                    sock.send_text(json.dumps({"type": "ping"}))
+                    next_ping = now + self.ping_interval
+                if self.bar_interval and now >= next_bar:
+                    for tf in client.timeframes:
+                        for sym in client.symbols:
+                            sock.send_text(json.dumps({"type": "bar", "closed": True, **self._next_fake_bar(sym, tf)}))
+                    next_bar = now + self.bar_interval
+        except (ws.ConnectionClosed, OSError, ValueError):
+            pass
+        finally:
+            sock.close()
+            with self._lock:
+                if client in self._clients:
+                    self._clients.remove(client)
@@ -7,12 +7,21 @@ except Exception:
     requests = None
     http_get_with_backoff = None  # type: ignore
 
+from backend.ingestion.recorder import record_response  # no-op unless PROVIDER_RECORD_DIR is set
+
 ALLTICK_API_KEY = os.environ.get("ALLTICK_API_KEY")
 DEV_FAKE = os.environ.get("ALLTICK_DEV_FAKE", "1")  # "1" = fake bars by default
 
 def _now_utc():
     return dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
 
+def _forming_open(timeframe: str) -> dt.datetime:
+    # The latest bar is the one still forming: its timestamp is the open of the current interval
+    from backend.tasks.utils import timeframe_seconds
+    step = timeframe_seconds(timeframe)
+    now = int(_now_utc().timestamp())
+    return dt.datetime.fromtimestamp(now - now % step, dt.timezone.utc)
+
 def _dev_fake_bar(symbol: str, timeframe: str, last_close: float | None) -> dict:
     base = last_close if last_close is not None else 1.0000
     drift = (random.random() - 0.5) * 0.001  # ~±0.0005
@@ -21,26 +30,118 @@ def _dev_fake_bar(symbol: str, timeframe: str, last_close: float | None) -> dict
     low  = round(min(base, close) - 0.0003, 6)
     open_ = base
     return {
-        "symbol": symbol, "timeframe": timeframe, "timestamp": _now_utc(),
+        "symbol": symbol, "timeframe": timeframe, "timestamp": _forming_open(timeframe),
         "open": open_, "high": high, "low": low, "close": close,
         "volume": 0.0, "provider": "AllTick",
     }
 
+def _wire_row(bar: dict) -> dict:
+    # Fake bars are recorded in the API's row format so replay parses them like live ones
+    return {"symbol": bar["symbol"], "ts": bar["timestamp"].replace(tzinfo=None).isoformat(),
+            "o": bar["open"], "h": bar["high"], "l": bar["low"], "c": bar["close"], "v": bar["volume"]}
+
+def _record(kind: str, symbol: str, timeframe: str, rows: list[dict],
+            start: dt.datetime | None = None, end: dt.datetime | None = None) -> None:
+    if start is None:
+        if not rows:
+            return
+        stamps = [dt.datetime.fromisoformat(j["ts"]) for j in rows]
+        start, end = min(stamps), max(stamps)
+    record_response("AllTick", kind, symbol, timeframe, start, end, rows)
+
 def fetch_latest_bar(symbol: str, timeframe: str, last_close: float | None = None) -> dict:
     # Dev default: synthesize bars unless ALLTICK_DEV_FAKE=0
     if DEV_FAKE != "0":
-        return _dev_fake_bar(symbol, timeframe, last_close)
+        bar = _dev_fake_bar(symbol, timeframe, last_close)
+        _record("latest", symbol, timeframe, [_wire_row(bar)])
+        return bar
 
     assert requests is not None, "requests not installed; pip install requests or set ALLTICK_DEV_FAKE=1"
     assert ALLTICK_API_KEY, "Missing ALLTICK_API_KEY; set it or use ALLTICK_DEV_FAKE=1"
     url = f"https://api.alltick.example/ohlcv?symbol={symbol}&tf={timeframe}&limit=1"
     headers = {"Authorization": f"Bearer {ALLTICK_API_KEY}"}
-    r = http_get_with_backoff(url, headers=headers, timeout=10, max_attempts=5, base=0.2, factor=2.0, jitter=0.3)
+    r = http_get_with_backoff(url, headers=headers, timeout=10, max_attempts=5, base=0.2, factor=2.0, jitter=0.3, provider="AllTick")
     r.raise_for_status()
-    j = r.json()[0]
+    row = r.json()[0]
+    _record("latest", symbol, timeframe, [dict(row, symbol=row.get("symbol", symbol))])
+    return _parse_row(symbol, timeframe, row)
+
+def _parse_row(symbol: str, timeframe: str, j: dict) -> dict:
     ts = dt.datetime.fromisoformat(j["ts"]).replace(tzinfo=dt.timezone.utc)
     return {
         "symbol": symbol, "timeframe": timeframe, "timestamp": ts,
         "open": j["o"], "high": j["h"], "low": j["l"], "close": j["c"],
         "volume": j["v"], "provider": "AllTick",
     }
+
+def fetch_latest_bars(symbols: list[str], timeframe: str, since: dt.datetime | None = None,
+                      last_closes: dict | None = None) -> dict[str, list[dict]]:
+    """Batched variant: one request for every symbol -> {symbol: [bars oldest→newest]}.
+    since=None asks for the latest bar only (limit=1 per symbol)."""
+    last_closes = last_closes or {}
+    if DEV_FAKE != "0":
+        out = {s: [_dev_fake_bar(s, timeframe, last_closes.get(s))] for s in symbols}
+        for s, bars in out.items():
+            _record("latest", s, timeframe, [_wire_row(b) for b in bars])
+        return out
+
+    assert requests is not None, "requests not installed; pip install requests or set ALLTICK_DEV_FAKE=1"
+    assert ALLTICK_API_KEY, "Missing ALLTICK_API_KEY; set it or use ALLTICK_DEV_FAKE=1"
+    url = f"https://api.alltick.example/ohlcv?symbols={','.join(symbols)}&tf={timeframe}"
+    url += f"&since={since.isoformat()}" if since is not None else "&limit=1"
+    headers = {"Authorization": f"Bearer {ALLTICK_API_KEY}"}
+    r = http_get_with_backoff(url, headers=headers, timeout=10, max_attempts=5, base=0.2, factor=2.0, jitter=0.3, provider="AllTick")
+    r.raise_for_status()
+    out: dict[str, list[dict]] = {s: [] for s in symbols}
+    raw: dict[str, list[dict]] = {s: [] for s in symbols}
+    for j in r.json():
+        sym = j.get("symbol")
+        if sym in out:
+            raw[sym].append(j)
+            out[sym].append(_parse_row(sym, timeframe, j))
+    for sym, rows in raw.items():
+        _record("latest" if since is None else "since", sym, timeframe, rows)
+    for bars in out.values():
+        bars.sort(key=lambda b: b["timestamp"])
+    return out
+
+def _dev_fake_history(symbol: str, timeframe: str, start: dt.datetime, end: dt.datetime, limit: int) -> list[dict]:
+    from backend.tasks.utils import timeframe_seconds
+    step = timeframe_seconds(timeframe)
+    # Align to the bar grid and seed per page so refetching a page is reproducible
+    t = int(start.timestamp()) + (-int(start.timestamp()) % step)
+    rng = random.Random(f"{symbol}:{timeframe}:{t}")
+    close = 1.0 + (rng.random() - 0.5) * 0.1
+    out = []
+    while t < end.timestamp() and len(out) < limit:
+        open_ = close
+        close = round(open_ + (rng.random() - 0.5) * 0.001, 6)
+        out.append({
+            "symbol": symbol, "timeframe": timeframe,
+            "timestamp": dt.datetime.fromtimestamp(t, dt.timezone.utc),
+            "open": open_, "high": round(max(open_, close) + 0.0002, 6),
+            "low": round(min(open_, close) - 0.0002, 6), "close": close,
+            "volume": float(rng.randint(100, 1000)), "provider": "AllTick",
+        })
+        t += step
+    return out
+
+def fetch_history_page(symbol: str, timeframe: str, start: dt.datetime, end: dt.datetime, limit: int = 5000) -> list[dict]:
+    """One page of history in [start, end), oldest → newest, at most `limit` bars."""
+    if DEV_FAKE != "0":
+        bars = _dev_fake_history(symbol, timeframe, start, end, limit)
+        _record("history", symbol, timeframe, [_wire_row(b) for b in bars], start, end)
+        return bars
+
+    assert requests is not None, "requests not installed; pip install requests or set ALLTICK_DEV_FAKE=1"
+    assert ALLTICK_API_KEY, "Missing ALLTICK_API_KEY; set it or use ALLTICK_DEV_FAKE=1"
+    url = (f"https://api.alltick.example/ohlcv?symbol={symbol}&tf={timeframe}"
+           f"&start={start.isoformat()}&end={end.isoformat()}&limit={limit}")
+    headers = {"Authorization": f"Bearer {ALLTICK_API_KEY}"}
+    r = http_get_with_backoff(url, headers=headers, timeout=30, max_attempts=5, base=0.2, factor=2.0, jitter=0.3, provider="AllTick")
+    r.raise_for_status()
+    rows = r.json()
+    _record("history", symbol, timeframe, rows, start, end)
+    bars = [_parse_row(symbol, timeframe, j) for j in rows]
+    bars.sort(key=lambda b: b["timestamp"])
+    return bars
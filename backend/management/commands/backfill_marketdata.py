@@ -0,0 +1,78 @@
+# Django management command: backfill_marketdata
+# Usage:
+#   python manage.py backfill_marketdata --tf 1m --start 2023-10-01 [--end 2025-10-01]
+# Optional flags:
+#   --pairs EURUSD,GBPUSD   # default: watchlist pairs
+#   --provider AllTick      # default: first provider in the configured order
+#   --page-size 5000        # bars per history request / bulk write
+#   --workers 4             # symbols fetched in parallel
+#   --rps 5                 # provider requests per second (shared by all workers)
+#   --restart               # ignore checkpoints and start from --start
+# Re-running the same command resumes each (pair, tf) from its BackfillCheckpoint.
+
+from __future__ import annotations
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from backend.ingestion.backfill import DEFAULT_PAGE_SIZE, run_backfill
+from backend.tasks.utils import parse_watchlist
+from providers.manager import ProviderManager
+
+
+def _parse_when(raw: str) -> datetime:
+    try:
+        dt = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    except ValueError:
+        raise CommandError(f"Not an ISO date/datetime: {raw}")
+    return dt if dt.tzinfo else dt.replace(tzinfo=dt_timezone.utc)
+
+
+class Command(BaseCommand):
+    help = "Page provider history into MarketData with chunked bulk writes and per-pair checkpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tf", required=True)
+        parser.add_argument("--start", required=True, help="ISO date/datetime (UTC if naive)")
+        parser.add_argument("--end", default="", help="ISO date/datetime, exclusive (default: now)")
+        parser.add_argument("--pairs", default="", help="Comma-separated symbols (default: watchlist)")
+        parser.add_argument("--provider", default="", help="Provider name (default: configured order)")
+        parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--rps", type=float, default=5.0)
+        parser.add_argument("--restart", action="store_true")
+
+    def handle(self, *args, **o):
+        pairs = [p.strip() for p in o["pairs"].split(",") if p.strip()] or parse_watchlist()["pairs"]
+        start = _parse_when(o["start"])
+        end = _parse_when(o["end"]) if o["end"] else timezone.now()
+        if end <= start:
+            raise CommandError("--end must be after --start")
+
+        manager = ProviderManager()
+        try:
+            provider = manager.get_provider(o["provider"]) if o["provider"] else manager.choose(pairs[0], o["tf"])
+        except KeyError:
+            raise CommandError(f"Unknown provider: {o['provider']}")
+
+        self.stdout.write(self.style.NOTICE(
+            f"Backfilling {len(pairs)} pair(s) {o['tf']} {start.isoformat()} → {end.isoformat()} via {provider.name}"
+        ))
+        out = run_backfill(
+            provider, pairs, o["tf"], start, end,
+            page_size=o["page_size"], workers=o["workers"], rate_per_sec=o["rps"], restart=o["restart"],
+        )
+
+        failed = 0
+        for sym, info in out["symbols"].items():
+            line = f"{sym:<10} {info['status']:<7} bars={info['bars']} cursor={info['cursor']}"
+            if info["status"] == "FAILED":
+                failed += 1
+                self.stderr.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        summary = f"done bars={out['bars']} rate={out['bars_per_sec']} bars/s failures={failed}"
+        self.stdout.write(self.style.WARNING(summary) if failed else self.style.SUCCESS(summary))
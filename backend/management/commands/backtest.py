@@ -0,0 +1,80 @@
+# Django management command: backtest
+# Usage:
+#   python manage.py backtest --pair EURUSD --tf 15m [--start 2025-01-01] [--end 2025-06-01]
+# Optional flags:
+#   --source rules          # rules: batch rule engine over stored features (default)
+#                           # analysis: stored TradeAnalysis decisions (rules ⊕ ML) and their SL/TP
+#   --min-composite 60      # analysis source: skip decisions below this composite score
+#   --ambiguity stop        # same-bar SL+TP touch policy: stop | target | open (see trading/backtest.py)
+#   --max-hold 96           # exit at the close after N bars without a touch
+#   --risk 0.01             # equity fraction risked per trade (1R)
+#   --overlap               # allow concurrent positions
+#   --trades out.csv        # write the trade list
+# Prints summary stats and the simulation throughput (bars/min).
+
+from __future__ import annotations
+
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from trading import backtest as bt
+
+
+def _parse_when(raw: str):
+    if not raw:
+        return None
+    try:
+        dt = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    except ValueError:
+        raise CommandError(f"Not an ISO date/datetime: {raw}")
+    return dt if dt.tzinfo else dt.replace(tzinfo=dt_timezone.utc)
+
+
+class Command(BaseCommand):
+    help = "Replay rule / analysis signals over MarketData with vectorized SL/TP fills."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pair", required=True)
+        parser.add_argument("--tf", required=True)
+        parser.add_argument("--start", default="", help="ISO date/datetime (UTC if naive)")
+        parser.add_argument("--end", default="", help="ISO date/datetime, exclusive")
+        parser.add_argument("--source", choices=("rules", "analysis"), default="rules")
+        parser.add_argument("--min-composite", type=float, default=0.0)
+        parser.add_argument("--ambiguity", choices=bt.AMBIGUITY_POLICIES, default=None)
+        parser.add_argument("--max-hold", type=int, default=None)
+        parser.add_argument("--risk", type=float, default=0.01)
+        parser.add_argument("--overlap", action="store_true")
+        parser.add_argument("--trades", default="", help="CSV path for the trade list")
+
+    def handle(self, *args, **o):
+        pair, tf = o["pair"].upper(), o["tf"]
+        bars = bt.load_bars(pair, tf, _parse_when(o["start"]), _parse_when(o["end"]))
+        if not len(bars["close"]):
+            raise CommandError(f"No MarketData for {pair} {tf}")
+        bars["atr"] = bt.feature_atr(bars, pair, tf)
+        sl = tp = None
+        if o["source"] == "rules":
+            signals = bt.rule_signals(bars, pair, tf)
+        else:
+            signals, sl, tp = bt.analysis_signals(bars, pair, tf, o["min_composite"])
+
+        t0 = time.perf_counter()
+        res = bt.backtest(bars, signals, sl=sl, tp=tp, max_hold=o["max_hold"], ambiguity=o["ambiguity"],
+                          allow_overlap=o["overlap"], risk_per_trade=o["risk"])
+        elapsed = max(time.perf_counter() - t0, 1e-9)
+
+        if o["trades"]:
+            res.trades.to_csv(o["trades"], index=False)
+        s = res.stats
+        self.stdout.write(f"{pair} {tf} source={o['source']} bars={s['bars']} trades={s['trades']}")
+        self.stdout.write(
+            f"win_rate={s['win_rate']:.2%} avg_r={s['avg_r']:.3f} total_r={s['total_r']:.2f} "
+            f"profit_factor={s['profit_factor']:.2f} max_dd={s['max_drawdown']:.2%} "
+            f"final_equity={s['final_equity']:.4f}")
+        self.stdout.write(
+            f"exits tp={s['exits_tp']} sl={s['exits_sl']} timeout={s['exits_timeout']} eod={s['exits_eod']} "
+            f"ambiguous={s['ambiguous']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"simulated in {elapsed * 1000:.1f} ms ({s['bars'] / elapsed * 60:,.0f} bars/min)"))
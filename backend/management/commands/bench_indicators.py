@@ -0,0 +1,92 @@
+# Django management command: bench_indicators
+# Usage:
+#   python manage.py bench_indicators [--csv pipeline_outputs/preprocess_output.csv] [--repeat 20] [--tile 1]
+# Times the `ta` / pandas indicator wrappers against the ml_pipeline.indicators NumPy kernels
+# on the same OHLCV columns (--tile repeats the frame to benchmark longer histories).
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ml_pipeline import indicators as ind
+
+
+def _best_ms(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+
+def _ta_suite(df: pd.DataFrame):
+    from ta.momentum import RSIIndicator
+    from ta.trend import EMAIndicator
+    from ta.volatility import AverageTrueRange, BollingerBands
+
+    h, l, c, v = df["high"], df["low"], df["close"], df["volume"]
+    return {
+        "atr": lambda: AverageTrueRange(h, l, c, window=14).average_true_range(),
+        "ema": lambda: [EMAIndicator(c, window=w).ema_indicator() for w in (8, 20, 50)],
+        "rsi": lambda: RSIIndicator(c, window=14).rsi(),
+        "bollinger": lambda: (lambda bb: (bb.bollinger_mavg(), bb.bollinger_hband(), bb.bollinger_lband()))(
+            BollingerBands(c, window=20, window_dev=2)),
+        "vwap": lambda: (c * v).cumsum() / v.cumsum(),
+        "zscore": lambda: (v - v.rolling(20).mean()) / v.rolling(20).std(),
+        "squeeze": lambda: (lambda w: (w < w.rolling(20).quantile(0.2)).astype(int))(c.rolling(20).std() / c),
+    }
+
+
+def _kernel_suite(df: pd.DataFrame):
+    h, l, c, v = (ind.as_f64(df[k]) for k in ("high", "low", "close", "volume"))
+    n = len(c)
+    buf = [np.empty(n) for _ in range(4)]
+    width = ind.bollinger(c, 20, 2)[3]
+    return {
+        "atr": lambda: ind.atr(h, l, c, 14, out=buf[0]),
+        "ema": lambda: [ind.ema(c, w, out=buf[i]) for i, w in enumerate((8, 20, 50))],
+        "rsi": lambda: ind.rsi(c, 14, out=buf[0]),
+        "bollinger": lambda: ind.bollinger(c, 20, 2, out=tuple(buf)),
+        "vwap": lambda: ind.vwap(c, v, out=buf[0]),
+        "zscore": lambda: ind.zscore(v, 20, out=buf[0]),
+        "squeeze": lambda: ind.squeeze(width),
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark the NumPy indicator kernels against the `ta` wrappers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--csv", default="pipeline_outputs/preprocess_output.csv", help="OHLCV CSV")
+        parser.add_argument("--repeat", type=int, default=20, help="Runs per indicator (best is reported)")
+        parser.add_argument("--tile", type=int, default=1, help="Repeat the frame N times")
+
+    def handle(self, *args, **o):
+        path = Path(o["csv"])
+        if not path.is_absolute():
+            path = Path(settings.BASE_DIR) / path
+        if not path.exists():
+            raise CommandError(f"CSV not found: {path}")
+        df = pd.read_csv(path, usecols=["high", "low", "close", "volume"])
+        if o["tile"] > 1:
+            df = pd.concat([df] * o["tile"], ignore_index=True)
+        repeat = max(1, o["repeat"])
+
+        ta_suite, np_suite = _ta_suite(df), _kernel_suite(df)
+        self.stdout.write(f"bars={len(df)} repeat={repeat}")
+        self.stdout.write(f"{'indicator':<10} {'ta ms':>9} {'numpy ms':>9} {'speedup':>8}")
+        total_ta = total_np = 0.0
+        for name in ta_suite:
+            t_ta, t_np = _best_ms(ta_suite[name], repeat), _best_ms(np_suite[name], repeat)
+            total_ta += t_ta
+            total_np += t_np
+            self.stdout.write(f"{name:<10} {t_ta:>9.3f} {t_np:>9.3f} {t_ta / t_np:>7.1f}x")
+        self.stdout.write(self.style.SUCCESS(
+            f"{'total':<10} {total_ta:>9.3f} {total_np:>9.3f} {total_ta / total_np:>7.1f}x"))
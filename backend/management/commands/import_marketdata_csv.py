@@ -0,0 +1,43 @@
+# Django management command: import_marketdata_csv
+# Usage:
+#   python manage.py import_marketdata_csv --csv ml_pipeline/ML_ready_EURUSD.csv --pair EURUSD --tf 1m
+# CSV must contain at least: timestamp, open, high, low, close, volume.
+
+from __future__ import annotations
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.tasks.utils import upsert_market_frame
+
+REQUIRED_COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+
+class Command(BaseCommand):
+    help = "Bulk-load OHLCV bars from a CSV file into MarketData (idempotent upsert)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--csv", required=True, help="Path to the CSV file")
+        parser.add_argument("--pair", required=True, help="Symbol to store the bars under, e.g. EURUSD")
+        parser.add_argument("--tf", required=True, help="Timeframe to store the bars under, e.g. 1m")
+        parser.add_argument("--provider", default="CSV", help="Provider attribution (default: CSV)")
+        parser.add_argument("--chunk", type=int, default=5000, help="Rows per read/write chunk (default: 5000)")
+
+    def handle(self, *args, **o):
+        inserted = updated = 0
+        try:
+            reader = pd.read_csv(o["csv"], chunksize=max(1, o["chunk"]))
+        except FileNotFoundError:
+            raise CommandError(f"CSV not found: {o['csv']}")
+
+        for df in reader:
+            missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+            if missing:
+                raise CommandError(f"CSV is missing columns: {missing}")
+            df = df.dropna(subset=list(REQUIRED_COLUMNS))
+            df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
+            counts = upsert_market_frame(df, o["pair"], o["tf"], provider=o["provider"])
+            inserted += counts["inserted"]
+            updated += counts["updated"]
+
+        self.stdout.write(self.style.SUCCESS(f"Import complete: inserted={inserted} updated={updated}"))
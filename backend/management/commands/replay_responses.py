@@ -0,0 +1,74 @@
+# Django management command: replay_responses
+# Usage:
+#   python manage.py replay_responses --dir /data/recordings [--source AllTick] [--pairs EURUSD] [--tf 1m]
+#                                     [--start 2025-01-01] [--end 2025-02-01] [--write]
+# Reads raw provider responses captured by the recorder (PROVIDER_RECORD_DIR), parses them
+# with the live row parser and reports records/bars per second; --write also upserts the bars
+# into MarketData. To re-run ingestion itself offline use provider "Replay", e.g.
+#   REPLAY_DIR=/data/recordings python manage.py backfill_marketdata --provider Replay --rps 1000 ...
+
+from __future__ import annotations
+
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.ingestion.recorder import PROVIDER_RECORD_DIR
+from backend.tasks.utils import upsert_market_bars
+from providers.replay import Replay
+
+
+def _parse_when(raw: str):
+    if not raw:
+        return None
+    try:
+        dt = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    except ValueError:
+        raise CommandError(f"Not an ISO date/datetime: {raw}")
+    return dt if dt.tzinfo else dt.replace(tzinfo=dt_timezone.utc)
+
+
+class Command(BaseCommand):
+    help = "Replay recorded raw provider responses at disk speed (parse benchmark, optional MarketData write)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", default=PROVIDER_RECORD_DIR, help="Recorder root (default: PROVIDER_RECORD_DIR)")
+        parser.add_argument("--source", default="AllTick", help="Recorded provider")
+        parser.add_argument("--pairs", default="", help="Comma-separated symbols (default: all recorded)")
+        parser.add_argument("--tf", default="", help="Timeframe (default: all recorded)")
+        parser.add_argument("--start", default="")
+        parser.add_argument("--end", default="")
+        parser.add_argument("--write", action="store_true", help="Upsert replayed bars into MarketData")
+
+    def handle(self, *args, **o):
+        if not o["dir"]:
+            raise CommandError("--dir (or PROVIDER_RECORD_DIR) is required")
+        try:
+            replay = Replay(root=o["dir"], source=o["source"])
+        except KeyError:
+            raise CommandError(f"No row parser for recorded provider: {o['source']}")
+
+        pairs = [p.strip() for p in o["pairs"].split(",") if p.strip()] or [None]
+        start, end = _parse_when(o["start"]), _parse_when(o["end"])
+        t0 = time.perf_counter()
+        entries = [e for sym in pairs for e in replay.reader.index(sym, o["tf"] or None, start, end)]
+        t_index = time.perf_counter() - t0
+
+        records = bars = written = 0
+        t0 = time.perf_counter()
+        for rec in replay.reader.records(entries):
+            parsed = replay.parse_record(rec)
+            records += 1
+            bars += len(parsed)
+            if o["write"] and parsed:
+                counts = upsert_market_bars(dict(b, provider=o["source"]) for b in parsed)
+                written += counts["inserted"] + counts["updated"]
+        elapsed = max(1e-9, time.perf_counter() - t0)
+
+        self.stdout.write(
+            f"index entries={len(entries)} in {t_index * 1000:.1f}ms; replayed records={records} bars={bars} "
+            f"in {elapsed:.3f}s ({records / elapsed:.0f} records/s, {bars / elapsed:.0f} bars/s)"
+        )
+        if o["write"]:
+            self.stdout.write(self.style.SUCCESS(f"written={written}"))
@@ -0,0 +1,35 @@
+# Django management command: scan_gaps
+# Usage:
+#   python manage.py scan_gaps [--pairs EURUSD,GBPUSD] [--tfs 15m,1h] [--repair]
+# Scans MarketData for missing bars (lookback from watchlist `gap_scan:`), records new
+# runs in the GapRepair ledger and, with --repair, fills them synchronously.
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from backend.ingestion.gaps import repair_gap, scan_gaps
+
+
+class Command(BaseCommand):
+    help = "Find missing MarketData bars per (pair, timeframe) and optionally repair them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pairs", default="", help="Comma-separated symbols (default: watchlist)")
+        parser.add_argument("--tfs", default="", help="Comma-separated timeframes (default: watchlist)")
+        parser.add_argument("--repair", action="store_true", help="Fetch queued ranges now instead of via Celery")
+
+    def handle(self, *args, **o):
+        pairs = [p.strip() for p in o["pairs"].split(",") if p.strip()] or None
+        tfs = [t.strip() for t in o["tfs"].split(",") if t.strip()] or None
+        out = scan_gaps(pairs, tfs)
+        self.stdout.write(
+            f"scanned series={out['series']} gaps={out['gaps']} missing_bars={out['missing_bars']} "
+            f"queued={len(out['queued'])}"
+        )
+        if not o["repair"]:
+            return
+        for gap_id in out["queued"]:
+            res = repair_gap(gap_id)
+            line = f"gap {gap_id}: {res['status']} bars_written={res['bars_written']} missing={res['missing']}"
+            self.stdout.write(self.style.SUCCESS(line) if res["status"] == "REPAIRED" else self.style.WARNING(line))
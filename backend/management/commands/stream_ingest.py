@@ -0,0 +1,61 @@
+# Django management command: stream_ingest
+# Usage:
+#   python manage.py stream_ingest [--provider AllTick] [--url wss://...]
+# Optional flags:
+#   --pairs EURUSD,GBPUSD   # default: watchlist pairs
+#   --tfs 1m,5m             # default: watchlist timeframes
+#   --standin               # start the local stand-in server and stream from it (offline dev)
+#   --bar-interval 1.0      # stand-in only: seconds between synthetic closed bars
+#   --duration 60           # stop after N seconds (default: run until interrupted)
+# Without --url the socket URL comes from <PROVIDER>_WS_URL (e.g. ALLTICK_WS_URL).
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.ingestion.stream import StreamIngestor, stream_url
+from backend.ingestion.stream_standin import StandInStreamServer
+from backend.tasks.utils import parse_watchlist
+
+
+class Command(BaseCommand):
+    help = "Long-running streaming ingestion: one WebSocket per provider, closed bars bulk-upserted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--provider", default="AllTick")
+        parser.add_argument("--url", default="")
+        parser.add_argument("--pairs", default="", help="Comma-separated symbols (default: watchlist)")
+        parser.add_argument("--tfs", default="", help="Comma-separated timeframes (default: watchlist)")
+        parser.add_argument("--standin", action="store_true")
+        parser.add_argument("--bar-interval", type=float, default=1.0)
+        parser.add_argument("--duration", type=float, default=0.0)
+
+    def handle(self, *args, **o):
+        cfg = parse_watchlist()
+        pairs = [p.strip() for p in o["pairs"].split(",") if p.strip()] or cfg["pairs"]
+        tfs = [t.strip() for t in o["tfs"].split(",") if t.strip()] or cfg["timeframes"]
+
+        server = None
+        if o["standin"]:
+            server = StandInStreamServer(bar_interval=o["bar_interval"], ping_interval=5.0).start()
+            url = server.url
+        else:
+            url = o["url"] or stream_url(o["provider"])
+        if not url:
+            raise CommandError(f"No stream URL: pass --url, set {o['provider'].upper()}_WS_URL or use --standin")
+
+        self.stdout.write(self.style.NOTICE(f"Streaming {len(pairs)} pair(s) × {','.join(tfs)} from {url}"))
+        ingestor = StreamIngestor(o["provider"], url, pairs, tfs)
+        try:
+            stats = ingestor.run(duration=o["duration"] or None)
+        except KeyboardInterrupt:
+            ingestor.stop()
+            stats = ingestor.stats
+        finally:
+            if server is not None:
+                server.stop()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"stream stopped bars={stats['bars']} batches={stats['batches']} pings={stats['pings']} "
+            f"reconnects={stats['reconnects']} errors={stats['errors']}"
+        ))
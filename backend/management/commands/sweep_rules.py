@@ -0,0 +1,103 @@
+# Django management command: sweep_rules
+# Usage:
+#   python manage.py sweep_rules --pair EURUSD --tf 15m [--start 2025-01-01] [--end 2025-06-01]
+# Optional flags:
+#   --param NAME=v1,v2,v3      # grid values (repeatable); NAME=lo:hi:step expands to a grid
+#   --param NAME=lo:hi         # uniform range, with --random only
+#                              # NAME: RULE_PARAMS (trading/rules/batch.py), ATR_MULTIPLIER_SL, DEFAULT_RR_RATIO
+#                              # no --param: trading/sweep.py DEFAULT_GRID (3888 configurations)
+#   --random 2000 --seed 7     # random search: N seeded samples instead of the full grid
+#   --workers 8                # process pool size (default SWEEP_WORKERS = CPU count; 1 = in-process)
+#   --strategy rsi_volume      # confluence strategy (default DEFAULT_CONFLUENCE_STRATEGY)
+#   --loose                    # loose confirmation (EMA8) instead of strict
+#   --scalar-flags             # do not chain stage 1.1/1.2 flags into stage 1.4 (scalar engine wiring)
+#   --max-hold 96 --ambiguity stop --risk 0.01 --overlap   # backtest settings (see backtest command)
+#   --rank-by total_r --min-trades 30 --top 20
+#   --csv sweep.csv            # write the full ranked table
+# Prints the top configurations and the sweep throughput.
+
+from __future__ import annotations
+
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from trading import backtest as bt
+from trading import sweep
+
+
+def _parse_when(raw: str):
+    if not raw:
+        return None
+    try:
+        dt = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    except ValueError:
+        raise CommandError(f"Not an ISO date/datetime: {raw}")
+    return dt if dt.tzinfo else dt.replace(tzinfo=dt_timezone.utc)
+
+
+class Command(BaseCommand):
+    help = "Grid / random search over rule constants, backtested in a process pool; prints a ranked table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pair", required=True)
+        parser.add_argument("--tf", required=True)
+        parser.add_argument("--start", default="", help="ISO date/datetime (UTC if naive)")
+        parser.add_argument("--end", default="", help="ISO date/datetime, exclusive")
+        parser.add_argument("--param", action="append", default=[], help="NAME=v1,v2 | NAME=lo:hi:step | NAME=lo:hi")
+        parser.add_argument("--random", type=int, default=0, help="Random search with N samples")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--workers", type=int, default=None)
+        parser.add_argument("--strategy", choices=("rsi_volume", "ema_price_sr"), default=None)
+        parser.add_argument("--loose", action="store_true")
+        parser.add_argument("--scalar-flags", action="store_true")
+        parser.add_argument("--ambiguity", choices=bt.AMBIGUITY_POLICIES, default=None)
+        parser.add_argument("--max-hold", type=int, default=None)
+        parser.add_argument("--risk", type=float, default=0.01)
+        parser.add_argument("--overlap", action="store_true")
+        parser.add_argument("--rank-by", default="total_r")
+        parser.add_argument("--min-trades", type=int, default=0)
+        parser.add_argument("--top", type=int, default=20)
+        parser.add_argument("--csv", default="", help="CSV path for the full ranked table")
+
+    def handle(self, *args, **o):
+        pair, tf = o["pair"].upper(), o["tf"]
+        try:
+            space = dict(sweep.parse_param(spec) for spec in o["param"]) or dict(sweep.DEFAULT_GRID)
+        except ValueError as e:
+            raise CommandError(str(e))
+        if o["random"] > 0:
+            configs = sweep.random_configs(space, o["random"], o["seed"])
+        elif any(isinstance(v, tuple) for v in space.values()):
+            raise CommandError("NAME=lo:hi ranges need --random N (or give a step: NAME=lo:hi:step)")
+        else:
+            configs = sweep.grid_configs(space)
+        if not configs:
+            raise CommandError("No configurations to sweep")
+
+        bars = bt.rule_inputs(pair, tf, _parse_when(o["start"]), _parse_when(o["end"]))
+        if not bars["close"].size:
+            raise CommandError(f"No featurised MarketData for {pair} {tf}")
+
+        self.stdout.write(f"{pair} {tf}: {len(configs)} configurations over {bars['close'].size} bars")
+        t0 = time.perf_counter()
+        try:
+            table = sweep.run_sweep(
+                bars, configs, workers=o["workers"], strict_confirmation=not o["loose"], strategy=o["strategy"],
+                chain_stage_flags=not o["scalar_flags"], max_hold=o["max_hold"], ambiguity=o["ambiguity"],
+                allow_overlap=o["overlap"], risk_per_trade=o["risk"], rank_by=o["rank_by"],
+                min_trades=o["min_trades"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = max(time.perf_counter() - t0, 1e-9)
+
+        if o["csv"]:
+            table.to_csv(o["csv"], index=False)
+        shown = [c for c in table.columns if c not in ("bars", "final_equity", "ambiguous") and not c.startswith("exits_")]
+        with pd.option_context("display.width", 200, "display.max_columns", None):
+            self.stdout.write(table[shown].head(o["top"]).to_string(index=False))
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(configs)} configurations in {elapsed:.1f}s ({len(configs) / elapsed:.1f} configs/s), "
+            f"{len(table)} with >= {o['min_trades']} trades"))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0021_backfillcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GapRepair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(db_index=True, max_length=20)),
+                ('timeframe', models.CharField(db_index=True, max_length=10)),
+                ('gap_start', models.DateTimeField()),
+                ('gap_end', models.DateTimeField()),
+                ('missing_bars', models.IntegerField(default=0)),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('REPAIRED', 'Repaired'), ('PARTIAL', 'Partial'), ('UNFILLABLE', 'Unfillable'), ('FAILED', 'Failed')], default='QUEUED', max_length=12)),
+                ('provider', models.CharField(blank=True, max_length=50, null=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('bars_written', models.IntegerField(default=0)),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('repaired_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status'], name='backend_gap_status_abdaa8_idx')],
+                'unique_together': {('symbol', 'timeframe', 'gap_start')},
+            },
+        ),
+    ]
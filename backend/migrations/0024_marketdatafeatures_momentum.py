@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0023_indicatorstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='marketdatafeatures',
+            name='adx',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='marketdatafeatures',
+            name='cci',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='marketdatafeatures',
+            name='macd',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='marketdatafeatures',
+            name='macd_signal',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='marketdatafeatures',
+            name='obv',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='marketdatafeatures',
+            name='stoch_d',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='marketdatafeatures',
+            name='stoch_k',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='marketdatafeatures',
+            name='willr',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
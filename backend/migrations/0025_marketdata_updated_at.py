@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0024_marketdatafeatures_momentum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='marketdata',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='marketdata',
+            index=models.Index(fields=['symbol', 'timeframe', 'updated_at'], name='backend_mar_symbol_f0f554_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0025_marketdata_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='marketdatafeatures',
+            name='cum_v',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='marketdatafeatures',
+            name='cum_vp',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -18,12 +18,15 @@ class MarketData(models.Model):
     close = models.FloatField()
     volume = models.FloatField()
     provider = models.CharField(max_length=50, default="AllTick")
+    # Last insert or upsert of this bar (IndicatorState notices bars rewritten behind it)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         # One bar per (symbol, timeframe, timestamp)
         unique_together = (("symbol", "timeframe", "timestamp"),)
         indexes = [
             models.Index(fields=["symbol", "timeframe", "timestamp"]),
+            models.Index(fields=["symbol", "timeframe", "updated_at"]),
         ]
 
     def __str__(self) -> str:
@@ -54,9 +57,23 @@ class MarketDataFeatures(models.Model):
     # Extended examples
     vwap = models.FloatField(null=True, blank=True)
     vwap_dist = models.FloatField(null=True, blank=True)
+    # Running Σ close·volume and Σ volume through this bar (vwap = cum_vp / cum_v); a tail
+    # recompute continues from them, as it does from obv
+    cum_vp = models.FloatField(null=True, blank=True)
+    cum_v = models.FloatField(null=True, blank=True)
     volume_zscore = models.FloatField(null=True, blank=True)
     range_atr_ratio = models.FloatField(null=True, blank=True)
 
+    # Momentum / trend (model inputs; see ml_pipeline.feature_builder.MODEL_TO_DB_NAME_MAP)
+    macd = models.FloatField(null=True, blank=True)
+    macd_signal = models.FloatField(null=True, blank=True)
+    adx = models.FloatField(null=True, blank=True)
+    cci = models.FloatField(null=True, blank=True)
+    obv = models.FloatField(null=True, blank=True)
+    stoch_k = models.FloatField(null=True, blank=True)
+    stoch_d = models.FloatField(null=True, blank=True)
+    willr = models.FloatField(null=True, blank=True)
+
     # Confluence flags
     ema_bull_cross = models.BooleanField(default=False)
     ema_bear_cross = models.BooleanField(default=False)
@@ -348,3 +365,95 @@ class ProviderTelemetry(models.Model):
     def __str__(self) -> str:
         return f"{self.provider} telemetry"
 
+
+
+# ------------------------------------------------------------
+# BackfillCheckpoint — resumable history backfill per (symbol, timeframe)
+# ------------------------------------------------------------
+class BackfillCheckpoint(models.Model):
+    STATUS_CHOICES = [
+        ("RUNNING", "Running"),
+        ("DONE", "Done"),
+        ("FAILED", "Failed"),
+    ]
+
+    symbol = models.CharField(max_length=20, db_index=True)
+    timeframe = models.CharField(max_length=10, db_index=True)
+    provider = models.CharField(max_length=50, default="AllTick")
+
+    range_start = models.DateTimeField()
+    range_end = models.DateTimeField()
+    # Next bar timestamp to fetch; everything before it is durably in MarketData
+    cursor_ts = models.DateTimeField()
+    bars_written = models.IntegerField(default=0)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="RUNNING")
+    error_message = models.TextField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (("symbol", "timeframe"),)
+
+    def __str__(self) -> str:
+        return f"Backfill<{self.symbol} {self.timeframe} @ {self.cursor_ts} [{self.status}]>"
+
+
+# ------------------------------------------------------------
+# GapRepair — ledger of missing-bar ranges found by the gap scanner
+# ------------------------------------------------------------
+class GapRepair(models.Model):
+    STATUS_CHOICES = [
+        ("QUEUED", "Queued"),
+        ("REPAIRED", "Repaired"),
+        ("PARTIAL", "Partial"),
+        ("UNFILLABLE", "Unfillable"),
+        ("FAILED", "Failed"),
+    ]
+
+    symbol = models.CharField(max_length=20, db_index=True)
+    timeframe = models.CharField(max_length=10, db_index=True)
+    # First and last missing bar timestamps (inclusive)
+    gap_start = models.DateTimeField()
+    gap_end = models.DateTimeField()
+    missing_bars = models.IntegerField(default=0)
+
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default="QUEUED")
+    provider = models.CharField(max_length=50, null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    bars_written = models.IntegerField(default=0)
+    error_message = models.TextField(null=True, blank=True)
+
+    detected_at = models.DateTimeField(auto_now_add=True)
+    repaired_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (("symbol", "timeframe", "gap_start"),)
+        indexes = [
+            models.Index(fields=["status"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"Gap<{self.symbol} {self.timeframe} {self.gap_start}→{self.gap_end} [{self.status}]>"
+
+
+# ------------------------------------------------------------
+# IndicatorState — snapshot of the incremental indicator engine per series
+# ------------------------------------------------------------
+class IndicatorState(models.Model):
+    symbol = models.CharField(max_length=20, db_index=True)
+    timeframe = models.CharField(max_length=10, db_index=True)
+    # Last MarketData bar folded into the state and how many bars that covers
+    last_ts = models.DateTimeField()
+    bars = models.IntegerField(default=0)
+    state = models.JSONField(default=dict)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (("symbol", "timeframe"),)
+
+    def __str__(self) -> str:
+        return f"IndicatorState<{self.symbol} {self.timeframe} @ {self.last_ts} ({self.bars} bars)>"
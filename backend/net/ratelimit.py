@@ -0,0 +1,369 @@
+# backend/net/ratelimit.py
+"""
+Token-bucket rate limiters for provider calls.
+
+RateLimiter: in-process and thread-safe; shared by the fetch threads of one process
+(ingest fan-out, backfill). `rate` tokens are added per second up to `burst`;
+acquire() takes one token.
+
+DistributedRateLimiter: per-provider second/minute token buckets and a UTC-day counter kept
+in the shared Django cache (Redis), drawn atomically by every Celery worker; limits come from
+providers.yaml (+ PROVIDER_RATE_LIMITS overrides). Reports usage into
+ProviderTelemetry.quota_usage_pct.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from backend.net import shared_cache
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def acquire(self, block: bool = True, timeout: Optional[float] = None) -> bool:
+        """Take one token. Non-blocking returns False when empty; blocking waits (up to timeout)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return True
+                wait = (1.0 - self._tokens) / self.rate
+            if not block:
+                return False
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+# ---------------------------------------------------------------------------
+# Cache-backed quota shared by every worker process
+# ---------------------------------------------------------------------------
+# Windows a provider quota can declare (providers.yaml `rate_limit:` keys).
+WINDOWS: Dict[str, int] = {"second": 1, "minute": 60, "daily": 86400}
+# Calendar windows: a counter per UTC day that never refills within it, so at most `limit`
+# calls go through per day. A token bucket would add a day's refill on top of a full bucket.
+CALENDAR_WINDOWS = frozenset({"daily"})
+
+# Provider config with `rate_limit:` windows per provider (see provider_manager/providers.yaml)
+PROVIDERS_YAML = os.getenv(
+    "PROVIDERS_YAML",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 "provider_manager", "providers.yaml"),
+)
+# Overrides on top of providers.yaml: "AllTick=second:10,minute:300,daily:20000;TwelveData=minute:8,daily:800"
+PROVIDER_RATE_LIMITS = os.getenv("PROVIDER_RATE_LIMITS", "")
+# Min seconds between ProviderTelemetry.quota_usage_pct writes per provider and process.
+QUOTA_REPORT_EVERY_SEC = float(os.getenv("QUOTA_REPORT_EVERY_SEC", "30"))
+# Longest a blocking acquire() waits for tokens when the caller gives no timeout.
+QUOTA_MAX_WAIT_SEC = float(os.getenv("QUOTA_MAX_WAIT_SEC", "30"))
+_KEY_PREFIX = "ratelimit"
+_PLACEHOLDER_WARNED = set()
+
+
+def parse_rate_limits(raw: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+    """Parse PROVIDER_RATE_LIMITS into {provider: {window: limit}}; malformed entries are ignored."""
+    out: Dict[str, Dict[str, int]] = {}
+    for block in (raw if raw is not None else PROVIDER_RATE_LIMITS).split(";"):
+        name, _, spec = block.partition("=")
+        limits = {}
+        for item in spec.split(","):
+            window, _, val = item.partition(":")
+            try:
+                if window.strip() in WINDOWS:
+                    limits[window.strip()] = int(val)
+            except ValueError:
+                continue
+        if name.strip() and limits:
+            out[name.strip()] = limits
+    return out
+
+
+def load_provider_config(path: Optional[str] = None) -> Dict[str, dict]:
+    """providers.yaml as {entry: config}; an unreadable file logs and yields {}."""
+    import yaml
+
+    try:
+        with open(path or PROVIDERS_YAML, "r") as f:
+            data = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as e:
+        logger.error("ratelimit: cannot read provider config %s: %s", path or PROVIDERS_YAML, e)
+        return {}
+    return {name: cfg or {} for name, cfg in data.items()} if isinstance(data, dict) else {}
+
+
+def provider_rate_limits(path: Optional[str] = None, raw: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+    """
+    {provider: {window: limit}} from providers.yaml `rate_limit:` blocks (keyed by the entry's
+    `provider:` name, the one ProviderManager and the fetchers use), overridden per provider
+    by PROVIDER_RATE_LIMITS. Blocks marked `placeholder: true` are stand-ins: using one
+    without an override logs a warning (once per provider and process).
+    """
+    out: Dict[str, Dict[str, int]] = {}
+    placeholders = set()
+    for entry, cfg in load_provider_config(path).items():
+        block = cfg.get("rate_limit") or {}
+        limits = {w: int(n) for w, n in block.items() if w in WINDOWS and n}
+        if limits:
+            name = cfg.get("provider") or entry
+            out[name] = limits
+            if block.get("placeholder"):
+                placeholders.add(name)
+    overrides = parse_rate_limits(raw)
+    out.update(overrides)
+    for name in sorted(placeholders - set(overrides) - _PLACEHOLDER_WARNED):
+        _PLACEHOLDER_WARNED.add(name)
+        logger.warning("ratelimit: %s uses placeholder limits %s from providers.yaml; set them to the "
+                       "subscription (providers.yaml or PROVIDER_RATE_LIMITS)", name, out[name])
+    return out
+
+
+# Takes ARGV[1] tokens from every window at once, on the Redis clock. Window i has limit
+# ARGV[3i], size ARGV[3i + 1] seconds and ARGV[3i + 2] == "1" when it is a calendar window.
+# A token bucket (KEYS[i], hash: tokens, ts) refills continuously; a calendar window only
+# has the counter KEYS[n + i] .. ":<window index>", and its quota comes back at the next
+# boundary. Every take increments the counters. Returns "0" when taken, else the seconds
+# until every window has room ("-1": never, more than a limit).
+_TAKE_LUA = """
+if redis.replicate_commands then redis.replicate_commands() end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local need = tonumber(ARGV[1])
+local force = ARGV[2] == '1'
+local n = #KEYS / 2
+local level = {}
+local wait = 0
+for i = 1, n do
+  local limit = tonumber(ARGV[3 * i])
+  local size = tonumber(ARGV[3 * i + 1])
+  if need > limit and not force then return '-1' end
+  if ARGV[3 * i + 2] == '1' then
+    local slot = math.floor(now / size)
+    local tokens = limit - (tonumber(redis.call('GET', KEYS[n + i] .. ':' .. slot)) or 0)
+    if tokens < need then wait = math.max(wait, (slot + 1) * size - now) end
+  else
+    local rate = limit / size
+    local b = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local tokens = tonumber(b[1]) or limit
+    local ts = tonumber(b[2]) or now
+    tokens = math.min(limit, tokens + math.max(0, now - ts) * rate)
+    level[i] = tokens
+    if tokens < need then wait = math.max(wait, (need - tokens) / rate) end
+  end
+end
+if wait > 0 and not force then return tostring(wait) end
+for i = 1, n do
+  local size = tonumber(ARGV[3 * i + 1])
+  if level[i] then
+    redis.call('HSET', KEYS[i], 'tokens', tostring(level[i] - need), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[i], 2 * size + 60)
+  end
+  local counter = KEYS[n + i] .. ':' .. math.floor(now / size)
+  redis.call('INCRBY', counter, need)
+  redis.call('EXPIRE', counter, size + 60)
+end
+return '0'
+"""
+
+
+class DistributedRateLimiter:
+    """
+    Quota windows for one provider kept in the Django cache (Redis), so every Celery worker
+    draws from the same quota. The second and minute windows are buckets of `limit` tokens
+    refilled continuously at limit/window per second, so short bursts cannot double up at
+    a boundary. The daily window is a fixed UTC-day counter (CALENDAR_WINDOWS): once `limit`
+    calls went through today, nothing more does until midnight UTC. A take checks and
+    debits every window in one atomic step (a Lua script on the Redis clock); other cache
+    backends run the same algorithm under a process-local lock (not shared, see
+    backend/net/shared_cache.py). Calls made per calendar window are counted for reporting.
+    """
+
+    def __init__(self, provider: str, limits: Dict[str, int], cache=None):
+        unknown = set(limits) - set(WINDOWS)
+        if unknown:
+            raise ValueError(f"unknown rate-limit window(s): {sorted(unknown)}")
+        self.provider = provider
+        self.limits = {w: int(n) for w, n in limits.items() if n and int(n) > 0}
+        self.cache = shared_cache.resolve(cache)
+        self._redis = shared_cache.redis_client(self.cache)
+        self._script = self._redis.register_script(_TAKE_LUA) if self._redis is not None else None
+        self._lock = threading.Lock()
+        self._last_report = 0.0
+        shared_cache.warn_if_local(self.cache, "ratelimit")
+
+    def _bucket_key(self, window: str) -> str:
+        return f"{_KEY_PREFIX}:{self.provider}:{window}:bucket"
+
+    def _count_key(self, window: str, now: Optional[float] = None) -> str:
+        key = f"{_KEY_PREFIX}:{self.provider}:{window}:used"
+        return key if now is None else f"{key}:{int(now // WINDOWS[window])}"
+
+    def _take(self, tokens: int, force: bool = False) -> float:
+        """Take tokens from every window: 0 on success, else seconds to wait (inf: never fits)."""
+        if not self.limits:
+            return 0.0
+        if self._script is not None:
+            windows = list(self.limits)
+            make = self.cache.make_and_validate_key
+            keys = [make(self._bucket_key(w)) for w in windows] + [make(self._count_key(w)) for w in windows]
+            args = [tokens, 1 if force else 0]
+            for w in windows:
+                args += [self.limits[w], WINDOWS[w], 1 if w in CALENDAR_WINDOWS else 0]
+            wait = float(self._script(keys=keys, args=args))
+            return float("inf") if wait < 0 else wait
+        return self._take_local(tokens, force, time.time())
+
+    def _take_local(self, tokens: int, force: bool, now: float) -> float:
+        """_TAKE_LUA on a non-Redis cache (atomic within this process only)."""
+        with self._lock:
+            keys = {w: self._bucket_key(w) for w in self.limits}
+            counters = {w: self._count_key(w, now) for w in self.limits}
+            state = self.cache.get_many(list(keys.values()) + list(counters.values()))
+            level, wait = {}, 0.0
+            for w, limit in self.limits.items():
+                if tokens > limit and not force:
+                    return float("inf")
+                size = WINDOWS[w]
+                if w in CALENDAR_WINDOWS:
+                    if limit - (state.get(counters[w]) or 0) < tokens:
+                        wait = max(wait, (now // size + 1) * size - now)
+                    continue
+                rate = limit / size
+                b = state.get(keys[w]) or {"tokens": float(limit), "ts": now}
+                level[w] = min(limit, b["tokens"] + max(0.0, now - b["ts"]) * rate)
+                if level[w] < tokens:
+                    wait = max(wait, (tokens - level[w]) / rate)
+            if wait > 0 and not force:
+                return wait
+            for w in self.limits:
+                size = WINDOWS[w]
+                if w in level:
+                    self.cache.set(keys[w], {"tokens": level[w] - tokens, "ts": now}, timeout=2 * size + 60)
+                counter = self._count_key(w, now)
+                self.cache.add(counter, 0, timeout=size + 60)
+                try:
+                    self.cache.incr(counter, tokens)
+                except ValueError:  # evicted between add and incr
+                    self.cache.add(counter, tokens, timeout=size + 60)
+            return 0.0
+
+    def acquire(self, tokens: int = 1, block: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Take `tokens` from every window. Non-blocking returns False when any is short;
+        blocking sleeps until the tokens have refilled, for at most `timeout` (default
+        QUOTA_MAX_WAIT_SEC). Gives up at once when the wait would outlast the deadline.
+        """
+        timeout = QUOTA_MAX_WAIT_SEC if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._take(tokens)
+            if wait <= 0:
+                self._maybe_report()
+                return True
+            remaining = deadline - time.monotonic()
+            if not block or wait > remaining:
+                self._maybe_report()
+                return False
+            time.sleep(max(0.001, wait))
+
+    def try_acquire(self, tokens: int = 1) -> bool:
+        return self.acquire(tokens, block=False)
+
+    def record(self, tokens: int = 1) -> None:
+        """Count calls that were made without acquire() (e.g. outside this process's control)."""
+        self._take(tokens, force=True)
+        self._maybe_report()
+
+    def usage(self) -> Dict[str, dict]:
+        """
+        {window: {"used", "limit", "remaining"}}: calls counted in the current calendar
+        window, and the whole tokens the bucket holds now (a calendar window: limit - used).
+        """
+        if self._redis is not None:
+            sec, usec = self._redis.time()
+            now = sec + usec / 1e6
+            buckets = {}
+            for w in self.limits:
+                tokens, ts = self._redis.hmget(self.cache.make_and_validate_key(self._bucket_key(w)), "tokens", "ts")
+                if tokens is not None:
+                    buckets[self._bucket_key(w)] = {"tokens": float(tokens), "ts": float(ts)}
+        else:
+            now = time.time()
+            buckets = self.cache.get_many([self._bucket_key(w) for w in self.limits])
+        used = self.cache.get_many([self._count_key(w, now) for w in self.limits])
+        out = {}
+        for window, limit in self.limits.items():
+            count = int(used.get(self._count_key(window, now)) or 0)
+            b = buckets.get(self._bucket_key(window))
+            if window in CALENDAR_WINDOWS:
+                level = limit - count
+            else:
+                level = limit if b is None else min(limit, b["tokens"] + max(0.0, now - b["ts"]) * limit / WINDOWS[window])
+            out[window] = {"used": count, "limit": limit, "remaining": max(0, int(level))}
+        return out
+
+    def usage_pct(self) -> Optional[float]:
+        """Fullest window as a percentage of its limit (None when no limits are set)."""
+        rows = self.usage()
+        if not rows:
+            return None
+        return round(max(100.0 * r["used"] / r["limit"] for r in rows.values()), 1)
+
+    def report_quota(self) -> Optional[float]:
+        """Write usage_pct() into ProviderTelemetry.quota_usage_pct for this provider."""
+        from django.apps import apps
+
+        pct = self.usage_pct()
+        self._last_report = time.monotonic()
+        try:
+            ProviderTelemetry = apps.get_model("backend", "ProviderTelemetry")
+            ProviderTelemetry.objects.update_or_create(provider=self.provider, defaults={"quota_usage_pct": pct})
+        except Exception:
+            logger.exception("ratelimit: quota report failed for %s", self.provider)
+        return pct
+
+    def _maybe_report(self) -> None:
+        if time.monotonic() - self._last_report >= QUOTA_REPORT_EVERY_SEC:
+            self.report_quota()
+
+
+_LIMITERS: Dict[str, DistributedRateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_provider_limiter(provider: str, limits: Optional[Dict[str, int]] = None) -> Optional[DistributedRateLimiter]:
+    """
+    Process-wide limiter for `provider`: explicit `limits`, else provider_rate_limits().
+    Returns None when the provider has no configured quota (calls are not throttled).
+    """
+    with _LIMITERS_LOCK:
+        lim = _LIMITERS.get(provider)
+        if lim is None or (limits is not None and lim.limits != limits):
+            limits = limits if limits is not None else provider_rate_limits().get(provider)
+            if not limits:
+                return None
+            lim = _LIMITERS[provider] = DistributedRateLimiter(provider, limits)
+        return lim
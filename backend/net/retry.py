@@ -1,9 +1,180 @@
-import random, time
-from typing import Iterable, Optional, Tuple
+import os, random, threading, time
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
 import requests
+from requests.adapters import HTTPAdapter
 
 RETRY_STATUS: Tuple[int, ...] = (429, 500, 502, 503, 504)
 
+# Pool / budget knobs (override via env if needed)
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))                          # keep-alive conns per host
+RETRY_BUDGET_RATIO = float(os.getenv("HTTP_RETRY_BUDGET_RATIO", "0.1"))          # retries ≤ 10% of requests
+RETRY_BUDGET_MIN_PER_SEC = float(os.getenv("HTTP_RETRY_BUDGET_MIN_PER_SEC", "0.1"))  # floor for quiet pools
+RETRY_BUDGET_WINDOW_SEC = float(os.getenv("HTTP_RETRY_BUDGET_WINDOW_SEC", "10"))
+QUOTA_WAIT_SEC = float(os.getenv("HTTP_QUOTA_WAIT_SEC", "5"))                     # max block on a shared provider quota
+_LATENCY_SAMPLES = 512
+
+
+class RetryBudget:
+    """
+    Sliding-window retry budget shared by every caller of one pool (provider).
+    A retry is allowed while retries in the window stay below
+    ratio × requests + min_per_sec × window, so a degraded provider sees at most
+    ~10% extra load instead of max_attempts× amplification.
+    """
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, min_per_sec: float = RETRY_BUDGET_MIN_PER_SEC,
+                 window_sec: float = RETRY_BUDGET_WINDOW_SEC):
+        self.ratio = ratio
+        self.min_per_sec = min_per_sec
+        self.window_sec = window_sec
+        self._events: Deque[Tuple[float, bool]] = deque()  # (t, is_retry)
+        self._requests = 0
+        self._retries = 0
+        self._denied = 0
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        while self._events and now - self._events[0][0] > self.window_sec:
+            _, was_retry = self._events.popleft()
+            if was_retry:
+                self._retries -= 1
+            else:
+                self._requests -= 1
+
+    def record_request(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            self._events.append((now, False))
+            self._requests += 1
+
+    def try_retry(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            allowed = self.ratio * self._requests + self.min_per_sec * self.window_sec
+            if self._retries + 1 > allowed:
+                self._denied += 1
+                return False
+            self._events.append((now, True))
+            self._retries += 1
+            return True
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._prune(time.monotonic())
+            return {"requests": self._requests, "retries": self._retries, "denied_total": self._denied}
+
+
+class _HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latencies_ms: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+
+
+_SESSIONS: Dict[str, requests.Session] = {}
+_BUDGETS: Dict[str, RetryBudget] = {}
+_HOST_STATS: Dict[Tuple[str, str], _HostStats] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_session(pool: str) -> requests.Session:
+    """Keep-alive session for one provider/pool: HTTP_POOL_SIZE conns per host, gzip accepted."""
+    with _REGISTRY_LOCK:
+        s = _SESSIONS.get(pool)
+        if s is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers["Accept-Encoding"] = "gzip, deflate"
+            _SESSIONS[pool] = s
+        return s
+
+
+def get_retry_budget(pool: str) -> RetryBudget:
+    with _REGISTRY_LOCK:
+        b = _BUDGETS.get(pool)
+        if b is None:
+            b = _BUDGETS[pool] = RetryBudget()
+        return b
+
+
+def _pool_name(url: str, provider: Optional[str]) -> str:
+    return provider or urlparse(url).hostname or "default"
+
+
+def _timed_request(pool: str, method: str, url: str, **kwargs):
+    host = urlparse(url).netloc
+    with _REGISTRY_LOCK:
+        stats = _HOST_STATS.setdefault((pool, host), _HostStats())
+    t0 = time.monotonic()
+    try:
+        r = get_session(pool).request(method, url, **kwargs)
+    except Exception:
+        with _REGISTRY_LOCK:
+            stats.requests += 1
+            stats.errors += 1
+        raise
+    with _REGISTRY_LOCK:
+        stats.requests += 1
+        stats.latencies_ms.append((time.monotonic() - t0) * 1000.0)
+    return r
+
+
+def _pct(sorted_vals, q: float) -> Optional[float]:
+    if not sorted_vals:
+        return None
+    return round(sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))], 1)
+
+
+def pool_stats() -> Dict[str, dict]:
+    """
+    {pool: {"retry_budget": {...}, "hosts": {host: {requests, errors, connections_opened,
+    reuse_ratio, p50_ms, p95_ms}}}} — connection counts come from the urllib3 pools.
+    """
+    with _REGISTRY_LOCK:
+        sessions = dict(_SESSIONS)
+        budgets = dict(_BUDGETS)
+        host_rows = {
+            k: (v.requests, v.errors, sorted(v.latencies_ms)) for k, v in _HOST_STATS.items()
+        }
+
+    opened: Dict[Tuple[str, str], int] = {}
+    for pool, s in sessions.items():
+        for adapter in set(s.adapters.values()):
+            pm = getattr(adapter, "poolmanager", None)
+            if pm is None:
+                continue
+            for key in list(pm.pools.keys()):
+                cp = pm.pools.get(key)
+                if cp is None:
+                    continue
+                host = cp.host if cp.port in (None, 80, 443) else f"{cp.host}:{cp.port}"
+                opened[(pool, host)] = opened.get((pool, host), 0) + int(getattr(cp, "num_connections", 0))
+
+    out: Dict[str, dict] = {}
+    for pool in set(sessions) | set(budgets) | {p for p, _ in host_rows}:
+        out[pool] = {
+            "retry_budget": budgets[pool].snapshot() if pool in budgets else None,
+            "hosts": {},
+        }
+    for (pool, host), (n, errors, lats) in host_rows.items():
+        conns = opened.get((pool, host), 0)
+        out[pool]["hosts"][host] = {
+            "requests": n,
+            "errors": errors,
+            "connections_opened": conns,
+            "reuse_ratio": round(1.0 - conns / n, 3) if n and conns else None,
+            "p50_ms": _pct(lats, 0.50),
+            "p95_ms": _pct(lats, 0.95),
+        }
+    return out
+
+
 def http_get_with_backoff(
     url: str,
     *,
@@ -14,25 +185,47 @@ def http_get_with_backoff(
     factor: float = 2.0,
     jitter: float = 0.25,
     retry_status: Iterable[int] = RETRY_STATUS,
+    provider: Optional[str] = None,
 ):
     """
     Lightweight bounded exponential backoff with full jitter.
-    Retries on connect/read timeouts and on retryable HTTP status codes.
+    Retries on connect/read timeouts and on retryable HTTP status codes, over the
+    provider's pooled keep-alive session, and only while the provider's retry budget allows.
+    Each attempt first takes a token from the provider's shared quota (providers.yaml rate_limit).
     """
+    pool = _pool_name(url, provider)
+    budget = get_retry_budget(pool)
+    budget.record_request()
+    limiter = None
+    if provider:
+        from backend.net.ratelimit import get_provider_limiter
+        limiter = get_provider_limiter(provider)
     last_exc = None
     for attempt in range(1, max_attempts + 1):
+        # every attempt spends provider quota shared with the other workers
+        if limiter is not None and not limiter.acquire(timeout=QUOTA_WAIT_SEC):
+            raise RuntimeError(f"{provider}: rate-limit quota exhausted")
         try:
-            r = requests.get(url, headers=headers or {}, timeout=timeout)
+            r = _timed_request(pool, "GET", url, headers=headers or {}, timeout=timeout)
             if r.status_code not in retry_status:
                 return r
             last_exc = RuntimeError(f"HTTP {r.status_code}")
         except (requests.Timeout, requests.ConnectionError) as e:
             last_exc = e
-        # sleep if we will retry
+        # sleep if we will retry (and the budget still allows it)
         if attempt < max_attempts:
+            if not budget.try_retry():
+                break  # budget spent: fail fast rather than amplify load on a degraded provider
             sleep_s = base * (factor ** (attempt - 1)) + random.uniform(0, jitter)
             time.sleep(sleep_s)
     # give up
     if last_exc:
         raise last_exc
     raise RuntimeError("http_get_with_backoff: exhausted attempts")
+
+
+def http_post(url: str, *, pool: Optional[str] = None, timeout: float = 10.0, **kwargs):
+    """Single POST over the pooled session for `pool` (retries are left to the caller, e.g. Celery)."""
+    name = _pool_name(url, pool)
+    get_retry_budget(name).record_request()
+    return _timed_request(name, "POST", url, timeout=timeout, **kwargs)
@@ -0,0 +1,123 @@
+# backend/net/shared_cache.py
+"""
+The Django cache as state shared by every process (Celery workers, beat, the API).
+
+settings.CACHES["shared"] points at Redis (CACHE_URL, default REDIS_URL); the default
+cache is left to the rest of the project. Provider quota buckets, forming bars, the poll
+planner heap and quota budget counters live in the shared one and are only correct when
+every process sees the same store: LocMem / dummy backends are per process and only fit
+tests and single-process runs (tasks executed eagerly in this process). Without a
+"shared" alias (e.g. test settings) the default cache stands in.
+
+- cache: the shared cache, looked up on each use (like django.core.cache.cache).
+- redis_client(): the raw redis-py client behind a RedisCache (Lua scripts, locks).
+- lock(): a cross-process lock (Redis lock; a process-local lock on other backends).
+- shared_across_workers() / warn_if_local(): whether state kept in a cache is visible to
+  every worker.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_LOCAL_LOCKS: Dict[str, threading.Lock] = {}
+_LOCAL_LOCKS_GUARD = threading.Lock()
+_WARNED = set()
+
+
+SHARED_ALIAS = "shared"
+
+
+def alias() -> str:
+    """CACHES alias holding cross-process state: "shared" when configured, else "default"."""
+    return SHARED_ALIAS if SHARED_ALIAS in settings.CACHES else "default"
+
+
+class _SharedCache:
+    """Proxy to the shared cache backend, resolved on every access."""
+
+    def __getattr__(self, item):
+        return getattr(resolve(), item)
+
+
+cache = _SharedCache()
+
+
+def resolve(cache=None):
+    """The cache backend object behind `cache` (default: the shared cache, not a proxy)."""
+    from django.core.cache import caches
+    from django.utils.connection import ConnectionProxy
+
+    if cache is None or isinstance(cache, _SharedCache):
+        return caches[alias()]
+    if isinstance(cache, ConnectionProxy):
+        return caches[cache._alias]
+    return cache
+
+
+def redis_client(cache):
+    """redis-py client of a RedisCache backend, else None."""
+    from django.core.cache.backends.redis import RedisCache
+
+    cache = resolve(cache)
+    if isinstance(cache, RedisCache):
+        return cache._cache.get_client(write=True)
+    return None
+
+
+def shared_across_workers(cache) -> bool:
+    """True when every process sees this cache's state (or tasks run eagerly in this one)."""
+    from django.core.cache.backends.dummy import DummyCache
+    from django.core.cache.backends.locmem import LocMemCache
+
+    if not isinstance(resolve(cache), (LocMemCache, DummyCache)):
+        return True
+    return bool(getattr(settings, "CELERY_TASK_ALWAYS_EAGER", False))
+
+
+def warn_if_local(cache, what: str) -> bool:
+    """shared_across_workers(cache), logging once per `what` when it is not."""
+    shared = shared_across_workers(cache)
+    if not shared and what not in _WARNED:
+        _WARNED.add(what)
+        logger.warning("%s: the cache backend is per process; state is not shared between workers "
+                       "(configure CACHES[\"shared\"] with Redis, see settings.CACHE_URL)", what)
+    return shared
+
+
+@contextmanager
+def lock(cache, name: str, timeout: float = 10.0, blocking_timeout: float = 5.0):
+    """
+    Hold `name` across processes (redis-py Lock, auto-expiring after `timeout` seconds) or,
+    without Redis, within this process. Yields False when not acquired in `blocking_timeout`.
+    """
+    client = redis_client(cache)
+    if client is not None:
+        key = resolve(cache).make_and_validate_key(f"lock:{name}")
+        held = client.lock(key, timeout=timeout, blocking_timeout=blocking_timeout)
+        acquired = held.acquire()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    held.release()
+                except Exception:  # expired while held: someone else may own it now
+                    logger.warning("shared_cache: lock %s expired before release", name)
+        return
+
+    with _LOCAL_LOCKS_GUARD:
+        local = _LOCAL_LOCKS.setdefault(name, threading.Lock())
+    acquired = local.acquire(timeout=blocking_timeout) if blocking_timeout > 0 else local.acquire(False)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            local.release()
+
@@ -0,0 +1,222 @@
+# backend/net/websocket.py
+"""
+Minimal RFC 6455 WebSocket framing on the stdlib (no extra dependency).
+
+Enough for provider quote streams and the local stand-in server: text frames,
+fragmentation, ping/pong and close. No extensions (permessage-deflate) or subprotocols.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import os
+import select
+import socket
+import ssl
+import struct
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+OP_CONT, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_MAX_HEADER_BYTES = 16 * 1024
+
+
+class ConnectionClosed(Exception):
+    """Peer sent a close frame or the socket hit EOF."""
+
+
+def accept_key(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + _GUID).encode()).digest()).decode()
+
+
+def _xor(data: bytes, key: bytes) -> bytes:
+    if not data:
+        return data
+    mask = (key * (len(data) // 4 + 1))[: len(data)]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(mask, "big")).to_bytes(len(data), "big")
+
+
+def encode_frame(opcode: int, payload: bytes = b"", *, mask: bool) -> bytes:
+    """Single FIN frame; clients must mask, servers must not."""
+    head = bytearray([0x80 | opcode])
+    n = len(payload)
+    mbit = 0x80 if mask else 0
+    if n < 126:
+        head.append(mbit | n)
+    elif n < 65536:
+        head.append(mbit | 126)
+        head += struct.pack("!H", n)
+    else:
+        head.append(mbit | 127)
+        head += struct.pack("!Q", n)
+    if mask:
+        key = os.urandom(4)
+        head += key
+        payload = _xor(payload, key)
+    return bytes(head) + payload
+
+
+def _read_headers(sock: socket.socket) -> Tuple[str, Dict[str, str], bytes]:
+    """Read an HTTP/1.1 head; returns (start line, lower-cased headers, bytes read past the head)."""
+    buf = b""
+    while b"\r\n\r\n" not in buf:
+        chunk = sock.recv(4096)
+        if not chunk:
+            raise ConnectionClosed("EOF during handshake")
+        buf += chunk
+        if len(buf) > _MAX_HEADER_BYTES:
+            raise ConnectionError("handshake headers too large")
+    head, _, rest = buf.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        k, _, v = line.partition(":")
+        headers[k.strip().lower()] = v.strip()
+    return lines[0], headers, rest
+
+
+class WebSocket:
+    """One framed connection. send_* are thread-safe; recv() must be called from a single reader."""
+
+    def __init__(self, sock: socket.socket, *, client: bool, leftover: bytes = b""):
+        self.sock = sock
+        self._mask = client
+        self._buf = bytearray(leftover)
+        self._send_lock = threading.Lock()
+        self.closed = False
+
+    # ---- sending ----
+    def _send(self, opcode: int, payload: bytes) -> None:
+        frame = encode_frame(opcode, payload, mask=self._mask)
+        with self._send_lock:
+            self.sock.sendall(frame)
+
+    def send_text(self, text: str) -> None:
+        self._send(OP_TEXT, text.encode("utf-8"))
+
+    def ping(self, payload: bytes = b"") -> None:
+        self._send(OP_PING, payload)
+
+    def pong(self, payload: bytes = b"") -> None:
+        self._send(OP_PONG, payload)
+
+    def close(self, code: int = 1000) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._send(OP_CLOSE, struct.pack("!H", code))
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    # ---- receiving ----
+    def _recv_exact(self, n: int) -> bytes:
+        while len(self._buf) < n:
+            chunk = self.sock.recv(max(4096, n - len(self._buf)))
+            if not chunk:
+                raise ConnectionClosed("socket EOF")
+            self._buf += chunk
+        out = bytes(self._buf[:n])
+        del self._buf[:n]
+        return out
+
+    def _read_frame(self) -> Tuple[bool, int, bytes]:
+        b1, b2 = self._recv_exact(2)
+        n = b2 & 0x7F
+        if n == 126:
+            n = struct.unpack("!H", self._recv_exact(2))[0]
+        elif n == 127:
+            n = struct.unpack("!Q", self._recv_exact(8))[0]
+        key = self._recv_exact(4) if b2 & 0x80 else None
+        payload = self._recv_exact(n)
+        return bool(b1 & 0x80), b1 & 0x0F, _xor(payload, key) if key else payload
+
+    def _readable(self, timeout: Optional[float]) -> bool:
+        if self._buf or (isinstance(self.sock, ssl.SSLSocket) and self.sock.pending()):
+            return True
+        r, _, _ = select.select([self.sock], [], [], timeout)
+        return bool(r)
+
+    def recv(self, timeout: Optional[float] = None) -> Optional[Tuple[int, bytes]]:
+        """
+        Next message as (opcode, payload), or None if nothing arrived within `timeout`.
+        Pings are answered automatically and still returned so callers can count heartbeats.
+        A close frame is acknowledged and raises ConnectionClosed.
+        """
+        if not self._readable(timeout):
+            return None
+        parts = []
+        msg_op = None
+        while True:
+            fin, op, payload = self._read_frame()
+            if op == OP_CLOSE:
+                self.close()
+                code = struct.unpack("!H", payload[:2])[0] if len(payload) >= 2 else 1005
+                raise ConnectionClosed(f"close frame ({code})")
+            if op == OP_PING:
+                self.pong(payload)
+                return op, payload
+            if op == OP_PONG:
+                return op, payload
+            if op != OP_CONT:
+                msg_op = op
+            parts.append(payload)
+            if fin:
+                return msg_op if msg_op is not None else OP_TEXT, b"".join(parts)
+
+
+def connect(url: str, *, headers: Optional[Dict[str, str]] = None, timeout: float = 10.0) -> WebSocket:
+    """Open a client connection to ws:// or wss:// `url`."""
+    u = urlparse(url)
+    secure = u.scheme == "wss"
+    port = u.port or (443 if secure else 80)
+    sock = socket.create_connection((u.hostname, port), timeout=timeout)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    if secure:
+        sock = ssl.create_default_context().wrap_socket(sock, server_hostname=u.hostname)
+
+    key = base64.b64encode(os.urandom(16)).decode()
+    path = (u.path or "/") + (f"?{u.query}" if u.query else "")
+    host = u.hostname if u.port is None else f"{u.hostname}:{u.port}"
+    lines = [
+        f"GET {path} HTTP/1.1",
+        f"Host: {host}",
+        "Upgrade: websocket",
+        "Connection: Upgrade",
+        f"Sec-WebSocket-Key: {key}",
+        "Sec-WebSocket-Version: 13",
+    ] + [f"{k}: {v}" for k, v in (headers or {}).items()]
+    try:
+        sock.sendall(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        status, resp, rest = _read_headers(sock)
+    except Exception:
+        sock.close()
+        raise
+    if " 101 " not in f"{status} " or resp.get("sec-websocket-accept") != accept_key(key):
+        sock.close()
+        raise ConnectionError(f"WebSocket handshake rejected: {status}")
+    sock.settimeout(None)
+    return WebSocket(sock, client=True, leftover=rest)
+
+
+def server_handshake(sock: socket.socket) -> Tuple[WebSocket, str]:
+    """Answer a client's upgrade request on an accepted socket; returns (ws, request path)."""
+    start, headers, rest = _read_headers(sock)
+    key = headers.get("sec-websocket-key")
+    if not key or headers.get("upgrade", "").lower() != "websocket":
+        sock.sendall(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+        raise ConnectionError("not a WebSocket upgrade")
+    sock.sendall((
+        "HTTP/1.1 101 Switching Protocols\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        f"Sec-WebSocket-Accept: {accept_key(key)}\r\n\r\n"
+    ).encode("latin-1"))
+    parts = start.split(" ")
+    return WebSocket(sock, client=False, leftover=rest), parts[1] if len(parts) > 1 else "/"
@@ -11,6 +11,8 @@ from .analysis_tasks import *     # rules/ML/composite analysis tasks
 from .feature_tasks import *      # feature engineering tasks
 from .scheduler import *          # periodic tick / orchestration
 from .escalation import *         # escalation ladder & circuit breaker tasks
+from .gap_tasks import *          # MarketData gap scan + targeted repair
+from .poll_tasks import *         # adaptive poll planner dispatch
 
 # --- Helper modules (no @shared_task, safe to import) ---
 from .freshness import *          # freshness + KPI helpers (returns model instance)
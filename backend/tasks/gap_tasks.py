@@ -0,0 +1,30 @@
+# backend/tasks/gap_tasks.py
+"""
+Periodic MarketData gap scan (beat: scan_marketdata_gaps) and per-range repair tasks.
+The heavy lifting lives in backend.ingestion.gaps; these are thin Celery wrappers.
+"""
+from __future__ import annotations
+
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name="backend.tasks.gap_tasks.repair_marketdata_gap", rate_limit="2/s")
+def repair_marketdata_gap(gap_id: int) -> dict:
+    from backend.ingestion.gaps import repair_gap  # lazy: gaps imports backend.tasks.utils
+    return repair_gap(gap_id)
+
+
+@shared_task(name="backend.tasks.gap_tasks.scan_marketdata_gaps")
+def scan_marketdata_gaps() -> dict:
+    from backend.ingestion.gaps import scan_gaps
+    out = scan_gaps()
+    for gap_id in out["queued"]:
+        repair_marketdata_gap.delay(gap_id)
+    if out["gaps"]:
+        logger.info("gap scan: %d gap(s), %d missing bar(s), %d queued for repair",
+                    out["gaps"], out["missing_bars"], len(out["queued"]))
+    return {k: (len(v) if k == "queued" else v) for k, v in out.items()}
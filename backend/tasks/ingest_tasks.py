@@ -1,16 +1,56 @@
 import os
 import datetime
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
 from celery import shared_task
 from django.utils.dateparse import parse_datetime
 from django.utils import timezone
 from django.db import transaction
 
 from backend.models import MarketData, IngestionStatus
-from backend.ingestion.temp_alltick_shim import fetch_latest_bar
-from .utils import parse_watchlist, upsert_market_bar
+from providers.manager import ProviderManager
+from .utils import parse_watchlist, upsert_market_bars
 from .freshness import update_ingestion_status
 from backend.net.backoff_state import next_delay_seconds, until_from_now
 
+logger = logging.getLogger(__name__)
+
+# ---- Fan-out knobs (override via env) ---------------------------------------
+# Total fetch threads per ingest cycle; 1 = serial (pre-fan-out behaviour).
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "8"))
+# Per-provider in-flight cap, e.g. "AllTick=4,TwelveData=2". Unlisted providers use the default.
+INGEST_PROVIDER_CONCURRENCY = os.getenv("INGEST_PROVIDER_CONCURRENCY", "AllTick=4")
+DEFAULT_PROVIDER_CONCURRENCY = int(os.getenv("INGEST_DEFAULT_PROVIDER_CONCURRENCY", "4"))
+
+# One semaphore per provider, shared by every ingest cycle in this process.
+_PROVIDER_SEMAPHORES: Dict[str, threading.BoundedSemaphore] = {}
+_SEMAPHORES_LOCK = threading.Lock()
+
+
+def _provider_caps(raw: Optional[str] = None) -> Dict[str, int]:
+    """Parse "Name=N,Other=M" into {name: N}; malformed entries are ignored."""
+    caps: Dict[str, int] = {}
+    for item in (raw if raw is not None else INGEST_PROVIDER_CONCURRENCY).split(","):
+        name, _, val = item.partition("=")
+        try:
+            if name.strip():
+                caps[name.strip()] = max(1, int(val))
+        except ValueError:
+            continue
+    return caps
+
+
+def _provider_semaphore(provider: str) -> threading.BoundedSemaphore:
+    with _SEMAPHORES_LOCK:
+        sem = _PROVIDER_SEMAPHORES.get(provider)
+        if sem is None:
+            cap = _provider_caps().get(provider, DEFAULT_PROVIDER_CONCURRENCY)
+            sem = _PROVIDER_SEMAPHORES[provider] = threading.BoundedSemaphore(cap)
+        return sem
+
 
 def _last_close(symbol: str, timeframe: str):
     row = (
@@ -22,9 +62,128 @@ def _last_close(symbol: str, timeframe: str):
     return row["close"] if row else None
 
 
+def _load_statuses(pairs: List[str], timeframes: List[str]) -> Dict[Tuple[str, str], IngestionStatus]:
+    """Fetch every status row for the watchlist in one query; create missing ones."""
+    rows = {
+        (st.symbol, st.timeframe): st
+        for st in IngestionStatus.objects.filter(symbol__in=pairs, timeframe__in=timeframes)
+    }
+    for sym in pairs:
+        for tf in timeframes:
+            if (sym, tf) not in rows:
+                rows[(sym, tf)], _ = IngestionStatus.objects.get_or_create(symbol=sym, timeframe=tf)
+    return rows
+
+
+def _fetch_concurrently(manager, jobs: List[Tuple[object, List[str], str, Dict[str, float]]], max_workers: int):
+    """
+    Run manager.fetch_bars(provider, symbols, timeframe) for every job on a bounded thread pool,
+    holding the serving provider's semaphore around each call. A job is one batched request
+    (supports_batch providers) or a single symbol (per-symbol fallback); the manager may hedge
+    it to the next provider. Workers never touch the DB; results come back per pair as
+    (symbol, timeframe, bars, exc, serving provider name).
+    """
+    if not jobs:
+        return []
+
+    from backend.ingestion.quota_budget import get_quota_budget  # lazy: imports backend.tasks.utils
+    budget = get_quota_budget()
+
+    def _one(provider, symbols: List[str], tf: str, last_closes: Dict[str, float]):
+        # Every request spends quota, a hedge's losing one too: attribute each to these series
+        return manager.fetch_bars(provider, symbols, tf, last_closes=last_closes, slot=_provider_semaphore,
+                                  called=lambda name: budget.record_usage(name, symbols, tf))
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as pool:
+        futures = {pool.submit(_one, *job): job for job in jobs}
+        for fut in as_completed(futures):
+            provider, symbols, tf, _ = futures[fut]
+            try:
+                by_symbol, served = fut.result()
+                by_symbol = by_symbol or {}
+                results.extend((sym, tf, by_symbol.get(sym) or [], None, served) for sym in symbols)
+            except Exception as exc:
+                results.extend((sym, tf, [], exc, provider.name) for sym in symbols)
+    return results
+
+
+def _rollup(results, base: str, targets: List[str]):
+    """
+    Roll fetched closed base-timeframe bars up on top of the stored ones; rollup bars that
+    closed come back as extra (symbol, timeframe, bars, None, provider) results.
+    """
+    from backend.ingestion.aggregator import roll_up  # lazy: aggregator imports backend.tasks.utils
+    fresh, served_by = [], {}
+    for sym, tf, bars, exc, served in results:
+        if exc is not None or tf != base:
+            continue
+        for bar in bars:
+            bar["provider"] = served
+        fresh.extend(bars)
+        served_by[sym] = served
+    derived: Dict[Tuple[str, str], List[dict]] = {}
+    for rolled in roll_up(fresh, base, targets):
+        derived.setdefault((rolled["symbol"], rolled["timeframe"]), []).append(rolled)
+    return [(sym, tf, bars, None, served_by[sym]) for (sym, tf), bars in derived.items()]
+
+
+def _closed_only(results, now):
+    """
+    Keep only bars whose interval has ended; the still-forming bar of each pair goes to the
+    forming-bar cache (provisional, not persisted) until the provider moves past it.
+    """
+    from backend.ingestion.forming import get_forming_bars  # lazy: forming imports backend.tasks.utils
+    forming = get_forming_bars()
+    out = []
+    for sym, tf, bars, exc, served in results:
+        if exc is None:
+            for bar in bars:
+                bar["provider"] = served
+            bars = forming.split(sym, tf, bars, now)
+        out.append((sym, tf, bars, exc, served))
+    return out
+
+
+def _clear_backoff(st: IngestionStatus) -> None:
+    st.in_backoff = False
+    st.backoff_attempts = 0
+    st.backoff_until = None
+    st.last_ingest_ts = timezone.now()
+    st.save(update_fields=["in_backoff","backoff_attempts","backoff_until","last_ingest_ts"])
+
+
+def _mark_backoff(st: IngestionStatus) -> None:
+    # Failure: increment attempts, compute next delay, set backoff
+    st.backoff_attempts = (st.backoff_attempts or 0) + 1
+    delay = next_delay_seconds(max(0, st.backoff_attempts - 1))
+    st.in_backoff = True
+    st.backoff_until = until_from_now(delay)
+    st.save(update_fields=["in_backoff", "backoff_attempts", "backoff_until"])
+
+
 @shared_task(rate_limit="10/s")
-def ingest_once():
+def ingest_once(max_workers: Optional[int] = None, series: Optional[List[List[str]]] = None):
+    """
+    One ingestion cycle over the watchlist (or only `series`, [[symbol, timeframe], ...],
+    when the adaptive poll planner picked the due ones):
+      1) Load per-pair status rows and drop pairs still inside their backoff window.
+      2) Fan the provider fetches out over a bounded thread pool (per-provider cap),
+         one batched fetch_bars() request per timeframe when the provider supports it;
+         with fallbacks allowed, slow requests are hedged to the next provider.
+      3) With `closed_bars_only` in the watchlist, hold each still-forming bar in the cache
+         (backend.ingestion.forming) and pass on only bars whose interval has ended.
+      4) With `rollup_from` in the watchlist, fetch only that base timeframe and derive
+         the other watchlist timeframes from it and the stored base bars
+         (backend.ingestion.aggregator). Implies `closed_bars_only`: a forming base bar
+         would be frozen into the rollup.
+      5) Write bars + status/backoff updates back in a single transaction.
+    """
     cfg = parse_watchlist()
+    rollup_base = cfg.get("rollup_from")
+    fetch_tfs = [rollup_base] if rollup_base else list(cfg["timeframes"])
+    rollup_tfs = [tf for tf in cfg["timeframes"] if tf not in fetch_tfs]
+    closed_only = bool(cfg.get("closed_bars_only") or rollup_base)
 
     # Parse issued date for AllTick key (ISO8601) -> surface as key_age_days
     key_issued_at = os.getenv("ALLTICK_KEY_ISSUED_AT")
@@ -38,48 +197,93 @@ def ingest_once():
         except Exception:
             pass
 
-    for sym in cfg["pairs"]:
-        for tf in cfg["timeframes"]:
-            # Load/create per-pair status row
-            st, _ = IngestionStatus.objects.get_or_create(symbol=sym, timeframe=tf)
+    only = {tuple(x) for x in series} if series is not None else None
+    statuses = _load_statuses(cfg["pairs"], fetch_tfs + rollup_tfs)
+    manager = ProviderManager()
 
-            # Gate on active backoff
-            if st.in_backoff and st.backoff_until and timezone.now() < st.backoff_until:
+    # Gate on active backoff, then group what is left into provider requests
+    now = timezone.now()
+    jobs = []
+    providers: Dict[Tuple[str, str], str] = {}
+    skipped = 0
+    for tf in fetch_tfs:
+        due = []
+        for sym in cfg["pairs"]:
+            if only is not None and (sym, tf) not in only:
                 continue
+            st = statuses[(sym, tf)]
+            if st.in_backoff and st.backoff_until and now < st.backoff_until:
+                skipped += 1
+                continue
+            due.append(sym)
+        if not due:
+            continue
 
-            try:
-                bar = fetch_latest_bar(sym, tf, last_close=_last_close(sym, tf))
-                if not bar:
-                    continue
+        provider = manager.choose(due[0], tf, prefer_batch=True)
+        last_closes = {sym: _last_close(sym, tf) for sym in due}
+        for sym in due:
+            providers[(sym, tf)] = provider.name
+        if provider.supports_batch:
+            jobs.append((provider, due, tf, last_closes))
+        else:
+            jobs.extend((provider, [sym], tf, {sym: last_closes[sym]}) for sym in due)
 
+    results = _fetch_concurrently(manager, jobs, max_workers or INGEST_MAX_WORKERS)
+    if closed_only:
+        results = _closed_only(results, timezone.now())
+    if rollup_base and rollup_tfs:
+        results += _rollup(results, rollup_base, rollup_tfs)
+    primary = manager.primary()
+
+    written = failed = 0
+    with transaction.atomic():
+        # All fetched bars go through one bulk upsert; per-pair writes are only the
+        # fallback if that batch is rejected.
+        for sym, tf, bars, exc, served in results:
+            providers[(sym, tf)] = served
+            for bar in bars:
                 # Ensure provider attribution is present on MarketData
-                bar["provider"] = "AllTick"
+                bar["provider"] = served
+        try:
+            with transaction.atomic():
+                upsert_market_bars(bar for _, _, bars, exc, _ in results if exc is None for bar in bars)
+            bars_written = True
+        except Exception:
+            logger.exception("ingest_once: batched bar upsert failed; retrying per pair")
+            bars_written = False
 
-                # Upsert + status update atomically
+        for sym, tf, bars, exc, _ in results:
+            st = statuses[(sym, tf)]
+            provider_name = providers[(sym, tf)]
+            if exc is not None:
+                logger.warning("ingest_once: fetch failed for %s %s via %s: %s", sym, tf, provider_name, exc)
+                _mark_backoff(st)
+                failed += 1
+                continue
+            if not bars:
+                if st.in_backoff:
+                    _clear_backoff(st)  # fetch succeeded; only a forming bar came back
+                continue
+
+            try:
+                # Savepoint per pair so one bad write does not sink the whole batch
                 with transaction.atomic():
-                    upsert_market_bar(bar)
+                    if not bars_written:
+                        upsert_market_bars(bars)
                     status = update_ingestion_status(sym, tf)
                     if status:
-                        status.provider = "AllTick"
-                        status.fallback_active = False
+                        status.provider = provider_name
+                        status.fallback_active = provider_name != primary
                         if key_age_days is not None:
                             status.key_age_days = key_age_days
                         status.save()
 
                     # Clear backoff on success
-                    st.in_backoff = False
-                    st.backoff_attempts = 0
-                    st.backoff_until = None
-                    st.last_ingest_ts = timezone.now()
-                    st.save(update_fields=["in_backoff","backoff_attempts","backoff_until","last_ingest_ts"])
-
+                    _clear_backoff(st)
+                written += 1
             except Exception:
-                # Failure: increment attempts, compute next delay, set backoff
-                st.backoff_attempts = (st.backoff_attempts or 0) + 1
-                delay = next_delay_seconds(max(0, st.backoff_attempts - 1))
-                st.in_backoff = True
-                st.backoff_until = until_from_now(delay)
-                st.save(update_fields=["in_backoff","backoff_attempts","backoff_until"])
-                # continue to next (symbol,timeframe)
-                continue
+                logger.exception("ingest_once: write failed for %s %s", sym, tf)
+                _mark_backoff(st)
+                failed += 1
 
+    return {"written": written, "failed": failed, "skipped_backoff": skipped, "requests": len(jobs)}
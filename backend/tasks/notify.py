@@ -23,7 +23,7 @@ Environment / settings integration:
 
 from __future__ import annotations
 
-import json, requests, datetime, hmac, hashlib, logging
+import json, datetime, hmac, hashlib, logging
 from typing import Dict, Any
 from celery import shared_task
 from celery.utils.log import get_task_logger
@@ -34,6 +34,8 @@ from django.core.mail import send_mail
 from django.utils import timezone
 from django.core.cache import cache
 
+from backend.net.retry import http_post
+
 # 013.2.1 centralized taxonomy
 from backend.errors import ErrorCode, map_exception  # noqa: F401 (map_exception available to callers)
 
@@ -180,7 +182,7 @@ def _send_webhook(url: str, payload: dict) -> None:
         headers["X-Signature"] = f"sha256={sig}"
 
     try:
-        resp = requests.post(url, data=body, headers=headers, timeout=10)
+        resp = http_post(url, pool="notify:webhook", data=body, headers=headers, timeout=10)
         logger.info("notify.sent: webhook status=%s url=%s", getattr(resp, "status_code", "?"), url)
         resp.raise_for_status()
     except Exception as e:
@@ -200,7 +202,7 @@ def _send_slack(webhook_url: str, text: str, payload: Dict[str, Any]) -> None:
         ],
     }
     try:
-        resp = requests.post(webhook_url, json=msg, timeout=10)
+        resp = http_post(webhook_url, pool="notify:slack", json=msg, timeout=10)
         logger.info("notify.sent: slack status=%s url=%s", getattr(resp, "status_code", "?"), webhook_url)
         resp.raise_for_status()
     except Exception as e:
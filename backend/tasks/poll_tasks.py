@@ -0,0 +1,25 @@
+# backend/tasks/poll_tasks.py
+"""
+Adaptive polling (beat: poll_due_series). Runs more often than scheduler.tick so short
+planner intervals are honoured; backend.ingestion.poll_planner decides what is due.
+"""
+from __future__ import annotations
+
+import logging
+
+from celery import shared_task
+
+from .ingest_tasks import ingest_once
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name="backend.tasks.poll_tasks.poll_due_series")
+def poll_due_series() -> dict:
+    from backend.ingestion.poll_planner import plan_due  # lazy: planner imports backend.tasks.utils
+    due = plan_due()
+    if due is None:
+        return {"autoslowdown": False, "dispatched": 0}  # scheduler.tick polls everything
+    if due:
+        ingest_once.delay(series=[list(s) for s in due])
+    return {"autoslowdown": True, "dispatched": len(due)}
@@ -34,13 +34,19 @@ def _log_skip(symbol: str, timeframe: str, reason: str):
 @shared_task
 def tick():
     """Kick ingestion once, then iterate pairs/timeframes.
+    - With autoslowdown on, ingest only the series the adaptive poll planner says are due
     - Skip only the pair/timeframe with breaker_open
     - If freshness not GREEN, update status and log a skip
     - If GREEN, enqueue analysis
     """
     # 1) Kick ingestion (defensive)
     try:
-        ingest_once.delay()
+        from backend.ingestion.poll_planner import plan_due  # lazy: planner imports backend.tasks.utils
+        due = plan_due()
+        if due is None:
+            ingest_once.delay()
+        elif due:
+            ingest_once.delay(series=[list(s) for s in due])
     except Exception:
         logger.exception("Failed to dispatch ingest_once")
 
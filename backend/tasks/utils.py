@@ -1,33 +1,151 @@
 # backend/tasks/utils.py
+from typing import Dict, Iterable, Optional, Tuple
+
 import yaml
 from django.db import transaction
 from backend.models import MarketData
 
+# Columns a bar may carry into MarketData besides its (symbol, timeframe, timestamp) key
+MARKET_BAR_FIELDS = ("open", "high", "low", "close", "volume", "provider")
+UPSERT_BATCH_SIZE = 500  # rows per chunk (existence probe); INSERTs are split by statement_rows()
+SQLITE_MAX_VARIABLES = 999  # bound-variable cap of SQLite builds before 3.32, which Django assumes
+
+
+def statement_rows(model) -> int:
+    """Rows per INSERT into `model` whose bound variables (rows x columns) stay within SQLite's cap."""
+    columns = sum(1 for f in model._meta.concrete_fields if not f.primary_key)
+    return max(1, SQLITE_MAX_VARIABLES // columns)
+
+
+_TF_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def timeframe_seconds(timeframe: str) -> int:
+    """Bar length in seconds for timeframe strings like '1m', '15m', '1h', '4h', '1d'."""
+    tf = (timeframe or "").strip().lower()
+    try:
+        return int(tf[:-1]) * _TF_UNITS[tf[-1]]
+    except (KeyError, ValueError, IndexError):
+        raise ValueError(f"Unknown timeframe: {timeframe!r}")
+
 
 def parse_watchlist(path: str = "backend/orchestration/watchlist.yaml") -> dict:
     with open(path, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
 
-@transaction.atomic
+def upsert_market_bars(bars: Iterable[dict], batch_size: int = UPSERT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Set-based idempotent write on (symbol, timeframe, timestamp) to MarketData.
+
+    One existence probe per chunk (to report counts) plus one
+    INSERT ... ON CONFLICT(symbol, timeframe, timestamp) DO UPDATE per statement_rows()
+    bars of the chunk, instead of SELECT + INSERT/UPDATE per bar. Duplicate keys inside the batch
+    collapse to the last occurrence. Only fields that belong to MarketData are written.
+
+    Returns {"inserted": n, "updated": m}.
+    """
+    latest: Dict[Tuple[str, str, object], dict] = {}
+    for bar in bars:
+        latest[(bar["symbol"], bar["timeframe"], bar["timestamp"])] = bar
+    if not latest:
+        return {"inserted": 0, "updated": 0}
+
+    items = list(latest.items())
+    inserted = updated = 0
+    with transaction.atomic():
+        for i in range(0, len(items), batch_size):
+            chunk = items[i:i + batch_size]
+            existing = _existing_keys([key for key, _ in chunk])
+            rows = []
+            for key, bar in chunk:
+                fields = {k: bar[k] for k in MARKET_BAR_FIELDS if k in bar}
+                rows.append(MarketData(symbol=key[0], timeframe=key[1], timestamp=key[2], **fields))
+                if key in existing:
+                    updated += 1
+                else:
+                    inserted += 1
+            MarketData.objects.bulk_create(
+                rows,
+                batch_size=statement_rows(MarketData),
+                update_conflicts=True,
+                unique_fields=["symbol", "timeframe", "timestamp"],
+                # updated_at (auto_now) marks the rewrite for IndicatorState
+                update_fields=[f for f in MARKET_BAR_FIELDS if any(f in bar for _, bar in chunk)] + ["updated_at"],
+            )
+    return {"inserted": inserted, "updated": updated}
+
+
+def upsert_market_frame(df, symbol: str, timeframe: str, provider: Optional[str] = None,
+                        batch_size: int = UPSERT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Columnar variant of upsert_market_bars() for translator/CSV frames.
+
+    Takes a DataFrame with a `timestamp` column plus any of MARKET_BAR_FIELDS and builds
+    MarketData rows straight from the column arrays (no per-bar dicts). Duplicate
+    timestamps keep the last row; `provider` overrides a provider column.
+
+    Returns {"inserted": n, "updated": m}.
+    """
+    import pandas as pd
+
+    if df is None or len(df) == 0:
+        return {"inserted": 0, "updated": 0}
+    cols = [f for f in MARKET_BAR_FIELDS if f != "provider" and f in df.columns]
+    if not cols:
+        raise ValueError("upsert_market_frame: frame has no OHLCV columns")
+    # Rows with unparseable prices cannot satisfy MarketData's NOT NULL columns
+    df = df.dropna(subset=["timestamp"] + cols).drop_duplicates("timestamp", keep="last")
+    stamps = list(pd.to_datetime(df["timestamp"], utc=True).dt.to_pydatetime())
+    values = list(zip(*(df[c].to_numpy(dtype="float64").tolist() for c in cols)))
+    if provider is not None:
+        providers = [provider] * len(stamps)
+    elif "provider" in df.columns:
+        providers = df["provider"].tolist()
+    else:
+        providers = None
+    update_fields = cols + (["provider"] if providers is not None else []) + ["updated_at"]
+
+    inserted = updated = 0
+    with transaction.atomic():
+        for i in range(0, len(stamps), batch_size):
+            ts_chunk = stamps[i:i + batch_size]
+            n_existing = len(_existing_keys([(symbol, timeframe, ts) for ts in ts_chunk]))
+            rows = []
+            for j, ts in enumerate(ts_chunk, start=i):
+                row = MarketData(symbol=symbol, timeframe=timeframe, timestamp=ts)
+                for c, v in zip(cols, values[j]):
+                    setattr(row, c, v)
+                if providers is not None:
+                    row.provider = providers[j]
+                rows.append(row)
+            MarketData.objects.bulk_create(
+                rows,
+                batch_size=statement_rows(MarketData),
+                update_conflicts=True,
+                unique_fields=["symbol", "timeframe", "timestamp"],
+                update_fields=update_fields,
+            )
+            updated += n_existing
+            inserted += len(rows) - n_existing
+    return {"inserted": inserted, "updated": updated}
+
+
+def _existing_keys(keys):
+    """Return the subset of (symbol, timeframe, timestamp) keys already in MarketData."""
+    by_series: Dict[Tuple[str, str], list] = {}
+    for sym, tf, ts in keys:
+        by_series.setdefault((sym, tf), []).append(ts)
+    found = set()
+    for (sym, tf), stamps in by_series.items():
+        qs = MarketData.objects.filter(symbol=sym, timeframe=tf, timestamp__in=stamps)
+        found.update((sym, tf, ts) for ts in qs.values_list("timestamp", flat=True))
+    return found
+
+
 def upsert_market_bar(bar: dict):
     """
     Idempotent write on (symbol, timeframe, timestamp) to MarketData.
-    Only persist fields that actually belong to MarketData.
+    Single-bar convenience wrapper over upsert_market_bars().
     """
-    allowed = {
-        "open",
-        "high",
-        "low",
-        "close",
-        "volume",
-        "provider",
-    }
-    defaults = {k: v for k, v in bar.items() if k in allowed}
-
-    MarketData.objects.update_or_create(
-        symbol=bar["symbol"],
-        timeframe=bar["timeframe"],
-        timestamp=bar["timestamp"],
-        defaults=defaults,
-    )
+    return upsert_market_bars([bar])
@@ -47,14 +47,14 @@ class TestNotifyGuards(TestCase):
     def _payload(self, title="t"):
         return {"symbol": "X", "timeframe": "1m", "bar_ts": iso_now(), "title": title}
 
-    @patch("backend.tasks.notify.requests.post")
+    @patch("backend.tasks.notify.http_post")
     def test_webhook_dry_run_short_circuits(self, mpost: Mock):
         # With dry_run=True and a listening channel, network should still be skipped.
         send_notification.run("signal", "INFO", self._payload("dry-run"))
         mpost.assert_not_called()
 
     @override_settings(NOTIFICATION_DEFAULTS={**BASE, "dry_run": False})
-    @patch("backend.tasks.notify.requests.post")
+    @patch("backend.tasks.notify.http_post")
     def test_webhook_500_triggers_autoretry(self, mpost: Mock):
         # _send_webhook logs and re-raises so Celery autoretry can kick in.
         mpost.return_value = Mock(status_code=500)
@@ -66,7 +66,7 @@ class TestNotifyGuards(TestCase):
         self.assertTrue(mpost.called)
 
     @override_settings(NOTIFICATION_DEFAULTS={**BASE, "dry_run": False, "max_events_per_minute": 1})
-    @patch("backend.tasks.notify.requests.post")
+    @patch("backend.tasks.notify.http_post")
     def test_rate_limit_applies_per_minute(self, mpost: Mock):
         p1 = self._payload("rl-1")
         p2 = self._payload("rl-2")
@@ -75,7 +75,7 @@ class TestNotifyGuards(TestCase):
         self.assertLessEqual(mpost.call_count, 1)
 
     @override_settings(NOTIFICATION_DEFAULTS={**BASE, "dry_run": False})
-    @patch("backend.tasks.notify.requests.post")
+    @patch("backend.tasks.notify.http_post")
     def test_dedup_same_bar_skips_second_send(self, mpost: Mock):
         ts = iso_now()
         p1 = {"symbol": "X", "timeframe": "1m", "bar_ts": ts, "title": "d1"}
@@ -0,0 +1,172 @@
+"""
+Bulk feature recompute over the whole (symbol, timeframe) universe (used by
+`manage.py bulk_features` and run_bulk_feature_engineering).
+
+- Series are sharded across a ProcessPoolExecutor, largest first. Each worker opens its own
+  read-only SQLite connection, reads one series' bars through the (symbol, timeframe,
+  timestamp) index and runs process_data (limited to the active feature plan).
+- Workers return compact arrays (MarketData ids + one float64 array per column), never ORM
+  objects, and never write; the calling process is the single writer and bulk-upserts each
+  series as it arrives (SQLite has one writer anyway).
+- Throughput is reported in bars read per second.
+
+Worker-side code in this module must stay Django-free so it also runs under spawn.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from celery import shared_task
+
+from ml_pipeline.data_preprocessor import process_data
+
+logger = logging.getLogger(__name__)
+
+FEATURE_BULK_WORKERS = int(os.getenv("FEATURE_BULK_WORKERS", str(os.cpu_count() or 1)))
+
+_BAR_COLUMNS = ("id", "timestamp", "open", "high", "low", "close", "volume", "provider")
+
+
+def _read_only_uri(db_path: str) -> str:
+    if db_path.startswith("file:"):
+        return db_path
+    return f"{Path(db_path).resolve().as_uri()}?mode=ro"
+
+
+def compute_series(db_path: str, table: str, symbol: str, timeframe: str,
+                   columns: Optional[Sequence[str]] = None):
+    """
+    Worker: features of one series straight from SQLite.
+    Returns (symbol, timeframe, bars read, ids int64[n], {column: float64[n]}).
+    """
+    con = sqlite3.connect(_read_only_uri(db_path), uri=True)
+    try:
+        rows = con.execute(
+            f'SELECT {", ".join(_BAR_COLUMNS)} FROM "{table}" '
+            "WHERE symbol = ? AND timeframe = ? ORDER BY timestamp",
+            (symbol, timeframe),
+        ).fetchall()
+    finally:
+        con.close()
+    if not rows:
+        return symbol, timeframe, 0, np.empty(0, dtype=np.int64), {}
+
+    df = pd.DataFrame(rows, columns=list(_BAR_COLUMNS))
+    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True, format="ISO8601")
+    id_by_ts = df.groupby("timestamp")["id"].first()
+    out = process_data(df, columns=columns)
+    ids = id_by_ts.reindex(out["timestamp"]).to_numpy(dtype=np.int64)
+    feats = {c: out[c].to_numpy(dtype=np.float64) for c in out.columns if c not in _BAR_COLUMNS}
+    return symbol, timeframe, len(rows), ids, feats
+
+
+def _series_universe(symbols: Optional[Iterable[str]], timeframes: Optional[Iterable[str]]) -> List[Tuple[str, str, int]]:
+    from django.db.models import Count
+
+    from backend.models import MarketData  # lazy: keep worker imports Django-free
+
+    qs = MarketData.objects.all()
+    if symbols:
+        qs = qs.filter(symbol__in=list(symbols))
+    if timeframes:
+        qs = qs.filter(timeframe__in=list(timeframes))
+    counts = qs.values("symbol", "timeframe").annotate(n=Count("id")).order_by("-n", "symbol", "timeframe")
+    return [(r["symbol"], r["timeframe"], r["n"]) for r in counts]
+
+
+def _store(ids: np.ndarray, feats: Dict[str, np.ndarray]) -> int:
+    from celery_tasks.preprocess_features import _write_features  # lazy: imports Django models
+
+    cols = list(feats)
+    rows = {int(i): dict(zip(cols, values)) for i, values in zip(ids.tolist(), zip(*(feats[c].tolist() for c in cols)))}
+    counts = _write_features(rows)
+    return counts["inserted"] + counts["updated"]
+
+
+def run_bulk_features(symbols: Optional[Iterable[str]] = None, timeframes: Optional[Iterable[str]] = None,
+                      workers: Optional[int] = None, db_path: Optional[str] = None,
+                      columns: Optional[Sequence[str]] = None, progress=None) -> Dict[str, float]:
+    """
+    Recompute and store features for every (symbol, timeframe) series (optionally filtered).
+    `db_path` defaults to the default SQLite database; `columns` to the active feature plan.
+    workers <= 1 computes in-process. `progress(symbol, timeframe, bars, written)` is called
+    per series. Returns {"series", "bars", "written", "errors", "seconds", "bars_per_sec"}.
+    """
+    from django.db import connections
+
+    from backend.models import MarketData
+    from ml_pipeline.feature_planner import planned_feature_columns
+
+    if db_path is None:
+        db = connections["default"].settings_dict
+        if db["ENGINE"] != "django.db.backends.sqlite3":
+            raise ValueError("The bulk feature job reads SQLite directly; use run_feature_engineering per symbol")
+        db_path = str(db["NAME"])
+    if columns is None:
+        columns = planned_feature_columns()
+    columns = tuple(columns) if columns is not None else None
+    table = MarketData._meta.db_table
+    universe = _series_universe(symbols, timeframes)
+    workers = FEATURE_BULK_WORKERS if workers is None else workers
+
+    report = {"series": len(universe), "bars": 0, "written": 0, "errors": 0}
+    started = time.perf_counter()
+
+    def _collect(symbol, timeframe, result=None, exc=None):
+        if exc is not None:
+            report["errors"] += 1
+            logger.error(f"Bulk features failed for {symbol} {timeframe}: {exc}")
+            return
+        _, _, bars, ids, feats = result
+        written = _store(ids, feats) if len(ids) else 0
+        report["bars"] += bars
+        report["written"] += written
+        if progress is not None:
+            progress(symbol, timeframe, bars, written)
+
+    if workers <= 1 or len(universe) <= 1:
+        for symbol, timeframe, _ in universe:
+            try:
+                result = compute_series(db_path, table, symbol, timeframe, columns)
+            except Exception as exc:
+                _collect(symbol, timeframe, exc=exc)
+                continue
+            _collect(symbol, timeframe, result)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(universe))) as pool:
+            futures = {pool.submit(compute_series, db_path, table, s, tf, columns): (s, tf) for s, tf, _ in universe}
+            for fut in as_completed(futures):
+                symbol, timeframe = futures[fut]
+                try:
+                    result = fut.result()
+                except Exception as exc:
+                    _collect(symbol, timeframe, exc=exc)
+                    continue
+                _collect(symbol, timeframe, result)
+
+    report["seconds"] = time.perf_counter() - started
+    report["bars_per_sec"] = report["bars"] / report["seconds"] if report["seconds"] > 0 else 0.0
+    logger.info(f"Bulk features: {report['series']} series, {report['bars']} bars, {report['written']} rows written "
+                f"in {report['seconds']:.2f}s ({report['bars_per_sec']:.0f} bars/s, {report['errors']} errors)")
+    return report
+
+
+@shared_task
+def run_bulk_feature_engineering(symbols: Optional[List[str]] = None, timeframes: Optional[List[str]] = None,
+                                 workers: Optional[int] = None):
+    """Celery entry point for run_bulk_features (e.g. after an indicator change)."""
+    try:
+        r = run_bulk_features(symbols, timeframes, workers)
+    except Exception as e:
+        logger.exception(f"❌ Bulk feature engineering failed: {e}")
+        return f"❌ Bulk feature engineering failed: {str(e)}"
+    return (f"✅ Bulk features: {r['series']} series, {r['bars']} bars in {r['seconds']:.2f}s "
+            f"({r['bars_per_sec']:.0f} bars/s)")
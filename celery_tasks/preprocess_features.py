@@ -1,53 +1,284 @@
 from celery import shared_task
+from django.db import transaction
 from django.utils import timezone
-from ml_pipeline.data_preprocessor import process_data  # FIXED: use function instead of missing class
-from backend.models import MarketData, MarketDataFeatures  # FIXED: corrected import path
+from ml_pipeline.data_preprocessor import planned_columns, process_data, warmup_bars  # FIXED: use function instead of missing class
+from ml_pipeline.feature_planner import planned_feature_columns
+from ml_pipeline.incremental import IndicatorEngine
+from backend.models import IndicatorState, MarketData, MarketDataFeatures  # FIXED: corrected import path
+from backend.tasks.utils import UPSERT_BATCH_SIZE, statement_rows, timeframe_seconds
+from datetime import timedelta
+from django.utils.dateparse import parse_datetime
+from typing import Dict, Sequence
 import pandas as pd
 import logging
 
 logger = logging.getLogger(__name__)
 
-def save_features_to_db(processed_df: pd.DataFrame):
-    saved_count = 0
-    for _, row in processed_df.iterrows():
-        try:
-            market_data = MarketData.objects.get(timestamp=row['timestamp'], symbol=row['symbol'])
-            MarketDataFeatures.objects.update_or_create(
-                market_data=market_data,
-                defaults={
-                    'atr_14': row.get('atr_14'),
-                    'ema_8': row.get('ema_8'),
-                    'ema_20': row.get('ema_20'),
-                    'ema_50': row.get('ema_50'),
-                    'rsi_14': row.get('rsi_14'),
-                    'bb_bbm': row.get('bb_bbm'),
-                    'bb_bbh': row.get('bb_bbh'),
-                    'bb_bbl': row.get('bb_bbl'),
-                    'bb_bandwidth': row.get('bb_bandwidth'),
-                    'vwap': row.get('vwap'),
-                    'vwap_dist': row.get('vwap_dist'),
-                    'volume_zscore': row.get('volume_zscore'),
-                    'range_atr_ratio': row.get('range_atr_ratio'),
-                    'ema_bull_cross': bool(row.get('ema_bull_cross')),
-                    'ema_bear_cross': bool(row.get('ema_bear_cross')),
-                    'rsi_overbought': bool(row.get('rsi_overbought')),
-                    'rsi_oversold': bool(row.get('rsi_oversold')),
-                    'bb_squeeze': bool(row.get('bb_squeeze')),
-                }
-            )
-            saved_count += 1
-        except MarketData.DoesNotExist:
-            logger.warning(f"No MarketData entry found for timestamp={row['timestamp']} and symbol={row['symbol']}")
+_FLAG_COLUMNS = {"ema_bull_cross", "ema_bear_cross", "rsi_overbought", "rsi_oversold", "bb_squeeze"}
+_FEATURE_FIELDS = [f.name for f in MarketDataFeatures._meta.concrete_fields if f.name not in ("id", "market_data")]
+
+
+def _clean(name: str, value):
+    if name in _FLAG_COLUMNS:
+        return bool(value) if value is not None and not pd.isna(value) else False
+    if value is None or pd.isna(value):
+        return None
+    return float(value)
+
+
+def _write_features(rows: Dict[int, dict], batch_size: int = UPSERT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Set-based upsert of {market_data_id: features} into MarketDataFeatures.
+
+    Per chunk: one SELECT of the stored rows, then INSERT ... ON CONFLICT(market_data_id)
+    DO UPDATE (statement_rows() rows per statement) for the rows that are new or whose values
+    changed; unchanged rows are skipped.
+    Only MarketDataFeatures columns present in the rows are written.
+    Returns {"inserted": n, "updated": m, "unchanged": k}.
+    """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    if not rows:
+        return counts
+    fields = [f for f in _FEATURE_FIELDS if any(f in r for r in rows.values())]
+    items = list(rows.items())
+    with transaction.atomic():
+        for i in range(0, len(items), batch_size):
+            chunk = items[i:i + batch_size]
+            stored = {
+                r["market_data_id"]: r
+                for r in MarketDataFeatures.objects.filter(market_data_id__in=[k for k, _ in chunk])
+                .values("market_data_id", *fields)
+            }
+            objs = []
+            for md_id, feats in chunk:
+                values = {f: _clean(f, feats.get(f)) for f in fields}
+                old = stored.get(md_id)
+                if old is not None and all(old[f] == values[f] for f in fields):
+                    counts["unchanged"] += 1
+                    continue
+                counts["updated" if old is not None else "inserted"] += 1
+                objs.append(MarketDataFeatures(market_data_id=md_id, **values))
+            if objs:
+                MarketDataFeatures.objects.bulk_create(
+                    objs, batch_size=statement_rows(MarketDataFeatures), update_conflicts=True,
+                    unique_fields=["market_data"], update_fields=fields,
+                )
+    return counts
+
+
+def _market_data_ids(keys, batch_size: int = UPSERT_BATCH_SIZE) -> Dict[tuple, int]:
+    """
+    MarketData ids for (symbol, timeframe, timestamp) keys, one query per series chunk.
+    A None timeframe matches any timeframe; keys that match more than one bar are left out.
+    """
+    by_series: Dict[tuple, list] = {}
+    for sym, tf, ts in keys:
+        by_series.setdefault((sym, tf), []).append(ts)
+    out: Dict[tuple, int] = {}
+    ambiguous = set()
+    for (sym, tf), stamps in by_series.items():
+        for i in range(0, len(stamps), batch_size):
+            qs = MarketData.objects.filter(symbol=sym, timestamp__in=stamps[i:i + batch_size])
+            if tf is not None:
+                qs = qs.filter(timeframe=tf)
+            for md_id, ts in qs.values_list("id", "timestamp"):
+                key = (sym, tf, ts)
+                if key in out:
+                    ambiguous.add(key)
+                out[key] = md_id
+    for key in ambiguous:
+        logger.warning(f"Several MarketData bars for symbol={key[0]} timestamp={key[2]}; pass a timeframe")
+        del out[key]
+    return out
+
+
+def save_features_to_db(processed_df: pd.DataFrame, timeframe: str | None = None,
+                        batch_size: int = UPSERT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Persist a process_data frame: resolve the MarketData ids of every row keyed by
+    (symbol, timeframe, timestamp), then bulk upsert the changed feature rows.
+    The timeframe comes from a `timeframe` column, else the argument.
+    """
+    if processed_df is None or processed_df.empty:
+        return {"inserted": 0, "updated": 0, "unchanged": 0}
+    stamps = pd.to_datetime(processed_df["timestamp"], utc=True).dt.to_pydatetime()
+    symbols = processed_df["symbol"].tolist()
+    tfs = processed_df["timeframe"].tolist() if "timeframe" in processed_df.columns else [timeframe] * len(stamps)
+    keys = list(zip(symbols, tfs, stamps))
+    ids = _market_data_ids(set(keys), batch_size)
+
+    cols = [c for c in _FEATURE_FIELDS if c in processed_df.columns]
+    rows: Dict[int, dict] = {}
+    missing = 0
+    for key, values in zip(keys, zip(*(processed_df[c].tolist() for c in cols))):
+        md_id = ids.get(key)
+        if md_id is None:
+            missing += 1
             continue
-    logger.info(f"Saved/Updated features for {saved_count} records.")
+        rows[md_id] = dict(zip(cols, values))
+    if missing:
+        logger.warning(f"No MarketData entry found for {missing} feature rows")
+
+    counts = _write_features(rows, batch_size)
+    logger.info(f"Saved/Updated features for {counts['inserted'] + counts['updated']} records "
+                f"({counts['unchanged']} unchanged).")
+    return counts
+
+
+def _closed_bars(symbol: str, timeframe: str):
+    """The series' bars whose interval has ended; the still-forming bar keeps changing."""
+    return MarketData.objects.filter(
+        symbol=symbol, timeframe=timeframe,
+        timestamp__lte=timezone.now() - timedelta(seconds=timeframe_seconds(timeframe)),
+    )
+
+
+def update_features(symbol: str, timeframe: str, columns: Sequence[str] | None = None) -> int:
+    """
+    Fold the closed bars after the saved IndicatorState into the incremental engine and
+    store their features; O(new bars). The still-forming bar is left for a later run, as
+    its values keep changing. The state is rebuilt from the first bar when there is none,
+    it was written by another engine version, or the stored columns differ from `columns`
+    (a new feature plan, so history gets the newly needed columns). It is also rebuilt
+    when a bar behind it was inserted or rewritten (backfill / gap repair): MarketData.updated_at
+    is newer than the newest write the state has seen (an indexed lookup, not a count).
+    Only `columns` are stored when given, from the first bar where they are all warmed up
+    (the rows process_data(columns=...) keeps). Returns the number of feature rows written.
+    """
+    bars = _closed_bars(symbol, timeframe)
+    saved = IndicatorState.objects.filter(symbol=symbol, timeframe=timeframe).first()
+    engine = IndicatorEngine.restore(saved.state) if saved else None
+    wanted = sorted(columns) if columns is not None else None
+    seen = parse_datetime(saved.state.get("seen") or "") if saved else None
+    if engine is not None and saved.state.get("columns") != wanted:
+        logger.info(f"Feature plan changed for {symbol} {timeframe}; rebuilding")
+        engine = None
+    if engine is not None and (seen is None or bars.filter(timestamp__lte=saved.last_ts, updated_at__gt=seen).exists()):
+        logger.info(f"Bars changed behind the indicator state of {symbol} {timeframe}; rebuilding")
+        engine = None
+    if engine is None:
+        engine, seen = IndicatorEngine(), None
+    else:
+        bars = bars.filter(timestamp__gt=saved.last_ts)
+
+    rows: Dict[int, dict] = {}
+    last_ts = None
+    for md_id, ts, o, h, l, c, v, written in (
+            bars.order_by("timestamp")
+            .values_list("id", "timestamp", "open", "high", "low", "close", "volume", "updated_at")
+            .iterator()):
+        feats = engine.update(ts, o, h, l, c, v, columns=wanted)
+        last_ts = ts
+        seen = written if seen is None else max(seen, written)
+        if feats is not None:
+            rows[md_id] = feats
+    if last_ts is None:
+        return 0
+
+    with transaction.atomic():
+        _write_features(rows)
+        IndicatorState.objects.update_or_create(
+            symbol=symbol, timeframe=timeframe,
+            defaults={"last_ts": last_ts, "bars": engine.bars,
+                      "state": {**engine.snapshot(), "columns": wanted, "seen": seen.isoformat()}},
+        )
+    return len(rows)
+
+
+_BAR_VALUES = ("id", "timestamp", "open", "high", "low", "close", "volume", "provider")
+
+
+def _series_features(symbol: str, timeframe: str, columns: Sequence[str] | None = None) -> int:
+    """Recompute and store one series' features (or just `columns`) from its closed bars."""
+    rows = list(_closed_bars(symbol, timeframe).order_by("timestamp").values(*_BAR_VALUES))
+    if not rows:
+        return 0
+    out = process_data(pd.DataFrame(rows), columns=columns)
+    out["symbol"] = symbol
+    counts = save_features_to_db(out, timeframe=timeframe)
+    return counts["inserted"] + counts["updated"]
+
+
+def tail_features(symbol: str, timeframe: str, tolerance: float | None = None,
+                  columns: Sequence[str] | None = None) -> int:
+    """
+    Features for the bars after the newest featurised one, computed from only the warm-up
+    window before them (warmup_bars(), derived from each indicator's declared needs) plus
+    the new bars, both via the (symbol, timeframe, timestamp) index. Cumulative VWAP/OBV
+    continue from the sums stored with the features of the bar just before the window.
+    Falls back to a full recompute of the series when there is nothing to continue from
+    (e.g. rows featurised before cum_vp/cum_v were stored). `columns` limits the indicators
+    (and the warm-up) to a feature plan. Only closed bars are featurised: the forming bar
+    (and the carry stored with it) would be wrong once it closes, and never revisited.
+    Returns the number of rows written.
+    """
+    bars = _closed_bars(symbol, timeframe)
+    done = (bars.filter(features__isnull=False).order_by("-timestamp")
+            .values_list("timestamp", flat=True).first())
+    if done is None:
+        return _series_features(symbol, timeframe, columns)
+    new = list(bars.filter(timestamp__gt=done).order_by("timestamp").values(*_BAR_VALUES))
+    if not new:
+        return 0
+
+    warm = warmup_bars(tolerance, columns)
+    history = list(bars.filter(timestamp__lte=done).order_by("-timestamp").values(*_BAR_VALUES)[:warm + 1])
+    history.reverse()
+    carry = None
+    if len(history) > warm:  # older bars exist: continue the cumulative features from them
+        anchor = history.pop(0)
+        stored = (MarketDataFeatures.objects.filter(market_data_id=anchor["id"])
+                  .values("obv", "cum_vp", "cum_v").first()) or {}
+        needed = [c for c in ("obv", "cum_vp", "cum_v") if columns is None or c in planned_columns(columns)]
+        if any(stored.get(c) is None for c in needed):
+            logger.info(f"No stored cumulative features before the tail of {symbol} {timeframe}; "
+                        f"recomputing the series")
+            return _series_features(symbol, timeframe, columns)
+        carry = {"cum_vp": stored.get("cum_vp"), "cum_v": stored.get("cum_v"),
+                 "obv": stored.get("obv"), "prev_close": anchor["close"]}
+
+    out = process_data(pd.DataFrame(history + new), carry, columns=columns)
+    out = out[out["timestamp"] > done].copy()
+    out["symbol"] = symbol
+    counts = save_features_to_db(out, timeframe=timeframe)
+    return counts["inserted"] + counts["updated"]
+
 
 @shared_task
-def run_feature_engineering(symbol: str):
+def run_feature_engineering(symbol: str, timeframe: str | None = None, full: bool = False, tail: bool = False):
+    """
+    Incremental by default: each timeframe of `symbol` (or just `timeframe`) resumes from its
+    IndicatorState. tail=True recomputes only the warm-up window plus the new bars instead;
+    full=True recomputes the whole history with process_data. Only the columns of the
+    active model's feature plan are computed/stored (ml_pipeline.feature_planner).
+    """
     start_time = timezone.now()
     logger.info(f"Starting feature engineering for {symbol} at {start_time}")
+    columns = planned_feature_columns()
+
+    if not full:
+        try:
+            tfs = [timeframe] if timeframe else list(
+                MarketData.objects.filter(symbol=symbol).values_list("timeframe", flat=True).distinct().order_by("timeframe")
+            )
+            if not tfs:
+                logger.warning(f"No data for symbol {symbol}")
+                return f"⚠️ No data for symbol {symbol}"
+            if tail:
+                written = sum(tail_features(symbol, tf, columns=columns) for tf in tfs)
+            else:
+                written = sum(update_features(symbol, tf, columns) for tf in tfs)
+            duration = (timezone.now() - start_time).total_seconds()
+            logger.info(f"✅ {written} feature rows updated for {symbol} in {duration:.2f}s")
+            return f"✅ Features generated for {symbol} in {duration:.2f}s"
+        except Exception as e:
+            logger.exception(f"❌ Error during feature engineering for {symbol}: {e}")
+            return f"❌ Error during feature engineering for {symbol}: {str(e)}"
 
     try:
         raw_qs = MarketData.objects.filter(symbol=symbol).order_by('timestamp')
+        if timeframe:
+            raw_qs = raw_qs.filter(timeframe=timeframe)
         if not raw_qs.exists():
             logger.warning(f"No data for symbol {symbol}")
             return f"⚠️ No data for symbol {symbol}"
@@ -55,13 +286,13 @@ def run_feature_engineering(symbol: str):
         df = pd.DataFrame(list(raw_qs.values()))
 
         # Process features using function
-        processed_df = process_data(df)
+        processed_df = process_data(df, columns=columns)
 
         # Ensure symbol column exists in processed_df
         if 'symbol' not in processed_df.columns:
             processed_df['symbol'] = symbol
 
-        save_features_to_db(processed_df)
+        save_features_to_db(processed_df, timeframe=timeframe)
 
         duration = (timezone.now() - start_time).total_seconds()
         logger.info(f"✅ Features generated for {symbol} in {duration:.2f}s")
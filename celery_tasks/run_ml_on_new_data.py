@@ -11,6 +11,7 @@ from ml_pipeline.feature_builder import (
     to_vector_by_feature_names,
     log_unknowns_once,
 )
+from ml_pipeline.feature_planner import model_feature_names
 
 try:
     from lightgbm.basic import LightGBMError  # type: ignore
@@ -81,18 +82,7 @@ def run_ml_on_new_data(trade_analysis_id: int) -> None:
         return
 
     # Discover the model's feature names if possible
-    feature_names = None
-    booster = getattr(model, "booster_", None)
-    if booster is not None and hasattr(booster, "feature_name"):
-        try:
-            feature_names = list(booster.feature_name())
-        except Exception:
-            feature_names = None
-    elif hasattr(model, "feature_name"):
-        try:
-            feature_names = list(model.feature_name())
-        except Exception:
-            feature_names = None
+    feature_names = model_feature_names(model)
 
     # Log unknowns once so we can extend MODEL_TO_DB_NAME_MAP as needed
     log_unknowns_once(feature_names, getattr(ta, "market_data_feature", None))
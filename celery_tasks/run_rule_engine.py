@@ -3,12 +3,44 @@
 Celery Task – Run Rule Engine (Agent 010)
 """
 
+import numpy as np
 from celery import shared_task
 from django.utils import timezone
 from backend.models import MarketDataFeatures, TradeAnalysis
 from trading.rules.engine import run_rule_engine
 from trading.rules.execution import calculate_sl_tp
 
+# Rule-engine market keys -> MarketDataFeatures columns (also the rule engine's share of
+# the feature plan, see ml_pipeline.feature_planner)
+MARKET_FEATURES = {
+    "atr": "atr_14",
+    "ema8": "ema_8",
+    "ema20": "ema_20",
+    "ema50": "ema_50",
+    "rsi14": "rsi_14",
+    "volume_z": "volume_zscore",
+}
+
+
+def market_arrays(symbol: str, timeframe: str, start=None, end=None) -> dict:
+    """
+    Featurised history of one series as the columnar bars of trading.rules.batch
+    (OHLCV + MARKET_FEATURES, NaN for missing values) plus "timestamp" and "market_data_id".
+    """
+    qs = MarketDataFeatures.objects.filter(market_data__symbol=symbol, market_data__timeframe=timeframe)
+    if start is not None:
+        qs = qs.filter(market_data__timestamp__gte=start)
+    if end is not None:
+        qs = qs.filter(market_data__timestamp__lt=end)
+    ohlcv = ("open", "high", "low", "close", "volume")
+    rows = list(qs.order_by("market_data__timestamp").values_list(
+        "market_data_id", "market_data__timestamp", *(f"market_data__{k}" for k in ohlcv), *MARKET_FEATURES.values()))
+    cols = list(zip(*rows)) if rows else [()] * (2 + len(ohlcv) + len(MARKET_FEATURES))
+    bars = {"market_data_id": np.array(cols[0], dtype=np.int64), "timestamp": np.array(cols[1], dtype=object)}
+    for key, values in zip(ohlcv + tuple(MARKET_FEATURES), cols[2:]):
+        bars[key] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return bars
+
 @shared_task
 def run_rule_engine_task(symbol: str, timeframe: str = "1m"):
     """
@@ -33,12 +65,7 @@ def run_rule_engine_task(symbol: str, timeframe: str = "1m"):
             "low": mdf.market_data.low,
             "close": mdf.market_data.close,
             "volume": mdf.market_data.volume,
-            "atr": mdf.atr_14,
-            "ema8": mdf.ema_8,
-            "ema20": mdf.ema_20,
-            "ema50": mdf.ema_50,
-            "rsi14": mdf.rsi_14,
-            "volume_z": mdf.volume_zscore,
+            **{key: getattr(mdf, col) for key, col in MARKET_FEATURES.items()},
             # Placeholders for now – upstream agents should provide
             "key_levels": [],
             "candles": [],
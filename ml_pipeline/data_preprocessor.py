@@ -1,11 +1,198 @@
+import math
+import os
+
 import pandas as pd
 import numpy as np
-from ta.volatility import AverageTrueRange, BollingerBands
-from ta.trend import EMAIndicator
-from ta.momentum import RSIIndicator
+from ml_pipeline import indicators as ind
+
+# -----------------------------------------------------------------------------
+# Warm-up per output, for tail recompute (celery_tasks.preprocess_features.tail_features):
+# bars until the first value, plus for each recursive (EWM / Wilder) smoothing stage the
+# bars an arbitrary seed needs to decay below FEATURE_TAIL_TOLERANCE. Windowed outputs
+# are exact after their window; vwap/obv are cumulative and carried (see `carry`).
+# -----------------------------------------------------------------------------
+FEATURE_TAIL_TOLERANCE = float(os.getenv("FEATURE_TAIL_TOLERANCE", "1e-8"))
+
+
+def _span(window: int) -> float:
+    return 2.0 / (window + 1)
+
+
+def _wilder(window: int) -> float:
+    return 1.0 / window
+
+
+INDICATOR_WARMUP = {
+    # output: (bars to first value, smoothing alphas in series)
+    "atr_14": (14, (_wilder(14),)),
+    "ema_8": (8, (_span(8),)),
+    "ema_20": (20, (_span(20),)),
+    "ema_50": (50, (_span(50),)),
+    "rsi_14": (14, (_wilder(14),)),
+    "bb_bbm": (20, ()),
+    "volume_zscore": (20, ()),
+    "bb_squeeze": (20 + 20 - 1, ()),
+    "macd": (26, (_span(12), _span(26))),
+    "macd_signal": (26 + 9 - 1, (_span(26), _span(9))),
+    "adx": (2 * 14, (_wilder(14), _wilder(14))),
+    "cci": (20, ()),
+    "stoch_d": (14 + 3 - 1, ()),
+    "willr": (14, ()),
+}
+
+
+def warmup_bars(tolerance: float = None, columns=None) -> int:
+    """
+    History bars a tail recompute needs so every feature (or every planned one, see
+    planned_columns) is within `tolerance` of a full run.
+    """
+    tol = tolerance if tolerance is not None else FEATURE_TAIL_TOLERANCE
+    wanted = None if columns is None else set(planned_columns(columns))
+    need = 0
+    for name, (first, alphas) in INDICATOR_WARMUP.items():
+        if wanted is not None and name not in wanted:
+            continue
+        decay = sum(math.ceil(math.log(tol) / math.log(1.0 - a)) for a in alphas)
+        need = max(need, first + decay)
+    return need
+
+
+# -----------------------------------------------------------------------------
+# Feature steps: each computes a group of output columns from OHLCV and the outputs of
+# its prerequisite steps. process_data(columns=...) runs only the steps those columns
+# need (ml_pipeline.feature_planner derives them from the active model + rule engine).
+# -----------------------------------------------------------------------------
+def _atr(df, a, carry):
+    df['atr_14'] = ind.atr(a['high'], a['low'], a['close'], window=14)
+
+
+def _ema(window):
+    def step(df, a, carry):
+        df[f'ema_{window}'] = ind.ema(a['close'], window)
+    return step
+
+
+def _rsi(df, a, carry):
+    df['rsi_14'] = ind.rsi(a['close'], window=14)
+
+
+def _bollinger(df, a, carry):
+    df['bb_bbm'], df['bb_bbh'], df['bb_bbl'], df['bb_bandwidth'] = ind.bollinger(a['close'], window=20, dev=2)
+
+
+def _vwap(df, a, carry):
+    # The running sums are stored with the features, so a tail recompute can carry them on
+    df['cum_vp'] = carry.get('cum_vp', 0.0) + np.cumsum(a['close'] * a['volume'])
+    df['cum_v'] = carry.get('cum_v', 0.0) + np.cumsum(a['volume'])
+    df['vwap'] = df['cum_vp'] / df['cum_v']
+    df['vwap_dist'] = (df['close'] - df['vwap']) / df['vwap']
+
+
+def _volume_zscore(df, a, carry):
+    df['volume_zscore'] = ind.zscore(a['volume'], window=20)
+
+
+def _macd(df, a, carry):
+    df['macd'], df['macd_signal'] = ind.macd(a['close'], 12, 26, 9)
+
+
+def _adx(df, a, carry):
+    df['adx'] = ind.adx(a['high'], a['low'], a['close'], window=14)
+
+
+def _cci(df, a, carry):
+    df['cci'] = ind.cci(a['high'], a['low'], a['close'], window=20)
+
+
+def _obv(df, a, carry):
+    df['obv'] = ind.obv(a['close'], a['volume'], base=carry.get('obv', 0.0), prev_close=carry.get('prev_close'))
+
+
+def _stochastic(df, a, carry):
+    df['stoch_k'], df['stoch_d'] = ind.stochastic(a['high'], a['low'], a['close'], window=14, smooth=3)
+
 
-def process_data(df: pd.DataFrame) -> pd.DataFrame:
-    """Full preprocessing pipeline for EURUSD data."""
+def _willr(df, a, carry):
+    df['willr'] = ind.williams_r(a['high'], a['low'], a['close'], window=14)
+
+
+def _range_atr_ratio(df, a, carry):
+    df['range_atr_ratio'] = ((df['high'] - df['low']) / df['atr_14']).replace([np.inf, -np.inf], np.nan)
+
+
+def _ema_cross(df, a, carry):
+    df['ema_bull_cross'] = (df['ema_8'] > df['ema_20']).astype(int)
+    df['ema_bear_cross'] = (df['ema_8'] < df['ema_20']).astype(int)
+
+
+def _rsi_extremes(df, a, carry):
+    df['rsi_overbought'] = (df['rsi_14'] > 70).astype(int)
+    df['rsi_oversold'] = (df['rsi_14'] < 30).astype(int)
+
+
+def _bb_squeeze(df, a, carry):
+    df['bb_squeeze'] = ind.squeeze(ind.as_f64(df['bb_bandwidth']), window=20, q=0.2)
+
+
+FEATURE_STEPS = {
+    # step: (output columns, prerequisite steps, compute) -- listed in dependency order
+    "atr": (("atr_14",), (), _atr),
+    "ema_8": (("ema_8",), (), _ema(8)),
+    "ema_20": (("ema_20",), (), _ema(20)),
+    "ema_50": (("ema_50",), (), _ema(50)),
+    "rsi": (("rsi_14",), (), _rsi),
+    "bollinger": (("bb_bbm", "bb_bbh", "bb_bbl", "bb_bandwidth"), (), _bollinger),
+    "vwap": (("vwap", "vwap_dist", "cum_vp", "cum_v"), (), _vwap),
+    "volume_zscore": (("volume_zscore",), (), _volume_zscore),
+    # Momentum / trend model inputs (ta defaults: MACD 12/26/9, ADX 14, CCI 20, Stoch 14/3, %R 14)
+    "macd": (("macd", "macd_signal"), (), _macd),
+    "adx": (("adx",), (), _adx),
+    "cci": (("cci",), (), _cci),
+    "obv": (("obv",), (), _obv),
+    "stochastic": (("stoch_k", "stoch_d"), (), _stochastic),
+    "willr": (("willr",), (), _willr),
+    "range_atr_ratio": (("range_atr_ratio",), ("atr",), _range_atr_ratio),
+    "ema_cross": (("ema_bull_cross", "ema_bear_cross"), ("ema_8", "ema_20"), _ema_cross),
+    "rsi_extremes": (("rsi_overbought", "rsi_oversold"), ("rsi",), _rsi_extremes),
+    "bb_squeeze": (("bb_squeeze",), ("bollinger",), _bb_squeeze),
+}
+
+_STEP_OF = {col: step for step, (outputs, _, _) in FEATURE_STEPS.items() for col in outputs}
+FEATURE_OUTPUTS = tuple(_STEP_OF)
+
+
+def plan_steps(columns=None) -> list:
+    """
+    Steps needed for `columns` (all steps when None), prerequisites included, in
+    FEATURE_STEPS order. Names that no step produces (e.g. raw OHLCV) are ignored.
+    """
+    if columns is None:
+        return list(FEATURE_STEPS)
+    needed = set()
+    stack = [_STEP_OF[c] for c in columns if c in _STEP_OF]
+    while stack:
+        step = stack.pop()
+        if step not in needed:
+            needed.add(step)
+            stack.extend(FEATURE_STEPS[step][1])
+    return [s for s in FEATURE_STEPS if s in needed]
+
+
+def planned_columns(columns=None) -> tuple:
+    """Every output column the steps for `columns` produce (requested + prerequisites)."""
+    return tuple(c for s in plan_steps(columns) for c in FEATURE_STEPS[s][0])
+
+
+def process_data(df: pd.DataFrame, carry: dict = None, columns=None) -> pd.DataFrame:
+    """
+    Full preprocessing pipeline for EURUSD data.
+
+    `carry` continues the cumulative features from the bar before the frame (tail recompute):
+    {"cum_vp": Σ close·volume, "cum_v": Σ volume, "obv": OBV, "prev_close": close}, as
+    stored with that bar's features (the vwap step outputs cum_vp/cum_v for this).
+    `columns` limits the indicators to those columns and their prerequisites (plan_steps);
+    NaN warm-up rows are then dropped on the computed columns only.
+    """
     # Ensure correct dtypes
     df['timestamp'] = pd.to_datetime(df['timestamp'])
     numeric_cols = ['open', 'high', 'low', 'close', 'volume']
@@ -24,47 +211,11 @@ def process_data(df: pd.DataFrame) -> pd.DataFrame:
         'provider': 'first'
     }).reset_index()
 
-    # ATR(14)
-    atr_indicator = AverageTrueRange(high=df['high'], low=df['low'], close=df['close'], window=14)
-    df['atr_14'] = atr_indicator.average_true_range()
-
-    # EMA
-    df['ema_8'] = EMAIndicator(df['close'], window=8).ema_indicator()
-    df['ema_20'] = EMAIndicator(df['close'], window=20).ema_indicator()
-    df['ema_50'] = EMAIndicator(df['close'], window=50).ema_indicator()
-
-    # RSI
-    df['rsi_14'] = RSIIndicator(df['close'], window=14).rsi()
-
-    # Bollinger Bands
-    bb = BollingerBands(df['close'], window=20, window_dev=2)
-    df['bb_bbm'] = bb.bollinger_mavg()
-    df['bb_bbh'] = bb.bollinger_hband()
-    df['bb_bbl'] = bb.bollinger_lband()
-    df['bb_bandwidth'] = (df['bb_bbh'] - df['bb_bbl']) / df['bb_bbm']
-
-    # VWAP distance
-    cumulative_vp = (df['close'] * df['volume']).cumsum()
-    cumulative_vol = df['volume'].cumsum()
-    df['vwap'] = cumulative_vp / cumulative_vol
-    df['vwap_dist'] = (df['close'] - df['vwap']) / df['vwap']
-
-    # Volume Z-score
-    df['volume_zscore'] = (df['volume'] - df['volume'].rolling(20).mean()) / df['volume'].rolling(20).std()
-
-    # Range/ATR ratio
-    df['range_atr_ratio'] = ((df['high'] - df['low']) / df['atr_14']).replace([np.inf, -np.inf], np.nan)
-
-    # EMA crossover flags
-    df['ema_bull_cross'] = (df['ema_8'] > df['ema_20']).astype(int)
-    df['ema_bear_cross'] = (df['ema_8'] < df['ema_20']).astype(int)
-
-    # RSI extremes
-    df['rsi_overbought'] = (df['rsi_14'] > 70).astype(int)
-    df['rsi_oversold'] = (df['rsi_14'] < 30).astype(int)
-
-    # Bollinger squeeze
-    df['bb_squeeze'] = (df['bb_bandwidth'] < df['bb_bandwidth'].rolling(20).quantile(0.2)).astype(int)
+    # Indicator kernels work on contiguous float64 columns (parity with `ta`: tests/test_indicator_kernels.py)
+    carry = carry or {}
+    arrays = {k: ind.as_f64(df[k]) for k in ('high', 'low', 'close', 'volume')}
+    for step in plan_steps(columns):
+        FEATURE_STEPS[step][2](df, arrays, carry)
 
     # Drop NaNs from indicator calculations
     df.dropna(inplace=True)
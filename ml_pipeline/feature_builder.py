@@ -38,6 +38,9 @@ MODEL_TO_DB_NAME_MAP: Dict[str, str] = {
     "ema_50": "ema_50",
     "rsi_14": "rsi_14",
     "bb_bandwidth": "bb_bandwidth",
+    "bb_bbm": "bb_bbm",
+    "bb_bbh": "bb_bbh",
+    "bb_bbl": "bb_bbl",
     "vwap": "vwap",
     "vwap_dist": "vwap_dist",
     "volume_zscore": "volume_zscore",
@@ -51,6 +54,13 @@ MODEL_TO_DB_NAME_MAP: Dict[str, str] = {
     "obv": "obv",
     "willr": "willr",
 
+    # Confluence flags (stored as booleans → 0.0 / 1.0)
+    "ema_bull_cross": "ema_bull_cross",
+    "ema_bear_cross": "ema_bear_cross",
+    "rsi_overbought": "rsi_overbought",
+    "rsi_oversold": "rsi_oversold",
+    "bb_squeeze": "bb_squeeze",
+
     # Raw OHLCV (from MarketData via md. prefix)
     "open": "md.open",
     "high": "md.high",
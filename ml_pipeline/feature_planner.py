@@ -0,0 +1,95 @@
+"""
+Model-driven feature plan.
+
+The feature columns worth computing and storing are the ones the active model reads
+(its booster's feature names, mapped through MODEL_TO_DB_NAME_MAP) plus the ones the
+rule engine reads (celery_tasks.run_rule_engine.MARKET_FEATURES); process_data adds
+their prerequisites (data_preprocessor.plan_steps). Plans are cached per model hash, so
+shipping a slimmer model shrinks feature CPU and storage without a config change.
+
+FEATURE_PLAN=all (or no loadable model) computes every column, as before.
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from ml_pipeline import ml_model
+from ml_pipeline.data_preprocessor import FEATURE_OUTPUTS, plan_steps, planned_columns
+from ml_pipeline.feature_builder import MODEL_TO_DB_NAME_MAP, _normalize_name
+
+logger = logging.getLogger(__name__)
+
+FEATURE_PLAN = os.getenv("FEATURE_PLAN", "model").strip().lower()
+
+
+@dataclass(frozen=True)
+class FeaturePlan:
+    model_hash: str
+    requested: Tuple[str, ...]  # model + rule engine columns
+    steps: Tuple[str, ...]      # data_preprocessor.FEATURE_STEPS to run
+    columns: Tuple[str, ...]    # every column those steps produce (what gets stored)
+
+
+_PLANS: Dict[str, FeaturePlan] = {}
+
+
+def model_feature_names(model) -> Optional[List[str]]:
+    """Feature names declared by a LightGBM booster / sklearn wrapper, or None."""
+    booster = getattr(model, "booster_", None)
+    source = booster if booster is not None and hasattr(booster, "feature_name") else model
+    if not hasattr(source, "feature_name"):
+        return None
+    try:
+        return list(source.feature_name())
+    except Exception:
+        return None
+
+
+def rule_feature_columns() -> Tuple[str, ...]:
+    from celery_tasks.run_rule_engine import MARKET_FEATURES
+
+    return tuple(MARKET_FEATURES.values())
+
+
+def _to_columns(names) -> List[str]:
+    out = []
+    for name in names:
+        db_name = MODEL_TO_DB_NAME_MAP.get(name) or MODEL_TO_DB_NAME_MAP.get(_normalize_name(name), _normalize_name(name))
+        if db_name in FEATURE_OUTPUTS:
+            out.append(db_name)
+    return out
+
+
+def build_plan(model_hash: str, feature_names) -> FeaturePlan:
+    requested = tuple(dict.fromkeys(_to_columns(feature_names) + list(rule_feature_columns())))
+    return FeaturePlan(
+        model_hash=model_hash,
+        requested=requested,
+        steps=tuple(plan_steps(requested)),
+        columns=planned_columns(requested),
+    )
+
+
+def active_plan() -> Optional[FeaturePlan]:
+    """The plan for the loaded model (cached by its hash); None means compute everything."""
+    if FEATURE_PLAN == "all":
+        return None
+    model = ml_model.get()
+    names = model_feature_names(model) if model is not None else None
+    if not names:
+        return None
+    key = ml_model.get_hash_prefix() or ""
+    plan = _PLANS.get(key)
+    if plan is None:
+        plan = _PLANS[key] = build_plan(key, names)
+        logger.info(f"Feature plan for model {key}: {len(plan.columns)}/{len(FEATURE_OUTPUTS)} columns, "
+                    f"steps={list(plan.steps)}")
+    return plan
+
+
+def planned_feature_columns() -> Optional[Tuple[str, ...]]:
+    """Columns to compute and store for the active model, or None for all of them."""
+    plan = active_plan()
+    return plan.columns if plan is not None else None
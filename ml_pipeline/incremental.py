@@ -0,0 +1,378 @@
+# ml_pipeline/incremental.py
+"""
+Incremental indicator engine: the features of data_preprocessor.process_data, one bar at a time.
+
+Each indicator keeps its running state (EMA/MACD values, Wilder RSI/ATR/ADX averages, ring
+buffers with Welford mean/variance for the rolling windows, cumulative VWAP/OBV sums), so a new bar costs
+O(1) instead of recomputing the whole history. snapshot() returns a JSON-safe dict and
+restore() rebuilds the engine from it, so a restarted worker resumes where it stopped
+(persisted per (symbol, timeframe) in IndicatorState by celery_tasks.preprocess_features).
+
+Values follow the `ta` / pandas semantics process_data uses (ATR seeded with the mean of the
+first 14 true ranges, EMA/RSI via ewm(adjust=False), population std for Bollinger, sample
+std for the volume z-score, linear-interpolated rolling quantile for the squeeze) and match
+it to floating-point tolerance. update() returns None for bars process_data would drop
+(indicator warm-up, undefined ratios).
+"""
+from __future__ import annotations
+
+import math
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Sequence
+
+STATE_VERSION = 2
+
+ATR_WINDOW = 14
+EMA_WINDOWS = (8, 20, 50)
+RSI_WINDOW = 14
+BB_WINDOW = 20
+BB_DEV = 2
+ZSCORE_WINDOW = 20
+SQUEEZE_WINDOW = 20
+SQUEEZE_QUANTILE = 0.2
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+ADX_WINDOW = 14
+CCI_WINDOW = 20
+CCI_CONSTANT = 0.015
+STOCH_WINDOW = 14
+STOCH_SMOOTH = 3  # Williams %R shares the stochastic lookback (14)
+
+FEATURE_COLUMNS: List[str] = [
+    "atr_14", "ema_8", "ema_20", "ema_50", "rsi_14",
+    "bb_bbm", "bb_bbh", "bb_bbl", "bb_bandwidth",
+    "vwap", "vwap_dist", "cum_vp", "cum_v", "volume_zscore", "range_atr_ratio",
+    "macd", "macd_signal", "adx", "cci", "obv", "stoch_k", "stoch_d", "willr",
+    "ema_bull_cross", "ema_bear_cross", "rsi_overbought", "rsi_oversold", "bb_squeeze",
+]
+
+
+class Rolling:
+    """Fixed-size window (ring buffer) with Welford mean/variance under add + evict."""
+
+    def __init__(self, n: int, keep_sorted: bool = False):
+        self.n = n
+        self.buf: List[float] = [0.0] * n
+        self.pos = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.same = 0  # run length of identical trailing values (exact zero variance)
+        self.keep_sorted = keep_sorted
+        self._sorted: List[float] = []
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.n
+
+    def push(self, x: float) -> None:
+        last = self.buf[self.pos - 1] if self.count else None
+        self.same = self.same + 1 if last is not None and x == last else 1
+        if self.full:
+            old = self.buf[self.pos]
+            delta = x - old
+            mean = self.mean + delta / self.n
+            self.m2 += delta * (x - mean + old - self.mean)
+            self.mean = mean
+            if self.keep_sorted:
+                del self._sorted[bisect_left(self._sorted, old)]
+        else:
+            self.count += 1
+            delta = x - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (x - self.mean)
+        self.buf[self.pos] = x
+        if self.keep_sorted:
+            insort(self._sorted, x)
+        self.pos = (self.pos + 1) % self.n
+        if self.pos == 0:
+            self._resync()  # exact recompute once per window: amortised O(1), no drift
+
+    def _resync(self) -> None:
+        vals = self.buf[: self.count]
+        self.mean = math.fsum(vals) / self.count
+        self.m2 = math.fsum((v - self.mean) ** 2 for v in vals)
+
+    def var(self, ddof: int = 0) -> Optional[float]:
+        if not self.full:
+            return None
+        if self.same >= self.n:
+            return 0.0
+        return max(self.m2, 0.0) / (self.n - ddof)
+
+    def std(self, ddof: int = 0) -> Optional[float]:
+        v = self.var(ddof)
+        return None if v is None else math.sqrt(v)
+
+    def lowest(self) -> Optional[float]:
+        return min(self.buf) if self.full else None
+
+    def highest(self) -> Optional[float]:
+        return max(self.buf) if self.full else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.full:
+            return None
+        pos = q * (self.n - 1)
+        lo = int(math.floor(pos))
+        hi = min(lo + 1, self.n - 1)
+        s = self._sorted
+        return s[lo] + (s[hi] - s[lo]) * (pos - lo)
+
+    def snapshot(self) -> dict:
+        return {"n": self.n, "buf": list(self.buf), "pos": self.pos, "count": self.count,
+                "mean": self.mean, "m2": self.m2, "same": self.same, "keep_sorted": self.keep_sorted}
+
+    @classmethod
+    def restore(cls, d: dict) -> "Rolling":
+        r = cls(d["n"], d["keep_sorted"])
+        r.buf, r.pos, r.count = list(d["buf"]), d["pos"], d["count"]
+        r.mean, r.m2, r.same = d["mean"], d["m2"], d["same"]
+        if r.keep_sorted:
+            r._sorted = sorted(r.buf[: r.count])
+        return r
+
+
+class Ewm:
+    """pandas ewm(alpha, adjust=False, min_periods) as a running value."""
+
+    def __init__(self, alpha: float, min_periods: int):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value: Optional[float] = None
+        self.count = 0
+
+    def push(self, x: float) -> Optional[float]:
+        self.value = x if self.value is None else (1.0 - self.alpha) * self.value + self.alpha * x
+        self.count += 1
+        return self.value if self.count >= self.min_periods else None
+
+    def snapshot(self) -> dict:
+        return {"alpha": self.alpha, "min_periods": self.min_periods, "value": self.value, "count": self.count}
+
+    @classmethod
+    def restore(cls, d: dict) -> "Ewm":
+        e = cls(d["alpha"], d["min_periods"])
+        e.value, e.count = d["value"], d["count"]
+        return e
+
+
+def _ratio(num: float, den: Optional[float]) -> Optional[float]:
+    """num/den with pandas' NaN for 0/0 and undefined inputs (±inf survives dropna)."""
+    if den is None or num is None:
+        return None
+    if den == 0:
+        return None if num == 0 else math.copysign(math.inf, num)
+    return num / den
+
+
+class IndicatorEngine:
+    """Running state for every process_data feature of one (symbol, timeframe) series."""
+
+    def __init__(self):
+        self.bars = 0
+        self.last_ts: Optional[str] = None
+        self.prev_close: Optional[float] = None
+        # ATR (ta: mean of the first window true ranges, then Wilder smoothing)
+        self.tr_sum = 0.0
+        self.atr = 0.0
+        self.emas: Dict[int, Ewm] = {w: Ewm(2.0 / (w + 1), w) for w in EMA_WINDOWS}
+        self.rsi_up = Ewm(1.0 / RSI_WINDOW, RSI_WINDOW)
+        self.rsi_dn = Ewm(1.0 / RSI_WINDOW, RSI_WINDOW)
+        self.bb = Rolling(BB_WINDOW)
+        self.vol = Rolling(ZSCORE_WINDOW)
+        self.bandwidth = Rolling(SQUEEZE_WINDOW, keep_sorted=True)
+        self.cum_vp = 0.0
+        self.cum_v = 0.0
+        self.macd_fast = Ewm(2.0 / (MACD_FAST + 1), MACD_FAST)
+        self.macd_slow = Ewm(2.0 / (MACD_SLOW + 1), MACD_SLOW)
+        self.macd_signal = Ewm(2.0 / (MACD_SIGNAL + 1), MACD_SIGNAL)  # fed from the first MACD value
+        # ADX (ta: Wilder averages of TR/±DM seeded from bars 1..window, ADX seeded with mean DX)
+        self.prev_high: Optional[float] = None
+        self.prev_low: Optional[float] = None
+        self.dm = {"tr": 0.0, "pos": 0.0, "neg": 0.0}
+        self.dx_sum = 0.0
+        self.adx = 0.0
+        self.tp = Rolling(CCI_WINDOW)
+        self.obv = 0.0
+        self.highs = Rolling(STOCH_WINDOW)
+        self.lows = Rolling(STOCH_WINDOW)
+        self.stoch_hist: List[Optional[float]] = []
+
+    def _update_adx(self, high: float, low: float, tr: float) -> float:
+        w, t = ADX_WINDOW, self.bars - 1
+        prev_high, prev_low = self.prev_high, self.prev_low
+        self.prev_high, self.prev_low = high, low
+        if t == 0:
+            return 0.0
+        up, down = high - prev_high, prev_low - low
+        moves = {"tr": tr,
+                 "pos": up if (up > down and up > 0) else 0.0,
+                 "neg": down if (down > up and down > 0) else 0.0}
+        if t <= w:
+            for k, v in moves.items():
+                self.dm[k] += v
+            if t < w:
+                return 0.0
+            self.dm = {k: v / w for k, v in self.dm.items()}
+        else:
+            for k, v in moves.items():
+                self.dm[k] = (1.0 - 1.0 / w) * self.dm[k] + v / w
+        trs = self.dm["tr"]
+        pdi = 100.0 * self.dm["pos"] / trs if trs != 0 else 0.0
+        ndi = 100.0 * self.dm["neg"] / trs if trs != 0 else 0.0
+        dx = 100.0 * abs(pdi - ndi) / (pdi + ndi) if pdi + ndi != 0 else 0.0
+        if t < 2 * w - 1:
+            self.dx_sum += dx
+            return 0.0
+        if t == 2 * w - 1:
+            self.adx = (self.dx_sum + dx) / w
+        else:
+            self.adx = (self.adx * (w - 1) + dx) / float(w)
+        return self.adx
+
+    def update(self, ts, open_: float, high: float, low: float, close: float, volume: float,
+               columns: Optional[Sequence[str]] = None) -> Optional[dict]:
+        """
+        Advance by one closed bar (strictly after the last one); features or None during warm-up.
+        `columns` (a feature plan, prerequisites included) limits the row and the warm-up to
+        those columns, as process_data(columns=...) does; every indicator still advances.
+        """
+        key = ts.isoformat() if hasattr(ts, "isoformat") else str(ts)
+        if self.last_ts is not None and key <= self.last_ts:
+            raise ValueError(f"bar {key} is not after {self.last_ts}")
+        self.last_ts = key
+        self.bars += 1
+        prev = self.prev_close
+        self.prev_close = close
+
+        tr = high - low if prev is None else max(high - low, abs(high - prev), abs(low - prev))
+        if self.bars < ATR_WINDOW:
+            self.tr_sum += tr
+        elif self.bars == ATR_WINDOW:
+            self.atr = (self.tr_sum + tr) / ATR_WINDOW
+        else:
+            self.atr = (self.atr * (ATR_WINDOW - 1) + tr) / float(ATR_WINDOW)
+
+        ema = {w: e.push(close) for w, e in self.emas.items()}
+
+        diff = 0.0 if prev is None else close - prev
+        up = self.rsi_up.push(diff if diff > 0 else 0.0)
+        dn = self.rsi_dn.push(-diff if diff < 0 else 0.0)
+        if up is None or dn is None:
+            rsi = None
+        else:
+            rsi = 100.0 if dn == 0 else 100.0 - 100.0 / (1.0 + up / dn)
+
+        self.bb.push(close)
+        bb_std = self.bb.std(ddof=0)
+        bbm = self.bb.mean if bb_std is not None else None
+        bbh = bbm + BB_DEV * bb_std if bbm is not None else None
+        bbl = bbm - BB_DEV * bb_std if bbm is not None else None
+        bandwidth = _ratio(bbh - bbl, bbm) if bbm is not None else None
+        if bandwidth is not None and math.isfinite(bandwidth):
+            self.bandwidth.push(bandwidth)
+        q = self.bandwidth.quantile(SQUEEZE_QUANTILE) if bandwidth is not None else None
+        squeeze = int(q is not None and bandwidth < q)
+
+        self.cum_vp += close * volume
+        self.cum_v += volume
+        vwap = _ratio(self.cum_vp, self.cum_v)
+        vwap_dist = _ratio(close - vwap, vwap) if vwap is not None else None
+
+        self.vol.push(volume)
+        vol_std = self.vol.std(ddof=1)
+        if vol_std is None or vol_std == 0:
+            zscore = None  # pandas: a constant window gives 0/0
+        else:
+            zscore = (volume - self.vol.mean) / vol_std
+
+        fast, slow = self.macd_fast.push(close), self.macd_slow.push(close)
+        macd = fast - slow if fast is not None and slow is not None else None
+        macd_signal = self.macd_signal.push(macd) if macd is not None else None
+
+        adx = self._update_adx(high, low, tr)
+
+        self.tp.push((high + low + close) / 3.0)
+        cci = None
+        if self.tp.full:
+            tp_mean = self.tp.buf[self.tp.pos - 1] if self.tp.same >= self.tp.n else self.tp.mean
+            mad = sum(abs(v - tp_mean) for v in self.tp.buf) / self.tp.n
+            cci = _ratio(self.tp.buf[self.tp.pos - 1] - tp_mean, CCI_CONSTANT * mad)
+
+        self.obv += -volume if prev is not None and close < prev else volume
+
+        self.highs.push(high)
+        self.lows.push(low)
+        hh, ll = self.highs.highest(), self.lows.lowest()
+        stoch_k = _ratio(100.0 * (close - ll), hh - ll) if hh is not None else None
+        willr = _ratio(-100.0 * (hh - close), hh - ll) if hh is not None else None
+        self.stoch_hist = (self.stoch_hist + [stoch_k])[-STOCH_SMOOTH:]
+        stoch_d = (sum(self.stoch_hist) / STOCH_SMOOTH
+                   if len(self.stoch_hist) == STOCH_SMOOTH and None not in self.stoch_hist else None)
+
+        range_atr = _ratio(high - low, self.atr)
+        if range_atr is not None and math.isinf(range_atr):
+            range_atr = None  # process_data maps ±inf to NaN here
+
+        row = {
+            "atr_14": self.atr,
+            "ema_8": ema[8], "ema_20": ema[20], "ema_50": ema[50],
+            "rsi_14": rsi,
+            "bb_bbm": bbm, "bb_bbh": bbh, "bb_bbl": bbl, "bb_bandwidth": bandwidth,
+            "vwap": vwap, "vwap_dist": vwap_dist, "cum_vp": self.cum_vp, "cum_v": self.cum_v,
+            "volume_zscore": zscore,
+            "range_atr_ratio": range_atr,
+            "macd": macd, "macd_signal": macd_signal, "adx": adx, "cci": cci, "obv": self.obv,
+            "stoch_k": stoch_k, "stoch_d": stoch_d, "willr": willr,
+        }
+        crossed = ema[8] is not None and ema[20] is not None
+        row.update({
+            "ema_bull_cross": int(ema[8] > ema[20]) if crossed else None,
+            "ema_bear_cross": int(ema[8] < ema[20]) if crossed else None,
+            "rsi_overbought": int(rsi > 70) if rsi is not None else None,
+            "rsi_oversold": int(rsi < 30) if rsi is not None else None,
+            "bb_squeeze": squeeze,
+        })
+        if columns is not None:
+            row = {c: row[c] for c in columns if c in row}
+        if any(v is None for v in row.values()):
+            return None
+        return row
+
+    # ---- persistence ----
+    def snapshot(self) -> dict:
+        return {
+            "version": STATE_VERSION,
+            "bars": self.bars, "last_ts": self.last_ts, "prev_close": self.prev_close,
+            "tr_sum": self.tr_sum, "atr": self.atr,
+            "emas": {str(w): e.snapshot() for w, e in self.emas.items()},
+            "rsi_up": self.rsi_up.snapshot(), "rsi_dn": self.rsi_dn.snapshot(),
+            "bb": self.bb.snapshot(), "vol": self.vol.snapshot(), "bandwidth": self.bandwidth.snapshot(),
+            "cum_vp": self.cum_vp, "cum_v": self.cum_v,
+            "macd_fast": self.macd_fast.snapshot(), "macd_slow": self.macd_slow.snapshot(),
+            "macd_signal": self.macd_signal.snapshot(),
+            "prev_high": self.prev_high, "prev_low": self.prev_low, "dm": dict(self.dm),
+            "dx_sum": self.dx_sum, "adx": self.adx,
+            "tp": self.tp.snapshot(), "obv": self.obv,
+            "highs": self.highs.snapshot(), "lows": self.lows.snapshot(), "stoch_hist": list(self.stoch_hist),
+        }
+
+    @classmethod
+    def restore(cls, d: Optional[dict]) -> Optional["IndicatorEngine"]:
+        """Engine from a snapshot; None when missing or written by another state version."""
+        if not d or d.get("version") != STATE_VERSION:
+            return None
+        e = cls()
+        e.bars, e.last_ts, e.prev_close = d["bars"], d["last_ts"], d["prev_close"]
+        e.tr_sum, e.atr = d["tr_sum"], d["atr"]
+        e.emas = {int(w): Ewm.restore(s) for w, s in d["emas"].items()}
+        e.rsi_up, e.rsi_dn = Ewm.restore(d["rsi_up"]), Ewm.restore(d["rsi_dn"])
+        e.bb, e.vol, e.bandwidth = Rolling.restore(d["bb"]), Rolling.restore(d["vol"]), Rolling.restore(d["bandwidth"])
+        e.cum_vp, e.cum_v = d["cum_vp"], d["cum_v"]
+        e.macd_fast, e.macd_slow = Ewm.restore(d["macd_fast"]), Ewm.restore(d["macd_slow"])
+        e.macd_signal = Ewm.restore(d["macd_signal"])
+        e.prev_high, e.prev_low, e.dm = d["prev_high"], d["prev_low"], dict(d["dm"])
+        e.dx_sum, e.adx = d["dx_sum"], d["adx"]
+        e.tp, e.obv = Rolling.restore(d["tp"]), d["obv"]
+        e.highs, e.lows, e.stoch_hist = Rolling.restore(d["highs"]), Rolling.restore(d["lows"]), list(d["stoch_hist"])
+        return e
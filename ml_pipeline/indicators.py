@@ -0,0 +1,327 @@
+# ml_pipeline/indicators.py
+"""
+Vectorized NumPy kernels for the process_data indicators (ATR, EMA, RSI, Bollinger bands,
+VWAP, volume z-score, rolling-quantile squeeze, MACD, ADX, CCI, OBV, stochastic, Williams %R).
+
+Inputs are converted once to contiguous float64 arrays; every kernel takes an optional
+preallocated `out` (same length as the input) and returns it. NaN marks warm-up exactly
+where `ta` / pandas put it (ATR keeps ta's zeros). Inputs are expected to be finite;
+process_data drops incomplete OHLCV rows first.
+
+The exponential recursions (EMA, Wilder RSI/ATR) run as a blocked scan: inside a block the
+recurrence y[i] = (1-a)·y[i-1] + a·x[i] is a cumulative sum of x·(1-a)^-k rescaled by
+(1-a)^k. Blocks are as long as (1-a)^-k stays under _SCAN_MAX_GROWTH, so the Python loop
+runs a handful of times per series instead of once per bar. Rolling windows use
+sliding_window_view.
+"""
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+_SCAN_MAX_GROWTH = 1e30
+
+
+def as_f64(a) -> np.ndarray:
+    return np.ascontiguousarray(a, dtype=np.float64)
+
+
+def _out(n: int, out: Optional[np.ndarray]) -> np.ndarray:
+    if out is None:
+        return np.empty(n, dtype=np.float64)
+    if out.shape != (n,) or out.dtype != np.float64:
+        raise ValueError("out must be a float64 array of the input length")
+    return out
+
+
+def ewm_scan(x: np.ndarray, alpha: float, out: Optional[np.ndarray] = None,
+             start: int = 0, seed: Optional[float] = None) -> np.ndarray:
+    """
+    pandas ewm(alpha, adjust=False) over x[start:]: y[start] = seed (default x[start]), then
+    y[i] = (1-alpha)·y[i-1] + alpha·x[i]. out[:start] is left untouched.
+    """
+    n = len(x)
+    out = _out(n, out)
+    if n <= start:
+        return out
+    b = 1.0 - alpha
+    out[start] = x[start] if seed is None else seed
+    block = max(1, min(n - start, int(np.log(_SCAN_MAX_GROWTH) / -np.log(b)) if b > 0 else 1))
+    powers = b ** np.arange(1, block + 1, dtype=np.float64)
+    prev = out[start]
+    for s in range(start + 1, n, block):
+        e = min(n, s + block)
+        p = powers[: e - s]
+        np.multiply(p, prev + alpha * np.cumsum(x[s:e] / p), out=out[s:e])
+        prev = out[e - 1]
+    return out
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+               out: Optional[np.ndarray] = None) -> np.ndarray:
+    out = _out(len(close), out)
+    np.subtract(high, low, out=out)
+    if len(close) > 1:
+        prev = close[:-1]
+        np.maximum(out[1:], np.abs(high[1:] - prev), out=out[1:])
+        np.maximum(out[1:], np.abs(low[1:] - prev), out=out[1:])
+    return out
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int = 14,
+        out: Optional[np.ndarray] = None) -> np.ndarray:
+    """ta AverageTrueRange: zeros, then mean of the first `window` true ranges, then Wilder."""
+    n = len(close)
+    out = _out(n, out)
+    out[:] = 0.0
+    if n < window:
+        return out
+    tr = true_range(high, low, close)
+    return ewm_scan(tr, 1.0 / window, out=out, start=window - 1, seed=float(tr[:window].mean()))
+
+
+def ema(close: np.ndarray, window: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """ta EMAIndicator: ewm(span=window, adjust=False), NaN before `window` bars."""
+    out = ewm_scan(close, 2.0 / (window + 1), out=out)
+    out[: window - 1] = np.nan
+    return out
+
+
+def rsi(close: np.ndarray, window: int = 14, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """ta RSIIndicator: Wilder averages of gains/losses; 100 when there are no losses."""
+    n = len(close)
+    out = _out(n, out)
+    diff = np.zeros(n)
+    np.subtract(close[1:], close[:-1], out=diff[1:])
+    up = ewm_scan(np.where(diff > 0, diff, 0.0), 1.0 / window)
+    dn = ewm_scan(np.where(diff < 0, -diff, 0.0), 1.0 / window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.subtract(100.0, 100.0 / (1.0 + up / dn), out=out)
+    out[dn == 0] = 100.0
+    out[: window - 1] = np.nan
+    return out
+
+
+def _windows(x: np.ndarray, window: int) -> np.ndarray:
+    return sliding_window_view(x, window)
+
+
+def _flat_windows(x: np.ndarray, window: int) -> np.ndarray:
+    """Mask over the full windows (x[window-1:]) whose values are all identical."""
+    change = np.ones(len(x), dtype=bool)
+    change[1:] = x[1:] != x[:-1]
+    run_start = np.maximum.accumulate(np.where(change, np.arange(len(x)), 0))
+    return (np.arange(len(x)) - run_start + 1 >= window)[window - 1:]
+
+
+def rolling_mean_std(x: np.ndarray, window: int, ddof: int = 0,
+                     mean_out: Optional[np.ndarray] = None,
+                     std_out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """pandas rolling(window).mean()/.std(ddof); constant windows give exactly (x, 0)."""
+    n = len(x)
+    mean_out, std_out = _out(n, mean_out), _out(n, std_out)
+    mean_out[: window - 1] = np.nan
+    std_out[: window - 1] = np.nan
+    if n < window:
+        return mean_out, std_out
+    # Two passes over the `window` shifted slices: no (n × window) temporaries
+    k = n - window + 1
+    m, sd = mean_out[window - 1:], std_out[window - 1:]
+    m[:] = 0.0
+    for j in range(window):
+        m += x[j:j + k]
+    m /= window
+    sd[:] = 0.0
+    dev = np.empty(k)
+    for j in range(window):
+        np.subtract(x[j:j + k], m, out=dev)
+        sd += dev * dev
+    np.sqrt(sd / (window - ddof), out=sd)
+    flat = _flat_windows(x, window)
+    m[flat] = x[window - 1:][flat]
+    std_out[window - 1:][flat] = 0.0
+    return mean_out, std_out
+
+
+def bollinger(close: np.ndarray, window: int = 20, dev: float = 2.0,
+              out: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None):
+    """ta BollingerBands (population std) plus bandwidth: (mavg, hband, lband, bandwidth)."""
+    n = len(close)
+    mavg, hband, lband, width = out if out is not None else (None, None, None, None)
+    mavg, hband, lband, width = _out(n, mavg), _out(n, hband), _out(n, lband), _out(n, width)
+    rolling_mean_std(close, window, ddof=0, mean_out=mavg, std_out=lband)  # lband holds std for now
+    np.multiply(lband, dev, out=width)
+    np.add(mavg, width, out=hband)
+    np.subtract(mavg, width, out=lband)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(hband - lband, mavg, out=width)
+    return mavg, hband, lband, width
+
+
+def vwap(close: np.ndarray, volume: np.ndarray, out: Optional[np.ndarray] = None,
+         cum_vp: float = 0.0, cum_v: float = 0.0) -> np.ndarray:
+    """Cumulative VWAP (as process_data defines it); cum_vp/cum_v carry the bars before the frame."""
+    out = _out(len(close), out)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(cum_vp + np.cumsum(close * volume), cum_v + np.cumsum(volume), out=out)
+    return out
+
+
+def zscore(x: np.ndarray, window: int = 20, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """(x - rolling mean) / rolling sample std; NaN for constant windows."""
+    out = _out(len(x), out)
+    mean, std = rolling_mean_std(x, window, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(x - mean, std, out=out)
+    return out
+
+
+def rolling_quantile(x: np.ndarray, window: int, q: float, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """pandas rolling(window).quantile(q) (linear interpolation); NaN if a window holds NaN."""
+    n = len(x)
+    out = _out(n, out)
+    out[: window - 1] = np.nan
+    if n >= window:
+        out[window - 1:] = np.quantile(_windows(x, window), q, axis=1)
+    return out
+
+
+def squeeze(bandwidth: np.ndarray, window: int = 20, q: float = 0.2) -> np.ndarray:
+    """1 where bandwidth is below its rolling q-quantile (NaN compares false)."""
+    return (bandwidth < rolling_quantile(bandwidth, window, q)).astype(int)
+
+
+def rolling_min(x: np.ndarray, window: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    out = _out(len(x), out)
+    out[: window - 1] = np.nan
+    if len(x) >= window:
+        np.min(_windows(x, window), axis=1, out=out[window - 1:])
+    return out
+
+
+def rolling_max(x: np.ndarray, window: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    out = _out(len(x), out)
+    out[: window - 1] = np.nan
+    if len(x) >= window:
+        np.max(_windows(x, window), axis=1, out=out[window - 1:])
+    return out
+
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9,
+         out: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """ta MACD: EMA(fast) - EMA(slow) and its EMA(signal), which starts at the first MACD value."""
+    n = len(close)
+    line, sig = out if out is not None else (None, None)
+    line, sig = _out(n, line), _out(n, sig)
+    np.subtract(ema(close, fast), ema(close, slow), out=line)
+    sig[:] = np.nan
+    first = slow - 1
+    if n > first:
+        ewm_scan(line, 2.0 / (signal + 1), out=sig, start=first)
+        sig[: first + signal - 1] = np.nan
+    return line, sig
+
+
+def stochastic(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int = 14, smooth: int = 3,
+               out: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """ta StochasticOscillator: %K over `window` bars and %D = SMA(smooth) of %K."""
+    n = len(close)
+    k, d = out if out is not None else (None, None)
+    k, d = _out(n, k), _out(n, d)
+    lo = rolling_min(low, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(100.0 * (close - lo), rolling_max(high, window) - lo, out=k)
+    d[:] = np.nan
+    if n >= smooth:
+        m = d[smooth - 1:]
+        m[:] = 0.0
+        for j in range(smooth):
+            m += k[j:j + n - smooth + 1]
+        m /= smooth
+    return k, d
+
+
+def williams_r(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int = 14,
+               out: Optional[np.ndarray] = None) -> np.ndarray:
+    """ta WilliamsRIndicator: -100 · (highest high - close) / (highest high - lowest low)."""
+    out = _out(len(close), out)
+    hh = rolling_max(high, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(-100.0 * (hh - close), hh - rolling_min(low, window), out=out)
+    return out
+
+
+def cci(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int = 20, constant: float = 0.015,
+        out: Optional[np.ndarray] = None) -> np.ndarray:
+    """ta CCIIndicator: (typical - SMA) / (constant · mean absolute deviation)."""
+    n = len(close)
+    out = _out(n, out)
+    tp = (high + low + close) / 3.0
+    mean, _ = rolling_mean_std(tp, window)
+    out[:] = np.nan
+    if n < window:
+        return out
+    k = n - window + 1
+    m = mean[window - 1:]
+    mad = np.zeros(k)
+    for j in range(window):
+        mad += np.abs(tp[j:j + k] - m)
+    mad /= window
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(tp[window - 1:] - m, constant * mad, out=out[window - 1:])
+    return out
+
+
+def obv(close: np.ndarray, volume: np.ndarray, out: Optional[np.ndarray] = None,
+        base: float = 0.0, prev_close: Optional[float] = None) -> np.ndarray:
+    """
+    ta OnBalanceVolumeIndicator: volume added unless the close fell (the first bar counts up
+    unless prev_close says otherwise); base is the OBV before the frame.
+    """
+    out = _out(len(close), out)
+    signed = volume.copy()
+    signed[1:][close[1:] < close[:-1]] *= -1.0
+    if prev_close is not None and len(close) and close[0] < prev_close:
+        signed[0] = -signed[0]
+    np.cumsum(signed, out=out)
+    out += base
+    return out
+
+
+def adx(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int = 14,
+        out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    ta ADXIndicator: Wilder sums of true range and ±DM seeded with bars 1..window, DX from
+    the ±DI ratio, ADX = mean of the first `window` DX values then Wilder-smoothed.
+    Zeros before bar 2·window - 1, as ta returns them.
+    """
+    n = len(close)
+    out = _out(n, out)
+    out[:] = 0.0
+    if n < 2 * window:
+        return out
+    w = window
+    tr = true_range(high, low, close)
+    up = np.zeros(n)
+    down = np.zeros(n)
+    np.subtract(high[1:], high[:-1], out=up[1:])
+    np.subtract(low[:-1], low[1:], out=down[1:])
+    pos = np.where((up > down) & (up > 0), up, 0.0)
+    neg = np.where((down > up) & (down > 0), down, 0.0)
+
+    # Wilder running sums scaled by 1/window (the ±DI ratios do not change)
+    alpha = 1.0 / w
+    trs = ewm_scan(tr, alpha, start=w, seed=float(tr[1:w + 1].mean()))[w:]
+    dip = ewm_scan(pos, alpha, start=w, seed=float(pos[1:w + 1].mean()))[w:]
+    din = ewm_scan(neg, alpha, start=w, seed=float(neg[1:w + 1].mean()))[w:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pdi = np.where(trs != 0, 100.0 * dip / trs, 0.0)
+        ndi = np.where(trs != 0, 100.0 * din / trs, 0.0)
+        total = pdi + ndi
+        dx = np.where(total != 0, 100.0 * np.abs(pdi - ndi) / total, 0.0)
+
+    dx_full = np.zeros(n)
+    dx_full[w:] = dx
+    return ewm_scan(dx_full, alpha, out=out, start=2 * w - 1, seed=float(dx[:w].mean()))
@@ -112,6 +112,20 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", REDIS_URL)
 
+# Shared cache: provider quota buckets, forming bars, the poll planner heap and quota
+# budget counters must be seen by every worker process (backend/net/shared_cache.py).
+# CACHE_URL=locmem:// keeps them per process (single-process dev runs only). The default
+# cache stays per process for everything else (notification dedup, API throttles).
+CACHE_URL = os.getenv("CACHE_URL", REDIS_URL)
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "shared": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": CACHE_URL, "KEY_PREFIX": "mtq"}
+        if CACHE_URL.startswith(("redis://", "rediss://", "unix://"))
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "shared"}
+    ),
+}
+
 # Optional but handy tunables (picked up in your Celery app/entrypoints)
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_ALWAYS_EAGER = False
@@ -191,6 +205,14 @@ CELERY_BEAT_SCHEDULE["check_provider_alerts"] = {
     "task": "backend.tasks.alert_tasks.check_provider_alerts",
     "schedule": float(os.getenv("ALERT_CHECK_EVERY_SEC", "60")),
 }
+CELERY_BEAT_SCHEDULE["scan_marketdata_gaps"] = {
+    "task": "backend.tasks.gap_tasks.scan_marketdata_gaps",
+    "schedule": float(os.getenv("GAP_SCAN_EVERY_SEC", "300")),
+}
+CELERY_BEAT_SCHEDULE["poll_due_series"] = {
+    "task": "backend.tasks.poll_tasks.poll_due_series",
+    "schedule": float(os.getenv("POLL_PLANNER_EVERY_SEC", "15")),
+}
 
 # --- Notifications defaults (env-driven) ---
 
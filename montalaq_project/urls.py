@@ -21,7 +21,7 @@ path("readyz", readyz),
     path("redoc/", redoc_view, name="redoc"),
 
     # ---- Core APIs ----
-    path("api/ingestion/", include("backend.api.status.urls")),   # /api/ingestion/status
+    path("api/ingestion/", include("backend.api.status.urls")),   # /api/ingestion/status, /quota
     path("api/analysis/", include("backend.api.analysis.urls")),  # /api/analysis/latest, /history
 ]
 
@@ -1,25 +1,37 @@
-# C:\Users\AHMED AL BALUSHI\Montalaq_2\provider_manager\manager.py
+# provider_manager/manager.py
 
 import yaml
 import os
-import time
-from dotenv import load_dotenv
-from collections import defaultdict
 
-load_dotenv()  # Load from .env
+try:
+    from dotenv import load_dotenv
+    load_dotenv()  # Load from .env
+except ImportError:
+    pass
+
+from backend.net.ratelimit import PROVIDERS_YAML, WINDOWS, DistributedRateLimiter
+
+# Stop choosing a provider once any window is this full (headroom for in-flight calls).
+SOFT_LIMIT_RATIO = 0.75
+
 
 class ProviderManager:
     _instance = None
 
-    def __init__(self, config_path="C:\\Users\\AHMED AL BALUSHI\\Montalaq_2\\provider_manager\\providers.yaml"):
-        with open(config_path, "r") as f:
+    def __init__(self, config_path=None, cache=None):
+        with open(config_path or PROVIDERS_YAML, "r") as f:
             self.providers = yaml.safe_load(f)
 
-        self.usage = defaultdict(lambda: {
-            "second": {"count": 0, "reset": time.time() + 1},
-            "minute": {"count": 0, "reset": time.time() + 60},
-            "daily": {"count": 0, "reset": time.time() + 86400}
-        })
+        # Usage lives in the shared cache so every worker process sees the same quota; buckets
+        # are keyed by the ingestion-side provider name, so both code paths draw from one quota.
+        self.limiters = {
+            name: DistributedRateLimiter(
+                (cfg or {}).get("provider") or name,
+                {w: n for w, n in ((cfg or {}).get("rate_limit") or {}).items() if w in WINDOWS},
+                cache=cache,
+            )
+            for name, cfg in self.providers.items()
+        }
 
     @classmethod
     def get_instance(cls):
@@ -27,32 +39,10 @@ class ProviderManager:
             cls._instance = cls()
         return cls._instance
 
-    def reset_window_if_needed(self, provider_name):
-        usage = self.usage[provider_name]
-        now = time.time()
-
-        if now > usage["second"]["reset"]:
-            usage["second"]["count"] = 0
-            usage["second"]["reset"] = now + 1
-
-        if now > usage["minute"]["reset"]:
-            usage["minute"]["count"] = 0
-            usage["minute"]["reset"] = now + 60
-
-        if now > usage["daily"]["reset"]:
-            usage["daily"]["count"] = 0
-            usage["daily"]["reset"] = now + 86400
-
     def is_under_limit(self, provider_name):
-        self.reset_window_if_needed(provider_name)
-        limits = self.providers[provider_name]["rate_limit"]
-        usage = self.usage[provider_name]
-
-        for period in ["second", "minute", "daily"]:
-            if period in limits:
-                max_allowed = limits[period]
-                if usage[period]["count"] >= 0.75 * max_allowed:
-                    return False
+        for row in self.limiters[provider_name].usage().values():
+            if row["used"] >= SOFT_LIMIT_RATIO * row["limit"]:
+                return False
         return True
 
     def choose_available_providers(self, required_endpoint=""):
@@ -73,8 +63,12 @@ class ProviderManager:
         var_name = self.providers[name]["api_key_env_var"]
         return os.getenv(var_name)
 
+    def acquire(self, name, calls=1, block=True, timeout=None):
+        """Take `calls` tokens from the provider's shared quota before calling it."""
+        return self.limiters[name].acquire(calls, block=block, timeout=timeout)
+
     def record_usage(self, name, calls=1):
-        self.reset_window_if_needed(name)
-        for period in ["second", "minute", "daily"]:
-            self.usage[name][period]["count"] += calls
+        self.limiters[name].record(calls)
 
+    def quota_usage_pct(self, name):
+        return self.limiters[name].usage_pct()
@@ -1,7 +1,10 @@
-# C:\Users\AHMED AL BALUSHI\Montalaq_2\provider_manager\translator.py
+# provider_manager/translator.py
 
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
+
 def translate_market_data(provider_name, raw_response):
     """
     Normalize each provider's OHLCV + ATR(14) response to unified schema.
@@ -80,3 +83,81 @@ def translate_market_data(provider_name, raw_response):
                 })
 
     return results
+
+
+# ---------------------------------------------------------------------------
+# Columnar path: provider response -> DataFrame without per-row dicts/strptime
+# ---------------------------------------------------------------------------
+FRAME_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume", "atr_14", "provider"]
+_NUMERIC = ["open", "high", "low", "close", "volume", "atr_14"]
+
+# Per-provider layout: where the rows live, how they are laid out, which source field feeds
+# each unified column, and how timestamps are encoded (strftime format or epoch unit).
+_COLUMNAR_SPECS = {
+    "finnhub": {"path": None, "layout": "columns", "ts_unit": "s",
+                "fields": {"timestamp": "t", "open": "o", "high": "h", "low": "l", "close": "c", "volume": "v"}},
+    "twelvedata": {"path": "values", "layout": "records", "ts_format": "%Y-%m-%d %H:%M:%S",
+                   "fields": {"timestamp": "datetime", "open": "open", "high": "high", "low": "low",
+                              "close": "close", "volume": "volume", "atr_14": "atr"}},
+    "allticks": {"path": "data", "layout": "records", "ts_format": "%Y-%m-%dT%H:%M:%S",
+                 "fields": {"timestamp": "timestamp", "open": "open", "high": "high", "low": "low",
+                            "close": "close", "volume": "volume"}},
+    "eodhd": {"path": None, "layout": "records", "ts_format": "%Y-%m-%d %H:%M:%S",
+              "fields": {"timestamp": "datetime", "open": "open", "high": "high", "low": "low",
+                         "close": "close", "volume": "volume"}},
+    "finage": {"path": "results", "layout": "records", "ts_format": "%Y-%m-%d %H:%M:%S",
+               "fields": {"timestamp": "datetime", "open": "open", "high": "high", "low": "low",
+                          "close": "close", "volume": "volume"}},
+}
+
+
+def _empty_frame():
+    df = pd.DataFrame({c: pd.Series(dtype="float64") for c in _NUMERIC})
+    df.insert(0, "timestamp", pd.Series(dtype="datetime64[ns, UTC]"))
+    df["provider"] = pd.Series(dtype="object")
+    return df[FRAME_COLUMNS]
+
+
+def translate_market_frame(provider_name, raw_response):
+    """
+    Columnar twin of translate_market_data(): one DataFrame with FRAME_COLUMNS,
+    tz-aware UTC timestamps (vectorized parse), float64 prices/volume (unparseable -> NaN),
+    atr_14 NaN when the provider does not send it. Rows are sorted by timestamp with
+    duplicate timestamps collapsed to the last one. Feeds upsert_market_frame() and
+    process_data() directly.
+    """
+    spec = _COLUMNAR_SPECS.get(provider_name)
+    if spec is None:
+        return _empty_frame()
+    src = raw_response.get(spec["path"]) if spec["path"] and isinstance(raw_response, dict) else raw_response
+    fields = spec["fields"]
+
+    if spec["layout"] == "columns":
+        if not isinstance(src, dict) or not all(k in src for k in fields.values()):
+            return _empty_frame()
+        cols = {dst: src[key] for dst, key in fields.items()}
+    else:
+        if not isinstance(src, list) or not src:
+            return _empty_frame()
+        raw = pd.DataFrame.from_records(src)
+        if fields["timestamp"] not in raw.columns:
+            return _empty_frame()
+        cols = {dst: raw[key] for dst, key in fields.items() if key in raw.columns}
+
+    n = len(cols["timestamp"])
+    if "ts_unit" in spec:
+        ts = pd.to_datetime(np.asarray(cols["timestamp"], dtype="int64"), unit=spec["ts_unit"], utc=True)
+    else:
+        ts = pd.to_datetime(pd.Series(cols["timestamp"]), format=spec["ts_format"], utc=True, errors="coerce")
+
+    out = {"timestamp": pd.Series(ts).astype("datetime64[ns, UTC]").array}
+    for c in _NUMERIC:
+        if c in cols:
+            out[c] = pd.to_numeric(pd.Series(cols[c]), errors="coerce").to_numpy(dtype="float64")
+        else:
+            out[c] = np.full(n, np.nan)
+    df = pd.DataFrame(out)
+    df["provider"] = provider_name
+    df = df.dropna(subset=["timestamp"])
+    df = df.drop_duplicates("timestamp", keep="last").sort_values("timestamp", kind="stable")
+    return df.reset_index(drop=True)[FRAME_COLUMNS]
@@ -1,4 +1,25 @@
+from typing import Any, Dict, Iterable, List, Optional
+
 from .base import BaseProvider
 
 class AllTick(BaseProvider):
     name = "AllTick"
+    supports_batch = True
+
+    def fetch_bar(self, symbol: str, timeframe: str, last_close: Optional[float] = None) -> dict:
+        from backend.ingestion.temp_alltick_shim import fetch_latest_bar
+        return fetch_latest_bar(symbol, timeframe, last_close=last_close)
+
+    def fetch_bars(
+        self,
+        symbols: Iterable[str],
+        timeframe: str,
+        since: Any = None,
+        last_closes: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, List[dict]]:
+        from backend.ingestion.temp_alltick_shim import fetch_latest_bars
+        return fetch_latest_bars(list(symbols), timeframe, since=since, last_closes=last_closes)
+
+    def fetch_history(self, symbol: str, timeframe: str, start: Any, end: Any, limit: int = 5000) -> List[dict]:
+        from backend.ingestion.temp_alltick_shim import fetch_history_page
+        return fetch_history_page(symbol, timeframe, start, end, limit=limit)
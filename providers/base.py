@@ -1,10 +1,40 @@
-from typing import Any
+from typing import Any, Dict, Iterable, List, Optional
 
 class BaseProvider:
     name: str = "Base"
+    # True when fetch_bars() is served by one batched request rather than a per-symbol loop.
+    supports_batch: bool = False
 
     def fetch_bar(self, symbol: str, timeframe: str) -> Any:
         """Return the latest bar for (symbol, timeframe).
         Implementations should raise NotImplementedError if not wired.
         """
         raise NotImplementedError("fetch_bar must be implemented by providers")
+
+    def fetch_bars(
+        self,
+        symbols: Iterable[str],
+        timeframe: str,
+        since: Any = None,
+        last_closes: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, List[dict]]:
+        """Return {symbol: [bar, ...]} (oldest → newest) for many symbols at once.
+
+        Overrides may honour since (None: the latest bar only; else every bar at/after it)
+        and last_closes (an optional seed hint for synthetic/dev providers).
+
+        Default: per-symbol fallback over fetch_bar(), so it returns the latest bar only and
+        ignores since and last_closes; callers needing a range use fetch_history().
+        Batch-capable providers override this with a single request and set supports_batch = True.
+        """
+        out: Dict[str, List[dict]] = {}
+        for symbol in symbols:
+            bar = self.fetch_bar(symbol, timeframe)
+            out[symbol] = [bar] if bar else []
+        return out
+
+    def fetch_history(self, symbol: str, timeframe: str, start: Any, end: Any, limit: int = 5000) -> List[dict]:
+        """Return one page of historical bars in [start, end), oldest → newest, at most `limit`.
+        Used by the backfill engine; providers without a history endpoint leave this unimplemented.
+        """
+        raise NotImplementedError(f"{self.name} does not expose history paging")
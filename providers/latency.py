@@ -0,0 +1,77 @@
+import os
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+# Samples kept per provider for the rolling percentiles.
+LATENCY_WINDOW = int(os.getenv("PROVIDER_LATENCY_WINDOW", "200"))
+# Fewer samples than this and a provider's percentiles are treated as unknown.
+LATENCY_MIN_SAMPLES = int(os.getenv("PROVIDER_LATENCY_MIN_SAMPLES", "5"))
+
+
+class _Stats:
+    def __init__(self):
+        self.samples: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.errors = 0
+        self.error_streak = 0
+
+
+class LatencyTracker:
+    """Rolling per-provider request latency (ms) and error streaks, shared by every thread."""
+
+    def __init__(self):
+        self._stats: Dict[str, _Stats] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, provider: str) -> _Stats:
+        st = self._stats.get(provider)
+        if st is None:
+            st = self._stats[provider] = _Stats()
+        return st
+
+    def record(self, provider: str, ms: float, ok: bool = True) -> None:
+        with self._lock:
+            st = self._get(provider)
+            if ok:
+                st.samples.append(float(ms))
+                st.error_streak = 0
+            else:
+                st.errors += 1
+                st.error_streak += 1
+
+    def percentile(self, provider: str, q: float) -> Optional[float]:
+        with self._lock:
+            st = self._stats.get(provider)
+            if st is None or len(st.samples) < LATENCY_MIN_SAMPLES:
+                return None
+            vals = sorted(st.samples)
+        return vals[min(len(vals) - 1, int(q * len(vals)))]
+
+    def p50(self, provider: str) -> Optional[float]:
+        return self.percentile(provider, 0.50)
+
+    def p95(self, provider: str) -> Optional[float]:
+        return self.percentile(provider, 0.95)
+
+    def error_streak(self, provider: str) -> int:
+        with self._lock:
+            st = self._stats.get(provider)
+            return st.error_streak if st else 0
+
+    def snapshot(self) -> Dict[str, dict]:
+        out = {}
+        for name in list(self._stats):
+            with self._lock:
+                st = self._stats[name]
+                n, errors, streak = len(st.samples), st.errors, st.error_streak
+            out[name] = {"samples": n, "errors": errors, "error_streak": streak,
+                         "p50_ms": self.p50(name), "p95_ms": self.p95(name)}
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+# Process-wide tracker used by ProviderManager
+TRACKER = LatencyTracker()
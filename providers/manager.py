@@ -1,7 +1,12 @@
 import os
-from typing import List
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional, Tuple
 from .alltick import AllTick
+from .base import BaseProvider
 from .twelvedata_stub import TwelveData
+from .replay import Replay
+from .latency import TRACKER
 
 from time import monotonic
 try:
@@ -13,9 +18,29 @@ except Exception:
 _PROVIDER_REGISTRY = {
     "AllTick": AllTick,
     "TwelveData": TwelveData,
+    "Replay": Replay,
 }
 
 _CACHE_TTL_S = 5.0
+
+
+def _can_fetch(name: str) -> bool:
+    """True when the registered provider implements fetching (not a stub of BaseProvider)."""
+    cls = _PROVIDER_REGISTRY.get(name)
+    return cls is not None and (cls.fetch_bars is not BaseProvider.fetch_bars
+                                or cls.fetch_bar is not BaseProvider.fetch_bar)
+
+
+# ---- Latency-aware failover / hedging knobs (only active with ALLOW_FALLBACKS) ----
+# Demote a provider whose rolling p95 exceeds this, or after this many errors in a row.
+FAILOVER_P95_MS = float(os.getenv("PROVIDER_FAILOVER_P95_MS", "5000"))
+FAILOVER_ERROR_STREAK = int(os.getenv("PROVIDER_FAILOVER_ERROR_STREAK", "3"))
+# Hedge delay: fixed if set, else the primary's p95 (default until enough samples), floored.
+HEDGE_DELAY_MS = os.getenv("PROVIDER_HEDGE_DELAY_MS", "")
+HEDGE_DEFAULT_DELAY_MS = float(os.getenv("PROVIDER_HEDGE_DEFAULT_DELAY_MS", "1500"))
+HEDGE_MIN_DELAY_MS = float(os.getenv("PROVIDER_HEDGE_MIN_DELAY_MS", "50"))
+_HEDGE_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("PROVIDER_HEDGE_POOL_SIZE", "16")),
+                                 thread_name_prefix="provider-hedge")
 _last_fetch_t = 0.0
 _last_bump = -1
 _cached_order = None
@@ -44,7 +69,8 @@ def _db_order_or_none():
     return _cached_order
 
 class ProviderManager:
-    """Thin provider selector. Behavior remains AllTick-first unless changed later."""
+    """Provider selector. Configured order (AllTick first by default); with ALLOW_FALLBACKS
+    it demotes slow/failing providers (rolling p50/p95) and hedges slow requests."""
     def __init__(self, order_env: str | None = None, allow_fallbacks_env: str | None = None):
         order_env = order_env or os.getenv("DEFAULT_PROVIDER_ORDER", "AllTick")
         self._order: List[str] = [p.strip() for p in order_env.split(",") if p.strip()]
@@ -55,13 +81,119 @@ class ProviderManager:
         src = db_order if db_order else self._order
         return [p for p in src if p in _PROVIDER_REGISTRY]
 
-    def choose(self, symbol: str, timeframe: str):
-        """Return the first configured provider instance (AllTick by default).
-        Fallback logic is intentionally deferred to 012.2+.
-        """
+    def primary(self) -> str:
+        """Configured first choice; serving from anything else counts as fallback_active."""
+        return (self.get_order() or ["AllTick"])[0]
+
+    @staticmethod
+    def _healthy(name: str) -> bool:
+        if TRACKER.error_streak(name) >= FAILOVER_ERROR_STREAK:
+            return False
+        p95 = TRACKER.p95(name)
+        return p95 is None or p95 <= FAILOVER_P95_MS
+
+    @staticmethod
+    def _budget_left(name: str) -> bool:
+        try:
+            from backend.ingestion.quota_budget import get_quota_budget
+            return not get_quota_budget().exhausted(name)
+        except Exception:
+            return True
+
+    def ranked(self) -> List[str]:
+        """Configured order with healthy providers first; demoted ones follow by rolling p50.
+        Providers whose usable daily budget is spent go last."""
         order = self.get_order() or ["AllTick"]
+        if not self._allow_fallbacks:
+            return order
+        healthy = [n for n in order if self._healthy(n)]
+        slow = sorted((n for n in order if n not in healthy),
+                      key=lambda n: (TRACKER.p50(n) is None, TRACKER.p50(n) or 0.0))
+        ranked = healthy + slow
+        spent = [n for n in ranked if not self._budget_left(n)]
+        return [n for n in ranked if n not in spent] + spent
+
+    def choose(self, symbol: str, timeframe: str, prefer_batch: bool = False):
+        """Return the provider to call first (AllTick by default).
+        With fallbacks allowed, slow/failing providers are demoted (see ranked()), and
+        prefer_batch picks the first provider that serves fetch_bars() in one request
+        (supports_batch) before per-symbol ones.
+        """
+        order = self.ranked()
+        if prefer_batch and self._allow_fallbacks:
+            for name in order:
+                if _PROVIDER_REGISTRY[name].supports_batch:
+                    return _PROVIDER_REGISTRY[name]()
         cls = _PROVIDER_REGISTRY[order[0]]
         return cls()
 
+    def get_provider(self, name: str):
+        """Instantiate a registered provider by name (KeyError if unknown)."""
+        return _PROVIDER_REGISTRY[name]()
+
+    def hedge_delay_sec(self, name: str) -> float:
+        if HEDGE_DELAY_MS:
+            ms = float(HEDGE_DELAY_MS)
+        else:
+            ms = TRACKER.p95(name) or HEDGE_DEFAULT_DELAY_MS
+        return max(HEDGE_MIN_DELAY_MS, ms) / 1000.0
+
+    def _hedge_for(self, name: str) -> Optional[str]:
+        """Next ranked provider that can actually fetch (stubs would only raise)."""
+        if not self._allow_fallbacks:
+            return None
+        return next((n for n in self.ranked() if n != name and _can_fetch(n)), None)
+
+    def fetch_bars(
+        self,
+        provider,
+        symbols: List[str],
+        timeframe: str,
+        since=None,
+        last_closes: Optional[Dict[str, float]] = None,
+        slot: Optional[Callable[[str], object]] = None,
+        called: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[Dict[str, List[dict]], str]:
+        """
+        provider.fetch_bars(...) with latency tracking; returns (bars by symbol, serving provider name).
+        With fallbacks allowed and a second provider available, a hedged request goes to it
+        once the primary has not answered within hedge_delay_sec() (or as soon as it fails);
+        whichever succeeds first wins. The loser keeps running so its latency is still recorded.
+        slot(name) is an optional context manager (e.g. a per-provider semaphore) held per call.
+        called(name) runs for every request issued, the hedge's loser and failures included
+        (each one spends the provider's quota).
+        """
+        def _call(p):
+            with (slot(p.name) if slot else nullcontext()):
+                if called:
+                    called(p.name)
+                t0 = monotonic()
+                try:
+                    out = p.fetch_bars(symbols, timeframe, since=since, last_closes=last_closes)
+                except Exception:
+                    TRACKER.record(p.name, (monotonic() - t0) * 1000.0, ok=False)
+                    raise
+                TRACKER.record(p.name, (monotonic() - t0) * 1000.0)
+                return out
+
+        hedge_name = self._hedge_for(provider.name)
+        if hedge_name is None:
+            return _call(provider), provider.name
+
+        first = _HEDGE_POOL.submit(_call, provider)
+        wait([first], timeout=self.hedge_delay_sec(provider.name))
+        if first.done() and first.exception() is None:
+            return first.result(), provider.name
+
+        second = _HEDGE_POOL.submit(_call, self.get_provider(hedge_name))
+        names = {first: provider.name, second: hedge_name}
+        pending = {first, second}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in (f for f in (first, second) if f in done):
+                if fut.exception() is None:
+                    return fut.result(), names[fut]
+        raise first.exception()
+
     def __repr__(self) -> str:
         return f"ProviderManager(order={self.get_order()}, allow_fallbacks={self._allow_fallbacks})"
@@ -0,0 +1,112 @@
+import os
+import threading
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .base import BaseProvider
+
+# Recorder tree to serve (defaults to where the recorder writes) and whose responses to replay.
+REPLAY_DIR = os.getenv("REPLAY_DIR", "") or os.getenv("PROVIDER_RECORD_DIR", "")
+REPLAY_SOURCE = os.getenv("REPLAY_SOURCE_PROVIDER", "AllTick")
+
+
+def _alltick_row(symbol: str, timeframe: str, row: dict) -> dict:
+    from backend.ingestion.temp_alltick_shim import _parse_row
+    return _parse_row(symbol, timeframe, row)
+
+
+# Raw row → bar dict, per recorded provider (same parsing as the live fetch path)
+_ROW_PARSERS: Dict[str, Callable[[str, str, dict], dict]] = {
+    "AllTick": _alltick_row,
+}
+
+
+# Readers and "latest" cursors per (root, source): the manager builds a new provider per
+# choose(), and a replayed ingest run must keep advancing through the recording.
+_STATE: Dict[Tuple[str, str], dict] = {}
+_STATE_LOCK = threading.Lock()
+
+
+def _utc(ts: datetime) -> datetime:
+    return ts if ts.tzinfo else ts.replace(tzinfo=dt_timezone.utc)
+
+
+def _state(root: str, source: str) -> dict:
+    from backend.ingestion.recorder import RecordingReader
+    with _STATE_LOCK:
+        st = _STATE.get((root, source))
+        if st is None:
+            st = _STATE[(root, source)] = {"reader": RecordingReader(root, source), "cursors": {},
+                                           "latest": {}, "lock": threading.Lock()}
+        return st
+
+
+class Replay(BaseProvider):
+    """Serves recorded raw responses (backend.ingestion.recorder) with no network or rate limit.
+
+    fetch_bars(since=None) replays the recorded "latest" polls for each (symbol, timeframe)
+    in order, one per call, then returns nothing; fetch_history()/fetch_bars(since=...) answer
+    any window from every recorded row, later recordings of a bar winning over earlier ones.
+    """
+    name = "Replay"
+    supports_batch = True
+
+    def __init__(self, root: Optional[str] = None, source: Optional[str] = None):
+        self.root = root or REPLAY_DIR
+        self.source = source or REPLAY_SOURCE
+        self._parse = _ROW_PARSERS[self.source]
+        self._state = _state(self.root, self.source)
+        self.reader = self._state["reader"]
+
+    def rewind(self) -> None:
+        """Restart the "latest" replay from the first recorded poll (and re-read the index)."""
+        with self._state["lock"]:
+            self._state["cursors"].clear()
+            self._state["latest"].clear()
+
+    def parse_record(self, record: dict) -> List[dict]:
+        """Bars of one recorded response, parsed exactly like the live fetch path."""
+        out = []
+        for row in record["raw"]:
+            bar = self._parse(record["symbol"], record["timeframe"], row)
+            bar["provider"] = self.name
+            out.append(bar)
+        return out
+
+    def _next_latest(self, symbol: str, timeframe: str) -> List[dict]:
+        key = (symbol, timeframe)
+        st = self._state
+        with st["lock"]:
+            if key not in st["latest"]:
+                st["latest"][key] = self.reader.index(symbol, timeframe, kind="latest")
+            entries, i = st["latest"][key], st["cursors"].get(key, 0)
+            if i >= len(entries):
+                return []
+            st["cursors"][key] = i + 1
+        return self.parse_record(next(self.reader.records([entries[i]])))
+
+    def fetch_bar(self, symbol: str, timeframe: str, last_close: Optional[float] = None) -> Any:
+        bars = self._next_latest(symbol, timeframe)
+        return bars[-1] if bars else None
+
+    def fetch_bars(
+        self,
+        symbols: Iterable[str],
+        timeframe: str,
+        since: Any = None,
+        last_closes: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, List[dict]]:
+        if since is None:
+            return {s: self._next_latest(s, timeframe) for s in symbols}
+        return {s: self.fetch_history(s, timeframe, since, None, limit=10 ** 9) for s in symbols}
+
+    def fetch_history(self, symbol: str, timeframe: str, start: Any, end: Any, limit: int = 5000) -> List[dict]:
+        start = _utc(start)
+        end = _utc(end) if end is not None else None
+        by_ts: Dict[datetime, dict] = {}
+        for rec in self.reader.records(self.reader.index(symbol, timeframe, start, end)):
+            for bar in self.parse_record(rec):
+                ts = _utc(bar["timestamp"])
+                if ts >= start and (end is None or ts < end):
+                    by_ts[ts] = bar
+        return [by_ts[ts] for ts in sorted(by_ts)][:limit]
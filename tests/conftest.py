@@ -9,6 +9,8 @@ def _isolate_settings(settings, monkeypatch):
     settings.CELERY_TASK_EAGER_PROPAGATES = True
     settings.CELERY_BROKER_URL = "memory://"
     settings.CELERY_RESULT_BACKEND = "cache+memory://"
+    # no "shared" alias: shared worker state (backend/net/shared_cache.py) uses this LocMem too
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
 
     # quiet logs (optional)
     settings.LOGGING = {}
@@ -8,7 +8,7 @@ from django.conf import settings
 def test_notify_rate_limit_caps_deliveries(monkeypatch):
     """
     Ensure NOTIFICATION_DEFAULTS['max_events_per_minute'] is respected.
-    We enable only the webhook channel and monkeypatch requests.post
+    We enable only the webhook channel and monkeypatch notify.http_post
     to count actual outbound attempts.
 
     Expectation: with max_events_per_minute=3 and 6 send attempts in the
@@ -35,17 +35,12 @@ def test_notify_rate_limit_caps_deliveries(monkeypatch):
         status_code = 200
         def json(self): return {}
 
-    def fake_post(url, json=None, headers=None, timeout=None):
+    def fake_post(url, json=None, headers=None, timeout=None, **kwargs):
         calls["post"] += 1
         return _DummyResp()
 
-    # Some implementations import requests at module level; patch there.
-    if hasattr(notify_mod, "requests"):
-        monkeypatch.setattr(notify_mod.requests, "post", fake_post, raising=True)
-    else:
-        # Fallback (shouldn't happen if requests is imported in notify.py)
-        import requests  # noqa: F401
-        monkeypatch.setattr("requests.post", fake_post, raising=True)
+    # Webhook/Slack go through the pooled session helper imported into notify.py.
+    monkeypatch.setattr(notify_mod, "http_post", fake_post, raising=True)
 
     # --- Execute multiple sends within the same minute window ---
     send_fn = getattr(notify_mod.send_notification, "run", None)
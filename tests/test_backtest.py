@@ -0,0 +1,165 @@
+# tests/test_backtest.py
+# Backtester: vectorized first-touch fills equal a bar-by-bar reference walk under every
+# same-bar ambiguity policy, SL/TP levels equal calculate_sl_tp, rule signals enter only once
+# their confirmation is known (no edge on a random walk), and the DB-backed command runs.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from trading import backtest as bt
+from trading.rules import execution
+from trading.rules.execution import calculate_sl_tp
+
+
+def _bars(n=3000, seed=2):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0006, n))
+    open_ = np.r_[close[0], close[:-1]] + rng.normal(0, 0.0002, n) * (rng.random(n) < 0.1)  # some gaps
+    high = np.maximum(open_, close) + rng.uniform(0, 0.0008, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 0.0008, n)
+    return {"open": open_, "high": high, "low": low, "close": close, "atr": np.full(n, 0.0004),
+            "timestamp": pd.date_range("2025-01-01", periods=n, freq="1min", tz="UTC")}
+
+
+def _reference(bars, i, d, sl, tp, max_hold, policy):
+    """Walk the bars after entry one by one."""
+    n = len(bars["close"])
+    last = n - 1 if max_hold is None else min(i + max_hold, n - 1)
+    for j in range(i + 1, last + 1):
+        o, h, l = bars["open"][j], bars["high"][j], bars["low"][j]
+        sl_hit = l <= sl if d > 0 else h >= sl
+        tp_hit = h >= tp if d > 0 else l <= tp
+        if not (sl_hit or tp_hit):
+            continue
+        if sl_hit and tp_hit:
+            gap_sl = o <= sl if d > 0 else o >= sl
+            gap_tp = o >= tp if d > 0 else o <= tp
+            if gap_sl or gap_tp:
+                stop = gap_sl
+            else:
+                stop = {"stop": True, "target": False, "open": abs(o - sl) <= abs(o - tp)}[policy]
+        else:
+            stop = sl_hit
+        if stop:
+            gapped = o < sl if d > 0 else o > sl
+            return j, "sl", o if gapped else sl
+        return j, "tp", tp
+    timed_out = max_hold is not None and i + max_hold <= n - 1
+    return last, "timeout" if timed_out else "eod", bars["close"][last]
+
+
+@pytest.mark.parametrize("policy", bt.AMBIGUITY_POLICIES)
+@pytest.mark.parametrize("max_hold", [None, 40])
+def test_fills_match_bar_by_bar_reference(monkeypatch, policy, max_hold):
+    monkeypatch.setattr(bt, "FIRST_WINDOW", 4)            # force several doubling rounds
+    monkeypatch.setattr(bt, "BACKTEST_CHUNK_CELLS", 500)  # and several chunks per round
+    bars = _bars()
+    rng = np.random.default_rng(8)
+    signals = rng.choice([-1, 0, 0, 0, 1], size=len(bars["close"]))
+    signals[-1] = 1  # signal on the last bar: nothing to search
+
+    res = bt.backtest(bars, signals, max_hold=max_hold, ambiguity=policy, allow_overlap=True)
+    assert len(res.trades) == np.count_nonzero(signals)
+    for t in res.trades.itertuples():
+        d = 1 if t.direction == "LONG" else -1
+        j, outcome, price = _reference(bars, t.entry_idx, d, t.stop_loss, t.take_profit, max_hold, policy)
+        assert (t.exit_idx, t.outcome) == (j, outcome), t
+        assert t.exit_price == pytest.approx(price, abs=1e-15)
+    assert res.stats["ambiguous"] > 0 and res.stats["exits_sl"] > 0 and res.stats["exits_tp"] > 0
+
+
+def test_levels_match_calculate_sl_tp(monkeypatch):
+    monkeypatch.setattr(execution, "ENABLE_RULE_DEBUG_LOGS", False)
+    bars = _bars(300)
+    rng = np.random.default_rng(1)
+    atr = rng.uniform(0.0002, 0.001, 300)
+    dirs = rng.choice([-1.0, 1.0], size=300)
+    sl, tp = bt.sl_tp_levels(bars["close"], atr, dirs)
+    for i in range(300):
+        ref = calculate_sl_tp({"close": bars["close"][i], "atr": atr[i]}, "LONG" if dirs[i] > 0 else "SHORT")
+        assert (sl[i], tp[i]) == (ref["stop_loss"], ref["take_profit"])
+
+
+def test_sequential_trades_equity_and_stats():
+    bars = _bars(2000, seed=5)
+    bars["atr"] = np.full(2000, 0.0015)
+    signals = np.where(np.arange(2000) % 3 == 0, "LONG", "NO_TRADE")
+    res = bt.backtest(bars, signals, max_hold=60, risk_per_trade=0.02)
+    t = res.trades
+    assert (t["entry_idx"].to_numpy()[1:] > t["exit_idx"].to_numpy()[:-1]).all()  # one position at a time
+    assert len(t) < (signals == "LONG").sum()
+
+    r = t["r_multiple"].to_numpy()
+    assert res.stats["trades"] == len(t) and res.stats["total_r"] == pytest.approx(r.sum())
+    assert res.stats["final_equity"] == pytest.approx(np.prod(1 + 0.02 * r))
+    assert res.equity.index.equals(bars["timestamp"]) and (res.equity.diff().fillna(0)[t["exit_time"]] != 0).any()
+    assert 0 <= res.stats["max_drawdown"] < 1
+    assert set(t["outcome"]) <= {"tp", "sl", "timeout", "eod"}
+    tp_rows = t[t["outcome"] == "tp"]
+    assert np.allclose(tp_rows["r_multiple"], bt.DEFAULT_RR_RATIO, rtol=1e-2)  # 5-decimal level rounding
+
+    with pytest.raises(ValueError):
+        bt.backtest(bars, signals, ambiguity="coin_flip")
+    with pytest.raises(ValueError):
+        bt.backtest({k: v for k, v in bars.items() if k != "atr"}, signals)
+
+
+def test_rule_signals_have_no_edge_on_a_random_walk():
+    from trading.rules.batch import run_rule_engine_batch
+
+    rng = np.random.default_rng(0)
+    n = 200_000
+    close = 1.1 + np.round(np.cumsum(rng.normal(0, 0.0004, n)), 4)
+    open_ = np.r_[close[0], close[:-1]]
+    bars = {"open": open_, "close": close, "volume": np.ones(n), "atr": np.full(n, 0.0006),
+            "high": np.maximum(open_, close) + np.round(rng.uniform(0, 0.0004, n), 4),
+            "low": np.minimum(open_, close) - np.round(rng.uniform(0, 0.0004, n), 4),
+            "ema8": close, "ema20": close, "ema50": close,
+            "rsi14": rng.uniform(20, 80, n), "volume_z": rng.normal(1.0, 1.0, n)}
+    res = run_rule_engine_batch(bars, chain_stage_flags=True)
+    raw = bt.signal_directions(res["final_decision"])
+    decided = bt.at_decision(raw, res["decided_at"])
+
+    assert (np.flatnonzero(decided) > np.flatnonzero(raw).min()).all()
+    stats = bt.backtest(bars, decided).stats
+    assert stats["trades"] > 1000 and abs(stats["avg_r"]) < 0.15  # ~1.4R per-trade spread: a few SE
+    # Entering on the pattern bar trades on the confirmation bars' closes
+    assert bt.backtest(bars, raw).stats["avg_r"] > 0.25
+
+
+def test_at_decision_moves_signals_to_the_decision_bar():
+    direction = np.array([1, 0, -1, 1, 0, 0, -1])
+    decided_at = np.array([2, 3, 3, 4, 6, 7, 8])
+    # bar 2's SHORT and bar 3's LONG are final on bars 3 / 4; bar 6's would be final past the end
+    np.testing.assert_array_equal(bt.at_decision(direction, decided_at), [0, 0, 1, -1, 1, 0, 0])
+    decided_at[3] = 3  # two decisions final on bar 3: the later pattern's wins
+    np.testing.assert_array_equal(bt.at_decision(direction, decided_at), [0, 0, 1, 1, 0, 0, 0])
+
+
+@pytest.mark.django_db
+def test_backtest_command_replays_rule_signals_over_marketdata(monkeypatch):
+    from io import StringIO
+
+    from django.core.management import call_command
+
+    from backend.models import MarketData
+    from celery_tasks.preprocess_features import update_features
+
+    bars = _bars(400, seed=11)
+    MarketData.objects.bulk_create([
+        MarketData(symbol="EURUSD", timeframe="1m", timestamp=bars["timestamp"][i], open=bars["open"][i],
+                   high=bars["high"][i], low=bars["low"][i], close=bars["close"][i], volume=100 + i % 50,
+                   provider="AllTick")
+        for i in range(400)
+    ])
+    update_features("EURUSD", "1m")
+    loaded = bt.load_bars("EURUSD", "1m")
+    assert len(loaded["close"]) == 400 and np.isnan(bt.feature_atr(loaded, "EURUSD", "1m")[:10]).all()
+
+    # Every featurised bar long: the command path is exercised whatever the rules decide
+    monkeypatch.setattr(bt, "rule_signals", lambda b, *a, **k: np.where(np.isnan(b["atr"]), 0, 1))
+    buf = StringIO()
+    call_command("backtest", pair="EURUSD", tf="1m", max_hold=30, stdout=buf)
+    out = buf.getvalue()
+    assert "bars=400" in out and "trades=" in out and "bars/min" in out
@@ -0,0 +1,174 @@
+# tests/test_bar_aggregator.py
+# Tick → 1m → 5m/15m/1h/4h rollup: parity with a pandas resample, emit-once semantics,
+# restart warm-start from MarketData, stateless per-cycle rollup on top of stored bars, and
+# one provider request per pair in ingest_once (forming base bars never rolled up).
+
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pandas as pd
+import pytest
+
+from backend.ingestion.aggregator import BarAggregator, roll_up
+from backend.models import MarketData
+from backend.tasks import freshness as fresh_mod
+from backend.tasks import ingest_tasks
+from backend.tasks.utils import upsert_market_bars
+from providers.base import BaseProvider
+from providers.manager import ProviderManager
+
+T0 = datetime(2025, 1, 8, 8, 0, tzinfo=dt_timezone.utc)  # 4h-aligned
+
+
+def _minute_bars(symbol, n, start=T0, seed=7):
+    rng = random.Random(seed)
+    close, out = 1.1, []
+    for i in range(n):
+        o = close
+        close = round(o + rng.uniform(-1e-3, 1e-3), 6)
+        out.append({"symbol": symbol, "timeframe": "1m", "timestamp": start + timedelta(minutes=i),
+                    "open": o, "high": max(o, close) + 1e-4, "low": min(o, close) - 1e-4, "close": close,
+                    "volume": float(rng.randint(1, 50)), "provider": "AllTick"})
+    return out
+
+
+def _resample(bars, rule):
+    df = pd.DataFrame(bars).set_index("timestamp")
+    r = df.resample(rule, label="left", closed="left").agg(
+        {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"})
+    return r.dropna()
+
+
+def test_rollups_match_resample_and_emit_once():
+    agg = BarAggregator("1m", ["5m", "15m", "1h", "4h"])
+    bars = _minute_bars("EURUSD", 240)
+    emitted = [b for bar in bars for b in agg.add_bar(bar)]
+
+    for tf, rule, count in [("5m", "5min", 48), ("15m", "15min", 16), ("1h", "1h", 4), ("4h", "4h", 1)]:
+        got = [b for b in emitted if b["timeframe"] == tf]
+        assert len(got) == count
+        exp = _resample(bars, rule)
+        assert [b["timestamp"] for b in got] == list(exp.index.to_pydatetime())
+        for col in ("open", "high", "low", "close", "volume"):
+            assert [b[col] for b in got] == pytest.approx(exp[col].tolist())
+
+    # re-delivered base bars (polling "latest" again) emit nothing
+    assert [b for bar in bars[-3:] for b in agg.add_bar(bar)] == []
+
+
+def test_missing_last_minute_closes_bucket_on_next_bucket():
+    agg = BarAggregator("1m", ["5m"])
+    bars = _minute_bars("EURUSD", 7)
+    del bars[4]  # 08:04 never arrives
+    out = [b for bar in bars for b in agg.add_bar(bar)]
+    assert len(out) == 1
+    assert out[0]["timestamp"] == T0 and out[0]["source_bars"] == 4
+    assert agg.open_bar("EURUSD", "5m")["timestamp"] == T0 + timedelta(minutes=5)
+
+
+def test_base_bar_timestamps_are_floored_to_the_base_step():
+    agg = BarAggregator("1m", ["5m"])
+    bars = _minute_bars("EURUSD", 5)
+    bars[4]["timestamp"] += timedelta(seconds=59)  # provider stamps the last minute late
+    out = [b for bar in bars for b in agg.add_bar(bar)]
+    assert len(out) == 1 and out[0]["timestamp"] == T0 and out[0]["source_bars"] == 5
+
+
+def test_ticks_build_minute_bars_and_roll_up():
+    agg = BarAggregator("1m", ["5m"])
+    out = []
+    for minute in range(5):
+        for k, px in enumerate((1.0, 1.3, 0.9, 1.1)):
+            out += agg.add_tick("EURUSD", T0 + timedelta(minutes=minute, seconds=10 * k), px + minute, volume=1.0)
+    assert [b["timeframe"] for b in out] == ["1m"] * 4  # last minute still forming
+    assert out[0] == {"symbol": "EURUSD", "timeframe": "1m", "timestamp": T0, "open": 1.0, "high": 1.3,
+                      "low": 0.9, "close": 1.1, "volume": 4.0, "provider": None}
+
+    closed = agg.flush_ticks("EURUSD", now=T0 + timedelta(minutes=5, seconds=1))
+    assert [b["timeframe"] for b in closed] == ["1m", "5m"]
+    assert closed[1]["open"] == 1.0 and closed[1]["close"] == 5.1 and closed[1]["volume"] == 20.0
+
+
+@pytest.mark.django_db
+def test_warm_start_rebuilds_open_bucket_after_restart():
+    bars = _minute_bars("EURUSD", 5)
+    upsert_market_bars(bars[:3])
+
+    agg = BarAggregator("1m", ["5m"])
+    agg.warm_start(["EURUSD"], now=T0 + timedelta(minutes=3, seconds=5))
+    out = [b for bar in bars[3:] for b in agg.add_bar(bar)]
+
+    assert len(out) == 1 and out[0]["source_bars"] == 5
+    assert out[0]["open"] == bars[0]["open"] and out[0]["close"] == bars[4]["close"]
+
+
+@pytest.mark.django_db
+def test_roll_up_rebuilds_buckets_from_stored_bars_each_call():
+    bars = _minute_bars("EURUSD", 12)
+    del bars[9]  # 08:09 never arrives
+    out = []
+    for bar in bars:  # one cycle per bar, as if each ran in a different worker
+        out += roll_up([bar], "1m", ["5m"])
+        upsert_market_bars([bar])
+    assert [(b["timestamp"], b["source_bars"]) for b in out] == [(T0, 5), (T0 + timedelta(minutes=5), 4)]
+    assert roll_up(bars[-2:], "1m", ["5m"]) == []  # re-delivered bars are already stored
+
+
+@pytest.mark.django_db
+def test_ingest_rollup_never_rolls_up_the_forming_base_bar(monkeypatch):
+    # the next minute's bar: still forming whenever the cycle below runs
+    start = ingest_tasks.timezone.now().replace(second=0, microsecond=0) + timedelta(minutes=1)
+    forming = _minute_bars("EURUSD", 1, start=start)[0]
+
+    class _OneMinute(BaseProvider):
+        name = "AllTick"
+        supports_batch = True
+
+        def fetch_bars(self, symbols, timeframe, since=None, last_closes=None):
+            return {"EURUSD": [dict(forming)]}
+
+    class _Manager(ProviderManager):
+        def choose(self, symbol, timeframe, prefer_batch=False):
+            return _OneMinute()
+
+    monkeypatch.setattr(ingest_tasks, "ProviderManager", _Manager)
+    monkeypatch.setattr(ingest_tasks, "_PROVIDER_SEMAPHORES", {})
+    # rollup_from without closed_bars_only: the forming bar must still stay out of MarketData
+    monkeypatch.setattr(ingest_tasks, "parse_watchlist",
+                        lambda: {"pairs": ["EURUSD"], "timeframes": ["5m"], "rollup_from": "1m"})
+    monkeypatch.setattr(fresh_mod, "_cfg", lambda: {"freshness_seconds": {"1m": 120, "5m": 600}})
+
+    ingest_tasks.ingest_once()
+    assert not MarketData.objects.exists()
+
+
+@pytest.mark.django_db
+def test_ingest_rollup_fetches_base_timeframe_only(monkeypatch):
+    feed = iter(_minute_bars("EURUSD", 5))
+    requests = []
+
+    class _OneMinute(BaseProvider):
+        name = "AllTick"
+        supports_batch = True
+
+        def fetch_bars(self, symbols, timeframe, since=None, last_closes=None):
+            requests.append(timeframe)
+            return {"EURUSD": [dict(next(feed))]}
+
+    class _Manager(ProviderManager):
+        def choose(self, symbol, timeframe, prefer_batch=False):
+            return _OneMinute()
+
+    monkeypatch.setattr(ingest_tasks, "ProviderManager", _Manager)
+    monkeypatch.setattr(ingest_tasks, "_PROVIDER_SEMAPHORES", {})
+    monkeypatch.setattr(ingest_tasks, "parse_watchlist",
+                        lambda: {"pairs": ["EURUSD"], "timeframes": ["5m"], "rollup_from": "1m"})
+    monkeypatch.setattr(fresh_mod, "_cfg", lambda: {"freshness_seconds": {"1m": 120, "5m": 600}})
+
+    for _ in range(5):
+        ingest_tasks.ingest_once()
+
+    assert requests == ["1m"] * 5
+    assert MarketData.objects.filter(timeframe="1m").count() == 5
+    five = MarketData.objects.get(timeframe="5m")
+    assert five.timestamp == T0 and five.volume == sum(b["volume"] for b in _minute_bars("EURUSD", 5))
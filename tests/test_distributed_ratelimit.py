@@ -0,0 +1,178 @@
+# tests/test_distributed_ratelimit.py
+# Cache-backed provider quota: limiter instances (one per worker) draw from the same
+# second/minute token buckets, which refill continuously (no double burst at a window
+# boundary), and the same UTC-day counter (never more than the daily limit per day);
+# blocking acquire waits for the refill, capped; limits come from providers.yaml; usage is
+# reported into ProviderTelemetry.quota_usage_pct.
+
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+
+from backend.models import ProviderTelemetry
+from backend.net import ratelimit as rl_mod
+from backend.net.ratelimit import (DistributedRateLimiter, get_provider_limiter, parse_rate_limits,
+                                   provider_rate_limits)
+from provider_manager.manager import ProviderManager
+
+
+@pytest.fixture(autouse=True)
+def _clean_cache(monkeypatch):
+    cache.clear()
+    monkeypatch.setattr(rl_mod, "_LIMITERS", {})
+    yield
+    cache.clear()
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits("AllTick=second:10,minute:300;TwelveData=daily:800,bogus:1;Bad") == {
+        "AllTick": {"second": 10, "minute": 300},
+        "TwelveData": {"daily": 800},
+    }
+
+
+def test_workers_share_one_quota(monkeypatch):
+    monkeypatch.setattr(rl_mod.time, "time", lambda: 1_000_000.5)  # pin the windows
+    workers = [DistributedRateLimiter("AllTick", {"second": 100, "minute": 5}) for _ in range(4)]
+    granted = []
+
+    def _burst(lim):
+        for _ in range(5):
+            granted.append(lim.try_acquire())
+
+    threads = [threading.Thread(target=_burst, args=(w,)) for w in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert granted.count(True) == 5
+    # a rejected take debits no window, so the second bucket is not drained
+    assert workers[0].usage() == {
+        "second": {"used": 5, "limit": 100, "remaining": 95},
+        "minute": {"used": 5, "limit": 5, "remaining": 0},
+    }
+
+
+def test_blocking_acquire_waits_for_window_reset():
+    lim = DistributedRateLimiter("AllTick", {"second": 2})
+    t0 = time.monotonic()
+    assert all(lim.acquire() for _ in range(3))
+    assert time.monotonic() - t0 <= 1.2
+    assert not lim.acquire(3, timeout=0.05)
+
+
+@pytest.mark.django_db
+def test_usage_reported_to_provider_telemetry(monkeypatch):
+    monkeypatch.setattr(rl_mod, "PROVIDER_RATE_LIMITS", "AllTick=minute:4,daily:100")
+    lim = get_provider_limiter("AllTick")
+    assert get_provider_limiter("Finage") is None  # no quota configured → unthrottled
+    lim.record(3)
+
+    assert lim.report_quota() == 75.0
+    assert ProviderTelemetry.objects.get(provider="AllTick").quota_usage_pct == 75.0
+
+
+def test_legacy_manager_uses_shared_quota(tmp_path):
+    cfg = tmp_path / "providers.yaml"
+    cfg.write_text(
+        "alltick:\n  endpoint: https://api.example\n  rate_limit: {second: 50, minute: 4}\n"
+        "twelvedata:\n  endpoint: https://td.example\n  rate_limit: {daily: 800}\n"
+    )
+    worker_a, worker_b = ProviderManager(config_path=str(cfg)), ProviderManager(config_path=str(cfg))
+
+    worker_a.record_usage("alltick", 2)
+    assert worker_b.is_under_limit("alltick")
+    worker_b.record_usage("alltick", 1)  # 3/4 ≥ 75% soft limit, seen by both workers
+
+    assert worker_a.choose_available_providers() == ["twelvedata"]
+    assert worker_a.quota_usage_pct("alltick") == 75.0
+    assert worker_b.acquire("alltick", block=False)
+    assert not worker_b.acquire("alltick", block=False)
+
+
+def test_buckets_refill_continuously_without_boundary_burst(monkeypatch):
+    clock = [1_000_019.9]  # 0.1 s before a minute boundary
+    monkeypatch.setattr(rl_mod.time, "time", lambda: clock[0])
+    lim = DistributedRateLimiter("AllTick", {"minute": 60})
+    assert all(lim.try_acquire() for _ in range(60)) and not lim.try_acquire()
+
+    clock[0] += 0.2  # next calendar minute: a fixed window would grant another 60 here
+    assert not lim.try_acquire()
+    clock[0] += 1.0  # 1 token / s
+    assert lim.try_acquire() and not lim.try_acquire()
+    clock[0] += 30.0
+    assert lim.usage()["minute"]["remaining"] == 30
+    assert lim.usage()["minute"]["used"] == 1  # calls counted in the current calendar minute
+
+
+def test_daily_quota_is_a_utc_day_counter(monkeypatch):
+    day = 20_000 * 86400
+    clock = [day + 3600.0]
+    monkeypatch.setattr(rl_mod.time, "time", lambda: clock[0])
+    lim = DistributedRateLimiter("AllTick", {"minute": 1000, "daily": 100})
+    granted = 0
+    for _ in range(22):  # hourly for the rest of the day: a refilling bucket would grant ~2x
+        while lim.try_acquire():
+            granted += 1
+        clock[0] += 3600.0
+    assert clock[0] < day + 86400 and granted == 100
+    assert lim.usage()["daily"] == {"used": 100, "limit": 100, "remaining": 0}
+    assert lim._take(1) == pytest.approx(day + 86400 - clock[0])  # back at midnight UTC
+
+    clock[0] = day + 86400 + 1.0
+    assert lim.try_acquire() and lim.usage()["daily"]["remaining"] == 99
+
+
+def test_blocking_acquire_is_capped(monkeypatch):
+    monkeypatch.setattr(rl_mod, "QUOTA_MAX_WAIT_SEC", 0.5)
+    lim = DistributedRateLimiter("AllTick", {"daily": 1})
+    assert lim.acquire()
+    t0 = time.monotonic()
+    assert not lim.acquire()  # the next token is ~a day away: give up at once, not at the reset
+    assert not lim.acquire(timeout=60)
+    assert time.monotonic() - t0 < 0.2
+
+
+def test_limits_come_from_providers_yaml(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(rl_mod, "PROVIDER_RATE_LIMITS", "AllTick=minute:300")
+    monkeypatch.setattr(rl_mod, "_PLACEHOLDER_WARNED", set())
+    limits = provider_rate_limits()  # the shipped config parses: conservative placeholders
+    assert limits["TwelveData"] == {"minute": 8, "daily": 800} and limits["AllTick"] == {"minute": 300}
+    warned = {r.args[0] for r in caplog.records if "placeholder limits" in r.getMessage()}
+    assert warned == {"EODHD", "Finnhub", "TwelveData"}  # AllTick is overridden
+
+    cfg = tmp_path / "providers.yaml"
+    cfg.write_text("alltick:\n  provider: AllTick\n  rate_limit: {minute: 100}\nfinage:\n  endpoint: x\n")
+    monkeypatch.setattr(rl_mod, "PROVIDER_RATE_LIMITS", "TwelveData=daily:50")
+    assert provider_rate_limits(str(cfg)) == {"AllTick": {"minute": 100}, "TwelveData": {"daily": 50}}
+    cfg.write_text("alltick:\n  ...\n  rate_limit: {minute: 1}\n")  # malformed: logged, no limits
+    assert provider_rate_limits(str(cfg), raw="") == {}
+
+
+def test_settings_use_a_redis_shared_cache(monkeypatch):
+    import runpy
+
+    from django.conf import settings
+
+    monkeypatch.delenv("CACHE_URL", raising=False)
+    monkeypatch.setenv("REDIS_URL", "redis://cache-host:6379/2")
+    ns = runpy.run_path(str(settings.BASE_DIR / "montalaq_project" / "settings.py"))
+    assert ns["CACHES"]["shared"]["BACKEND"] == "django.core.cache.backends.redis.RedisCache"
+    assert ns["CACHES"]["shared"]["LOCATION"] == "redis://cache-host:6379/2"
+    assert ns["CACHES"]["default"]["BACKEND"] == "django.core.cache.backends.locmem.LocMemCache"
+
+
+def test_shared_state_uses_the_shared_alias(settings):
+    from django.core.cache import caches
+
+    from backend.net import shared_cache
+
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+                       "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "s"}}
+    lim = DistributedRateLimiter("AllTick", {"minute": 5})
+    assert lim.cache is caches["shared"]
+    shared_cache.cache.set("k", 1)
+    assert caches["shared"].get("k") == 1 and cache.get("k") is None
@@ -0,0 +1,107 @@
+# tests/test_feature_planner.py
+# Model-driven feature plan: prerequisite expansion, per-model-hash caching, process_data
+# computing only planned columns, and the feature task storing only those.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.models import IndicatorState, MarketData, MarketDataFeatures
+from celery_tasks import preprocess_features as pf
+from ml_pipeline import feature_planner as fp
+from ml_pipeline import ml_model
+from ml_pipeline.data_preprocessor import FEATURE_OUTPUTS, plan_steps, planned_columns, process_data, warmup_bars
+
+RULE_COLUMNS = ("atr_14", "ema_8", "ema_20", "ema_50", "rsi_14", "volume_zscore")
+
+
+def _frame(n=300, seed=5):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0008, n))
+    open_ = np.r_[close[0], close[:-1]]
+    ts = pd.date_range("2025-01-01", periods=n, freq="15min", tz="UTC")
+    return pd.DataFrame({"timestamp": ts, "open": open_,
+                         "high": np.maximum(open_, close) + rng.uniform(0, 0.0006, n),
+                         "low": np.minimum(open_, close) - rng.uniform(0, 0.0006, n),
+                         "close": close, "volume": rng.integers(50, 500, n).astype(float),
+                         "provider": "AllTick"})
+
+
+class _Booster:
+    calls = 0
+
+    def __init__(self, names):
+        self.names = names
+
+    def feature_name(self):
+        _Booster.calls += 1
+        return self.names
+
+
+def test_prerequisites_are_expanded_in_dependency_order():
+    assert plan_steps(["range_atr_ratio"]) == ["atr", "range_atr_ratio"]
+    assert planned_columns(["bb_squeeze"]) == ("bb_bbm", "bb_bbh", "bb_bbl", "bb_bandwidth", "bb_squeeze")
+    assert plan_steps(["ema_bull_cross", "close"]) == ["ema_8", "ema_20", "ema_cross"]
+    assert planned_columns() == FEATURE_OUTPUTS
+    assert warmup_bars(columns=["willr"]) == 14 < warmup_bars(columns=["ema_50"]) < warmup_bars()
+
+
+def test_planned_process_data_matches_full_run():
+    df = _frame()
+    full = process_data(df.copy()).set_index("timestamp")
+    slim = process_data(df.copy(), columns=["range_atr_ratio", "vwap_dist"]).set_index("timestamp")
+    assert set(slim.columns) - set(full.columns) == set()
+    assert {"atr_14", "range_atr_ratio", "vwap", "vwap_dist"} <= set(slim.columns)
+    assert not {"ema_50", "macd", "adx", "bb_squeeze"} & set(slim.columns)
+    assert len(slim) > len(full)  # only the planned indicators' warm-up is dropped
+    for col in ("atr_14", "range_atr_ratio", "vwap_dist"):
+        np.testing.assert_allclose(slim.loc[full.index, col], full[col], rtol=1e-12, err_msg=col)
+
+
+def test_plan_is_built_once_per_model_hash(monkeypatch):
+    model = type("M", (), {"booster_": _Booster(["rsi_oversold", "MACD", "close", "unmapped_thing"])})()
+    monkeypatch.setattr(fp, "_PLANS", {})
+    monkeypatch.setattr(fp, "FEATURE_PLAN", "model")
+    monkeypatch.setattr(ml_model, "get", lambda: model)
+    monkeypatch.setattr(ml_model, "get_hash_prefix", lambda: "abc12345")
+    _Booster.calls = 0
+
+    plan = fp.active_plan()
+    assert plan.model_hash == "abc12345"
+    assert plan.requested == ("rsi_oversold", "macd") + RULE_COLUMNS
+    assert set(plan.columns) == {"rsi_14", "rsi_overbought", "rsi_oversold", "macd", "macd_signal", *RULE_COLUMNS}
+    assert fp.active_plan() is plan and fp.planned_feature_columns() == plan.columns
+
+    monkeypatch.setattr(ml_model, "get_hash_prefix", lambda: "def67890")
+    assert fp.active_plan() is not plan and len(fp._PLANS) == 2
+
+    monkeypatch.setattr(fp, "FEATURE_PLAN", "all")
+    assert fp.planned_feature_columns() is None
+    monkeypatch.setattr(fp, "FEATURE_PLAN", "model")
+    monkeypatch.setattr(ml_model, "get", lambda: None)
+    assert fp.active_plan() is None
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("tail", [False, True])
+def test_task_stores_only_planned_columns_and_rebuilds_on_new_plan(monkeypatch, tail):
+    df = _frame()
+    MarketData.objects.bulk_create([
+        MarketData(symbol="EURUSD", timeframe="15m", timestamp=r.timestamp, open=r.open, high=r.high,
+                   low=r.low, close=r.close, volume=r.volume, provider="AllTick")
+        for r in df.itertuples()
+    ])
+    slim = planned_columns(RULE_COLUMNS)
+    monkeypatch.setattr(pf, "planned_feature_columns", lambda: slim)
+    assert pf.run_feature_engineering("EURUSD", "15m", tail=tail).startswith("✅")
+
+    row = MarketDataFeatures.objects.order_by("-market_data__timestamp").first()
+    assert all(getattr(row, c) is not None for c in RULE_COLUMNS)
+    assert row.macd is None and row.cci is None and row.vwap is None and row.bb_bbm is None
+    if tail:
+        return
+
+    # A plan that needs more columns rebuilds the series so history gets them too
+    assert IndicatorState.objects.get(symbol="EURUSD").state["columns"] == sorted(slim)
+    assert pf.update_features("EURUSD", "15m", planned_columns(RULE_COLUMNS + ("cci",))) == MarketDataFeatures.objects.count()
+    assert MarketDataFeatures.objects.filter(cci__isnull=True).count() == 0
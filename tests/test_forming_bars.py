@@ -0,0 +1,150 @@
+# tests/test_forming_bars.py
+# Forming vs closed bars: the still-open bar lives in the cache (provisional) and is
+# persisted once, when its interval has ended; concurrent merges lose nothing; the API can
+# still show it.
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from backend.ingestion.forming import FormingBars, get_forming_bars
+from backend.models import IngestionStatus, MarketData
+from backend.tasks import freshness as fresh_mod
+from backend.tasks import ingest_tasks
+from providers.base import BaseProvider
+from providers.manager import ProviderManager
+
+T0 = datetime(2025, 1, 8, 9, 0, tzinfo=dt_timezone.utc)
+
+
+def _bar(ts, close, high=None, low=None, volume=1.0):
+    return {"symbol": "EURUSD", "timeframe": "1m", "timestamp": ts, "open": 1.0,
+            "high": high if high is not None else max(1.0, close), "low": low if low is not None else min(1.0, close),
+            "close": close, "volume": volume}
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_split_holds_forming_bar_and_releases_it_on_rollover():
+    fb = FormingBars()
+    assert fb.split("EURUSD", "1m", [_bar(T0, 1.2, high=1.5, volume=3.0)], now=T0 + timedelta(seconds=10)) == []
+    assert fb.split("EURUSD", "1m", [_bar(T0, 1.1, low=0.8, volume=7.0)], now=T0 + timedelta(seconds=40)) == []
+
+    live = fb.get("EURUSD", "1m")
+    assert live["provisional"] and (live["high"], live["low"], live["close"], live["volume"]) == (1.5, 0.8, 1.1, 7.0)
+
+    # Provider moved on: the last snapshot of 09:00 is released as closed, 09:01 is held
+    nxt = T0 + timedelta(minutes=1)
+    closed = fb.split("EURUSD", "1m", [_bar(nxt, 1.3)], now=nxt + timedelta(seconds=5))
+    assert [(b["timestamp"], b["high"], b["low"], b["close"]) for b in closed] == [(T0, 1.5, 0.8, 1.1)]
+    assert "provisional" not in closed[0]
+    assert fb.get("EURUSD", "1m")["timestamp"] == nxt
+
+
+def test_split_prefers_provider_closed_bar_and_passes_closed_history_through():
+    fb = FormingBars()
+    fb.split("EURUSD", "1m", [_bar(T0, 1.1)], now=T0 + timedelta(seconds=30))
+    final = _bar(T0, 1.25)
+    nxt = _bar(T0 + timedelta(minutes=1), 1.3)
+    closed = fb.split("EURUSD", "1m", [nxt, final], now=T0 + timedelta(minutes=1, seconds=2))
+    assert closed == [final]
+
+    # Nothing new came back and the forming interval has ended: release and forget it
+    assert fb.split("EURUSD", "1m", [], now=T0 + timedelta(minutes=2, seconds=1)) == [nxt]
+    assert fb.get("EURUSD", "1m") is None
+
+
+def test_concurrent_snapshots_merge_atomically():
+    class _SlowCache:
+        """Widens the get → set window so unlocked merges would overwrite each other."""
+
+        def __init__(self, inner):
+            self.inner = inner
+
+        def get(self, key):
+            value = self.inner.get(key)
+            time.sleep(0.01)
+            return value
+
+        def __getattr__(self, name):
+            return getattr(self.inner, name)
+
+    fb = FormingBars(cache=_SlowCache(cache))
+    threads = [threading.Thread(target=fb.remember, args=(_bar(T0, 1.0, high=1.0 + i / 100, low=1.0 - i / 100),))
+               for i in (3, 8, 1, 6, 2, 7, 4, 5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    live = fb.get("EURUSD", "1m")
+    assert (live["high"], live["low"]) == (1.08, 0.92)
+
+
+@pytest.mark.django_db
+def test_ingest_persists_only_closed_bars(monkeypatch):
+    clock = [T0 + timedelta(seconds=5)]
+    polls = []
+
+    class _Latest(BaseProvider):
+        name = "AllTick"
+        supports_batch = True
+
+        def fetch_bars(self, symbols, timeframe, since=None, last_closes=None):
+            now = clock[0]
+            start = now - timedelta(seconds=now.second)
+            polls.append(start)
+            return {"EURUSD": [_bar(start, 1.0 + now.second / 1000.0)]}
+
+    class _Manager(ProviderManager):
+        def choose(self, symbol, timeframe, prefer_batch=False):
+            return _Latest()
+
+    status_updates = []
+    real_update = ingest_tasks.update_ingestion_status
+    monkeypatch.setattr(ingest_tasks, "update_ingestion_status",
+                        lambda *a, **k: status_updates.append(a) or real_update(*a, **k))
+    monkeypatch.setattr(ingest_tasks, "timezone", SimpleNamespace(now=lambda: clock[0]))
+    monkeypatch.setattr(ingest_tasks, "ProviderManager", _Manager)
+    monkeypatch.setattr(ingest_tasks, "_PROVIDER_SEMAPHORES", {})
+    monkeypatch.setattr(ingest_tasks, "parse_watchlist",
+                        lambda: {"pairs": ["EURUSD"], "timeframes": ["1m"], "closed_bars_only": True})
+    monkeypatch.setattr(fresh_mod, "_cfg", lambda: {"freshness_seconds": {"1m": 120}})
+
+    for second in (5, 20, 35, 50):  # four polls inside the 09:00 bar
+        clock[0] = T0 + timedelta(seconds=second)
+        assert ingest_tasks.ingest_once()["written"] == 0
+    assert MarketData.objects.count() == 0 and status_updates == []
+
+    clock[0] = T0 + timedelta(minutes=1, seconds=5)
+    assert ingest_tasks.ingest_once()["written"] == 1
+
+    row = MarketData.objects.get()
+    assert row.timestamp == T0 and row.close == pytest.approx(1.05) and row.provider == "AllTick"
+    assert len(status_updates) == 1
+    assert get_forming_bars().get("EURUSD", "1m")["timestamp"] == T0 + timedelta(minutes=1)
+
+
+@pytest.mark.django_db
+def test_marketdata_api_shows_provisional_bar():
+    IngestionStatus.objects.create(symbol="EURUSD", timeframe="1m", last_ingest_ts=T0, provider="AllTick")
+    get_forming_bars().remember(dict(_bar(T0, 1.2), provider="AllTick"))
+    client = APIClient()
+
+    plain = client.get("/api/marketdata/", {"pair": "EURUSD", "tf": "1m"})
+    assert plain.status_code == 200 and "forming" not in plain.json()
+
+    live = client.get("/api/marketdata/", {"pair": "EURUSD", "tf": "1m", "provisional": "1"})
+    forming = live.json()["forming"]
+    assert forming["provisional"] is True and forming["close"] == 1.2
+    assert forming["timestamp"] == "2025-01-08T09:00:00Z"
+    assert live["ETag"] != plain["ETag"]
@@ -0,0 +1,82 @@
+# tests/test_http_pool.py
+# Pooled provider sessions: keep-alive reuse per host and a shared retry budget
+# that caps retry amplification against a degraded upstream.
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.net import retry as retry_mod
+from backend.net.retry import RetryBudget, http_get_with_backoff, pool_stats
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    status = 200
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(self.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        type(self).hits += 1
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(status):
+    handler = type("H", (_Handler,), {"status": status, "hits": 0})
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, handler
+
+
+@pytest.fixture(autouse=True)
+def _fresh_pools(monkeypatch):
+    monkeypatch.setattr(retry_mod, "_SESSIONS", {})
+    monkeypatch.setattr(retry_mod, "_BUDGETS", {})
+    monkeypatch.setattr(retry_mod, "_HOST_STATS", {})
+    monkeypatch.setattr(retry_mod.time, "sleep", lambda s: None)
+    yield
+
+
+def test_session_reuses_one_connection_per_host():
+    srv, handler = _serve(200)
+    try:
+        url = f"http://127.0.0.1:{srv.server_port}/bars"
+        for _ in range(5):
+            assert http_get_with_backoff(url, provider="TestProv").status_code == 200
+        host = pool_stats()["TestProv"]["hosts"][f"127.0.0.1:{srv.server_port}"]
+        assert host["requests"] == 5
+        assert host["connections_opened"] == 1
+        assert host["reuse_ratio"] == 0.8
+        assert host["p95_ms"] is not None
+    finally:
+        srv.shutdown()
+
+
+def test_retry_budget_denies_once_spent():
+    budget = RetryBudget(ratio=0.1, min_per_sec=0.0, window_sec=60)
+    for _ in range(20):
+        budget.record_request()
+    assert budget.try_retry() and budget.try_retry()
+    assert not budget.try_retry()
+    assert budget.snapshot() == {"requests": 20, "retries": 2, "denied_total": 1}
+
+
+def test_degraded_provider_sees_no_retry_amplification(monkeypatch):
+    srv, handler = _serve(503)
+    monkeypatch.setattr(retry_mod, "_BUDGETS", {"Degraded": RetryBudget(ratio=0.1, min_per_sec=0.0, window_sec=60)})
+    try:
+        url = f"http://127.0.0.1:{srv.server_port}/bars"
+        for _ in range(20):
+            with pytest.raises(RuntimeError):
+                http_get_with_backoff(url, provider="Degraded", max_attempts=5)
+        # 20 first attempts + at most 10% retries, instead of 20 × 5
+        assert handler.hits == 22
+    finally:
+        srv.shutdown()
@@ -0,0 +1,167 @@
+# tests/test_incremental_indicators.py
+# Incremental indicator engine: parity with process_data (also under a feature plan),
+# snapshot/resume, and the IndicatorState-backed run_feature_engineering (O(new bars),
+# closed bars only, rebuild on back-inserts and in-place rewrites).
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.models import IndicatorState, MarketData, MarketDataFeatures, TradeAnalysis
+from backend.tasks.utils import upsert_market_bars
+from celery_tasks import preprocess_features as pf
+from ml_pipeline.data_preprocessor import process_data
+from ml_pipeline.feature_builder import to_vector_by_feature_names
+from ml_pipeline.incremental import FEATURE_COLUMNS, IndicatorEngine
+
+
+def _frame(n=400, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0008, n))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + rng.uniform(0, 0.0006, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 0.0006, n)
+    volume = rng.integers(50, 500, n).astype(float)
+    volume[100:130] = 200.0  # flat stretch: zero-variance windows
+    ts = pd.date_range("2025-01-01", periods=n, freq="15min", tz="UTC")
+    return pd.DataFrame({"timestamp": ts, "open": open_, "high": high, "low": low,
+                         "close": close, "volume": volume, "provider": "AllTick"})
+
+
+def _feed(engine, df):
+    out = {}
+    for r in df.itertuples():
+        feats = engine.update(r.timestamp, r.open, r.high, r.low, r.close, r.volume)
+        if feats is not None:
+            out[r.timestamp] = feats
+    return pd.DataFrame.from_dict(out, orient="index")
+
+
+def _assert_matches(got, ref):
+    assert list(got.index) == list(ref.index)
+    for col in FEATURE_COLUMNS:
+        np.testing.assert_allclose(got[col].astype(float), ref[col].astype(float), rtol=1e-8, atol=1e-12,
+                                   err_msg=col)
+
+
+def test_engine_matches_process_data():
+    df = _frame()
+    ref = process_data(df.copy()).set_index("timestamp")
+    _assert_matches(_feed(IndicatorEngine(), df), ref)
+
+
+def test_snapshot_resume_is_seamless():
+    df = _frame()
+    ref = _feed(IndicatorEngine(), df)
+
+    first = IndicatorEngine()
+    head = _feed(first, df.iloc[:237])
+    resumed = IndicatorEngine.restore(json.loads(json.dumps(first.snapshot())))
+    tail = _feed(resumed, df.iloc[237:])
+    _assert_matches(pd.concat([head, tail]), ref)
+
+    with pytest.raises(ValueError):
+        resumed.update(df.timestamp.iloc[0], 1, 1, 1, 1, 1)
+    assert IndicatorEngine.restore({"version": -1}) is None
+
+
+def _store(df, symbol="EURUSD", timeframe="15m"):
+    MarketData.objects.bulk_create([
+        MarketData(symbol=symbol, timeframe=timeframe, timestamp=r.timestamp, open=r.open, high=r.high,
+                   low=r.low, close=r.close, volume=r.volume, provider="AllTick")
+        for r in df.itertuples()
+    ])
+
+
+def _stored_features(symbol="EURUSD", timeframe="15m"):
+    rows = (MarketDataFeatures.objects.filter(market_data__symbol=symbol, market_data__timeframe=timeframe)
+            .order_by("market_data__timestamp").values("market_data__timestamp", *FEATURE_COLUMNS))
+    return pd.DataFrame(list(rows)).set_index("market_data__timestamp")
+
+
+@pytest.mark.django_db
+def test_feature_task_resumes_from_state_and_rebuilds_on_back_insert(monkeypatch):
+    monkeypatch.setattr(pf, "planned_feature_columns", lambda: None)  # every column
+    df = _frame(300)
+    ref = process_data(df.copy()).set_index("timestamp")
+
+    _store(df.iloc[:200])
+    pf.run_feature_engineering("EURUSD")
+    state = IndicatorState.objects.get(symbol="EURUSD", timeframe="15m")
+    assert state.bars == 200 and state.last_ts == df.timestamp.iloc[199]
+
+    _store(df.iloc[200:])
+    assert pf.update_features("EURUSD", "15m") == 100  # only the new bars
+    _assert_matches(_stored_features(), ref)
+
+    # A bar repaired behind the state invalidates it: full rebuild, still exact
+    MarketData.objects.filter(timestamp=df.timestamp.iloc[50]).delete()
+    pf.update_features("EURUSD", "15m")
+    _store(df.iloc[50:51])
+    assert pf.update_features("EURUSD", "15m") == len(ref)
+    assert IndicatorState.objects.get(symbol="EURUSD", timeframe="15m").bars == 300
+    _assert_matches(_stored_features(), ref)
+
+
+@pytest.mark.django_db
+def test_bar_rewritten_in_place_behind_the_state_triggers_rebuild(django_assert_max_num_queries):
+    df = _frame(300)
+    _store(df)
+    pf.update_features("EURUSD", "15m")
+    with django_assert_max_num_queries(3):  # state, one indexed exists(), the new-bar scan; no count
+        assert pf.update_features("EURUSD", "15m") == 0
+
+    # Backfill overwrites a bar with corrected values: same bar count, different content
+    fixed = df.copy()
+    fixed.loc[120, ["high", "close"]] = fixed.loc[120, "high"] + 0.01, fixed.loc[120, "close"] + 0.005
+    upsert_market_bars([dict(r._asdict(), symbol="EURUSD", timeframe="15m") for r in fixed.iloc[120:121].itertuples(index=False)])
+    assert pf.update_features("EURUSD", "15m") > 100  # rebuilt, not skipped
+    _assert_matches(_stored_features(), process_data(fixed.copy()).set_index("timestamp"))
+
+
+@pytest.mark.django_db
+def test_forming_bar_is_not_folded(monkeypatch):
+    df = _frame(120)
+    _store(df)
+    forming = df.timestamp.iloc[-1] + pd.Timedelta(minutes=5)  # 10 minutes of the last bar left
+    monkeypatch.setattr(pf.timezone, "now", lambda: forming.to_pydatetime())
+    pf.update_features("EURUSD", "15m")
+    assert IndicatorState.objects.get().last_ts == df.timestamp.iloc[-2]
+
+
+def test_plan_keeps_rows_once_planned_columns_warm_up():
+    df = _frame(120)
+    cols = ["rsi_14", "rsi_overbought", "rsi_oversold"]
+    ref = process_data(df.copy(), columns=cols).set_index("timestamp")
+    engine, got = IndicatorEngine(), {}
+    for r in df.itertuples():
+        feats = engine.update(r.timestamp, r.open, r.high, r.low, r.close, r.volume, columns=cols)
+        if feats is not None:
+            got[r.timestamp] = feats
+    assert list(got) == list(ref.index)  # not held back until EMA 50 / ADX warm up
+    assert set(got[ref.index[0]]) == set(cols)
+    np.testing.assert_allclose([got[t]["rsi_14"] for t in ref.index], ref["rsi_14"], rtol=1e-8)
+
+
+@pytest.mark.django_db
+def test_update_features_under_a_plan_stores_the_rows_process_data_keeps():
+    df = _frame(120)
+    _store(df)
+    cols = ("rsi_14", "rsi_overbought", "rsi_oversold")
+    assert pf.update_features("EURUSD", "15m", cols) == len(process_data(df.copy(), columns=cols))
+
+
+@pytest.mark.django_db
+def test_stored_momentum_features_reach_the_model_vector():
+    df = _frame(120)
+    _store(df)
+    pf.update_features("EURUSD", "15m")
+    mdf = MarketDataFeatures.objects.select_related("market_data").order_by("-market_data__timestamp").first()
+    ta = TradeAnalysis(market_data_feature=mdf)
+
+    names = ["macd", "macd_signal", "adx", "cci", "obv", "stoch_k", "stoch_d", "willr"]
+    vec = to_vector_by_feature_names(ta, names)
+    assert vec == [pytest.approx(getattr(mdf, n)) for n in names]
+    assert all(v != 0.0 for v in vec)
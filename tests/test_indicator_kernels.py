@@ -0,0 +1,110 @@
+# tests/test_indicator_kernels.py
+# NumPy indicator kernels vs the `ta` / pandas reference on pipeline_outputs/preprocess_output.csv,
+# plus process_data end-to-end parity and the kernels' `out=` contract.
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from ta.momentum import RSIIndicator, StochasticOscillator, WilliamsRIndicator
+from ta.trend import ADXIndicator, CCIIndicator, EMAIndicator, MACD
+from ta.volatility import AverageTrueRange, BollingerBands
+from ta.volume import OnBalanceVolumeIndicator
+
+from ml_pipeline import indicators as ind
+from ml_pipeline.data_preprocessor import process_data
+
+CSV = Path(__file__).resolve().parents[1] / "pipeline_outputs" / "preprocess_output.csv"
+
+
+@pytest.fixture(scope="module")
+def ohlcv():
+    df = pd.read_csv(CSV, usecols=["timestamp", "open", "high", "low", "close", "volume", "provider"])
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df
+
+
+def _close(a, b):
+    np.testing.assert_allclose(np.asarray(a, dtype=float), np.asarray(b, dtype=float),
+                               rtol=1e-8, atol=1e-11, equal_nan=True)
+
+
+def test_kernels_match_ta(ohlcv):
+    h, l, c, v = (ind.as_f64(ohlcv[k]) for k in ("high", "low", "close", "volume"))
+    hs, ls, cs, vs = ohlcv["high"], ohlcv["low"], ohlcv["close"], ohlcv["volume"]
+
+    _close(ind.atr(h, l, c, 14), AverageTrueRange(hs, ls, cs, window=14).average_true_range())
+    for w in (8, 20, 50):
+        _close(ind.ema(c, w), EMAIndicator(cs, window=w).ema_indicator())
+    _close(ind.rsi(c, 14), RSIIndicator(cs, window=14).rsi())
+
+    bb = BollingerBands(cs, window=20, window_dev=2)
+    mavg, hband, lband, width = ind.bollinger(c, 20, 2)
+    _close(mavg, bb.bollinger_mavg())
+    _close(hband, bb.bollinger_hband())
+    _close(lband, bb.bollinger_lband())
+    ref_width = (bb.bollinger_hband() - bb.bollinger_lband()) / bb.bollinger_mavg()
+    _close(width, ref_width)
+
+    _close(ind.vwap(c, v), (cs * vs).cumsum() / vs.cumsum())
+    _close(ind.zscore(v, 20), (vs - vs.rolling(20).mean()) / vs.rolling(20).std())
+    _close(ind.rolling_quantile(width, 20, 0.2), ref_width.rolling(20).quantile(0.2))
+    ref_q = ref_width.rolling(20).quantile(0.2)
+    flips = ind.squeeze(width) != (ref_width < ref_q).astype(int).to_numpy()
+    # Squeeze may only differ where bandwidth ties its quantile up to float noise
+    assert np.all(np.abs(ref_width - ref_q).to_numpy()[flips] < 1e-12)
+
+
+def test_momentum_kernels_match_ta(ohlcv):
+    h, l, c, v = (ind.as_f64(ohlcv[k]) for k in ("high", "low", "close", "volume"))
+    hs, ls, cs, vs = ohlcv["high"], ohlcv["low"], ohlcv["close"], ohlcv["volume"]
+
+    ref = MACD(cs, window_slow=26, window_fast=12, window_sign=9)
+    line, signal = ind.macd(c, 12, 26, 9)
+    _close(line, ref.macd())
+    _close(signal, ref.macd_signal())
+    _close(ind.adx(h, l, c, 14), ADXIndicator(hs, ls, cs, window=14).adx())
+    np.testing.assert_allclose(ind.cci(h, l, c, 20), CCIIndicator(hs, ls, cs, window=20).cci(),
+                               rtol=1e-8, atol=1e-8, equal_nan=True)  # CCI is O(100): absolute noise
+    _close(ind.obv(c, v), OnBalanceVolumeIndicator(cs, vs).on_balance_volume())
+    stoch = StochasticOscillator(hs, ls, cs, window=14, smooth_window=3)
+    k, d = ind.stochastic(h, l, c, 14, 3)
+    _close(k, stoch.stoch())
+    _close(d, stoch.stoch_signal())
+    _close(ind.williams_r(h, l, c, 14), WilliamsRIndicator(hs, ls, cs, lbp=14).williams_r())
+
+
+def test_process_data_matches_stored_output_columns(ohlcv):
+    # Same rows process_data kept when preprocess_output.csv was written (ta-based at the time)
+    stored = pd.read_csv(CSV)
+    out = process_data(ohlcv.copy())
+    tail = stored.iloc[-len(out):]
+    # Recomputed on the already-trimmed frame the warm-up differs, so compare the settled tail
+    settled = slice(len(out) // 2, None)
+    for col in ("atr_14", "ema_8", "ema_20", "ema_50", "rsi_14", "bb_bbm", "bb_bandwidth", "volume_zscore"):
+        np.testing.assert_allclose(out[col].to_numpy()[settled], tail[col].to_numpy()[settled], rtol=1e-6, err_msg=col)
+
+
+def test_constant_windows_and_out_buffers():
+    v = np.array([5.0] * 25 + [6.0, 7.0])
+    z = ind.zscore(v, 20)
+    assert np.isnan(z[19:25]).all() and np.isfinite(z[25:]).all()
+
+    c = np.linspace(1.0, 2.0, 100)
+    buf = np.empty(100)
+    assert ind.ema(c, 8, out=buf) is buf
+    with pytest.raises(ValueError):
+        ind.ema(c, 8, out=np.empty(99))
+    assert (ind.atr(c, c, c, 14, out=np.empty(100))[:13] == 0).all()
+
+
+def test_bench_command_reports_speedup():
+    from io import StringIO
+
+    from django.core.management import call_command
+
+    buf = StringIO()
+    call_command("bench_indicators", repeat=1, stdout=buf)
+    lines = buf.getvalue().splitlines()
+    assert lines[0].startswith("bars=4934") and lines[-1].split()[0] == "total"
@@ -0,0 +1,127 @@
+# tests/test_ingest_fanout.py
+# Concurrent ingest_once: bounded fan-out, per-provider cap, backoff gating, batched write-back.
+
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from backend.models import MarketData, IngestionStatus
+from backend.tasks import ingest_tasks
+from backend.tasks import freshness as fresh_mod
+from providers.base import BaseProvider
+from providers.manager import ProviderManager
+
+
+PAIRS = ["EURUSD", "GBPUSD", "USDJPY", "AUDUSD"]
+TF = "1m"
+
+
+@pytest.fixture(autouse=True)
+def _cfg(monkeypatch):
+    monkeypatch.setattr(ingest_tasks, "parse_watchlist", lambda: {"pairs": PAIRS, "timeframes": [TF]})
+    monkeypatch.setattr(fresh_mod, "_cfg", lambda: {"freshness_seconds": {TF: 60}})
+    # fresh semaphore registry per test so caps are re-read
+    monkeypatch.setattr(ingest_tasks, "_PROVIDER_SEMAPHORES", {})
+    yield
+
+
+class _PerSymbolProvider(BaseProvider):
+    """No batch support: ingest_once must fall back to one job per symbol."""
+    name = "AllTick"
+
+    def __init__(self, fetch):
+        self._fetch = fetch
+
+    def fetch_bar(self, symbol, timeframe):
+        return self._fetch(symbol, timeframe)
+
+
+def _use_provider(monkeypatch, provider):
+    class _Manager(ProviderManager):
+        def choose(self, symbol, timeframe, prefer_batch=False):
+            return provider
+
+    monkeypatch.setattr(ingest_tasks, "ProviderManager", _Manager)
+
+
+def _bar(symbol, timeframe):
+    return {
+        "symbol": symbol, "timeframe": timeframe,
+        "timestamp": timezone.now().replace(second=0, microsecond=0),
+        "open": 1.0, "high": 1.001, "low": 0.999, "close": 1.0005, "volume": 0.0,
+    }
+
+
+@pytest.mark.django_db
+def test_fanout_respects_provider_cap_and_skips_backoff(monkeypatch):
+    monkeypatch.setattr(ingest_tasks, "INGEST_PROVIDER_CONCURRENCY", "AllTick=2")
+
+    IngestionStatus.objects.create(
+        symbol="AUDUSD", timeframe=TF, in_backoff=True, backoff_attempts=1,
+        backoff_until=timezone.now() + timedelta(minutes=5),
+    )
+
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0, "calls": []}
+
+    def fake_fetch(symbol, timeframe):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            state["calls"].append(symbol)
+        time.sleep(0.05)
+        with lock:
+            state["active"] -= 1
+        return _bar(symbol, timeframe)
+
+    _use_provider(monkeypatch, _PerSymbolProvider(fake_fetch))
+
+    out = ingest_tasks.ingest_once(max_workers=8)
+
+    assert sorted(state["calls"]) == ["EURUSD", "GBPUSD", "USDJPY"]
+    assert state["peak"] == 2
+    assert out == {"written": 3, "failed": 0, "skipped_backoff": 1, "requests": 3}
+    assert MarketData.objects.filter(timeframe=TF).count() == 3
+    assert not MarketData.objects.filter(symbol="AUDUSD").exists()
+
+
+@pytest.mark.django_db
+def test_failed_fetch_sets_backoff_without_blocking_others(monkeypatch):
+    def fake_fetch(symbol, timeframe):
+        if symbol == "GBPUSD":
+            raise TimeoutError("provider slow")
+        return _bar(symbol, timeframe)
+
+    _use_provider(monkeypatch, _PerSymbolProvider(fake_fetch))
+
+    out = ingest_tasks.ingest_once()
+
+    assert out["written"] == 3 and out["failed"] == 1
+    st = IngestionStatus.objects.get(symbol="GBPUSD", timeframe=TF)
+    assert st.in_backoff and st.backoff_attempts == 1 and st.backoff_until is not None
+    ok = IngestionStatus.objects.get(symbol="EURUSD", timeframe=TF)
+    assert not ok.in_backoff and ok.last_ingest_ts is not None
+
+
+@pytest.mark.django_db
+def test_batch_provider_gets_one_request_per_timeframe(monkeypatch):
+    calls = []
+
+    class _BatchProvider(BaseProvider):
+        name = "AllTick"
+        supports_batch = True
+
+        def fetch_bars(self, symbols, timeframe, since=None, last_closes=None):
+            calls.append((tuple(symbols), timeframe))
+            return {s: [_bar(s, timeframe)] for s in symbols}
+
+    _use_provider(monkeypatch, _BatchProvider())
+
+    out = ingest_tasks.ingest_once()
+
+    assert calls == [(tuple(PAIRS), TF)]
+    assert out["requests"] == 1 and out["written"] == len(PAIRS)
+    assert set(MarketData.objects.values_list("provider", flat=True)) == {"AllTick"}
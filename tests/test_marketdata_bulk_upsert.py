@@ -0,0 +1,87 @@
+# tests/test_marketdata_bulk_upsert.py
+# upsert_market_bars: one ON CONFLICT statement per chunk, inserted/updated counts, CSV import path.
+
+from datetime import datetime, timedelta, timezone as dt_tz
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from backend.models import MarketData
+from backend.tasks.utils import SQLITE_MAX_VARIABLES, statement_rows, upsert_market_bar, upsert_market_bars
+
+T0 = datetime(2025, 8, 4, 18, 47, tzinfo=dt_tz.utc)
+
+
+def _bars(n, close=1.1, symbol="EURUSD", tf="1m"):
+    return [
+        {
+            "symbol": symbol, "timeframe": tf, "timestamp": T0 + timedelta(minutes=i),
+            "open": 1.1, "high": 1.2, "low": 1.0, "close": close, "volume": 10.0,
+            "provider": "AllTick", "atr_14": 0.001,  # non-model keys are ignored
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.mark.django_db
+def test_counts_inserted_then_updated():
+    assert upsert_market_bars(_bars(5)) == {"inserted": 5, "updated": 0}
+
+    mixed = _bars(7, close=1.15)  # 5 existing + 2 new
+    assert upsert_market_bars(mixed) == {"inserted": 2, "updated": 5}
+
+    assert MarketData.objects.count() == 7
+    assert set(MarketData.objects.values_list("close", flat=True)) == {1.15}
+
+
+@pytest.mark.django_db
+def test_duplicate_keys_in_batch_collapse_to_last():
+    bars = _bars(1, close=1.1) + _bars(1, close=1.3)
+    assert upsert_market_bars(bars) == {"inserted": 1, "updated": 0}
+    assert MarketData.objects.get().close == 1.3
+
+
+@pytest.mark.django_db
+def test_query_count_is_per_chunk_not_per_bar():
+    with CaptureQueriesContext(connection) as ctx:
+        upsert_market_bars(_bars(180), batch_size=90)  # 90 rows x 10 columns: under SQLite's 999 variables
+    writes = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+    assert len(writes) == 2
+    assert len(ctx.captured_queries) < 10
+
+
+@pytest.mark.django_db
+def test_insert_statements_fit_sqlite_variable_cap():
+    assert statement_rows(MarketData) == SQLITE_MAX_VARIABLES // 10  # 10 columns per row
+    with CaptureQueriesContext(connection) as ctx:
+        assert upsert_market_bars(_bars(250)) == {"inserted": 250, "updated": 0}
+    writes = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+    probes = [q for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+    assert len(writes) == 3 and len(probes) == 1  # one 500-bar chunk, INSERTs of 99 rows
+
+
+@pytest.mark.django_db
+def test_single_bar_wrapper_still_idempotent():
+    bar = _bars(1)[0]
+    upsert_market_bar(bar)
+    upsert_market_bar(dict(bar, close=1.05))
+    assert MarketData.objects.count() == 1
+    assert MarketData.objects.get().close == 1.05
+
+
+@pytest.mark.django_db
+def test_import_marketdata_csv_command(tmp_path):
+    path = tmp_path / "bars.csv"
+    path.write_text(
+        "timestamp,open,high,low,close,volume\n"
+        "2025-08-04 18:47:00,1.15697,1.15703,1.15696,1.15701,598.0\n"
+        "2025-08-04 18:48:00,1.15701,1.15706,1.15699,1.15699,950.0\n"
+    )
+    call_command("import_marketdata_csv", csv=str(path), pair="EURUSD", tf="1m", chunk=1)
+    call_command("import_marketdata_csv", csv=str(path), pair="EURUSD", tf="1m")
+
+    rows = list(MarketData.objects.order_by("timestamp").values("timestamp", "close", "provider"))
+    assert [r["timestamp"] for r in rows] == [T0, T0 + timedelta(minutes=1)]
+    assert rows[0]["provider"] == "CSV"
@@ -0,0 +1,175 @@
+# tests/test_marketdata_gaps.py
+# Gap scanner: one pass finds missing runs (New York weekend closure excluded, leading run
+# from the window start, trailing run up to now and series without bars included), the
+# ledger dedupes re-scans (also concurrent ones) and re-dispatches stale QUEUED rows, and
+# targeted repair fills exactly the missing range.
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+import pytest
+
+from backend.ingestion import gaps as gaps_mod
+from backend.ingestion.gaps import find_gaps, repair_gap, scan_gaps
+from backend.models import GapRepair, MarketData
+from backend.tasks.utils import upsert_market_bars
+from providers.base import BaseProvider
+
+TF = "15m"
+STEP = 900
+# Wednesday 2025-01-08 00:00 UTC
+T0 = datetime(2025, 1, 8, tzinfo=dt_timezone.utc)
+# Slot 10 has just closed: no trailing bars are missing yet
+AFTER_SLOT_10 = T0 + timedelta(seconds=STEP * 11)
+
+
+@pytest.fixture(autouse=True)
+def _cfg(monkeypatch):
+    monkeypatch.setattr(gaps_mod, "_cfg", lambda: {
+        "pairs": ["EURUSD", "GBPUSD"], "timeframes": [TF], "lookback_hours": 24 * 7, "skip_weekends": True,
+        "requeue_after_min": 30.0, "trailing_grace_sec": 120,
+    })
+    yield
+
+
+def _bars(symbol, slots):
+    return [{"symbol": symbol, "timeframe": TF, "timestamp": T0 + timedelta(seconds=STEP * i),
+             "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "volume": 0.0} for i in slots]
+
+
+class _History(BaseProvider):
+    name = "AllTick"
+
+    def __init__(self, skip=()):
+        self.calls = []
+        self.skip = set(skip)
+
+    def fetch_history(self, symbol, timeframe, start, end, limit=5000):
+        self.calls.append((symbol, start, end))
+        out, t = [], start
+        while t < end:
+            if t not in self.skip:
+                out.append({"symbol": symbol, "timeframe": timeframe, "timestamp": t,
+                            "open": 2.0, "high": 2.0, "low": 2.0, "close": 2.0, "volume": 1.0})
+            t += timedelta(seconds=STEP)
+        return out
+
+
+def test_find_gaps_splits_runs_and_skips_fx_weekend():
+    s = lambda dt: int(dt.timestamp())
+    # January (EST): the weekend is Friday 22:00 → Sunday 22:00 UTC
+    fri_21 = datetime(2025, 1, 10, 21, 0, tzinfo=dt_timezone.utc)
+    sun_22 = datetime(2025, 1, 12, 22, 0, tzinfo=dt_timezone.utc)
+    # Friday 21:00 → Sunday 22:00 leaves 21:15..21:45 missing; the weekend itself is expected
+    stamps = np.array([s(fri_21), s(sun_22)], dtype=np.int64)
+    assert find_gaps(stamps, STEP) == [(s(fri_21) + STEP, s(fri_21) + 3 * STEP, 3)]
+    assert find_gaps(stamps, STEP, skip_weekends=False)[0][2] == (s(sun_22) - s(fri_21)) // STEP - 1
+
+    # July (EDT): the same New York 17:00 close is 21:00 UTC
+    fri_20 = datetime(2025, 7, 11, 20, 0, tzinfo=dt_timezone.utc)
+    sun_21 = datetime(2025, 7, 13, 21, 0, tzinfo=dt_timezone.utc)
+    stamps = np.array([s(fri_20), s(sun_21)], dtype=np.int64)
+    assert find_gaps(stamps, STEP) == [(s(fri_20) + STEP, s(fri_20) + 3 * STEP, 3)]
+
+
+def test_find_gaps_reports_trailing_run_up_to_series_end():
+    stamps = np.array([0, STEP, 2 * STEP], dtype=np.int64) + int(T0.timestamp())
+    end = int(T0.timestamp()) + 6 * STEP
+    assert find_gaps(stamps, STEP) == []
+    assert find_gaps(stamps, STEP, end=end) == [(stamps[-1] + STEP, end - STEP, 3)]
+    assert find_gaps(stamps, STEP, end=int(stamps[-1])) == []
+    assert find_gaps(stamps[:1], STEP, end=int(stamps[0]) + 2 * STEP) == [(stamps[0] + STEP, stamps[0] + STEP, 1)]
+
+
+@pytest.mark.django_db
+def test_scan_queues_each_gap_once_and_repair_fills_it(django_assert_max_num_queries):
+    upsert_market_bars(_bars("EURUSD", [0, 1, 2, 6, 7, 10]) + _bars("GBPUSD", range(11)))
+
+    with django_assert_max_num_queries(4):  # series pass + ledger read + ledger insert + queued ids
+        out = scan_gaps(since=T0, now=AFTER_SLOT_10)
+    assert out["gaps"] == 2 and out["missing_bars"] == 5
+    ledger = list(GapRepair.objects.order_by("gap_start"))
+    assert [(g.symbol, g.gap_start, g.gap_end, g.missing_bars) for g in ledger] == [
+        ("EURUSD", T0 + timedelta(seconds=STEP * 3), T0 + timedelta(seconds=STEP * 5), 3),
+        ("EURUSD", T0 + timedelta(seconds=STEP * 8), T0 + timedelta(seconds=STEP * 9), 2),
+    ]
+    assert scan_gaps(since=T0, now=AFTER_SLOT_10)["queued"] == []  # still QUEUED → not duplicated
+
+    provider = _History()
+    for gap in ledger:
+        assert repair_gap(gap.pk, provider=provider)["status"] == "REPAIRED"
+    # minimal range fetches: exactly the missing bars, end exclusive
+    assert [(c[1], c[2]) for c in provider.calls] == [
+        (T0 + timedelta(seconds=STEP * 3), T0 + timedelta(seconds=STEP * 6)),
+        (T0 + timedelta(seconds=STEP * 8), T0 + timedelta(seconds=STEP * 10)),
+    ]
+    assert MarketData.objects.filter(symbol="EURUSD").count() == 11
+    assert scan_gaps(since=T0, now=AFTER_SLOT_10)["gaps"] == 0
+
+
+@pytest.mark.django_db
+def test_provider_without_data_ends_unfillable(monkeypatch):
+    monkeypatch.setattr(gaps_mod, "GAP_MAX_REPAIR_ATTEMPTS", 2)
+    upsert_market_bars(_bars("EURUSD", [0, 3]))
+    missing = {T0 + timedelta(seconds=STEP * 2)}
+    provider = _History(skip=missing)
+
+    gap_id = scan_gaps(["EURUSD"], since=T0, now=T0 + timedelta(hours=1))["queued"][0]
+    assert repair_gap(gap_id, provider=provider)["status"] == "PARTIAL"
+
+    # still missing → requeued once more, then given up on
+    assert scan_gaps(["EURUSD"], since=T0, now=T0 + timedelta(hours=1))["queued"] != []
+    gap_id = GapRepair.objects.get(status="QUEUED").pk
+    assert repair_gap(gap_id, provider=provider)["status"] == "UNFILLABLE"
+    assert scan_gaps(["EURUSD"], since=T0, now=T0 + timedelta(hours=1))["queued"] == []
+
+
+@pytest.mark.django_db
+def test_scan_queues_trailing_gap_up_to_now():
+    upsert_market_bars(_bars("EURUSD", range(4)) + _bars("GBPUSD", range(8)))
+    # slots 4..7 closed (slot 8 is forming); slot 7 closed 60s ago, inside the grace period
+    out = scan_gaps(since=T0, now=T0 + timedelta(seconds=STEP * 8 + 60))
+    assert out["gaps"] == 1 and out["missing_bars"] == 3
+    gap = GapRepair.objects.get()
+    assert (gap.symbol, gap.gap_start, gap.gap_end) == (
+        "EURUSD", T0 + timedelta(seconds=STEP * 4), T0 + timedelta(seconds=STEP * 6))
+
+
+@pytest.mark.django_db
+def test_stale_queued_row_is_dispatched_again():
+    upsert_market_bars(_bars("EURUSD", [0, 3]))
+    now = T0 + timedelta(hours=1)
+    gap_id = scan_gaps(["EURUSD"], since=T0, now=now)["queued"][0]
+    assert scan_gaps(["EURUSD"], since=T0, now=now)["queued"] == []  # fresh QUEUED row: its repair is in flight
+
+    # the repair task was lost: nobody touched the row for longer than GAP_REQUEUE_AFTER_MIN
+    GapRepair.objects.filter(pk=gap_id).update(updated_at=gaps_mod.timezone.now() - timedelta(hours=2))
+    assert scan_gaps(["EURUSD"], since=T0, now=now)["queued"] == [gap_id]
+    assert scan_gaps(["EURUSD"], since=T0, now=now)["queued"] == []
+
+
+@pytest.mark.django_db
+def test_scan_covers_the_window_start_and_series_without_bars():
+    upsert_market_bars(_bars("EURUSD", [2, 3]))  # GBPUSD: no bars at all (outage / new pair)
+    out = scan_gaps(since=T0, now=T0 + timedelta(seconds=STEP * 4 + 300))
+    assert out["series"] == 2 and out["missing_bars"] == 2 + 4
+    assert {(g.symbol, g.gap_start, g.gap_end, g.missing_bars) for g in GapRepair.objects.all()} == {
+        ("EURUSD", T0, T0 + timedelta(seconds=STEP), 2),
+        ("GBPUSD", T0, T0 + timedelta(seconds=STEP * 3), 4),
+    }
+
+
+@pytest.mark.django_db
+def test_concurrent_scans_do_not_collide_on_the_ledger(monkeypatch):
+    upsert_market_bars(_bars("EURUSD", [0, 3]) + _bars("GBPUSD", range(4)))
+    now = T0 + timedelta(seconds=STEP * 4 + 300)
+    real = GapRepair.objects.bulk_create
+
+    def _raced(objs, **kwargs):  # the other scan inserts the same run in between
+        GapRepair.objects.create(symbol="EURUSD", timeframe=TF, gap_start=objs[0].gap_start,
+                                 gap_end=objs[0].gap_end, missing_bars=objs[0].missing_bars)
+        return real(objs, **kwargs)
+
+    monkeypatch.setattr(GapRepair.objects, "bulk_create", _raced)
+    out = scan_gaps(since=T0, now=now)
+    assert out["queued"] == [GapRepair.objects.get().pk]
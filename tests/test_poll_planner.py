@@ -0,0 +1,145 @@
+# tests/test_poll_planner.py
+# Adaptive poll planner: activity/quota driven intervals, heap ordering (busy first),
+# cross-process planning lock, autoslowdown switch (and the legacy fallback on a per-process
+# cache) and ingest_once(series=...) restricting the fetch.
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pytest
+from django.core.cache import cache
+
+from backend.ingestion import poll_planner as pp
+from backend.ingestion.poll_planner import PollPlanner, activity, interval_sec, plan_due, quota_factor
+from backend.models import MarketData, ProviderTelemetry
+from backend.net import shared_cache
+from backend.preferences.models import UserPreference
+from backend.tasks import freshness as fresh_mod
+from backend.tasks import ingest_tasks, scheduler as sched_mod
+from providers.base import BaseProvider
+from providers.manager import ProviderManager
+
+NOW = datetime(2025, 1, 8, 12, 0, tzinfo=dt_timezone.utc)
+STEP = timedelta(minutes=15)
+
+
+def _series(symbol, recent_range, n=100, recent=14, volume=10.0, recent_volume=None):
+    rows = []
+    for i in range(n):
+        ts = NOW - STEP * (n - i)
+        rng = recent_range if i >= n - recent else 0.001
+        vol = recent_volume if (recent_volume is not None and i >= n - recent) else volume
+        rows.append(MarketData(symbol=symbol, timeframe="15m", timestamp=ts, open=1.0, high=1.0 + rng,
+                               low=1.0, close=1.0, volume=vol, provider="AllTick"))
+    MarketData.objects.bulk_create(rows)
+
+
+@pytest.fixture(autouse=True)
+def _clean(monkeypatch):
+    cache.clear()
+    monkeypatch.setattr(pp, "parse_watchlist",
+                        lambda: {"pairs": ["EURUSD", "USDJPY", "GBPUSD"], "timeframes": ["15m"]})
+    yield
+    cache.clear()
+
+
+def test_interval_scales_with_timeframe_activity_and_quota():
+    assert interval_sec("15m") == 60.0
+    assert interval_sec("1h") == 240.0
+    assert interval_sec("1m") == pp.POLL_MIN_SEC
+    assert interval_sec("15m", act=4.0) == 15.0 and interval_sec("15m", act=0.25) == 240.0
+    assert interval_sec("1m", act=0.05) == 60.0             # quiet never skips a whole bar ...
+    assert interval_sec("1m", act=0.05, quota=2.0) == 160.0  # ... unless quota runs short
+    assert interval_sec("15m", quota=100.0) == pp.POLL_MAX_SEC
+
+
+@pytest.mark.django_db
+def test_activity_from_recent_atr_and_volume():
+    _series("EURUSD", recent_range=0.004)                       # ranges widened recently
+    _series("USDJPY", recent_range=0.001, recent_volume=1.0)    # volume dried up
+    act = activity([("EURUSD", "15m"), ("USDJPY", "15m"), ("GBPUSD", "15m")], NOW)
+    assert act[("EURUSD", "15m")] > 1.5
+    assert act[("USDJPY", "15m")] < 0.75
+    assert act[("GBPUSD", "15m")] == 1.0  # no data: typical
+
+
+@pytest.mark.django_db
+def test_quota_factor_from_provider_telemetry():
+    assert quota_factor("AllTick") == 1.0
+    ProviderTelemetry.objects.create(provider="AllTick", quota_usage_pct=90.0)
+    assert quota_factor("AllTick") == pytest.approx(4.0)
+
+
+@pytest.mark.django_db
+def test_heap_polls_busy_pairs_more_often(monkeypatch):
+    _series("EURUSD", recent_range=0.004)
+    _series("USDJPY", recent_range=0.0002, recent_volume=1.0)
+    planner = PollPlanner()
+
+    assert set(planner.due(NOW, provider="AllTick")) == {("EURUSD", "15m"), ("USDJPY", "15m"), ("GBPUSD", "15m")}
+    assert planner.due(NOW + timedelta(seconds=5), provider="AllTick") == []
+
+    polls = {"EURUSD": 0, "USDJPY": 0, "GBPUSD": 0}
+    for k in range(1, 41):  # ten minutes of 15s planner ticks
+        for sym, _ in planner.due(NOW + timedelta(seconds=15 * k), provider="AllTick"):
+            polls[sym] += 1
+    assert polls["EURUSD"] > polls["GBPUSD"] > polls["USDJPY"]
+
+    # Capped tick: the busiest due series goes first, the rest wait
+    monkeypatch.setattr(pp, "POLL_MAX_SERIES_PER_TICK", 1)
+    planner.reset()
+    assert planner.due(NOW, provider="AllTick") == [("EURUSD", "15m")]
+    assert len(planner.heap()) == 3
+
+
+@pytest.mark.django_db
+def test_tick_dispatches_only_due_series_unless_autoslowdown_off(monkeypatch):
+    sent = []
+    monkeypatch.setattr(sched_mod, "ingest_once", type("X", (), {"delay": staticmethod(lambda **kw: sent.append(kw))}))
+    monkeypatch.setattr(sched_mod, "_cfg", lambda: {"pairs": [], "timeframes": []})
+
+    sched_mod.tick()
+    sched_mod.tick()
+    assert len(sent[0]["series"]) == 3 and len(sent) == 1  # second tick: nothing due yet
+
+    UserPreference.objects.create(pk=1, autoslowdown_enabled=False)
+    assert plan_due() is None
+    sched_mod.tick()
+    assert sent[-1] == {}  # legacy: poll everything
+
+
+@pytest.mark.django_db
+def test_one_planner_at_a_time_and_only_on_a_shared_cache(settings):
+    planner = PollPlanner()
+    with shared_cache.lock(cache, pp.LOCK_NAME):  # another worker is planning
+        assert planner.due(NOW, provider="AllTick") is None
+    assert len(planner.due(NOW, provider="AllTick")) == 3
+
+    # LocMem with real workers: each would keep its own heap, so poll everything instead
+    settings.CELERY_TASK_ALWAYS_EAGER = False
+    assert plan_due() is None
+
+
+@pytest.mark.django_db
+def test_ingest_once_series_limits_fetch(monkeypatch):
+    asked = []
+
+    class _P(BaseProvider):
+        name = "AllTick"
+        supports_batch = True
+
+        def fetch_bars(self, symbols, timeframe, since=None, last_closes=None):
+            asked.append((tuple(symbols), timeframe))
+            return {s: [] for s in symbols}
+
+    class _Manager(ProviderManager):
+        def choose(self, symbol, timeframe, prefer_batch=False):
+            return _P()
+
+    monkeypatch.setattr(ingest_tasks, "ProviderManager", _Manager)
+    monkeypatch.setattr(ingest_tasks, "_PROVIDER_SEMAPHORES", {})
+    monkeypatch.setattr(ingest_tasks, "parse_watchlist",
+                        lambda: {"pairs": ["EURUSD", "USDJPY"], "timeframes": ["15m", "1h"]})
+    monkeypatch.setattr(fresh_mod, "_cfg", lambda: {"freshness_seconds": {"15m": 1800, "1h": 5400}})
+
+    out = ingest_tasks.ingest_once(series=[["USDJPY", "1h"]])
+    assert asked == [(("USDJPY",), "1h")] and out["requests"] == 1
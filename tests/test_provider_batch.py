@@ -0,0 +1,45 @@
+# tests/test_provider_batch.py
+# fetch_bars() contract: per-symbol fallback on BaseProvider, batched AllTick shim, batch-aware choose().
+
+from providers.base import BaseProvider
+from providers.alltick import AllTick
+from providers.twelvedata_stub import TwelveData
+from providers import manager as manager_mod
+from providers.manager import ProviderManager
+
+
+def test_base_fetch_bars_falls_back_to_fetch_bar():
+    seen = []
+
+    class P(BaseProvider):
+        def fetch_bar(self, symbol, timeframe):
+            seen.append(symbol)
+            return None if symbol == "GBPUSD" else {"symbol": symbol, "timeframe": timeframe}
+
+    out = P().fetch_bars(["EURUSD", "GBPUSD"], "1m")
+    assert seen == ["EURUSD", "GBPUSD"]
+    assert out == {"EURUSD": [{"symbol": "EURUSD", "timeframe": "1m"}], "GBPUSD": []}
+    assert P.supports_batch is False
+    assert P().fetch_bars(["EURUSD"], "1m", since="2025-01-01") == {"EURUSD": [out["EURUSD"][0]]}  # latest only
+
+
+def test_alltick_fetch_bars_dev_fake_seeds_from_last_close(monkeypatch):
+    from backend.ingestion import temp_alltick_shim as shim
+    monkeypatch.setattr(shim, "DEV_FAKE", "1")
+
+    out = AllTick().fetch_bars(["EURUSD", "USDJPY"], "15m", last_closes={"USDJPY": 150.0})
+    assert set(out) == {"EURUSD", "USDJPY"}
+    assert len(out["USDJPY"]) == 1 and out["USDJPY"][0]["open"] == 150.0
+    assert out["EURUSD"][0]["timeframe"] == "15m"
+
+
+def test_choose_prefers_batch_provider_only_when_fallbacks_allowed(monkeypatch):
+    monkeypatch.setattr(manager_mod, "_db_order_or_none", lambda: None)
+    monkeypatch.setattr(TwelveData, "supports_batch", False)
+
+    strict = ProviderManager(order_env="TwelveData,AllTick", allow_fallbacks_env="0")
+    assert strict.choose("EURUSD", "1m", prefer_batch=True).name == "TwelveData"
+
+    relaxed = ProviderManager(order_env="TwelveData,AllTick", allow_fallbacks_env="1")
+    assert relaxed.choose("EURUSD", "1m", prefer_batch=True).name == "AllTick"
+    assert relaxed.choose("EURUSD", "1m").name == "TwelveData"
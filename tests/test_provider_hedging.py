@@ -0,0 +1,160 @@
+# tests/test_provider_hedging.py
+# Latency-aware ProviderManager: rolling p50/p95 demotion, hedged requests after the
+# primary's delay, and fallback attribution on IngestionStatus. Slow providers block on an
+# event instead of sleeping, so the ordering never depends on scheduler timing.
+
+import threading
+
+import pytest
+from django.core.cache import cache
+
+from backend.ingestion.quota_budget import get_quota_budget
+from backend.models import IngestionStatus, MarketData
+from backend.tasks import freshness as fresh_mod
+from backend.tasks import ingest_tasks
+from providers import manager as manager_mod
+from providers.base import BaseProvider
+from providers.latency import TRACKER
+from providers.manager import ProviderManager
+from providers.twelvedata_stub import TwelveData
+
+TF = "1m"
+calls = {"AllTick": 0, "TwelveData": 0}
+
+
+def _make(name, gate=None, fail=False):
+    """Provider class answering at once, or only once `gate` is set."""
+    class _P(BaseProvider):
+        supports_batch = True
+
+        def fetch_bars(self, symbols, timeframe, since=None, last_closes=None):
+            calls[name] += 1
+            if gate is not None:
+                assert gate.wait(timeout=5), f"{name} never released"
+            if fail:
+                raise TimeoutError(f"{name} down")
+            return {s: [{"symbol": s, "timeframe": timeframe, "timestamp": fresh_mod.timezone.now(),
+                         "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "volume": 0.0}] for s in symbols}
+    _P.name = name
+    return _P
+
+
+@pytest.fixture(autouse=True)
+def _reset(monkeypatch):
+    TRACKER.reset()
+    cache.clear()  # quota budget usage counters
+    calls.update({"AllTick": 0, "TwelveData": 0})
+    monkeypatch.setattr(manager_mod, "_db_order_or_none", lambda: None)
+    monkeypatch.setattr(manager_mod, "HEDGE_DELAY_MS", "50")
+    yield
+    TRACKER.reset()
+    cache.clear()
+
+
+@pytest.fixture
+def measured(monkeypatch):
+    """One event per provider, set once the tracker has recorded a call of it."""
+    events = {"AllTick": threading.Event(), "TwelveData": threading.Event()}
+    record = TRACKER.record
+
+    def _record(provider, ms, ok=True):
+        record(provider, ms, ok=ok)
+        events[provider].set()
+
+    monkeypatch.setattr(TRACKER, "record", _record)
+    return events
+
+
+def _providers(monkeypatch, primary, secondary):
+    monkeypatch.setitem(manager_mod._PROVIDER_REGISTRY, "AllTick", primary)
+    monkeypatch.setitem(manager_mod._PROVIDER_REGISTRY, "TwelveData", secondary)
+    return ProviderManager(order_env="AllTick,TwelveData", allow_fallbacks_env="1")
+
+
+def test_slow_primary_is_hedged_and_loser_latency_recorded(monkeypatch, measured):
+    release = threading.Event()
+    mgr = _providers(monkeypatch, _make("AllTick", gate=release), _make("TwelveData"))
+
+    out, served = mgr.fetch_bars(mgr.choose("EURUSD", TF), ["EURUSD"], TF)  # primary still blocked
+    assert served == "TwelveData" and list(out) == ["EURUSD"]
+    assert not measured["AllTick"].is_set()
+
+    release.set()  # the primary finishes in the background and is still measured
+    assert measured["AllTick"].wait(timeout=5)
+    assert TRACKER.snapshot()["AllTick"]["samples"] == 1
+
+
+def test_fast_primary_fires_no_hedge(monkeypatch):
+    monkeypatch.setattr(manager_mod, "HEDGE_DELAY_MS", "60000")
+    mgr = _providers(monkeypatch, _make("AllTick"), _make("TwelveData"))
+    _, served = mgr.fetch_bars(mgr.choose("EURUSD", TF), ["EURUSD"], TF)
+    assert served == "AllTick" and calls["TwelveData"] == 0
+
+
+def test_failing_primary_fails_over_immediately(monkeypatch):
+    monkeypatch.setattr(manager_mod, "HEDGE_DELAY_MS", "60000")  # waiting for the hedge timer would take a minute
+    mgr = _providers(monkeypatch, _make("AllTick", fail=True), _make("TwelveData"))
+
+    _, served = mgr.fetch_bars(mgr.choose("EURUSD", TF), ["EURUSD"], TF)
+    assert served == "TwelveData"
+
+
+def test_both_failing_raises_primary_error(monkeypatch):
+    mgr = _providers(monkeypatch, _make("AllTick", fail=True), _make("TwelveData", fail=True))
+    with pytest.raises(TimeoutError, match="AllTick down"):
+        mgr.fetch_bars(mgr.choose("EURUSD", TF), ["EURUSD"], TF)
+
+
+def test_rolling_p95_and_error_streak_demote_primary(monkeypatch):
+    monkeypatch.setattr(manager_mod, "FAILOVER_P95_MS", 1000.0)
+    mgr = _providers(monkeypatch, _make("AllTick"), _make("TwelveData"))
+    assert mgr.choose("EURUSD", TF).name == "AllTick"
+
+    for _ in range(10):
+        TRACKER.record("AllTick", 2500.0)
+        TRACKER.record("TwelveData", 120.0)
+    assert mgr.ranked() == ["TwelveData", "AllTick"]
+    assert mgr.choose("EURUSD", TF).name == "TwelveData"
+    assert mgr.primary() == "AllTick"
+
+    strict = ProviderManager(order_env="AllTick,TwelveData", allow_fallbacks_env="0")
+    assert strict.choose("EURUSD", TF).name == "AllTick"
+
+
+def test_stub_provider_is_never_a_hedge(monkeypatch):
+    mgr = _providers(monkeypatch, _make("AllTick", fail=True), TwelveData)
+    assert mgr._hedge_for("AllTick") is None
+    with pytest.raises(TimeoutError, match="AllTick down"):  # the primary's error, not NotImplementedError
+        mgr.fetch_bars(mgr.choose("EURUSD", TF), ["EURUSD"], TF)
+
+
+def test_every_issued_request_is_reported(monkeypatch, measured):
+    release = threading.Event()
+    mgr = _providers(monkeypatch, _make("AllTick", gate=release), _make("TwelveData"))
+    issued = []
+
+    _, served = mgr.fetch_bars(mgr.choose("EURUSD", TF), ["EURUSD"], TF, called=issued.append)
+    assert served == "TwelveData" and sorted(issued) == ["AllTick", "TwelveData"]  # the loser spent quota too
+    release.set()
+    assert measured["AllTick"].wait(timeout=5)
+
+
+@pytest.mark.django_db
+def test_ingest_marks_fallback_active_when_hedge_serves(monkeypatch, measured):
+    release = threading.Event()
+    mgr = _providers(monkeypatch, _make("AllTick", gate=release), _make("TwelveData"))
+    monkeypatch.setattr(ingest_tasks, "ProviderManager", lambda: mgr)
+    monkeypatch.setattr(ingest_tasks, "parse_watchlist", lambda: {"pairs": ["EURUSD"], "timeframes": [TF]})
+    monkeypatch.setattr(fresh_mod, "_cfg", lambda: {"freshness_seconds": {TF: 60}})
+    monkeypatch.setattr(ingest_tasks, "_PROVIDER_SEMAPHORES", {})
+
+    out = ingest_tasks.ingest_once()
+
+    assert out["written"] == 1
+    st = IngestionStatus.objects.get(symbol="EURUSD", timeframe=TF)
+    assert st.provider == "TwelveData" and st.fallback_active
+    assert MarketData.objects.get(symbol="EURUSD").provider == "TwelveData"
+    used = {p: get_quota_budget().used(p, [("EURUSD", TF)])[("EURUSD", TF)] for p in ("AllTick", "TwelveData")}
+    assert used == {"AllTick": 1.0, "TwelveData": 1.0}  # the hedge's loser is charged as well
+    release.set()  # let the losing primary finish before the next test resets TRACKER
+    assert measured["AllTick"].wait(timeout=5)
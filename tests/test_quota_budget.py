@@ -0,0 +1,145 @@
+# tests/test_quota_budget.py
+# Daily quota budget per (provider, symbol, timeframe): capacity from the tightest window,
+# re-planning on actual usage, and its consumers (poll planner, ProviderManager, API).
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from backend.ingestion import poll_planner as pp
+from backend.ingestion.poll_planner import PollPlanner
+from backend.ingestion.quota_budget import QuotaBudget, daily_capacity, get_quota_budget
+from backend.net import ratelimit as rl
+from backend.tasks import freshness as fresh_mod
+from backend.tasks import ingest_tasks
+from providers import manager as manager_mod
+from providers.base import BaseProvider
+from providers.manager import ProviderManager
+
+MIDNIGHT = datetime(2025, 1, 8, 0, 0, tzinfo=dt_timezone.utc)
+NOON = MIDNIGHT + timedelta(hours=12)
+
+
+@pytest.fixture(autouse=True)
+def _setup(monkeypatch):
+    cache.clear()
+    monkeypatch.setattr(rl, "PROVIDER_RATE_LIMITS", "AllTick=second:10,minute:300,daily:1000;TwelveData=daily:800")
+    monkeypatch.setattr(rl, "_LIMITERS", {})
+    monkeypatch.setattr(pp, "parse_watchlist", lambda: {"pairs": ["EURUSD", "GBPUSD"], "timeframes": ["15m"]})
+    monkeypatch.setattr(manager_mod, "_db_order_or_none", lambda: None)
+    yield
+    cache.clear()
+
+
+def test_capacity_is_tightest_window():
+    assert daily_capacity({"second": 10, "minute": 300, "daily": 20000}) == 20000
+    assert daily_capacity({"second": 1, "minute": 300}) == 86400
+    assert daily_capacity({}) is None
+
+
+def test_limits_come_from_provider_config_without_overrides(monkeypatch):
+    monkeypatch.setattr(rl, "PROVIDER_RATE_LIMITS", "")
+    plan = QuotaBudget().plan("EODHD", MIDNIGHT)
+    assert plan["limits"] == {"minute": 8, "daily": 800} and plan["capacity"] == 800
+    assert QuotaBudget().plan("Finage", MIDNIGHT) is None  # no rate_limit: not budgeted
+
+
+def test_start_of_day_plan_scales_demand_to_usable_capacity():
+    plan = QuotaBudget().plan("AllTick", MIDNIGHT)
+    # 15m polls every 60s → 1440 batched requests/day shared by two pairs
+    assert plan["demand"] == 1440.0 and plan["usable"] == 900.0
+    assert plan["series"][("EURUSD", "15m")]["budget"] == pytest.approx(450.0)
+    assert plan["budget"] == pytest.approx(900.0) and plan["actual"] == 0.0
+    assert QuotaBudget().plan("Nope", MIDNIGHT) is None
+
+
+def test_replan_on_actual_usage_and_pace():
+    qb = QuotaBudget()
+    for _ in range(400):
+        qb.record_usage("AllTick", ["EURUSD"], "15m", now=NOON)
+    for _ in range(100):
+        qb.record_usage("AllTick", ["EURUSD", "GBPUSD"], "15m", now=NOON)  # batched: half each
+
+    plan = qb.plan("AllTick", NOON, force=True)
+    eur, gbp = plan["series"][("EURUSD", "15m")], plan["series"][("GBPUSD", "15m")]
+    assert (eur["used"], gbp["used"]) == (450.0, 50.0) and plan["actual"] == 500.0
+    # 400 left over the remaining 720 demanded → every series gets 5/9 of its remaining demand
+    assert eur["budget"] == pytest.approx(450.0 + 360 * 400 / 720)
+    assert plan["projected_eod"] == 1000.0 and plan["over_budget"] and plan["pressure"]
+    assert qb.pace_factor("AllTick", "EURUSD", "15m", NOON) > 1.3
+    assert qb.pace_factor("AllTick", "GBPUSD", "15m", NOON) == 1.0
+    assert not qb.exhausted("AllTick", NOON)
+
+    for _ in range(400):
+        qb.record_usage("AllTick", ["GBPUSD"], "15m", now=NOON)
+    assert qb.plan("AllTick", NOON, force=True)["actual"] == 900.0
+    assert qb.exhausted("AllTick", NOON)
+
+
+def test_busy_series_is_not_throttled_with_ample_capacity(monkeypatch):
+    monkeypatch.setattr(rl, "PROVIDER_RATE_LIMITS", "AllTick=daily:100000")
+    qb = QuotaBudget()
+    for _ in range(1440):  # four times its base cadence by noon
+        qb.record_usage("AllTick", ["EURUSD"], "15m", now=NOON)
+    plan = qb.plan("AllTick", NOON, force=True)
+    assert plan["series"][("EURUSD", "15m")]["pace_factor"] > 1.0
+    assert plan["scale"] == 1.0 and not plan["pressure"]
+    assert qb.pace_factor("AllTick", "EURUSD", "15m", NOON) == 1.0
+
+
+def test_over_pace_series_polls_slower(monkeypatch):
+    monkeypatch.setattr(pp, "activity", lambda series, now=None: {s: 1.0 for s in series})
+    monkeypatch.setattr(pp, "quota_factor", lambda provider: 1.0)
+    for _ in range(450):
+        get_quota_budget().record_usage("AllTick", ["EURUSD"], "15m", now=NOON)
+
+    planner = PollPlanner()
+    planner.due(NOON, provider="AllTick")
+    due_at = {e[2]: e[0] - NOON.timestamp() for e in planner.heap()}
+    assert due_at["GBPUSD"] == 60.0 and due_at["EURUSD"] > 60.0
+
+
+def test_manager_demotes_provider_with_spent_budget():
+    mgr = ProviderManager(order_env="AllTick,TwelveData", allow_fallbacks_env="1")
+    assert mgr.ranked() == ["AllTick", "TwelveData"]
+    now = datetime.now(dt_timezone.utc)
+    for _ in range(900):
+        get_quota_budget().record_usage("AllTick", ["EURUSD"], "15m", now=now)
+    get_quota_budget().plan("AllTick", force=True)
+    assert mgr.ranked() == ["TwelveData", "AllTick"]
+    assert ProviderManager(order_env="AllTick,TwelveData", allow_fallbacks_env="0").ranked()[0] == "AllTick"
+
+
+@pytest.mark.django_db
+def test_ingest_records_usage_and_api_reports_burn(monkeypatch):
+    class _P(BaseProvider):
+        name = "AllTick"
+        supports_batch = True
+
+        def fetch_bars(self, symbols, timeframe, since=None, last_closes=None):
+            return {s: [] for s in symbols}
+
+    class _Manager(ProviderManager):
+        def choose(self, symbol, timeframe, prefer_batch=False):
+            return _P()
+
+    monkeypatch.setattr(ingest_tasks, "ProviderManager", _Manager)
+    monkeypatch.setattr(ingest_tasks, "_PROVIDER_SEMAPHORES", {})
+    monkeypatch.setattr(ingest_tasks, "parse_watchlist", lambda: {"pairs": ["EURUSD", "GBPUSD"], "timeframes": ["15m"]})
+    monkeypatch.setattr(fresh_mod, "_cfg", lambda: {"freshness_seconds": {"15m": 1800}})
+
+    for _ in range(4):
+        ingest_tasks.ingest_once()
+
+    body = APIClient().get("/api/ingestion/quota", {"provider": "AllTick"}).json()
+    (plan,) = body["providers"]
+    assert plan["provider"] == "AllTick" and plan["actual"] == 4.0
+    assert {(r["symbol"], r["used"]) for r in plan["series"]} == {("EURUSD", 2.0), ("GBPUSD", 2.0)}
+    assert {"budget", "usable", "planned_by_now", "projected_eod", "over_budget"} <= set(plan)
+
+    # every provider with a providers.yaml rate_limit (AllTick/TwelveData overridden above)
+    every = APIClient().get("/api/ingestion/quota").json()["providers"]
+    assert [p["provider"] for p in every] == ["AllTick", "EODHD", "Finnhub", "TwelveData"]
+    assert {p["provider"]: p["capacity"] for p in every}["TwelveData"] == 800
@@ -0,0 +1,106 @@
+# tests/test_rule_engine_batch.py
+# Batch rule engine: every per-bar output equals the scalar run_rule_engine on market_at(bars, i),
+# for both confirmation modes and both confluence strategies.
+
+import numpy as np
+import pytest
+
+from trading.rules import engine as scalar_engine
+from trading.rules import stage_11_context, stage_12_patterns, stage_13_confirmation, stage_14_confluence
+from trading.rules.batch import detect_patterns, market_at, run_rule_engine_batch
+
+
+@pytest.fixture(autouse=True)
+def _quiet(monkeypatch):
+    for mod in (scalar_engine, stage_11_context, stage_12_patterns, stage_13_confirmation, stage_14_confluence):
+        monkeypatch.setattr(mod, "ENABLE_RULE_DEBUG_LOGS", False)
+
+
+def _bars(n=600, seed=3):
+    rng = np.random.default_rng(seed)
+    # Coarse price grid: ties, dojis and engulfing candles show up often
+    close = 1.1 + np.round(np.cumsum(rng.normal(0, 0.0004, n)), 4)
+    open_ = np.where(rng.random(n) < 0.15, close, np.r_[close[0], close[:-1]] + np.round(rng.normal(0, 0.0002, n), 4))
+    high = np.maximum(open_, close) + np.round(rng.uniform(0, 0.0005, n), 4) * (rng.random(n) < 0.7)
+    low = np.minimum(open_, close) - np.round(rng.uniform(0, 0.0005, n), 4) * (rng.random(n) < 0.7)
+    rsi = rng.uniform(20, 80, n)
+    rsi[:3] = np.nan
+    levels = np.round(close[:, None] + rng.normal(0, 0.0006, (n, 3)), 4)
+    levels[rng.random((n, 3)) < 0.3] = np.nan
+    return {
+        "open": open_, "high": high, "low": low, "close": close, "volume": rng.integers(50, 500, n).astype(float),
+        "atr": np.r_[np.nan, np.full(n - 1, 0.0006)], "ema8": close + rng.normal(0, 0.0003, n),
+        "ema20": close + rng.normal(0, 0.0005, n), "ema50": close + rng.normal(0, 0.0008, n),
+        "rsi14": rsi, "volume_z": rng.normal(0.5, 1.0, n), "key_levels": levels,
+        "last_pdh": np.where(rng.random(n) < 0.5, close + 0.0002, np.nan), "last_pdl": close - 0.003,
+        "volume_support": rng.random(n) < 0.6, "pattern_location_sr": rng.random(n) < 0.6,
+    }
+
+
+def _assert_same_as_scalar(bars, strict):
+    got = run_rule_engine_batch(bars, strict_confirmation=strict)
+    for i in range(len(bars["close"])):
+        ref = scalar_engine.run_rule_engine(market_at(bars, i), strict_confirmation=strict)
+        row = {k: v[i] for k, v in got.items()}
+        assert (row["final_decision"], row["confidence_score"], bool(row["red_flag"])) == \
+               (ref["final_decision"], ref["confidence_score"], ref["red_flag"]), i
+        assert row["candlestick_pattern"] == ref["stage_12"]["candlestick_pattern"], i
+        for stage, keys in (("stage_11", ("volume_support", "proximity_to_sr")),
+                            ("stage_12", ("pattern_location_sr",)),
+                            ("stage_13", ("pattern_confirmed",)),
+                            ("stage_14", ("indicator_confluence", "confluence_ok"))):
+            assert row["points_" + stage[-2:]] == ref[stage]["points_awarded"], (i, stage)
+            for k in keys:
+                assert bool(row[k]) == ref[stage][k], (i, k)
+    return got
+
+
+@pytest.mark.parametrize("strict", [True, False])
+@pytest.mark.parametrize("strategy", ["rsi_volume", "ema_price_sr"])
+def test_batch_matches_scalar_engine(monkeypatch, strict, strategy):
+    monkeypatch.setattr(stage_14_confluence, "DEFAULT_CONFLUENCE_STRATEGY", strategy)
+    monkeypatch.setattr("trading.rules.batch.DEFAULT_CONFLUENCE_STRATEGY", strategy)
+    got = _assert_same_as_scalar(_bars(), strict)
+    # The sample exercises the interesting branches ("hammer" needs lower_wick = low - min(open, close)
+    # >= 2 * body, which the scalar detector never satisfies on a real candle)
+    assert set(got["candlestick_pattern"]) == {"none", "bullish_engulfing", "bearish_engulfing", "shooting_star"}
+    assert got["stage_13"].any() and got["stage_14"].any()
+    assert {"LONG", "SHORT"} <= set(got["final_decision"])
+
+
+def test_shared_levels_and_minimal_inputs():
+    bars = {k: v for k, v in _bars(200, seed=9).items()
+            if k not in ("last_pdh", "last_pdl", "volume_support", "pattern_location_sr")}
+    bars["key_levels"] = [1.1, 1.1005, float("nan")]
+    _assert_same_as_scalar(bars, strict=True)
+    assert run_rule_engine_batch({k: v[:0] for k, v in bars.items() if k != "key_levels"})["final_decision"].size == 0
+
+
+def test_detect_patterns_matches_scalar_detector():
+    b = _bars(300, seed=1)
+    got = detect_patterns(b["open"], b["high"], b["low"], b["close"])
+    candles = [{k: b[k][i] for k in ("open", "high", "low", "close")} for i in range(300)]
+    assert list(got) == [stage_12_patterns.detect_pattern(candles[max(0, i - 1):i + 1]) for i in range(300)]
+
+
+@pytest.mark.django_db
+def test_market_arrays_feed_the_batch_engine():
+    import pandas as pd
+
+    from backend.models import MarketData
+    from celery_tasks.preprocess_features import update_features
+    from celery_tasks.run_rule_engine import market_arrays
+
+    b = _bars(150, seed=4)
+    ts = pd.date_range("2025-01-01", periods=150, freq="15min", tz="UTC")
+    MarketData.objects.bulk_create([
+        MarketData(symbol="EURUSD", timeframe="15m", timestamp=ts[i], open=b["open"][i], high=b["high"][i],
+                   low=b["low"][i], close=b["close"][i], volume=b["volume"][i], provider="AllTick")
+        for i in range(150)
+    ])
+    update_features("EURUSD", "15m")
+    bars = market_arrays("EURUSD", "15m", start=ts[100])
+    assert len(bars["close"]) == 50 and bars["timestamp"][0] == ts[100]
+    assert np.isfinite(bars["atr"]).all() and np.isfinite(bars["rsi14"]).all()
+    _assert_same_as_scalar(bars, strict=True)
+    assert market_arrays("GBPUSD", "15m")["close"].size == 0
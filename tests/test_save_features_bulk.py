@@ -0,0 +1,57 @@
+# tests/test_save_features_bulk.py
+# Set-based save_features_to_db: ids resolved per (symbol, timeframe, timestamp),
+# chunked upserts with a bounded query count, unchanged rows skipped.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.models import MarketData, MarketDataFeatures
+from celery_tasks.preprocess_features import save_features_to_db
+from ml_pipeline.data_preprocessor import process_data
+
+
+def _bars(timeframe, n=300, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0008, n))
+    ts = pd.date_range("2025-01-01", periods=n, freq="1h", tz="UTC")
+    MarketData.objects.bulk_create([
+        MarketData(symbol="EURUSD", timeframe=timeframe, timestamp=t, open=c, high=c + 0.0005,
+                   low=c - 0.0005, close=c, volume=float(rng.integers(50, 500)), provider="AllTick")
+        for t, c in zip(ts, close)
+    ])
+    df = pd.DataFrame(list(MarketData.objects.filter(symbol="EURUSD", timeframe=timeframe).values()))
+    out = process_data(df)
+    out["symbol"] = "EURUSD"
+    return out
+
+
+@pytest.mark.django_db
+def test_bulk_save_targets_timeframe_and_skips_unchanged(django_assert_max_num_queries):
+    feats_1h = _bars("1h")
+    _bars("15m", seed=2)  # same timestamps on another timeframe
+
+    with django_assert_max_num_queries(16):
+        counts = save_features_to_db(feats_1h, timeframe="1h", batch_size=200)
+    assert counts == {"inserted": len(feats_1h), "updated": 0, "unchanged": 0}
+    assert not MarketDataFeatures.objects.filter(market_data__timeframe="15m").exists()
+
+    row = feats_1h.iloc[-1]
+    stored = MarketDataFeatures.objects.get(market_data__timeframe="1h", market_data__timestamp=row["timestamp"])
+    assert stored.rsi_14 == pytest.approx(row["rsi_14"]) and stored.ema_bull_cross == bool(row["ema_bull_cross"])
+
+    feats_1h.loc[feats_1h.index[-1], "rsi_14"] = 55.5
+    counts = save_features_to_db(feats_1h, timeframe="1h")
+    assert counts == {"inserted": 0, "updated": 1, "unchanged": len(feats_1h) - 1}
+    stored.refresh_from_db()
+    assert stored.rsi_14 == 55.5
+
+
+@pytest.mark.django_db
+def test_bulk_save_without_timeframe_skips_ambiguous_bars():
+    feats = _bars("1h")
+    assert save_features_to_db(feats)["inserted"] == len(feats)  # unambiguous: one timeframe
+
+    _bars("15m", seed=2)
+    MarketDataFeatures.objects.all().delete()
+    assert save_features_to_db(feats) == {"inserted": 0, "updated": 0, "unchanged": 0}
@@ -0,0 +1,102 @@
+# tests/test_stream_ingest.py
+# Streaming ingestion against the local stand-in server: closed bars land in MarketData
+# well under a second after publish, pings refresh last_seen_at, forming bars are skipped,
+# and a dropped socket reconnects.
+
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import pytest
+
+from backend.ingestion.stream import StreamIngestor
+from backend.ingestion.stream_standin import StandInStreamServer
+from backend.models import IngestionStatus, MarketData
+from backend.tasks import freshness as fresh_mod
+
+PAIRS = ["EURUSD", "GBPUSD"]
+TF = "1m"
+
+
+@pytest.fixture(autouse=True)
+def _cfg(monkeypatch):
+    monkeypatch.setattr(fresh_mod, "_cfg", lambda: {"freshness_seconds": {TF: 60}})
+    yield
+
+
+@pytest.fixture
+def server():
+    srv = StandInStreamServer(bar_interval=None, ping_interval=0.05).start()
+    yield srv
+    srv.stop()
+
+
+def _wire_bar(symbol, minute, closed=True):
+    ts = datetime(2025, 1, 2, 10, minute, tzinfo=dt_timezone.utc)
+    return {"symbol": symbol, "tf": TF, "ts": ts.isoformat(), "o": 1.1, "h": 1.2, "l": 1.0,
+            "c": 1.15, "v": 3.0, "closed": closed}
+
+
+def _publish_after_subscribe(server, bars, sent_at):
+    def _go():
+        assert server.wait_for_subscriber()
+        time.sleep(0.1)  # let a couple of pings through first
+        sent_at.append(time.monotonic())
+        for bar in bars:
+            server.publish(bar)
+    t = threading.Thread(target=_go, daemon=True)
+    t.start()
+    return t
+
+
+@pytest.mark.django_db
+def test_closed_bars_written_with_subsecond_latency_and_heartbeat(server):
+    sent_at = []
+    _publish_after_subscribe(server, [_wire_bar(s, 1) for s in PAIRS], sent_at)
+
+    ingestor = StreamIngestor("AllTick", server.url, PAIRS, [TF], flush_ms=20, ping_sec=0)
+    stats = ingestor.run(max_bars=len(PAIRS), duration=5)
+    latency = time.monotonic() - sent_at[0]
+
+    assert stats["bars"] == 2 and stats["pings"] >= 1
+    assert latency < 1.0
+    rows = MarketData.objects.filter(timeframe=TF).order_by("symbol")
+    assert [r.symbol for r in rows] == PAIRS
+    assert {r.provider for r in rows} == {"AllTick"}
+    for st in IngestionStatus.objects.filter(symbol__in=PAIRS, timeframe=TF):
+        assert st.last_seen_at is not None
+        assert st.last_bar_ts == datetime(2025, 1, 2, 10, 1, tzinfo=dt_timezone.utc)
+
+
+@pytest.mark.django_db
+def test_forming_bars_are_not_persisted(server):
+    sent_at = []
+    _publish_after_subscribe(server, [_wire_bar("EURUSD", 2, closed=False), _wire_bar("EURUSD", 1)], sent_at)
+
+    stats = StreamIngestor("AllTick", server.url, ["EURUSD"], [TF], ping_sec=0).run(max_bars=1, duration=5)
+
+    assert stats["forming"] == 1 and stats["bars"] == 1
+    assert list(MarketData.objects.values_list("timestamp", flat=True)) == [
+        datetime(2025, 1, 2, 10, 1, tzinfo=dt_timezone.utc)
+    ]
+
+
+@pytest.mark.django_db
+def test_reconnects_after_provider_drop(server):
+    dropped = threading.Event()
+
+    def _drop_then_publish():
+        assert server.wait_for_subscriber()
+        server.drop_clients()
+        dropped.set()
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and not server.wait_for_subscriber(timeout=0.05):
+            pass
+        server.publish(_wire_bar("EURUSD", 3))
+
+    threading.Thread(target=_drop_then_publish, daemon=True).start()
+    stats = StreamIngestor("AllTick", server.url, ["EURUSD"], [TF], ping_sec=0).run(max_bars=1, duration=8)
+
+    assert dropped.is_set()
+    assert stats["reconnects"] >= 1 and stats["bars"] == 1
+    assert MarketData.objects.filter(symbol="EURUSD").count() == 1
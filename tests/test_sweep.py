@@ -0,0 +1,127 @@
+# tests/test_sweep.py
+# Rule-constant sweep: every ranked row equals a direct backtest of the batch rule engine under
+# that configuration, the shared-memory process pool gives the same table as in-process runs,
+# fills are simulated once per exit setting, and the DB-backed command runs.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from trading import backtest as bt
+from trading import sweep
+from trading.rules.batch import RULE_PARAMS, run_rule_engine_batch
+
+
+def _bars(n=3000, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.round(np.cumsum(rng.normal(0, 0.0004, n)), 4)
+    open_ = np.where(rng.random(n) < 0.15, close, np.r_[close[0], close[:-1]] + np.round(rng.normal(0, 0.0002, n), 4))
+    high = np.maximum(open_, close) + np.round(rng.uniform(0, 0.0005, n), 4)
+    low = np.minimum(open_, close) - np.round(rng.uniform(0, 0.0005, n), 4)
+    ts = pd.date_range("2025-01-01", periods=n, freq="15min", tz="UTC")
+    bars = {"open": open_, "high": high, "low": low, "close": close, "volume": np.ones(n),
+            "atr": np.r_[np.nan, np.full(n - 1, 0.0006)], "ema8": close + rng.normal(0, 0.0003, n),
+            "ema20": close + rng.normal(0, 0.0005, n), "ema50": close + rng.normal(0, 0.0008, n),
+            "rsi14": rng.uniform(20, 80, n), "volume_z": rng.normal(0.8, 1.0, n), "timestamp": ts}
+    bars["last_pdh"], bars["last_pdl"] = bt.previous_day_levels(ts, high, low)
+    return bars
+
+
+def _configs(k=24, seed=1):
+    return sweep.random_configs(sweep.DEFAULT_GRID, k, seed=seed)
+
+
+def test_param_specs_grid_and_random_search():
+    assert sweep.parse_param("rsi_min_delta=1,2,4") == ("RSI_MIN_DELTA", [1, 2, 4])
+    assert sweep.parse_param("ATR_MULTIPLIER_SL=1:2:0.5") == ("ATR_MULTIPLIER_SL", [1.0, 1.5, 2.0])
+    assert sweep.parse_param("STAGE_11_WEIGHT=10:40") == ("STAGE_11_WEIGHT", (10, 40))
+    for bad in ("NOT_A_CONSTANT=1", "RSI_MIN_DELTA", "RSI_MIN_DELTA=a,b", "RSI_MIN_DELTA=5:1:1"):
+        with pytest.raises(ValueError):
+            sweep.parse_param(bad)
+
+    grid = sweep.grid_configs({"RSI_MIN_DELTA": [1, 2], "DEFAULT_RR_RATIO": [1.5, 2.0, 3.0]})
+    assert len(grid) == 6 and {"RSI_MIN_DELTA": 2, "DEFAULT_RR_RATIO": 3.0} in grid
+    assert len(sweep.grid_configs(sweep.DEFAULT_GRID)) == 3888
+
+    space = {"STAGE_11_WEIGHT": (10, 40), "SR_PROXIMITY_ATR_MULTIPLIER": (0.2, 1.0), "RSI_MIN_DELTA": [0, 4]}
+    draws = sweep.random_configs(space, 200, seed=5)
+    assert draws == sweep.random_configs(space, 200, seed=5)
+    assert all(isinstance(d["STAGE_11_WEIGHT"], int) and 10 <= d["STAGE_11_WEIGHT"] <= 40 for d in draws)
+    assert all(0.2 <= d["SR_PROXIMITY_ATR_MULTIPLIER"] < 1.0 and d["RSI_MIN_DELTA"] in (0, 4) for d in draws)
+
+
+def test_previous_day_levels():
+    ts = pd.date_range("2025-01-01 12:00", periods=6, freq="8h", tz="UTC")  # days: 1 1 2 2 2 3
+    high = np.array([1.0, 3.0, 2.0, 5.0, 4.0, 9.0])
+    low = np.array([0.5, 0.2, 1.0, 0.8, 0.9, 2.0])
+    pdh, pdl = bt.previous_day_levels(ts, high, low)
+    np.testing.assert_array_equal(pdh, [np.nan, np.nan, 3.0, 3.0, 3.0, 5.0])
+    np.testing.assert_array_equal(pdl, [np.nan, np.nan, 0.2, 0.2, 0.2, 0.8])
+
+
+def test_sweep_rows_equal_direct_backtests():
+    bars, configs = _bars(), _configs()
+    table = sweep.run_sweep(bars, configs, workers=1, max_hold=50)
+    assert len(table) == len(configs) and list(table["rank"]) == list(range(1, len(configs) + 1))
+    assert table["total_r"].is_monotonic_decreasing and table["trades"].sum() > 0
+
+    for _, row in table.iterrows():
+        config = {k: row[k] for k in configs[0]}
+        params = {k: v for k, v in config.items() if k in RULE_PARAMS}
+        res = run_rule_engine_batch(bars, params=params, chain_stage_flags=True)
+        signals = bt.at_decision(bt.signal_directions(res["final_decision"]), res["decided_at"])
+        ref = bt.backtest(bars, signals, max_hold=50, atr_multiplier=config["ATR_MULTIPLIER_SL"],
+                          rr_ratio=config["DEFAULT_RR_RATIO"]).stats
+        for stat, value in ref.items():
+            assert row[stat] == pytest.approx(value), stat
+
+    # Scalar wiring: stage 1.4 never sees volume_support, so nothing trades
+    assert sweep.run_sweep(bars, configs[:4], workers=1, chain_stage_flags=False)["trades"].eq(0).all()
+
+
+def test_fills_are_simulated_once_per_exit_setting(monkeypatch):
+    calls = []
+    real = sweep.simulate
+    monkeypatch.setattr(sweep, "simulate", lambda *a, **k: calls.append(1) or real(*a, **k))
+    configs = sweep.grid_configs({"ATR_MULTIPLIER_SL": [1.0, 2.0], "RSI_MIN_DELTA": [0, 2, 4],
+                                  "INCONCLUSIVE_THRESHOLD": [40, 60]})
+    sweep.run_sweep(_bars(800), configs, workers=1, chunk_size=5)
+    assert len(calls) == 2
+
+
+def test_process_pool_matches_in_process():
+    bars, configs = _bars(), _configs(40, seed=2)
+    local = sweep.run_sweep(bars, configs, workers=1, rank_by="profit_factor", min_trades=5)
+    pooled = sweep.run_sweep(bars, configs, workers=2, chunk_size=7, rank_by="profit_factor", min_trades=5)
+    pd.testing.assert_frame_equal(local, pooled)
+    assert (local["trades"] >= 5).all()
+    with pytest.raises(ValueError):
+        sweep.run_sweep(bars, [{"NOT_A_CONSTANT": 1}], workers=1)
+    with pytest.raises(ValueError):
+        sweep.run_sweep(bars, configs, workers=1, rank_by="sharpe")
+
+
+@pytest.mark.django_db
+def test_sweep_command_ranks_configurations(tmp_path):
+    from io import StringIO
+
+    from django.core.management import call_command
+
+    from backend.models import MarketData
+    from celery_tasks.preprocess_features import update_features
+
+    bars = _bars(600, seed=11)
+    MarketData.objects.bulk_create([
+        MarketData(symbol="EURUSD", timeframe="15m", timestamp=bars["timestamp"][i], open=bars["open"][i],
+                   high=bars["high"][i], low=bars["low"][i], close=bars["close"][i], volume=100 + i % 50,
+                   provider="AllTick")
+        for i in range(600)
+    ])
+    update_features("EURUSD", "15m")
+
+    out, csv = StringIO(), tmp_path / "sweep.csv"
+    call_command("sweep_rules", pair="EURUSD", tf="15m", param=["RSI_MIN_DELTA=0,2", "DEFAULT_RR_RATIO=1:2:0.5"],
+                 workers=1, top=3, csv=str(csv), stdout=out)
+    assert "6 configurations" in out.getvalue() and "configs/s" in out.getvalue()
+    table = pd.read_csv(csv)
+    assert len(table) == 6 and {"RSI_MIN_DELTA", "DEFAULT_RR_RATIO", "total_r"} <= set(table.columns)
@@ -0,0 +1,125 @@
+# tests/test_tail_features.py
+# Tail recompute: the warm-up window is derived from the declared indicator needs, only
+# warm-up + new bars are loaded, cumulative VWAP/OBV continue from the sums stored with
+# the anchor bar, and the new rows match a full process_data run.
+
+import numpy as np
+import pandas as pd
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from backend.models import MarketData, MarketDataFeatures
+from celery_tasks import preprocess_features as pf
+from ml_pipeline import data_preprocessor as dp
+from ml_pipeline.data_preprocessor import process_data, warmup_bars
+from ml_pipeline.incremental import FEATURE_COLUMNS
+
+
+def _frame(n, seed=11):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0008, n))
+    open_ = np.r_[close[0], close[:-1]]
+    ts = pd.date_range("2025-01-01", periods=n, freq="15min", tz="UTC")
+    return pd.DataFrame({"timestamp": ts, "open": open_,
+                         "high": np.maximum(open_, close) + rng.uniform(0, 0.0006, n),
+                         "low": np.minimum(open_, close) - rng.uniform(0, 0.0006, n),
+                         "close": close, "volume": rng.integers(50, 500, n).astype(float),
+                         "provider": "AllTick"})
+
+
+def _store(df):
+    MarketData.objects.bulk_create([
+        MarketData(symbol="EURUSD", timeframe="15m", timestamp=r.timestamp, open=r.open, high=r.high,
+                   low=r.low, close=r.close, volume=r.volume, provider="AllTick")
+        for r in df.itertuples()
+    ])
+
+
+def test_warmup_is_derived_from_declared_needs(monkeypatch):
+    assert 50 < warmup_bars(1e-4) < warmup_bars(1e-8)
+    monkeypatch.setattr(dp, "INDICATOR_WARMUP", {"sma": (20, ()), "ema": (10, (0.5,))})
+    assert warmup_bars(1e-3) == max(20, 10 + 10)  # 0.5**10 < 1e-3
+
+
+@pytest.mark.django_db
+def test_tail_recompute_loads_only_warmup_and_matches_full(monkeypatch):
+    df = _frame(1500)
+    _store(df.iloc[:1100])
+    assert pf.tail_features("EURUSD", "15m") > 0  # nothing featurised yet: full series
+
+    monkeypatch.setattr(pf, "planned_feature_columns", lambda: None)  # every column, as in process_data(df)
+    frames = []
+    real = pf.process_data
+    monkeypatch.setattr(pf, "process_data",
+                        lambda frame, carry=None, columns=None: frames.append(len(frame)) or real(frame, carry, columns))
+    _store(df.iloc[1100:])
+    assert pf.run_feature_engineering("EURUSD", "15m", tail=True).startswith("✅")
+    assert frames == [warmup_bars() + 400]
+    assert pf.tail_features("EURUSD", "15m") == 0  # nothing new
+
+    ref = process_data(df.copy()).set_index("timestamp").iloc[-400:]
+    got = pd.DataFrame(list(
+        MarketDataFeatures.objects.filter(market_data__timestamp__gte=ref.index[0])
+        .order_by("market_data__timestamp").values("market_data__timestamp", *FEATURE_COLUMNS)
+    )).set_index("market_data__timestamp")
+    assert list(got.index) == list(ref.index)
+    for col in FEATURE_COLUMNS:
+        np.testing.assert_allclose(got[col].astype(float), ref[col].astype(float), rtol=1e-6, atol=1e-7, err_msg=col)
+
+
+@pytest.mark.django_db
+def test_tail_continues_vwap_from_stored_sums(monkeypatch):
+    df = _frame(1300)
+    _store(df.iloc[:1200])
+    pf.tail_features("EURUSD", "15m")
+    _store(df.iloc[1200:1250])
+
+    frames = []
+    real = pf.process_data
+    monkeypatch.setattr(pf, "process_data",
+                        lambda frame, carry=None, columns=None: frames.append(len(frame)) or real(frame, carry, columns))
+    with CaptureQueriesContext(connection) as ctx:
+        assert pf.tail_features("EURUSD", "15m") == 50
+    assert not any("SUM(" in q["sql"].upper() for q in ctx.captured_queries)  # no pass over history
+    assert frames == [warmup_bars() + 50]
+
+    # rows featurised before the sums were stored: recompute the series once
+    MarketDataFeatures.objects.update(cum_vp=None, cum_v=None)
+    _store(df.iloc[1250:])
+    assert pf.tail_features("EURUSD", "15m") > 50
+    assert frames[-1] == 1300
+
+    ref = process_data(df.copy()).set_index("timestamp")
+    last = MarketDataFeatures.objects.order_by("-market_data__timestamp").values("vwap", "cum_vp", "cum_v").first()
+    assert last["cum_v"] == pytest.approx(df["volume"].sum())
+    assert last["vwap"] == pytest.approx(ref["vwap"].iloc[-1])
+
+
+@pytest.mark.django_db
+def test_forming_bar_is_left_for_the_tail_after_it_closes(monkeypatch):
+    df = _frame(1300)
+    _store(df.iloc[:1200])
+    pf.tail_features("EURUSD", "15m")
+    _store(df.iloc[1200:1250])
+    forming = df.loc[1249, "timestamp"]
+    bar = MarketData.objects.get(timestamp=forming)
+    bar.close, bar.volume = bar.close + 0.002, 1.0  # partial: the bar is still forming
+    bar.save()
+
+    monkeypatch.setattr(pf.timezone, "now", lambda: (forming + pd.Timedelta(minutes=5)).to_pydatetime())
+    assert pf.tail_features("EURUSD", "15m") == 49
+    assert not MarketDataFeatures.objects.filter(market_data__timestamp=forming).exists()
+
+    MarketData.objects.filter(timestamp=forming).update(close=df.loc[1249, "close"], volume=df.loc[1249, "volume"])
+    _store(df.iloc[1250:])
+    monkeypatch.setattr(pf.timezone, "now", lambda: (df["timestamp"].iloc[-1] + pd.Timedelta(hours=1)).to_pydatetime())
+    assert pf.tail_features("EURUSD", "15m") == 51
+
+    ref = process_data(df.copy()).set_index("timestamp").iloc[-60:]
+    got = pd.DataFrame(list(
+        MarketDataFeatures.objects.filter(market_data__timestamp__gte=ref.index[0])
+        .order_by("market_data__timestamp").values("market_data__timestamp", "vwap", "cum_vp", "cum_v", "obv")
+    )).set_index("market_data__timestamp")
+    for col in ("vwap", "cum_vp", "cum_v", "obv"):
+        np.testing.assert_allclose(got[col], ref[col], rtol=1e-9, err_msg=col)
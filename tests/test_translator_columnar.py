@@ -0,0 +1,85 @@
+# tests/test_translator_columnar.py
+# Columnar provider translation: parity with the per-row translator, dtype coercion,
+# and the frame → MarketData bulk write path.
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.models import MarketData
+from backend.tasks.utils import upsert_market_frame
+from provider_manager.translator import FRAME_COLUMNS, translate_market_data, translate_market_frame
+
+T0 = datetime(2025, 3, 3, 9, 0)
+
+
+def _records(n, fmt, ts_key="datetime", **extra):
+    return [
+        {ts_key: (T0 + timedelta(minutes=i)).strftime(fmt), "open": f"{1.1 + i * 1e-4:.5f}",
+         "high": f"{1.2 + i * 1e-4:.5f}", "low": f"{1.0 + i * 1e-4:.5f}", "close": f"{1.15 + i * 1e-4:.5f}",
+         "volume": str(10 + i), **extra}
+        for i in range(n)
+    ]
+
+
+RESPONSES = {
+    "finnhub": {"t": [int((T0 + timedelta(minutes=i)).replace(tzinfo=dt_timezone.utc).timestamp()) for i in range(5)],
+                "o": [1.1] * 5, "h": [1.2] * 5, "l": [1.0] * 5, "c": [1.15] * 5, "v": [7.0] * 5},
+    "twelvedata": {"values": _records(5, "%Y-%m-%d %H:%M:%S", atr="0.0012")},
+    "allticks": {"data": _records(5, "%Y-%m-%dT%H:%M:%S", ts_key="timestamp")},
+    "eodhd": _records(5, "%Y-%m-%d %H:%M:%S"),
+    "finage": {"results": _records(5, "%Y-%m-%d %H:%M:%S")},
+}
+
+
+@pytest.mark.parametrize("provider", sorted(RESPONSES))
+def test_frame_matches_row_translator(provider):
+    rows = translate_market_data(provider, RESPONSES[provider])
+    df = translate_market_frame(provider, RESPONSES[provider])
+
+    assert list(df.columns) == FRAME_COLUMNS
+    assert str(df["timestamp"].dtype) == "datetime64[ns, UTC]"
+    assert all(df[c].dtype == np.float64 for c in ("open", "high", "low", "close", "volume", "atr_14"))
+    assert len(df) == len(rows) == 5
+    assert [ts.replace(tzinfo=None) for ts in df["timestamp"].dt.to_pydatetime()] == [r["timestamp"] for r in rows]
+    for col in ("open", "high", "low", "close", "volume"):
+        assert df[col].tolist() == pytest.approx([r[col] for r in rows])
+    expected_atr = [np.nan if r["atr_14"] is None else r["atr_14"] for r in rows]
+    np.testing.assert_allclose(df["atr_14"].to_numpy(), expected_atr)
+    assert set(df["provider"]) == {provider}
+
+
+def test_bad_values_coerce_to_nan_and_duplicates_collapse():
+    recs = _records(3, "%Y-%m-%d %H:%M:%S")
+    recs[1]["close"] = "n/a"
+    recs.append(dict(recs[0], close="9.9"))   # duplicate timestamp: last wins
+    recs.append(dict(recs[2], datetime="garbage"))
+
+    df = translate_market_frame("twelvedata", {"values": recs})
+
+    assert len(df) == 3 and df["timestamp"].is_monotonic_increasing
+    assert np.isnan(df["close"].iloc[1])
+    assert df["close"].iloc[0] == 9.9
+
+
+def test_unknown_provider_or_empty_payload_gives_empty_frame():
+    for provider, raw in [("nope", {}), ("twelvedata", {}), ("finnhub", {"t": []})]:
+        df = translate_market_frame(provider, raw)
+        assert df.empty and list(df.columns) == FRAME_COLUMNS
+
+
+@pytest.mark.django_db
+def test_frame_upserts_into_marketdata_without_dicts():
+    df = translate_market_frame("twelvedata", {"values": _records(4, "%Y-%m-%d %H:%M:%S")})
+    df.loc[3, "volume"] = np.nan  # unwritable row is skipped
+
+    assert upsert_market_frame(df, "EURUSD", "1m", provider="TwelveData") == {"inserted": 3, "updated": 0}
+    df.loc[0, "close"] = 2.0
+    assert upsert_market_frame(df, "EURUSD", "1m", provider="TwelveData") == {"inserted": 0, "updated": 3}
+
+    rows = MarketData.objects.filter(symbol="EURUSD", timeframe="1m").order_by("timestamp")
+    assert [r.close for r in rows][0] == 2.0
+    assert rows[0].timestamp == pd.Timestamp(T0, tz="UTC").to_pydatetime()
+    assert {r.provider for r in rows} == {"TwelveData"}
@@ -0,0 +1,374 @@
+"""
+Backtester – replay LONG/SHORT signals over bar history with SL/TP fills.
+
+- Entry at the signal bar's close (the entry_price the live stack uses); SL/TP default to the
+  ATR levels of rules.execution.calculate_sl_tp. Rule signals sit on the bar their decision
+  is final on (at_decision), never on the pattern bar the confirmation bars follow.
+- Exits are found by a vectorized first-touch search over the forward bars: trades are laid
+  out as (trades x window) matrices of highs/lows, the first bar touching SL or TP is an
+  argmax, and unresolved trades move to the next window (doubling), chunked to bound memory.
+- Same-bar ambiguity (one bar touches both levels) follows AMBIGUITY_POLICY:
+    "stop"   – the stop is assumed hit first (pessimistic, default)
+    "target" – the target is assumed hit first
+    "open"   – the level nearer the bar's open is assumed hit first
+  A bar that opens beyond a level is never ambiguous: that level was hit first. A stop gapped
+  through fills at the open; targets fill at the target.
+- max_hold bars without a touch exits at that bar's close ("timeout"); running out of history
+  exits at the last close ("eod"). Without allow_overlap a signal is taken only after the
+  previous trade's exit bar.
+- Output: trades (DataFrame), per-bar equity curve (risk_per_trade of equity per 1R,
+  compounded at exit bars) and summary stats.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from trading.rules.constants import ATR_MULTIPLIER_SL, DEFAULT_RR_RATIO
+
+AMBIGUITY_POLICY = os.getenv("BACKTEST_AMBIGUITY_POLICY", "stop")
+AMBIGUITY_POLICIES = ("stop", "target", "open")
+# Upper bound on trades x window cells gathered per search step (~16 bytes each per array)
+BACKTEST_CHUNK_CELLS = int(os.getenv("BACKTEST_CHUNK_CELLS", "2000000"))
+FIRST_WINDOW = 32
+
+OUTCOMES = np.array(["open", "tp", "sl", "timeout", "eod"], dtype=object)
+_TP, _SL, _TIMEOUT, _EOD = 1, 2, 3, 4
+
+
+@dataclass
+class BacktestResult:
+    trades: pd.DataFrame
+    equity: pd.Series
+    stats: Dict[str, float]
+
+
+def signal_directions(decisions) -> np.ndarray:
+    """LONG/SHORT/other decisions (e.g. run_rule_engine_batch final_decision) as +1/-1/0."""
+    d = np.asarray(decisions, dtype=object)
+    return np.where(d == "LONG", 1, np.where(d == "SHORT", -1, 0)).astype(np.int8)
+
+
+def at_decision(direction: np.ndarray, decided_at: np.ndarray) -> np.ndarray:
+    """
+    Move every signal from its pattern bar to the bar its decision is final on
+    (run_rule_engine_batch decided_at), so trades enter at that bar's close instead of
+    trading on the confirmation bars' future prices. Decisions final past the last bar are
+    dropped; when several are final on one bar, the latest pattern's wins.
+    """
+    direction = np.asarray(direction)
+    out = np.zeros(len(direction), dtype=np.int8)
+    src = np.flatnonzero((direction != 0) & (decided_at < len(direction)))
+    dst = decided_at[src]
+    order = np.lexsort((src, dst))
+    src, dst = src[order], dst[order]
+    last = np.r_[dst[1:] != dst[:-1], True] if dst.size else np.zeros(0, dtype=bool)
+    out[dst[last]] = direction[src[last]]
+    return out
+
+
+def sl_tp_levels(entry: np.ndarray, atr: np.ndarray, direction: np.ndarray,
+                 atr_multiplier: float = None, rr_ratio: float = None):
+    """
+    calculate_sl_tp for every trade (same ATR multiples and 5-decimal rounding); the
+    multiples default to ATR_MULTIPLIER_SL / DEFAULT_RR_RATIO.
+    """
+    atr_multiplier = ATR_MULTIPLIER_SL if atr_multiplier is None else atr_multiplier
+    rr_ratio = DEFAULT_RR_RATIO if rr_ratio is None else rr_ratio
+    dist = atr_multiplier * np.asarray(atr, dtype=np.float64)
+    sl = entry - direction * dist
+    tp = entry + direction * (dist * rr_ratio)
+    return (np.array([round(x, 5) for x in sl.tolist()], dtype=np.float64),
+            np.array([round(x, 5) for x in tp.tolist()], dtype=np.float64))
+
+
+def first_touch(open_: np.ndarray, high: np.ndarray, low: np.ndarray, entry_idx: np.ndarray,
+                direction: np.ndarray, sl: np.ndarray, tp: np.ndarray, max_hold: Optional[int] = None,
+                ambiguity: str = None):
+    """
+    Exit bar, outcome code (OUTCOMES) and ambiguity flag of every trade, searching the bars
+    after entry_idx up to entry_idx + max_hold (or the end of the data).
+    """
+    ambiguity = ambiguity or AMBIGUITY_POLICY
+    if ambiguity not in AMBIGUITY_POLICIES:
+        raise ValueError(f"Unknown ambiguity policy {ambiguity!r}; expected one of {AMBIGUITY_POLICIES}")
+    n, m = len(high), len(entry_idx)
+    last = np.full(m, n - 1, dtype=np.int64)
+    if max_hold is not None:
+        last = np.minimum(entry_idx + max_hold, n - 1)
+    exit_idx = last.copy()
+    outcome = np.full(m, _EOD, dtype=np.int8)
+    if max_hold is not None:
+        outcome[entry_idx + max_hold <= n - 1] = _TIMEOUT
+    ambiguous = np.zeros(m, dtype=bool)
+
+    pending = np.flatnonzero(entry_idx < last)
+    offset, width = 1, FIRST_WINDOW
+    while pending.size:
+        still = []
+        rows = max(1, BACKTEST_CHUNK_CELLS // width)
+        for s in range(0, pending.size, rows):
+            p = pending[s:s + rows]
+            idx = entry_idx[p, None] + offset + np.arange(width)
+            valid = idx <= last[p, None]
+            np.minimum(idx, n - 1, out=idx)
+            h, l = high[idx], low[idx]
+            up = direction[p, None] > 0
+            lo_sl, hi_sl = sl[p, None], tp[p, None]
+            sl_hit = np.where(up, l <= lo_sl, h >= lo_sl) & valid
+            tp_hit = np.where(up, h >= hi_sl, l <= hi_sl) & valid
+            hit = sl_hit | tp_hit
+            first = hit.argmax(axis=1)
+            r = np.arange(p.size)
+            done = hit[r, first]
+
+            t, f = p[done], first[done]
+            bar = idx[r[done], f]
+            both = sl_hit[r[done], f] & tp_hit[r[done], f]
+            stop_first = sl_hit[r[done], f] & ~both
+            if both.any():
+                o, up_t = open_[bar], direction[t] > 0
+                gap_sl = np.where(up_t, o <= sl[t], o >= sl[t])
+                gap_tp = np.where(up_t, o >= tp[t], o <= tp[t])
+                if ambiguity == "stop":
+                    pick_sl = ~gap_tp
+                elif ambiguity == "target":
+                    pick_sl = gap_sl
+                else:
+                    pick_sl = gap_sl | (~gap_tp & (np.abs(o - sl[t]) <= np.abs(o - tp[t])))
+                stop_first |= both & pick_sl
+                ambiguous[t] = both & ~gap_sl & ~gap_tp
+            exit_idx[t] = bar
+            outcome[t] = np.where(stop_first, _SL, _TP)
+
+            # Unresolved trades whose window did not reach their last bar keep searching
+            open_rows = ~done & (entry_idx[p] + offset + width - 1 < last[p])
+            still.append(p[open_rows])
+        pending = np.concatenate(still) if still else pending[:0]
+        offset += width
+        width *= 2
+    return exit_idx, outcome, ambiguous
+
+
+def _sequential(entry_idx: np.ndarray, exit_idx: np.ndarray) -> np.ndarray:
+    """Positions (into the entry-sorted trades) taken with one trade open at a time."""
+    taken = []
+    i = 0
+    while i < len(entry_idx):
+        taken.append(i)
+        i = int(np.searchsorted(entry_idx, exit_idx[i], side="right"))
+    return np.array(taken, dtype=np.int64)
+
+
+def _max_drawdown(equity: np.ndarray) -> float:
+    if not equity.size:
+        return 0.0
+    peak = np.maximum.accumulate(equity)
+    return float(np.max(1.0 - equity / peak))
+
+
+def simulate(bars: dict, entry_idx: np.ndarray, direction: np.ndarray, sl: np.ndarray, tp: np.ndarray,
+             max_hold: Optional[int] = None, ambiguity: str = None) -> Dict[str, np.ndarray]:
+    """
+    Fill every candidate trade independently (overlap allowed). Returns arrays entry_idx,
+    direction, entry, sl, tp, exit_idx, outcome, ambiguous, exit_price, r_multiple.
+    Fill prices: the levels, a stop gapped through at the open, time exits at the close.
+    """
+    o, h, l, c = (np.asarray(bars[k], dtype=np.float64) for k in ("open", "high", "low", "close"))
+    entry = c[entry_idx]
+    exit_idx, outcome, ambiguous = first_touch(o, h, l, entry_idx, direction, sl, tp, max_hold, ambiguity)
+    gapped = np.where(direction > 0, o[exit_idx] < sl, o[exit_idx] > sl)
+    exit_price = np.where(outcome == _TP, tp,
+                          np.where(outcome == _SL, np.where(gapped, o[exit_idx], sl), c[exit_idx]))
+    r_mult = (exit_price - entry) * direction / np.abs(entry - sl)
+    return {"entry_idx": entry_idx, "direction": direction, "entry": entry, "sl": sl, "tp": tp,
+            "exit_idx": exit_idx, "outcome": outcome, "ambiguous": ambiguous,
+            "exit_price": exit_price, "r_multiple": r_mult}
+
+
+def select_trades(trades: Dict[str, np.ndarray], rows=None, allow_overlap: bool = False) -> Dict[str, np.ndarray]:
+    """Subset of simulated trades (`rows`), one position at a time unless allow_overlap."""
+    if rows is not None:
+        trades = {k: v[rows] for k, v in trades.items()}
+    if not allow_overlap and trades["entry_idx"].size:
+        keep = _sequential(trades["entry_idx"], trades["exit_idx"])
+        trades = {k: v[keep] for k, v in trades.items()}
+    return trades
+
+
+def summarize(trades: Dict[str, np.ndarray], n: int, risk_per_trade: float = 0.01, initial_equity: float = 1.0):
+    """(per-bar equity array, stats) of the selected trades."""
+    r_mult, outcome = trades["r_multiple"], trades["outcome"]
+    growth = np.ones(n)
+    np.multiply.at(growth, trades["exit_idx"], 1.0 + risk_per_trade * r_mult)
+    equity = initial_equity * np.cumprod(growth)
+
+    count = len(r_mult)
+    wins, losses = r_mult[r_mult > 0], r_mult[r_mult < 0]
+    stats = {
+        "bars": n,
+        "trades": int(count),
+        "win_rate": float(len(wins) / count) if count else 0.0,
+        "avg_r": float(r_mult.mean()) if count else 0.0,
+        "total_r": float(r_mult.sum()),
+        "profit_factor": float(wins.sum() / -losses.sum()) if losses.size else float("inf") if wins.size else 0.0,
+        "max_drawdown": _max_drawdown(equity),
+        "final_equity": float(equity[-1]) if n else initial_equity,
+        "avg_bars_held": float((trades["exit_idx"] - trades["entry_idx"]).mean()) if count else 0.0,
+        "ambiguous": int(trades["ambiguous"].sum()),
+        **{f"exits_{name}": int((outcome == code).sum()) for code, name in enumerate(OUTCOMES) if code},
+    }
+    return equity, stats
+
+
+def backtest(bars: dict, signals, sl=None, tp=None, max_hold: Optional[int] = None, ambiguity: str = None,
+             allow_overlap: bool = False, risk_per_trade: float = 0.01, initial_equity: float = 1.0,
+             atr_multiplier: float = None, rr_ratio: float = None) -> BacktestResult:
+    """
+    Replay per-bar `signals` (+1/-1/0, or LONG/SHORT/NO_TRADE) over `bars` (open/high/low/close
+    arrays; optional "timestamp" and "atr"). `sl`/`tp` are per-bar levels for the signal bars;
+    where omitted or NaN they come from sl_tp_levels on bars["atr"]. Signals without usable
+    levels are skipped.
+    """
+    c = np.asarray(bars["close"], dtype=np.float64)
+    n = len(c)
+    direction = np.asarray(signals)
+    if direction.dtype == object or direction.dtype.kind in "US":
+        direction = signal_directions(direction)
+    direction = direction.astype(np.int8)
+
+    entry_idx = np.flatnonzero(direction != 0)
+    dirs = direction[entry_idx].astype(np.float64)
+    entry = c[entry_idx]
+    if "atr" in bars:
+        sl_t, tp_t = sl_tp_levels(entry, np.asarray(bars["atr"], dtype=np.float64)[entry_idx], dirs,
+                                  atr_multiplier, rr_ratio)
+    elif sl is None or tp is None:
+        raise ValueError("backtest needs sl/tp levels or an 'atr' column to derive them")
+    else:
+        sl_t = tp_t = np.full(len(entry_idx), np.nan)
+    if sl is not None:
+        given = np.asarray(sl, dtype=np.float64)[entry_idx]
+        sl_t = np.where(np.isnan(given), sl_t, given)
+    if tp is not None:
+        given = np.asarray(tp, dtype=np.float64)[entry_idx]
+        tp_t = np.where(np.isnan(given), tp_t, given)
+    usable = np.isfinite(sl_t) & np.isfinite(tp_t) & (sl_t != entry)
+
+    sim = simulate(bars, entry_idx[usable], dirs[usable], sl_t[usable], tp_t[usable], max_hold, ambiguity)
+    t = select_trades(sim, allow_overlap=allow_overlap)
+    equity, stats = summarize(t, n, risk_per_trade, initial_equity)
+
+    ts = bars.get("timestamp")
+    index = pd.Index(ts) if ts is not None else pd.RangeIndex(n)
+    trades = pd.DataFrame({
+        "entry_idx": t["entry_idx"], "exit_idx": t["exit_idx"],
+        "entry_time": index[t["entry_idx"]], "exit_time": index[t["exit_idx"]],
+        "direction": np.where(t["direction"] > 0, "LONG", "SHORT"),
+        "entry_price": t["entry"], "stop_loss": t["sl"], "take_profit": t["tp"], "exit_price": t["exit_price"],
+        "outcome": OUTCOMES[t["outcome"]], "ambiguous": t["ambiguous"],
+        "bars_held": t["exit_idx"] - t["entry_idx"], "pnl": (t["exit_price"] - t["entry"]) * t["direction"],
+        "r_multiple": t["r_multiple"],
+    })
+    return BacktestResult(trades=trades, equity=pd.Series(equity, index=index, name="equity"), stats=stats)
+
+
+def load_bars(symbol: str, timeframe: str, start=None, end=None) -> dict:
+    """One MarketData series as backtest arrays (id, timestamp, OHLC)."""
+    from backend.models import MarketData  # lazy: the engine itself is Django-free
+
+    qs = MarketData.objects.filter(symbol=symbol, timeframe=timeframe)
+    if start is not None:
+        qs = qs.filter(timestamp__gte=start)
+    if end is not None:
+        qs = qs.filter(timestamp__lt=end)
+    rows = list(qs.order_by("timestamp").values_list("id", "timestamp", "open", "high", "low", "close"))
+    cols = list(zip(*rows)) if rows else [()] * 6
+    bars = {"id": np.array(cols[0], dtype=np.int64), "timestamp": pd.DatetimeIndex(cols[1]) if rows else pd.DatetimeIndex([])}
+    for key, values in zip(("open", "high", "low", "close"), cols[2:]):
+        bars[key] = np.array(values, dtype=np.float64)
+    return bars
+
+
+def previous_day_levels(timestamps, high: np.ndarray, low: np.ndarray):
+    """High / low of the previous (UTC) trading day for every bar: last_pdh / last_pdl."""
+    days = pd.DatetimeIndex(timestamps).normalize().asi8
+    uniq, inv = np.unique(days, return_inverse=True)
+    day_high, day_low = np.full(len(uniq), -np.inf), np.full(len(uniq), np.inf)
+    np.maximum.at(day_high, inv, high)
+    np.minimum.at(day_low, inv, low)
+    return np.r_[np.nan, day_high[:-1]][inv], np.r_[np.nan, day_low[:-1]][inv]
+
+
+def rule_inputs(symbol: str, timeframe: str, start=None, end=None) -> dict:
+    """Featurised bars as batch rule engine inputs, with previous-day high/low as S/R levels."""
+    from celery_tasks.run_rule_engine import market_arrays  # lazy: imports Django models
+
+    feats = market_arrays(symbol, timeframe, start=start, end=end)
+    if feats["close"].size:
+        feats["last_pdh"], feats["last_pdl"] = previous_day_levels(feats["timestamp"], feats["high"], feats["low"])
+    return feats
+
+
+def _aligned_features(bars: dict, symbol: str, timeframe: str):
+    feats = rule_inputs(symbol, timeframe, start=bars["timestamp"][0]) if len(bars["close"]) else None
+    if feats is None or not feats["close"].size:
+        return None, None
+    pos = pd.Index(bars["id"]).get_indexer(feats["market_data_id"])
+    return feats, pos
+
+
+def feature_atr(bars: dict, symbol: str, timeframe: str) -> np.ndarray:
+    """Stored ATR(14) aligned to `bars` (NaN where a bar has no features)."""
+    atr = np.full(len(bars["close"]), np.nan)
+    feats, pos = _aligned_features(bars, symbol, timeframe)
+    if feats is not None:
+        atr[pos[pos >= 0]] = feats["atr"][pos >= 0]
+    return atr
+
+
+def rule_signals(bars: dict, symbol: str, timeframe: str, strict_confirmation: bool = True,
+                 params: dict = None, chain_stage_flags: bool = False) -> np.ndarray:
+    """
+    Batch rule engine decisions aligned to `bars` (0 where a bar has no features), each on
+    the bar it is final on (at_decision): confirmation looks at the bars after the pattern
+    bar, like the scalar engine's confirmation_bars. `params` / `chain_stage_flags` as in
+    run_rule_engine_batch.
+    """
+    from trading.rules.batch import run_rule_engine_batch
+
+    signals = np.zeros(len(bars["close"]), dtype=np.int8)
+    feats, pos = _aligned_features(bars, symbol, timeframe)
+    if feats is not None:
+        res = run_rule_engine_batch(feats, strict_confirmation, params=params, chain_stage_flags=chain_stage_flags)
+        decided = at_decision(signal_directions(res["final_decision"]), res["decided_at"])
+        signals[pos[pos >= 0]] = decided[pos >= 0]
+    return signals
+
+
+def analysis_signals(bars: dict, symbol: str, timeframe: str, min_composite: float = 0.0):
+    """
+    Stored TradeAnalysis decisions (rules ⊕ ML) aligned to `bars`: signals, and the
+    analysis' own SL/TP where it has them (NaN otherwise).
+    """
+    from backend.models import TradeAnalysis  # lazy: the engine itself is Django-free
+
+    n = len(bars["close"])
+    signals, sl, tp = np.zeros(n, dtype=np.int8), np.full(n, np.nan), np.full(n, np.nan)
+    rows = [r for r in (TradeAnalysis.objects
+                        .filter(symbol=symbol, timeframe=timeframe, final_decision__in=["LONG", "SHORT"])
+                        .values_list("bar_ts", "final_decision", "composite_score", "sl", "tp"))
+            if r[2] is None or r[2] >= min_composite]
+    if not rows or not n:
+        return signals, sl, tp
+    stamps, decisions, _, a_sl, a_tp = zip(*rows)
+    pos = pd.DatetimeIndex(bars["timestamp"]).get_indexer(pd.DatetimeIndex(stamps))
+    found = pos >= 0
+    signals[pos[found]] = np.where(np.array(decisions)[found] == "LONG", 1, -1)
+    sl[pos[found]] = np.array([np.nan if v is None else v for v in a_sl], dtype=np.float64)[found]
+    tp[pos[found]] = np.array([np.nan if v is None else v for v in a_tp], dtype=np.float64)[found]
+    return signals, sl, tp
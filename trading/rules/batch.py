@@ -0,0 +1,310 @@
+"""
+Batch Rule Engine – Stages 1.1–1.4 over columnar arrays
+Agent 010 – Rule-Based Analysis Engine
+
+Same rules as engine.run_rule_engine, evaluated for every bar at once with NumPy masks
+and without the per-stage debug prints. Bar i is judged on the market dict that
+market_at(bars, i) builds: its last two candles (bars i-1, i), the next bars as
+confirmation bars and the previous bar's RSI as rsi14_prev. The results equal
+run_rule_engine(market_at(bars, i)) for every i (tests/test_rule_engine_batch.py).
+
+Because stage 1.3 reads the bars after bar i, bar i's decision is only final at bar
+decided_at[i]: the first confirming bar, or the end of the confirmation window. Anything
+acting on the decisions (e.g. the backtester) must act there, not at bar i.
+"""
+
+import numpy as np
+
+from .constants import (
+    STAGE_11_WEIGHT,
+    STAGE_13_WEIGHT,
+    STAGE_14_BONUS,
+    INCONCLUSIVE_THRESHOLD,
+    RED_FLAG_NO_PATTERN,
+    RED_FLAG_STRICT_NEEDS_CONFIRM,
+    SR_PROXIMITY_ATR_MULTIPLIER,
+    DEFAULT_CONFLUENCE_STRATEGY,
+    RSI_LONG_THRESHOLD,
+    RSI_SHORT_THRESHOLD,
+    RSI_MIN_DELTA,
+)
+
+# Columns (market dict keys) every batch needs; NaN plays the role of a missing value
+BAR_KEYS = ("open", "high", "low", "close", "volume", "atr", "ema8", "ema20", "ema50", "rsi14", "volume_z")
+# Optional per-bar inputs; key_levels may also be one shared 1-D list of levels
+OPTIONAL_KEYS = ("key_levels", "last_pdh", "last_pdl", "trigger_price", "rsi14_prev",
+                 "volume_support", "pattern_location_sr")
+
+# detect_pattern's names by code, in its order of precedence
+PATTERNS = np.array(["none", "bullish_engulfing", "bearish_engulfing", "hammer", "shooting_star"], dtype=object)
+_LONG_CODES = [i for i, p in enumerate(PATTERNS) if p in ("bullish_engulfing", "hammer", "morning_star")]
+_SHORT_CODES = [i for i, p in enumerate(PATTERNS) if p in ("bearish_engulfing", "shooting_star", "evening_star")]
+_BULLISH_CODES = [i for i, p in enumerate(PATTERNS) if p.startswith("bullish")]
+_BEARISH_CODES = [i for i, p in enumerate(PATTERNS) if p.startswith("bearish")]
+STRICT_CONFIRM_BARS = 2
+LOOSE_CONFIRM_BARS = 3
+
+# Tunable constants the batch takes as parameters (defaults: constants.py)
+RULE_PARAMS = {
+    "STAGE_11_WEIGHT": STAGE_11_WEIGHT,
+    "STAGE_13_WEIGHT": STAGE_13_WEIGHT,
+    "STAGE_14_BONUS": STAGE_14_BONUS,
+    "INCONCLUSIVE_THRESHOLD": INCONCLUSIVE_THRESHOLD,
+    "SR_PROXIMITY_ATR_MULTIPLIER": SR_PROXIMITY_ATR_MULTIPLIER,
+    "RSI_LONG_THRESHOLD": RSI_LONG_THRESHOLD,
+    "RSI_SHORT_THRESHOLD": RSI_SHORT_THRESHOLD,
+    "RSI_MIN_DELTA": RSI_MIN_DELTA,
+}
+
+
+def _col(bars: dict, key: str, n: int) -> np.ndarray:
+    return np.asarray(bars[key], dtype=np.float64).reshape(n)
+
+
+def _levels(bars: dict, n: int) -> np.ndarray:
+    """key_levels as an (n, k) float array, NaN-padded; a 1-D input applies to every bar."""
+    raw = bars.get("key_levels")
+    if raw is None:
+        return np.empty((n, 0))
+    levels = np.array(raw, dtype=np.float64)
+    if levels.ndim == 1:
+        levels = np.broadcast_to(levels, (n, levels.size))
+    return levels
+
+
+def _ahead(x: np.ndarray, k: int) -> np.ndarray:
+    """x[i + k] aligned to bar i (NaN past the end)."""
+    out = np.full_like(x, np.nan)
+    if k < len(x):
+        out[:len(x) - k] = x[k:]
+    return out
+
+
+def _near(close: np.ndarray, atr: np.ndarray, levels: np.ndarray, multiplier: float) -> np.ndarray:
+    if levels.shape[1] == 0:
+        return np.zeros(len(close), dtype=bool)
+    with np.errstate(invalid="ignore"):
+        return (np.abs(close[:, None] - levels) <= (multiplier * atr)[:, None]).any(axis=1)
+
+
+def pattern_codes(o: np.ndarray, h: np.ndarray, l: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """stage_12_patterns.detect_pattern on the window ending at every bar, as PATTERNS codes."""
+    n = len(c)
+    o1, c1 = np.r_[np.nan, o[:-1]], np.r_[np.nan, c[:-1]]
+    body0 = np.abs(c - o)
+    range0 = h - l
+    lower_wick = l - np.minimum(c, o)
+    upper_wick = h - np.maximum(c, o)
+    with np.errstate(invalid="ignore"):
+        bull_engulf = (c > o) & (c1 < o1) & (c >= o1) & (o <= c1)
+        bear_engulf = (c < o) & (c1 > o1) & (c <= o1) & (o >= c1)
+        hammer = (lower_wick >= 2 * body0) & (c > (l + range0 * 2 / 3))
+        star = (upper_wick >= 2 * body0) & (c < (h - range0 * 2 / 3))
+    code = np.select([bull_engulf, bear_engulf, hammer, star], [1, 2, 3, 4], default=0)
+    if n:
+        code[0] = 0  # fewer than 2 candles
+    return code
+
+
+def detect_patterns(o: np.ndarray, h: np.ndarray, l: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """Pattern names (object array) for every bar."""
+    return PATTERNS[pattern_codes(o, h, l, c)]
+
+
+def prepare_batch(bars: dict, strict_confirmation: bool = True) -> dict:
+    """
+    The parameter-free part of the batch: inputs as arrays, pattern codes, confirmation
+    and the red flags they raise. score_batch scores it for any RULE_PARAMS.
+    """
+    n = len(bars["close"])
+    o, h, l, c = (_col(bars, k, n) for k in ("open", "high", "low", "close"))
+    atr, vz, rsi = _col(bars, "atr", n), _col(bars, "volume_z", n), _col(bars, "rsi14", n)
+    levels = _levels(bars, n)
+    no_level = np.full(n, np.nan)
+    code = pattern_codes(o, h, l, c)
+    has_pattern = code != 0
+
+    with np.errstate(invalid="ignore"):
+        # Stage 1.3 – Confirmation (on the bars after the pattern bar)
+        bullish, bearish = np.isin(code, _BULLISH_CODES), np.isin(code, _BEARISH_CODES)
+        confirmed = np.zeros(n, dtype=bool)
+        lag = np.zeros(n, dtype=np.int64)  # first confirming bar after the pattern bar (0: none)
+        red_flag = ~has_pattern if RED_FLAG_NO_PATTERN else np.zeros(n, dtype=bool)
+        if strict_confirmation:
+            trigger = _col(bars, "trigger_price", n) if "trigger_price" in bars else c
+            for k in range(1, STRICT_CONFIRM_BARS + 1):
+                nxt = _ahead(c, k)
+                hit = ((bullish & (nxt > trigger)) | (bearish & (nxt < trigger))) & (vz > 0.5)
+                lag[hit & (lag == 0)] = k
+                confirmed |= hit
+            if RED_FLAG_STRICT_NEEDS_CONFIRM:
+                red_flag |= has_pattern & ~confirmed
+        else:
+            ema8 = _col(bars, "ema8", n)
+            for k in range(1, LOOSE_CONFIRM_BARS + 1):
+                nxt, nxt_ema = _ahead(c, k), _ahead(ema8, k)
+                truthy = (nxt_ema != 0) & ~np.isnan(nxt_ema)
+                hit = truthy & ((bullish & (nxt > nxt_ema)) | (bearish & (nxt < nxt_ema)))
+                lag[hit & (lag == 0)] = k
+                confirmed |= hit
+        confirmed &= has_pattern
+        lag[lag == 0] = STRICT_CONFIRM_BARS if strict_confirmation else LOOSE_CONFIRM_BARS
+
+    return {
+        "n": n, "close": c, "atr": atr, "rsi": rsi, "ema20": _col(bars, "ema20", n), "ema50": _col(bars, "ema50", n),
+        "rsi_prev": _col(bars, "rsi14_prev", n) if "rsi14_prev" in bars else np.r_[np.nan, rsi[:-1]],
+        "has_prev": np.ones(n, dtype=bool) if "rsi14_prev" in bars else np.arange(n) > 0,
+        "levels": levels,
+        "sr_levels": np.column_stack([levels,
+                                      _col(bars, "last_pdh", n) if "last_pdh" in bars else no_level,
+                                      _col(bars, "last_pdl", n) if "last_pdl" in bars else no_level]),
+        "volume_support": vz > 1.0,
+        "supported_input": (np.asarray(bars["volume_support"], dtype=bool).reshape(n) if "volume_support" in bars
+                            else np.zeros(n, dtype=bool)),
+        "at_sr_input": (np.asarray(bars["pattern_location_sr"], dtype=bool).reshape(n) if "pattern_location_sr" in bars
+                        else np.zeros(n, dtype=bool)),
+        "code": code, "has_pattern": has_pattern,
+        "is_long": np.isin(code, _LONG_CODES), "is_short": np.isin(code, _SHORT_CODES),
+        "confirmed": confirmed, "red_flag": red_flag, "decided_at": np.arange(n) + lag,
+    }
+
+
+def _cached(cache, key, compute):
+    if cache is None:
+        return compute()
+    if key not in cache:
+        cache[key] = compute()
+    return cache[key]
+
+
+def score_batch(prep: dict, params: dict = None, strategy: str = None, chain_stage_flags: bool = False,
+                cache: dict = None) -> dict:
+    """
+    Numeric stage results of a prepared batch under `params` (RULE_PARAMS overrides).
+    `cache` (any dict kept across calls on the same prep) reuses the masks that only depend
+    on some of the parameters, e.g. S/R proximity per SR_PROXIMITY_ATR_MULTIPLIER.
+    chain_stage_flags feeds stage 1.1 volume_support / stage 1.2 pattern_location_sr into
+    stage 1.4; the scalar engine leaves those to the caller's market dict (False when absent).
+    """
+    p = {**RULE_PARAMS, **(params or {})}
+    strategy = strategy or DEFAULT_CONFLUENCE_STRATEGY
+    c, atr, mult = prep["close"], prep["atr"], p["SR_PROXIMITY_ATR_MULTIPLIER"]
+    is_long, is_short = prep["is_long"], prep["is_short"]
+
+    # Stage 1.1 – Context / Stage 1.2 – Patterns at S/R
+    proximity_to_sr = _cached(cache, ("sr", mult), lambda: _near(c, atr, prep["sr_levels"], mult))
+    pattern_location_sr = _cached(cache, ("pattern_sr", mult), lambda: _near(c, atr, prep["levels"], mult))
+    s11 = prep["volume_support"] & proximity_to_sr
+
+    # Stage 1.4 – Confluence
+    def _confluence():
+        with np.errstate(invalid="ignore"):
+            if strategy == "rsi_volume":
+                rsi, prev = prep["rsi"], prep["rsi_prev"]
+                supported = prep["volume_support"] if chain_stage_flags else prep["supported_input"]
+                rising = (rsi - prev) >= p["RSI_MIN_DELTA"]
+                falling = (prev - rsi) >= p["RSI_MIN_DELTA"]
+                return prep["has_prev"] & supported & ((is_long & (rsi < p["RSI_LONG_THRESHOLD"]) & rising)
+                                                       | (is_short & (rsi > p["RSI_SHORT_THRESHOLD"]) & falling))
+            if strategy == "ema_price_sr":
+                ema20, ema50 = prep["ema20"], prep["ema50"]
+                at_sr = pattern_location_sr if chain_stage_flags else prep["at_sr_input"]
+                return at_sr & ((is_long & (c > ema20) & (ema20 > ema50)) | (is_short & (c < ema20) & (ema20 < ema50)))
+        return np.zeros(prep["n"], dtype=bool)
+
+    deps = ((p["RSI_MIN_DELTA"], p["RSI_LONG_THRESHOLD"], p["RSI_SHORT_THRESHOLD"]) if strategy == "rsi_volume"
+            else (mult,) if chain_stage_flags else ())
+    s14 = _cached(cache, ("s14", strategy, chain_stage_flags, deps), _confluence)
+
+    # Compute confidence and decide
+    points_11 = np.where(s11, p["STAGE_11_WEIGHT"], 0)
+    points_12 = np.where(prep["has_pattern"], 15 + np.where(pattern_location_sr, 15, 0), 0)
+    points_13 = np.where(prep["confirmed"], p["STAGE_13_WEIGHT"], 0)
+    points_14 = np.where(s14, p["STAGE_14_BONUS"], 0)
+    confidence = np.minimum(points_11 + points_12 + points_13 + points_14, 100)
+    red_flag = prep["red_flag"] | ~s14  # confluence is always evaluated: a miss is a red flag
+    # Above INCONCLUSIVE_THRESHOLD the scalar engine takes the direction whether or not
+    # MIN_CONFIDENCE_TO_TRADE is reached
+    trade = ~red_flag & (confidence >= p["INCONCLUSIVE_THRESHOLD"])
+    signal = np.where(trade & is_long, 1, np.where(trade & is_short, -1, 0)).astype(np.int8)
+    return {
+        "signal": signal, "confidence_score": confidence.astype(np.int64), "red_flag": red_flag,
+        "stage_11": s11, "stage_14": s14,
+        "points_11": points_11, "points_12": points_12, "points_13": points_13, "points_14": points_14,
+        "proximity_to_sr": proximity_to_sr, "pattern_location_sr": pattern_location_sr,
+    }
+
+
+def run_rule_engine_batch(bars: dict, strict_confirmation: bool = True, strategy: str = None,
+                          params: dict = None, chain_stage_flags: bool = False) -> dict:
+    """
+    Run Stages 1.1–1.4 for every bar of `bars` (BAR_KEYS arrays, optional OPTIONAL_KEYS).
+    `params` overrides RULE_PARAMS (the constants.py values by default).
+
+    Returns a dict of length-n arrays:
+        final_decision, candlestick_pattern, direction (object: str / None)
+        confidence_score (int), red_flag (bool)
+        stage_11 .. stage_14 (bool: stage passed), points_11 .. points_14 (int)
+        volume_support, proximity_to_sr, pattern_location_sr, pattern_confirmed,
+        indicator_confluence, confluence_ok (bool)
+        decided_at (int): the bar each decision is final on (> i, may be past the last bar)
+    """
+    prep = prepare_batch(bars, strict_confirmation)
+    scored = score_batch(prep, params, strategy, chain_stage_flags)
+    n = prep["n"]
+    direction = np.full(n, None, dtype=object)
+    direction[prep["is_long"]] = "LONG"
+    direction[prep["is_short"]] = "SHORT"
+    signal = scored["signal"]
+    decision = np.where(signal > 0, "LONG", np.where(signal < 0, "SHORT", "NO_TRADE")).astype(object)
+
+    return {
+        "final_decision": decision,
+        "confidence_score": scored["confidence_score"],
+        "red_flag": scored["red_flag"],
+        "direction": direction,
+        "candlestick_pattern": PATTERNS[prep["code"]],
+        "stage_11": scored["stage_11"], "stage_12": prep["has_pattern"], "stage_13": prep["confirmed"],
+        "stage_14": scored["stage_14"],
+        **{k: scored[k] for k in ("points_11", "points_12", "points_13", "points_14")},
+        "volume_support": prep["volume_support"],
+        "proximity_to_sr": scored["proximity_to_sr"],
+        "pattern_location_sr": scored["pattern_location_sr"],
+        "pattern_confirmed": prep["confirmed"],
+        "indicator_confluence": np.ones(n, dtype=bool),
+        "confluence_ok": scored["stage_14"],
+        "decided_at": prep["decided_at"],
+    }
+
+
+def _opt(bars: dict, key: str, i: int):
+    if key not in bars:
+        return None
+    v = float(np.asarray(bars[key], dtype=np.float64)[i])
+    return None if np.isnan(v) else v
+
+
+def market_at(bars: dict, i: int) -> dict:
+    """The scalar engine's market dict for bar i of `bars` (the batch engine's reference)."""
+    n = len(bars["close"])
+    row = {k: float(bars[k][i]) for k in BAR_KEYS}
+    candle = lambda j: {k: float(bars[k][j]) for k in ("open", "high", "low", "close", "volume")}
+    levels = _levels(bars, n)[i]
+    market = {
+        **row,
+        "key_levels": [float(x) for x in levels if not np.isnan(x)],
+        "last_pdh": _opt(bars, "last_pdh", i),
+        "last_pdl": _opt(bars, "last_pdl", i),
+        "trigger_price": _opt(bars, "trigger_price", i) if "trigger_price" in bars else row["close"],
+        "candles": [candle(j) for j in range(max(0, i - 1), i + 1)],
+        "confirmation_bars": [{**candle(j), "ema8": float(bars["ema8"][j])}
+                              for j in range(i + 1, min(n, i + 1 + LOOSE_CONFIRM_BARS))],
+    }
+    if "rsi14_prev" in bars:
+        market["rsi14_prev"] = _opt(bars, "rsi14_prev", i)
+    elif i > 0:
+        market["rsi14_prev"] = float(bars["rsi14"][i - 1])
+    for key in ("volume_support", "pattern_location_sr"):
+        if key in bars:
+            market[key] = bool(bars[key][i])
+    return market
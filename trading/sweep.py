@@ -0,0 +1,300 @@
+"""
+Parameter sweep over the rule constants (used by `manage.py sweep_rules`).
+
+- The swept names are RULE_PARAMS (stage weights, INCONCLUSIVE_THRESHOLD, S/R proximity, RSI
+  thresholds) plus the exit constants ATR_MULTIPLIER_SL / DEFAULT_RR_RATIO; defaults come
+  from trading/rules/constants.py. Configurations are a grid (every combination) or seeded
+  random samples.
+- The parent loads the series once and runs prepare_batch (patterns, confirmation: nothing
+  there depends on a parameter). Those arrays and the bars go into one SharedMemory block
+  that every worker of the ProcessPoolExecutor maps read-only, instead of pickling them per task.
+- Tasks are chunks of configurations sharing their exit constants. A worker fills every
+  pattern bar once per (ATR_MULTIPLIER_SL, DEFAULT_RR_RATIO) – fills do not depend on the rule
+  parameters; entries are on the bar each decision is final on, as in backtest.rule_signals,
+  never on the pattern bar the confirmation closes follow – and keeps a score_batch cache, so S/R proximity and confluence masks are
+  computed once per value of the parameters they depend on. A configuration then costs the
+  scoring arithmetic plus picking its signal rows out of the cached fills.
+- The result is a DataFrame of parameters + backtest stats, ranked by one stat.
+"""
+from __future__ import annotations
+
+import itertools
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from trading.backtest import select_trades, simulate, sl_tp_levels, summarize
+from trading.rules.batch import RULE_PARAMS, prepare_batch, score_batch
+from trading.rules.constants import ATR_MULTIPLIER_SL, DEFAULT_RR_RATIO
+
+logger = logging.getLogger(__name__)
+
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", str(os.cpu_count() or 1)))
+
+SWEEP_PARAMS = {**RULE_PARAMS, "ATR_MULTIPLIER_SL": ATR_MULTIPLIER_SL, "DEFAULT_RR_RATIO": DEFAULT_RR_RATIO}
+EXIT_PARAMS = ("ATR_MULTIPLIER_SL", "DEFAULT_RR_RATIO")
+
+# Grid used when no parameter is given (4 x 3 x 4 x 3 x 3 x 3 x 3 = 3888 configurations)
+DEFAULT_GRID = {
+    "SR_PROXIMITY_ATR_MULTIPLIER": [0.25, 0.5, 0.75, 1.0],
+    "ATR_MULTIPLIER_SL": [1.0, 1.5, 2.0],
+    "DEFAULT_RR_RATIO": [1.0, 1.5, 2.0, 3.0],
+    "INCONCLUSIVE_THRESHOLD": [40, 50, 60],
+    "RSI_LONG_THRESHOLD": [45, 50, 55],
+    "RSI_SHORT_THRESHOLD": [45, 50, 55],
+    "RSI_MIN_DELTA": [0, 2, 4],
+}
+
+# Stats where lower is better
+_ASCENDING = ("max_drawdown",)
+_BAR_KEYS = ("open", "high", "low", "close")
+
+_WORKER: dict = {}
+
+
+def _number(raw: str):
+    value = float(raw)
+    return int(value) if value.is_integer() and "." not in raw and "e" not in raw.lower() else value
+
+
+def parse_param(spec: str) -> Tuple[str, object]:
+    """
+    "NAME=v1,v2,..." -> (NAME, [values]); "NAME=lo:hi:step" -> (NAME, [lo, lo+step, .. hi]);
+    "NAME=lo:hi" -> (NAME, (lo, hi)), a range for random search.
+    """
+    name, sep, raw = spec.partition("=")
+    name = name.strip().upper()
+    if not sep or name not in SWEEP_PARAMS:
+        raise ValueError(f"Expected NAME=values with NAME one of {', '.join(SWEEP_PARAMS)}: {spec!r}")
+    try:
+        if ":" in raw:
+            parts = [_number(x.strip()) for x in raw.split(":")]
+            if len(parts) == 2:
+                return name, (parts[0], parts[1])
+            lo, hi, step = parts
+            if step <= 0 or hi < lo:
+                raise ValueError
+            count = int(math.floor((hi - lo) / step + 1e-9)) + 1
+            values = [lo + k * step for k in range(count)]
+            return name, values if all(isinstance(x, int) for x in parts) else [round(v, 10) for v in values]
+        return name, [_number(x.strip()) for x in raw.split(",") if x.strip()]
+    except ValueError:
+        raise ValueError(f"Bad values for {name}: {raw!r}") from None
+
+
+def grid_configs(grid: Dict[str, Sequence]) -> List[dict]:
+    """Every combination of the grid's values."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(list(grid[k]) for k in names))]
+
+
+def random_configs(space: Dict[str, object], samples: int, seed: int = 0) -> List[dict]:
+    """
+    `samples` seeded draws: a list is sampled uniformly from its values, a (lo, hi) tuple is a
+    uniform range (integers when both ends are ints).
+    """
+    rng = np.random.default_rng(seed)
+    configs = [{} for _ in range(samples)]
+    for name, values in space.items():
+        if isinstance(values, tuple):
+            lo, hi = values
+            if isinstance(lo, int) and isinstance(hi, int):
+                draws = rng.integers(lo, hi + 1, samples).tolist()
+            else:
+                draws = rng.uniform(lo, hi, samples).tolist()
+        else:
+            values = list(values)
+            draws = [values[k] for k in rng.integers(0, len(values), samples)]
+        for config, value in zip(configs, draws):
+            config[name] = value
+    return configs
+
+
+# ---------------------------------------------------------------------------
+# Shared memory
+# ---------------------------------------------------------------------------
+
+def _publish(arrays: Dict[str, np.ndarray]):
+    """Copy arrays into one SharedMemory block. Returns (shm, [(key, dtype, shape, offset)])."""
+    spec, offset = [], 0
+    for key, arr in arrays.items():
+        offset = -(-offset // 16) * 16  # keep every array 16-byte aligned
+        spec.append((key, arr.dtype.str, arr.shape, offset))
+        offset += arr.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (key, dtype, shape, start), arr in zip(spec, arrays.values()):
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)[...] = arr
+    return shm, spec
+
+
+def _views(buf, spec) -> Dict[str, np.ndarray]:
+    out = {}
+    for key, dtype, shape, start in spec:
+        view = np.ndarray(shape, dtype=dtype, buffer=buf, offset=start)
+        view.flags.writeable = False
+        out[key] = view
+    return out
+
+
+def _split(prep: dict, bars: dict) -> Dict[str, np.ndarray]:
+    arrays = {f"prep.{k}": np.ascontiguousarray(v) for k, v in prep.items() if isinstance(v, np.ndarray)}
+    arrays.update({f"bars.{k}": np.ascontiguousarray(bars[k], dtype=np.float64) for k in _BAR_KEYS})
+    return arrays
+
+
+def _init_state(arrays: Dict[str, np.ndarray], n: int, settings: dict, shm=None):
+    _WORKER.clear()
+    _WORKER.update(
+        shm=shm, settings=settings, n=n, cache={}, fills={},
+        prep={"n": n, **{k[5:]: v for k, v in arrays.items() if k.startswith("prep.")}},
+        bars={k[5:]: v for k, v in arrays.items() if k.startswith("bars.")},
+    )
+
+
+def _attach(shm_name: str, spec, n: int, settings: dict):
+    """ProcessPoolExecutor initializer: map the published arrays."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _init_state(_views(shm.buf, spec), n, settings, shm)
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+def _fills(exit_key: Tuple[float, float]) -> Dict[str, np.ndarray]:
+    """
+    Fills of every pattern bar under one (ATR multiplier, RR ratio), entered on the bar its
+    decision is final on (backtest.at_decision) with usable levels there; "row" is the
+    pattern bar. Sorted by (entry bar, pattern bar).
+    """
+    fills = _WORKER["fills"]
+    if exit_key not in fills:
+        fills.clear()  # tasks arrive grouped by exit key; keep one
+        prep, s, n = _WORKER["prep"], _WORKER["settings"], _WORKER["n"]
+        direction = np.where(prep["is_long"], 1.0, np.where(prep["is_short"], -1.0, 0.0))
+        decided_at = prep["decided_at"]
+        row = np.flatnonzero((direction != 0) & (decided_at < n))
+        row = row[np.lexsort((row, decided_at[row]))]
+        entry = decided_at[row]
+        sl, tp = sl_tp_levels(prep["close"][entry], prep["atr"][entry], direction[row], *exit_key)
+        usable = np.isfinite(sl) & np.isfinite(tp) & (sl != prep["close"][entry])
+        row, entry = row[usable], entry[usable]
+        fills[exit_key] = {**simulate(_WORKER["bars"], entry, direction[row], sl[usable], tp[usable],
+                                      s["max_hold"], s["ambiguity"]), "row": row}
+    return fills[exit_key]
+
+
+def evaluate(config: dict) -> dict:
+    """Backtest stats of one configuration against the worker's series."""
+    s = _WORKER["settings"]
+    params = {k: v for k, v in config.items() if k in RULE_PARAMS}
+    exit_key = (float(config.get("ATR_MULTIPLIER_SL", ATR_MULTIPLIER_SL)),
+                float(config.get("DEFAULT_RR_RATIO", DEFAULT_RR_RATIO)))
+    fills = _fills(exit_key)
+    signal = score_batch(_WORKER["prep"], params, s["strategy"], s["chain_stage_flags"], _WORKER["cache"])["signal"]
+    rows = np.flatnonzero(signal[fills["row"]] != 0)
+    entry = fills["entry_idx"][rows]
+    if rows.size:
+        rows = rows[np.r_[entry[1:] != entry[:-1], True]]  # one decision per entry bar: the latest pattern's
+    trades = select_trades(fills, rows, s["allow_overlap"])
+    return summarize(trades, _WORKER["n"], s["risk_per_trade"])[1]
+
+
+def _run_chunk(items: List[Tuple[int, dict]]) -> List[Tuple[int, dict]]:
+    return [(i, evaluate(config)) for i, config in items]
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def _chunks(configs: List[dict], workers: int, chunk_size: Optional[int]) -> List[List[Tuple[int, dict]]]:
+    groups: Dict[tuple, list] = {}
+    for i, config in enumerate(configs):
+        key = tuple(float(config.get(k, SWEEP_PARAMS[k])) for k in EXIT_PARAMS)
+        groups.setdefault(key, []).append((i, config))
+    if chunk_size is None:
+        chunk_size = max(1, min(256, math.ceil(len(configs) / (4 * max(workers, 1)))))
+    return [items[k:k + chunk_size] for items in groups.values() for k in range(0, len(items), chunk_size)]
+
+
+def rank(results: pd.DataFrame, rank_by: str = "total_r", min_trades: int = 0) -> pd.DataFrame:
+    """Configurations with at least `min_trades` trades, best first, with a 1-based "rank"."""
+    if rank_by not in results.columns:
+        raise ValueError(f"Unknown stat to rank by: {rank_by}")
+    ranked = results[results["trades"] >= min_trades]
+    ranked = ranked.sort_values([rank_by, "trades"], ascending=[rank_by in _ASCENDING, False], kind="stable")
+    ranked = ranked.reset_index(drop=True)
+    ranked.insert(0, "rank", np.arange(1, len(ranked) + 1))
+    return ranked
+
+
+def run_sweep(bars: dict, configs: List[dict], workers: Optional[int] = None, strict_confirmation: bool = True,
+              strategy: str = None, chain_stage_flags: bool = True, max_hold: Optional[int] = None,
+              ambiguity: str = None, allow_overlap: bool = False, risk_per_trade: float = 0.01,
+              rank_by: str = "total_r", min_trades: int = 0, chunk_size: Optional[int] = None,
+              progress=None) -> pd.DataFrame:
+    """
+    Backtest the batch rule engine's signals over `bars` (batch rule engine inputs, see
+    backtest.rule_inputs) for every configuration (SWEEP_PARAMS overrides). workers <= 1 runs
+    in-process. chain_stage_flags defaults on: without it stage 1.4 never passes on stored
+    features (see score_batch) and no configuration trades. `progress(done, total)` is called
+    per finished chunk. Returns the ranked table (see rank).
+    """
+    if not configs:
+        raise ValueError("No configurations to sweep")
+    for config in configs:
+        unknown = set(config) - set(SWEEP_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown sweep parameters: {', '.join(sorted(unknown))}")
+    workers = SWEEP_WORKERS if workers is None else workers
+    settings = {"strategy": strategy, "chain_stage_flags": chain_stage_flags, "max_hold": max_hold,
+                "ambiguity": ambiguity, "allow_overlap": allow_overlap, "risk_per_trade": risk_per_trade}
+
+    started = time.perf_counter()
+    prep = prepare_batch(bars, strict_confirmation)
+    arrays, n = _split(prep, bars), prep["n"]
+    chunks = _chunks(configs, workers, chunk_size)
+    stats: List[Optional[dict]] = [None] * len(configs)
+    done = 0
+
+    def _collect(results):
+        nonlocal done
+        for i, row in results:
+            stats[i] = row
+        done += len(results)
+        if progress is not None:
+            progress(done, len(configs))
+
+    if workers <= 1 or len(chunks) <= 1:
+        _init_state(arrays, n, settings)
+        try:
+            for items in chunks:
+                _collect(_run_chunk(items))
+        finally:
+            _WORKER.clear()
+    else:
+        shm, spec = _publish(arrays)
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=_attach,
+                                     initargs=(shm.name, spec, n, settings)) as pool:
+                for fut in as_completed([pool.submit(_run_chunk, items) for items in chunks]):
+                    _collect(fut.result())
+        finally:
+            shm.close()
+            shm.unlink()
+
+    seconds = time.perf_counter() - started
+    logger.info(f"Rule sweep: {len(configs)} configurations over {n} bars in {seconds:.2f}s "
+                f"({len(configs) / seconds if seconds > 0 else 0.0:.1f} configs/s, {len(chunks)} chunks)")
+    names = list(dict.fromkeys(k for config in configs for k in config))
+    table = pd.DataFrame([{**{k: config.get(k, SWEEP_PARAMS[k]) for k in names}, **row}
+                          for config, row in zip(configs, stats)])
+    return rank(table, rank_by, min_trades)